@@ -0,0 +1,37 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure activity lookups as done by autocompletion on each keystroke.
+
+``ActivityManager.get_all(search_term=...)`` matches substrings using ``LIKE``,
+scanning and loading all activities as ORM instances. ``ActivityManager.complete``
+uses a range on the ``lower(name)`` index and returns at most ``limit`` rows.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+
+from utils import TemporaryStore, best_of, populate, print_table
+
+SIZES = (1000, 10000, 100000)
+
+# Activity names are 'activity <pk>'.
+PREFIXES = ('a', 'activity 12', 'activity 12345')
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, 0, activity_count=count)
+            for prefix in PREFIXES:
+                rows.append((count, prefix,
+                    round(best_of(lambda: store.activities.get_all(search_term=prefix),
+                        repeat=3) * 1e3, 2),
+                    round(best_of(lambda: store.activities.complete(prefix)) * 1e3, 2)))
+    print_table(('activities', 'prefix', 'get_all [ms]', 'complete [ms]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,53 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure looking up the most frequently and most recently used activities.
+
+Without usage statistics a frontend loads all facts and counts them in python,
+or at best has the database count them. ``ActivityManager.get_frequent`` and
+``get_recent`` read the first rows of an index on ``activity_usage`` instead.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+from collections import Counter
+
+from hamster_lib.backends.sqlalchemy import objects
+from sqlalchemy import func, select
+from utils import TemporaryStore, best_of, populate, print_table
+
+SIZES = (10000, 100000)
+LIMIT = 10
+
+
+def count_in_python(store):
+    """Count the activities of all facts, the way frontends do."""
+    counter = Counter(fact.activity.pk for fact in store.facts.get_all())
+    return counter.most_common(LIMIT)
+
+
+def count_in_database(store):
+    """Count the activities of all facts using ``GROUP BY``."""
+    facts = objects.facts
+    count = func.count()
+    return store.session.execute(select([facts.c.activity_id, count]).group_by(
+        facts.c.activity_id).order_by(count.desc()).limit(LIMIT)).fetchall()
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, count, activity_count=count // 100)
+            rows.append((count,
+                round(best_of(lambda: count_in_python(store), repeat=1) * 1e3),
+                round(best_of(lambda: count_in_database(store), repeat=3) * 1e3, 1),
+                round(best_of(lambda: store.activities.get_frequent(limit=LIMIT)) * 1e3, 2),
+                round(best_of(lambda: store.activities.get_recent(limit=LIMIT)) * 1e3, 2)))
+    print_table(('facts', 'python [ms]', 'group by [ms]', 'get_frequent [ms]',
+                 'get_recent [ms]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,41 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Compare ``FactManager.aggregate`` to summing up the facts ``get_all`` returns.
+
+``aggregate`` issues a single ``GROUP BY`` query and never hydrates a fact, so
+it should be much faster and use constant memory no matter how many facts match.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+
+from utils import TemporaryStore, best_of, populate, print_table
+
+SIZES = (1000, 10000, 50000)
+
+
+def sum_in_python(store):
+    totals = {}
+    for fact in store.facts.get_all():
+        key = (fact.activity.name, fact.category.name if fact.category else None)
+        totals[key] = totals.get(key, 0) + fact.delta.total_seconds()
+    return totals
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, count, tag_count=10)
+            python = best_of(lambda: sum_in_python(store), repeat=3)
+            sql = best_of(lambda: store.facts.aggregate(group_by=('activity',)), repeat=3)
+            by_week = best_of(lambda: store.facts.aggregate(group_by=('week', 'tag')), repeat=3)
+        rows.append((count, int(python * 1e3), int(sql * 1e3), int(by_week * 1e3)))
+    print_table(('facts', 'get_all + sum [ms]', 'aggregate [ms]', 'by week and tag [ms]'),
+                rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
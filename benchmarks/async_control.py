@@ -0,0 +1,67 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure interactive latency of ``AsyncHamsterControl`` during a burst of exports.
+
+We fire a burst of ``get_all`` calls and then time a ``facts.get`` call. With a
+single shared executor the interactive call queues behind all exports. Our bulk
+lane keeps it from waiting for more than the calls already running.
+
+Requires python 3.6 or later.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import asyncio
+import functools
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hamster_lib.aio import AsyncHamsterControl
+from utils import TemporaryStore, populate, print_table
+
+EXPORTS = 8
+
+
+async def naive(control, executor, exports):
+    """Run everything on one shared executor, just like a plain ``run_in_executor`` would."""
+    loop = asyncio.get_event_loop()
+    facts = control.control.facts
+    get_all, get = control._in_scope(facts.get_all), control._in_scope(facts.get)
+    burst = [loop.run_in_executor(executor, get_all) for i in range(exports)]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await loop.run_in_executor(executor, functools.partial(get, 1))
+    latency = time.perf_counter() - started
+    await asyncio.gather(*burst)
+    return latency
+
+
+async def laned(control, exports):
+    burst = [asyncio.ensure_future(control.facts.get_all()) for i in range(exports)]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await control.facts.get(1)
+    latency = time.perf_counter() - started
+    await asyncio.gather(*burst)
+    return latency
+
+
+def main(exports=EXPORTS):
+    loop = asyncio.new_event_loop()
+    with TemporaryStore() as store:
+        populate(store, 5000)
+        control = AsyncHamsterControl(store.config)
+        executor = ThreadPoolExecutor(4)
+        shared = loop.run_until_complete(naive(control, executor, exports))
+        separate = loop.run_until_complete(laned(control, exports))
+        executor.shutdown()
+        loop.run_until_complete(control.close())
+    loop.close()
+    print_table(('exports', 'shared executor [ms]', 'separate lanes [ms]'),
+                [(exports, int(shared * 1e3), int(separate * 1e3))])
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
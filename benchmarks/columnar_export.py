@@ -0,0 +1,54 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure exporting facts for analytics.
+
+Compares loading ``Fact`` instances, ``FactRecord`` namedtuples and ``FactColumns``
+from the database, writing the columns to an ``.npz`` file and, if NumPy is
+installed, loading that file again.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import os
+import shutil
+import sys
+import tempfile
+
+from utils import TemporaryStore, best_of, populate, print_table
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FACTS = 100000
+
+
+def main(count=FACTS):
+    tmp_dir = tempfile.mkdtemp(prefix='hamster-bench-')
+    path = os.path.join(tmp_dir, 'facts.npz')
+    try:
+        with TemporaryStore() as store:
+            populate(store, count)
+            timings = [
+                ('get_all', lambda: store.facts.get_all()),
+                ('get_records', lambda: store.facts.get_records()),
+                ('get_columns', lambda: store.facts.get_columns()),
+            ]
+            columns = store.facts.get_columns()
+            timings.append(('write_npz', lambda: columns.write_npz(path)))
+            if numpy is not None:
+                timings.append(('numpy.load', lambda: dict(numpy.load(path))))
+            rows = []
+            for name, function in timings:
+                seconds = best_of(function, repeat=3)
+                rows.append((name, '{:.3f}'.format(seconds), '{:.0f}'.format(count / seconds)))
+            print_table(('operation', 'seconds', 'facts/s'), rows)
+            print('npz size: {:.1f} MiB'.format(os.path.getsize(path) / 2 ** 20))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
@@ -0,0 +1,44 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure activity completion as done on each keystroke.
+
+``ActivityManager.get_all(search_term=...)`` scans all activities using ``LIKE``
+and ``ActivityManager.complete`` queries the ``lower(name)`` index. The in-memory
+``store.completion`` index does not query at all and also ranks by recent usage.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+import time
+
+from utils import TemporaryStore, best_of, populate, print_table
+
+SIZES = (1000, 10000, 100000)
+
+# Activity names are 'activity <pk>'.
+PREFIXES = ('a', 'activity 12', 'activity 12345')
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, count, activity_count=count, tag_count=10)
+            started = time.time()
+            store.completion.complete('activities', '')
+            load = time.time() - started
+            for prefix in PREFIXES:
+                rows.append((count, prefix, round(load * 1e3),
+                    round(best_of(lambda: store.activities.get_all(search_term=prefix),
+                        repeat=3) * 1e3, 2),
+                    round(best_of(lambda: store.activities.complete(prefix)) * 1e3, 3),
+                    round(1e6 * best_of(
+                        lambda: store.completion.complete('activities', prefix)), 1)))
+    print_table(('activities', 'prefix', 'load [ms]', 'get_all [ms]', 'complete [ms]',
+                 'index [us]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
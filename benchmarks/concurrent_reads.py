@@ -0,0 +1,60 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure worker threads sharing one store, with and without a global lock.
+
+Before stores used thread local sessions, all access had to be serialized. Now
+each thread runs its requests within ``session_scope``. Only time spent waiting
+for the database overlaps. With a local SQLite file most time goes into building
+facts in python, so expect throughput to scale with server databases only.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import sys
+import threading
+
+from utils import BASE_START, TemporaryStore, best_of, populate, print_table
+
+THREADS = (1, 2, 4, 8)
+REQUESTS = 20
+
+
+def run(store, threads, lock):
+    """Let ``threads`` workers each retrieve a weeks worth of facts ``REQUESTS`` times."""
+    def work(offset):
+        start = BASE_START + datetime.timedelta(weeks=offset)
+        for index in range(REQUESTS):
+            with lock:
+                with store.session_scope():
+                    store.facts.get_all(start, start + datetime.timedelta(weeks=1))
+
+    workers = [threading.Thread(target=work, args=(offset,)) for offset in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+class NoLock(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+def main(thread_counts=THREADS):
+    rows = []
+    with TemporaryStore() as store:
+        populate(store, 20000)
+        for threads in thread_counts:
+            locked = best_of(lambda: run(store, threads, threading.Lock()), repeat=3)
+            unlocked = best_of(lambda: run(store, threads, NoLock()), repeat=3)
+            rows.append((threads, int(locked * 1e3), int(unlocked * 1e3)))
+    print_table(('threads', 'global lock [ms]', 'session per thread [ms]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(value) for value in sys.argv[1:]] or THREADS)
@@ -0,0 +1,47 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure ``FactManager.get_totals`` with and without the ``daily_totals`` table.
+
+Without the table all facts of the requested timeframe are loaded and summed up
+in python. With it we only sum up one row per workday and activity (or tag).
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import sys
+
+from utils import BASE_START, TemporaryStore, best_of, populate, print_table
+
+SIZES = (1000, 10000, 50000)
+
+
+def measure(store):
+    """Return timings for a year of totals per day and per activity in milliseconds."""
+    start = BASE_START.date()
+    end = start + datetime.timedelta(days=365)
+    by_day = best_of(lambda: store.facts.get_totals(start, end), repeat=3)
+    by_activity = best_of(lambda: store.facts.get_totals(start, end, group_by=('activity',)),
+        repeat=3)
+    return int(by_day * 1e3), int(by_activity * 1e3)
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, count, tag_count=10)
+            plain = measure(store)
+        with TemporaryStore(daily_totals=True) as store:
+            populate(store, count, tag_count=10)
+            store.totals.rebuild()
+            store.session.commit()
+            aggregated = measure(store)
+        rows.append((count,) + plain + aggregated)
+    print_table(('facts', 'per day [ms]', 'per activity [ms]',
+                 'table per day [ms]', 'table per activity [ms]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,55 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure deduplicating facts with sets.
+
+Half of the facts are distinct instances equal to another one, as produced by
+merging overlapping exports. ``Fact`` rebuilds its tuple representation for each
+hash and comparison, ``FrozenFact`` computes it once when it is frozen.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import sys
+
+from hamster_lib import Activity, Category, Fact, Tag
+from utils import BASE_START, best_of, print_table
+
+FACTS = 100000
+
+
+def get_facts(count):
+    facts = []
+    for index in range(count):
+        # Every value occurs twice.
+        value = index // 2
+        start = BASE_START + datetime.timedelta(minutes=15 * value)
+        activity = Activity('activity-{}'.format(value % 50), pk=value % 50 + 1,
+            category=Category('category-{}'.format(value % 5), pk=value % 5 + 1))
+        tags = [Tag('tag-{}'.format(value % 10), pk=value % 10 + 1),
+            Tag('tag-{}'.format(value % 7 + 10), pk=value % 7 + 11)]
+        facts.append(Fact(activity, start, start + datetime.timedelta(minutes=10),
+            pk=value + 1, description='description', tags=tags))
+    return facts
+
+
+def main(count=FACTS):
+    facts = get_facts(count)
+    frozen = [fact.frozen() for fact in facts]
+    assert len(set(facts)) == len(set(frozen)) == (count + 1) // 2
+
+    timings = (
+        ('Fact', 'set()', lambda: set(facts)),
+        ('FrozenFact', 'frozen() + set()', lambda: set(fact.frozen() for fact in facts)),
+        ('FrozenFact', 'set()', lambda: set(frozen)),
+    )
+    rows = []
+    for name, operation, function in timings:
+        seconds = best_of(function, repeat=3)
+        rows.append((name, operation, '{:.3f}'.format(seconds)))
+    print_table(('class', 'operation', 'seconds'), rows)
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
@@ -0,0 +1,61 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Compare importing facts one by one using ``save`` with ``save_many``.
+
+``save`` checks the timeframe, resolves activity and tags and commits for each
+fact individually. ``save_many`` handles the whole batch in a constant number
+of statements within a single transaction.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+import timeit
+
+from hamster_lib import Activity, Category, Fact, Tag
+from utils import TemporaryStore, fact_rows, print_table
+
+SIZES = (100, 1000, 5000)
+
+
+def get_facts(count):
+    """Return ``count`` new, non overlapping facts."""
+    categories = [Category('category {}'.format(index)) for index in range(5)]
+    activities = [Activity('activity {}'.format(index), category=categories[index % 5])
+                  for index in range(50)]
+    tags = [Tag('tag {}'.format(index)) for index in range(10)]
+    return [Fact(activities[row['activity_id'] - 1], row['start'], row['end'],
+                 description=row['description'], tags=[tags[index % 10]])
+            for index, row in enumerate(fact_rows(count))]
+
+
+def measure(count, function):
+    """Return the time in seconds ``function`` takes to import ``count`` facts."""
+    facts = get_facts(count)
+    with TemporaryStore() as store:
+        return timeit.timeit(lambda: function(store, facts), number=1)
+
+
+def save_each(store, facts):
+    for fact in facts:
+        store.facts.save(fact)
+
+
+def save_many(store, facts):
+    saved, errors = store.facts.save_many(facts)
+    assert not errors
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        each = measure(count, save_each)
+        many = measure(count, save_many)
+        rows.append((count, '{:.3f}'.format(each), '{:.3f}'.format(many),
+                     '{:.1f}x'.format(each / many)))
+    print_table(('facts', 'save [s]', 'save_many [s]', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,76 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure bulk duration, overlap and workday computations.
+
+``per fact`` uses ``Fact.delta`` and ``helpers.time.split_by_workday`` on ``Fact``
+instances. ``python`` and ``numpy`` use ``hamster_lib.intervals`` on epoch seconds
+without and with NumPy.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import sys
+
+from hamster_lib import Activity, Fact, intervals
+from hamster_lib.helpers import time as time_helpers
+from utils import BASE_START, best_of, print_table
+
+FACTS = 100000
+
+CONFIG = {'day_start': datetime.time(5, 30)}
+
+
+def get_facts(count):
+    activity = Activity('activity')
+    facts = []
+    for index in range(count):
+        # Every 100th fact overlaps its successor.
+        start = BASE_START + datetime.timedelta(hours=4 * index)
+        end = start + datetime.timedelta(hours=5 if index % 100 == 0 else 3)
+        facts.append(Fact(activity, start, end))
+    return facts
+
+
+def per_fact(facts):
+    return {
+        'durations': lambda: [fact.delta.total_seconds() for fact in facts],
+        'split_by_workday': lambda: [time_helpers.split_by_workday(fact.start, fact.end, CONFIG)
+            for fact in facts],
+    }
+
+
+def bulk(starts, ends):
+    return {
+        'durations': lambda: intervals.durations(starts, ends),
+        'overlapping': lambda: intervals.overlapping(starts, ends),
+        'find_overlaps': lambda: intervals.find_overlaps(starts, ends),
+        'split_by_workday': lambda: intervals.split_by_workday(starts, ends,
+            CONFIG['day_start']),
+    }
+
+
+def main(count=FACTS):
+    facts = get_facts(count)
+    starts, ends = intervals.get_ranges(facts)
+    implementations = [('per fact', per_fact(facts)), ('python', None)]
+    numpy = intervals.numpy
+    if numpy is not None:
+        implementations.append(('numpy', None))
+
+    rows = []
+    for name, functions in implementations:
+        intervals.numpy = numpy if name == 'numpy' else None
+        if functions is None:
+            functions = bulk(starts, ends)
+        for operation in ('durations', 'overlapping', 'find_overlaps', 'split_by_workday'):
+            if operation in functions:
+                seconds = best_of(functions[operation], repeat=3)
+                rows.append((operation, name, '{:.4f}'.format(seconds)))
+    intervals.numpy = numpy
+    print_table(('operation', 'implementation', 'seconds'), sorted(rows))
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
@@ -0,0 +1,83 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure the memory needed to hold facts, as hydrated by the SQLAlchemy backend.
+
+``get_all`` creates a ``Fact`` with its own ``Activity``, ``Category`` and ``Tag``
+instances for each row. ``get_records`` creates a ``FactRecord`` per row and shares
+equal names and tag tuples. Start and end datetimes are part of both.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import gc
+import sys
+import tracemalloc
+
+from hamster_lib import Activity, Category, Fact, FactRecord, Tag
+from utils import BASE_START, print_table
+
+COUNT = 1000000
+
+
+def get_rows(count, activity_count=50, tag_count=10):
+    """Return a function providing the column values of the n-th fact row."""
+    def get_row(index):
+        start = BASE_START + datetime.timedelta(minutes=15 * index)
+        # Fresh strings for each row, just like database drivers return them.
+        activity = ''.join(('activity-', str(index % activity_count)))
+        category = ''.join(('category-', str(index % 5)))
+        tag = ''.join(('tag-', str(index % tag_count)))
+        return (index + 1, start, start + datetime.timedelta(minutes=10), index % 50 + 1,
+            activity, index % 5 + 1, category, index % tag_count + 1, tag)
+    return get_row
+
+
+def build_facts(count):
+    get_row = get_rows(count)
+    facts = []
+    for index in range(count):
+        (pk, start, end, activity_pk, activity, category_pk, category, tag_pk,
+            tag) = get_row(index)
+        facts.append(Fact(Activity(activity, pk=activity_pk, category=Category(category,
+            pk=category_pk)), start, end, pk=pk, tags=[Tag(tag, pk=tag_pk)]))
+    return facts
+
+
+def build_records(count):
+    get_row = get_rows(count)
+    shared = {}
+
+    def share(value):
+        return shared.setdefault(value, value)
+
+    records = []
+    for index in range(count):
+        pk, start, end, _, activity, _, category, _, tag = get_row(index)
+        records.append(FactRecord(pk, start, end, share(activity), share(category),
+            share((share(tag),)), None))
+    return records
+
+
+def measure(build, count):
+    """Return the bytes allocated by ``build(count)`` and still held afterwards."""
+    gc.collect()
+    tracemalloc.start()
+    result = build(count)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main(count=COUNT):
+    rows = []
+    for name, build in (('Fact', build_facts), ('FactRecord', build_records)):
+        size = measure(build, count)
+        rows.append((name, '{:.0f}'.format(size / count), '{:.1f}'.format(size / 2 ** 20)))
+    print_table(('representation', 'bytes/fact', 'total [MiB]'), rows)
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
@@ -0,0 +1,57 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Benchmark range lookups on the ``facts`` table with and without our indexes.
+
+With our indexes in place looking up the facts of a one day window should take
+roughly the same time no matter how many facts are stored (``O(log n)`` index
+seeks). Without them each lookup is a full table scan and grows linearly.
+
+We measure the query ``_get_all`` issues, not the hydration of its results.
+
+Note:
+    The overlap check done by ``_timeframe_available_for_fact`` (``start < end
+    AND end > start``) can only use one side of the range. Its cost depends on
+    where the probed timeframe lies.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import sys
+
+from hamster_lib.backends.sqlalchemy import objects
+from utils import TemporaryStore, best_of, fact_rows, populate, print_table
+
+SIZES = (1000, 10000, 100000)
+
+
+def measure(store, count):
+    """Return ``(complete, partial)`` lookup timings in microseconds."""
+    # Pick a window in the middle of our data.
+    middle = list(fact_rows(count // 2 + 1))[-1]
+    start = middle['start'].replace(hour=0, minute=0)
+    end = start + datetime.timedelta(days=1)
+
+    complete = best_of(lambda: store.facts._get_all_query(start, end).all())
+    partial = best_of(lambda: store.facts._get_all_query(start, end, partial=True).all())
+    return int(complete * 1e6), int(partial * 1e6)
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, count)
+            indexed = measure(store, count)
+            engine = store.session.get_bind()
+            for index in objects.facts.indexes:
+                index.drop(bind=engine)
+            unindexed = measure(store, count)
+        rows.append((count,) + indexed + unindexed)
+    print_table(('facts', 'complete [us]', 'partial [us]',
+                 'complete no index [us]', 'partial no index [us]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,43 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure ``FactManager.search`` with the FTS5 index and with the ``LIKE`` fallback.
+
+``LIKE '%term%'`` can not use any index, so the fallback scans all facts along
+with their activity, category and tags. The FTS5 index only looks up the facts
+containing each term.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+
+from utils import TemporaryStore, best_of, populate, print_table
+
+SIZES = (10000, 100000)
+
+# A term matching every 50th fact by activity and one matching a single description.
+QUERIES = ('activity 7', 'fact #4321')
+
+
+def measure(store):
+    """Return the time of each query in ``QUERIES`` in milliseconds."""
+    return [round(best_of(lambda: store.facts.search(query), repeat=3) * 1e3, 1)
+        for query in QUERIES]
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, count, tag_count=10)
+            indexed = measure(store)
+            store.search.enabled = False
+            plain = measure(store)
+        rows.append([count] + plain + indexed)
+    print_table(('facts', 'like common [ms]', 'like rare [ms]', 'fts5 common [ms]',
+                 'fts5 rare [ms]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
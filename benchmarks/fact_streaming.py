@@ -0,0 +1,56 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Compare peak memory usage of ``FactManager.get_all`` and ``FactManager.iter_all``.
+
+``get_all`` builds a list of all matching facts, so its peak memory usage grows
+linearly with the number of facts. ``iter_all`` only ever holds one batch and
+should stay flat.
+
+Note:
+    This requires Python 3 as we use ``tracemalloc``.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+import tracemalloc
+
+from utils import TemporaryStore, populate, print_table
+
+SIZES = (1000, 10000, 50000)
+
+
+def peak_memory(function):
+    """Return peak memory allocated while running ``function`` in KiB."""
+    tracemalloc.start()
+    try:
+        function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+def consume(iterable):
+    """Process all facts one by one without keeping them around."""
+    count = 0
+    for fact in iterable:
+        count += 1
+    return count
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, count, tag_count=10)
+            listed = peak_memory(lambda: consume(store.facts.get_all()))
+            store.session.expunge_all()
+            streamed = peak_memory(lambda: consume(store.facts.iter_all()))
+        rows.append((count, listed, streamed))
+    print_table(('facts', 'get_all peak [KiB]', 'iter_all peak [KiB]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
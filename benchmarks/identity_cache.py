@@ -0,0 +1,41 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure resolving related instances with and without our identity cache.
+
+This is what ``FactManager._add`` does for the activity and each tag of a new
+fact. Without a cached entry resolving an activity costs two queries (category
+and activity), resolving a tag one.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+
+from hamster_lib import Category
+from utils import TemporaryStore, best_of, populate, print_table
+
+LOOKUPS = 1000
+
+
+def resolve(store, count, clear_cache):
+    category = Category('category 2')
+    for index in range(count):
+        if clear_cache:
+            store.cache.clear()
+        store.activities.get_by_composite('activity 1', category, raw=True)
+        store.tags.get_by_name('tag 1', raw=True)
+
+
+def main(count=LOOKUPS):
+    with TemporaryStore() as store:
+        populate(store, 100, tag_count=10)
+        uncached = best_of(lambda: resolve(store, count, True), repeat=3)
+        cached = best_of(lambda: resolve(store, count, False), repeat=3)
+        info = store.cache.cache_info()
+    print_table(('lookups', 'uncached [ms]', 'cached [ms]', 'hits', 'misses'),
+                [(count, int(uncached * 1e3), int(cached * 1e3), info.hits, info.misses)])
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
@@ -0,0 +1,52 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure the overlap check run whenever a fact is saved.
+
+``FactManager._timeframe_available_for_fact`` is timed for a timeframe at the
+beginning, in the middle and at the end of the stored facts, once using the
+``fact_ranges`` R*Tree and once using the plain ``start``/``end`` index. The
+latter only narrows the search down to the facts starting before the timeframe
+ends, so it gets slower the later the timeframe is.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import sys
+
+from hamster_lib import Fact
+from utils import BASE_START, TemporaryStore, best_of, populate, print_table
+
+SIZES = (10000, 100000, 1000000)
+
+
+def measure(store, count):
+    """Return the time of an overlap check at each position in microseconds."""
+    result = []
+    for index in (0, count // 2, count - 1):
+        # Overlaps the stored fact ``index`` (facts start an hour apart).
+        start = BASE_START + datetime.timedelta(hours=index, minutes=30)
+        fact = Fact(None, start, start + datetime.timedelta(minutes=20))
+        assert not store.facts._timeframe_available_for_fact(fact)
+        result.append(int(best_of(lambda: store.facts._timeframe_available_for_fact(fact),
+            repeat=5, number=20) * 1e6))
+    return result
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            assert store.ranges.enabled
+            populate(store, count)
+            indexed = measure(store, count)
+            store.ranges.enabled = False
+            plain = measure(store, count)
+        rows.append([count] + plain + indexed)
+    print_table(('facts', 'first [us]', 'middle [us]', 'last [us]',
+                 'rtree first [us]', 'rtree middle [us]', 'rtree last [us]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,55 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure the cost of a page of facts depending on how deep it is.
+
+``LIMIT ... OFFSET`` has the database step over all preceding facts, so late
+pages get slower and slower. ``FactManager.get_page`` seeks right behind the
+``(start, id)`` keyset held by its token instead.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+
+from hamster_lib import storage
+from hamster_lib.backends.sqlalchemy.objects import AlchemyFact
+from utils import TemporaryStore, best_of, populate, print_table
+
+SIZES = (10000, 100000)
+PAGE_SIZE = 50
+
+
+def get_offset_page(store, offset):
+    """Return a page using ``OFFSET``, the way one would without keyset pagination."""
+    query = store.facts._eager_load(store.facts._get_all_query())
+    query = query.order_by(AlchemyFact.start, AlchemyFact.pk).offset(offset).limit(PAGE_SIZE)
+    return [alchemy_fact.as_hamster() for alchemy_fact in query]
+
+
+def get_token(store, offset):
+    """Return the token of the page starting at ``offset``."""
+    if not offset:
+        return None
+    fact = get_offset_page(store, offset - 1)[0]
+    return store.facts._encode_token((fact.start.strftime(storage.TOKEN_TIME_FORMAT),
+        fact.pk))
+
+
+def main(sizes=SIZES):
+    rows = []
+    for count in sizes:
+        with TemporaryStore() as store:
+            populate(store, count, tag_count=10)
+            everything = best_of(lambda: store.facts.get_all(), repeat=1)
+            for offset in (0, count // 2, count - PAGE_SIZE):
+                token = get_token(store, offset)
+                assert store.facts.get_page(token=token).items == get_offset_page(store, offset)
+                rows.append((count, offset, round(everything * 1e3),
+                    round(best_of(lambda: get_offset_page(store, offset)) * 1e3, 1),
+                    round(best_of(lambda: store.facts.get_page(token=token)) * 1e3, 1)))
+    print_table(('facts', 'offset', 'get_all [ms]', 'offset page [ms]', 'get_page [ms]'), rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,65 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure raw fact parsing throughput.
+
+``distinct`` lines all carry their own timestamps, as in a typical text log.
+``repeated`` lines only use a handful of different texts, so parses are mostly
+served from ``parse_raw_fact``'s cache.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import sys
+
+from hamster_lib import Fact
+from hamster_lib.helpers import helpers
+from utils import BASE_START, best_of, print_table
+
+LINES = 20000
+
+CONFIG = {'day_start': datetime.time(5, 30)}
+
+
+def get_lines(count, distinct=True):
+    lines = []
+    for index in range(count):
+        start = BASE_START + datetime.timedelta(minutes=15 * (index if distinct else index % 8))
+        end = start + datetime.timedelta(minutes=10)
+        lines.append('{:%Y-%m-%d %H:%M} - {:%Y-%m-%d %H:%M} activity-{}@category #foo #bar,'
+            ' description {}'.format(start, end, index % 50, index % 4))
+    return lines
+
+
+def parse_uncached(lines):
+    for line in lines:
+        helpers._parse_raw_fact(line)
+
+
+def parse(lines):
+    if helpers.lru_cache:
+        helpers._cached_parse_raw_fact.cache_clear()
+    for line in lines:
+        helpers.parse_raw_fact(line)
+
+
+def create_many(lines):
+    if helpers.lru_cache:
+        helpers._cached_parse_raw_fact.cache_clear()
+    for result in Fact.create_many_from_raw_facts(lines, CONFIG):
+        pass
+
+
+def main(count=LINES):
+    rows = []
+    for name, distinct in (('distinct', True), ('repeated', False)):
+        lines = get_lines(count, distinct)
+        for function in (parse_uncached, parse, create_many):
+            seconds = best_of(lambda: function(lines), repeat=3)
+            rows.append((name, function.__name__, '{:.0f}'.format(count / seconds)))
+    print_table(('lines', 'function', 'lines/s'), rows)
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
@@ -0,0 +1,74 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Compare peak memory usage of our buffering and streaming report writers.
+
+Buffering writers keep a whole ``icalendar.Calendar`` or
+``xml.dom.minidom.Document`` around until the report is closed, so their peak
+memory usage grows linearly with the number of exported facts. Streaming
+writers only ever hold the fact currently written.
+
+Note:
+    This requires Python 3 as we use ``tracemalloc``.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from hamster_lib import Activity, Category, Fact, reports
+from utils import BASE_START, print_table
+
+SIZES = (1000, 10000, 50000)
+WRITERS = (reports.ICALWriter, reports.XMLWriter)
+
+
+def generate_facts(count):
+    """Generate ``count`` non persistent facts without keeping them around."""
+    category = Category('category')
+    activities = [Activity('activity {}'.format(index), category=category) for index in range(50)]
+    step = datetime.timedelta(hours=1)
+    for index in range(count):
+        start = BASE_START + index * step
+        yield Fact(activities[index % 50], start, start + datetime.timedelta(minutes=45),
+            description='Benchmark fact #{}'.format(index))
+
+
+def peak_memory(writer_class, path, count, stream):
+    """Return peak memory allocated while writing a report of ``count`` facts in KiB."""
+    tracemalloc.start()
+    try:
+        writer_class(path, stream=stream).write_report(generate_facts(count))
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+def main(sizes=SIZES):
+    tmp_dir = tempfile.mkdtemp(prefix='hamster-bench-')
+    path = os.path.join(tmp_dir, 'report')
+    headers = ['facts']
+    for writer_class in WRITERS:
+        headers.extend(['{} [KiB]'.format(writer_class.__name__),
+                        '{} stream [KiB]'.format(writer_class.__name__)])
+    rows = []
+    try:
+        for count in sizes:
+            row = [count]
+            for writer_class in WRITERS:
+                row.append(peak_memory(writer_class, path, count, False))
+                row.append(peak_memory(writer_class, path, count, True))
+            rows.append(row)
+    finally:
+        shutil.rmtree(tmp_dir)
+    print_table(headers, rows)
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
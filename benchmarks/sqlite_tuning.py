@@ -0,0 +1,58 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure start/stop latency with SQLite's defaults and with our tuning profile.
+
+Each cycle starts an ongoing fact and stops it again, which stores it with one
+commit. In rollback journal mode each commit syncs the database file twice. With
+``journal_mode=WAL`` and ``synchronous=NORMAL`` commits are only appended to the
+log, syncs happen at checkpoints.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import sys
+import timeit
+
+from hamster_lib import Activity, Fact
+from hamster_lib.helpers import config_helpers
+from utils import BASE_START, TemporaryStore, populate, print_table
+
+CYCLES = 200
+
+
+def get_tuning():
+    """Return the sqlite options of our default config."""
+    config = config_helpers.get_default_backend_config(config_helpers.DEFAULT_APPDIRS)
+    return dict((key, config[key]) for key in
+        config_helpers.SQLITE_TEXT_OPTIONS + config_helpers.SQLITE_INT_OPTIONS)
+
+
+def start_stop(store, cycles):
+    """Return the mean latency of a start/stop cycle in milliseconds."""
+    activity = Activity('benchmark')
+    start = BASE_START - datetime.timedelta(days=cycles + 1)
+
+    def cycle(index):
+        fact_start = start + datetime.timedelta(days=index)
+        store.facts.save(Fact(activity, fact_start, None))
+        store.facts.stop_tmp_fact(fact_start + datetime.timedelta(minutes=30))
+
+    indexes = iter(range(cycles))
+    seconds = timeit.timeit(lambda: cycle(next(indexes)), number=cycles)
+    return seconds / cycles * 1e3
+
+
+def main(cycles=CYCLES):
+    rows = []
+    for name, config in (('defaults', {}), ('tuned', get_tuning())):
+        with TemporaryStore(**config) as store:
+            populate(store, 10000)
+            journal_mode = store.session.execute('PRAGMA journal_mode').scalar()
+            rows.append((name, journal_mode, '{:.2f}'.format(start_stop(store, cycles))))
+    print_table(('profile', 'journal_mode', 'start/stop [ms]'), rows)
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
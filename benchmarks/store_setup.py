@@ -0,0 +1,38 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure setting up and cleaning up a ``SQLAlchemyStore`` for an existing database.
+
+This is what creating a ``HamsterControl`` per request costs. With the engine
+registry only the first store creates an engine and sets up the schema.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+
+from hamster_lib.backends.sqlalchemy import SQLAlchemyStore, engines
+from utils import TemporaryStore, best_of, print_table
+
+STORES = 100
+
+
+def setup_stores(config, count, reuse):
+    for index in range(count):
+        if not reuse:
+            engines.registry.dispose_all()
+        store = SQLAlchemyStore(config)
+        store.cleanup()
+
+
+def main(count=STORES):
+    with TemporaryStore() as store:
+        config = store.config
+        fresh = best_of(lambda: setup_stores(config, count, False), repeat=3)
+        shared = best_of(lambda: setup_stores(config, count, True), repeat=3)
+    print_table(('stores', 'fresh engine [ms]', 'shared engine [ms]'),
+                [(count, int(fresh * 1e3), int(shared * 1e3))])
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
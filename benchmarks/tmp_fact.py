@@ -0,0 +1,54 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Measure loading and storing the ongoing fact, pickled and as JSON file.
+
+``get_tmp_fact`` is called on every status query, so loading is what matters
+most. Storing includes the ``fsync`` and rename that make the JSON file atomic.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import os.path
+import pickle
+import shutil
+import sys
+import tempfile
+
+from hamster_lib import Activity, Category, Fact, Tag
+from hamster_lib.helpers import helpers
+from utils import BASE_START, best_of, print_table
+
+NUMBER = 2000
+
+
+def get_fact():
+    activity = Activity('benchmark', pk=1, category=Category('work', pk=1))
+    tags = [Tag('tag-{}'.format(index), pk=index) for index in range(5)]
+    return Fact(activity, BASE_START, description='Some description.', tags=tags)
+
+
+def dump_pickle(path, fact):
+    with open(path, 'wb') as fobj:
+        pickle.dump(fact, fobj)
+
+
+def main(number=NUMBER):
+    fact = get_fact()
+    tmp_dir = tempfile.mkdtemp(prefix='hamster-bench-')
+    try:
+        path = os.path.join(tmp_dir, 'hamster.tmp')
+        rows = []
+        for name, dump in (('pickle', dump_pickle), ('json', helpers._dump_tmp_fact)):
+            dump(path, fact)
+            load = best_of(lambda: helpers._load_tmp_fact(path), number=number)
+            store = best_of(lambda: dump(path, fact), number=max(number // 10, 1))
+            rows.append((name, os.path.getsize(path), '{:.1f}'.format(load * 1e6),
+                '{:.1f}'.format(store * 1e6)))
+    finally:
+        shutil.rmtree(tmp_dir)
+    print_table(('format', 'size [bytes]', 'load [us]', 'store [us]'), rows)
+
+
+if __name__ == '__main__':
+    main(*[int(value) for value in sys.argv[1:]])
@@ -0,0 +1,123 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Shared helpers for our benchmark scripts.
+
+Benchmarks are plain scripts and not part of the test suite. Run them from the
+project root, for example: ``python benchmarks/fact_ranges.py``.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import datetime
+import os
+import shutil
+import tempfile
+import timeit
+
+from hamster_lib.backends.sqlalchemy import SQLAlchemyStore, objects
+
+BASE_START = datetime.datetime(2010, 1, 1, 8, 0, 0)
+
+
+def get_config(db_path, **kwargs):
+    """Return a backend config suitable to set up a benchmark store."""
+    tmp_dir = os.path.dirname(db_path)
+    config = {
+        'store': 'sqlalchemy',
+        'day_start': datetime.time(5, 30, 0),
+        'fact_min_delta': 1,
+        'tmpfile_path': os.path.join(tmp_dir, 'hamster.tmp'),
+        'db_engine': 'sqlite',
+        'db_path': db_path,
+    }
+    config.update(kwargs)
+    return config
+
+
+class TemporaryStore(object):
+    """Context manager providing a ``SQLAlchemyStore`` backed by a throwaway sqlite file."""
+
+    def __init__(self, **config):
+        self.config = config
+
+    def __enter__(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='hamster-bench-')
+        config = get_config(os.path.join(self.tmp_dir, 'hamster.sqlite'), **self.config)
+        self.store = SQLAlchemyStore(config)
+        return self.store
+
+    def __exit__(self, *args):
+        self.store.session.close()
+        self.store.cleanup()
+        shutil.rmtree(self.tmp_dir)
+
+
+def fact_rows(count, activity_count=50, start=BASE_START, gap_minutes=15):
+    """
+    Generate consecutive, non overlapping ``facts`` table rows.
+
+    Each fact lasts 45 minutes and is followed by a ``gap_minutes`` pause.
+    """
+    duration = datetime.timedelta(minutes=45)
+    step = duration + datetime.timedelta(minutes=gap_minutes)
+    for index in range(count):
+        fact_start = start + index * step
+        yield {
+            'start': fact_start,
+            'end': fact_start + duration,
+            'activity_id': (index % activity_count) + 1,
+            'description': 'Benchmark fact #{}'.format(index),
+        }
+
+
+def populate(store, count, activity_count=50, tag_count=0, chunk_size=10000):
+    """
+    Fill a store with ``count`` facts as fast as possible.
+
+    We bypass the managers and use plain ``executemany`` inserts as we want to
+    measure retrieval, not our insertion code path.
+    """
+    session = store.session
+    session.execute(objects.categories.insert(), [
+        {'id': pk, 'name': 'category {}'.format(pk)} for pk in range(1, 6)])
+    session.execute(objects.activities.insert(), [
+        {'id': pk, 'name': 'activity {}'.format(pk), 'deleted': False,
+         'category_id': (pk % 5) + 1} for pk in range(1, activity_count + 1)])
+    if tag_count:
+        session.execute(objects.tags.insert(), [
+            {'id': pk, 'name': 'tag {}'.format(pk)} for pk in range(1, tag_count + 1)])
+
+    chunk = []
+    for pk, row in enumerate(fact_rows(count, activity_count), 1):
+        row['id'] = pk
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            _insert_facts(session, chunk, tag_count)
+            chunk = []
+    if chunk:
+        _insert_facts(session, chunk, tag_count)
+    # Usage statistics are maintained by ``FactManager``, which we just bypassed.
+    store.usage.rebuild()
+    session.commit()
+
+
+def _insert_facts(session, rows, tag_count):
+    session.execute(objects.facts.insert(), rows)
+    if tag_count:
+        session.execute(objects.facttags.insert(), [
+            {'fact_id': row['id'], 'tag_id': (row['id'] % tag_count) + 1} for row in rows])
+
+
+def best_of(function, repeat=5, number=1):
+    """Return the best wall clock time in seconds per call of ``function``."""
+    return min(timeit.repeat(function, repeat=repeat, number=number)) / number
+
+
+def print_table(headers, rows):
+    """Print a simple, aligned result table."""
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    line = '  '.join('{{:>{}}}'.format(width) for width in widths)
+    print(line.format(*headers))
+    for row in rows:
+        print(line.format(*row))
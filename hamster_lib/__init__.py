@@ -20,6 +20,7 @@
 """hamster-lib provides generic time tracking functionality."""
 
 from .lib import REGISTERED_BACKENDS, HamsterControl  # NOQA
-from .objects import Activity, Category, Fact, Tag  # NOQA
+from .objects import (Activity, Category, Fact, FactRecord, FrozenActivity,  # NOQA
+    FrozenCategory, FrozenFact, FrozenTag, Tag)
 
 __version__ = '0.13.2'
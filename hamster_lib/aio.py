@@ -0,0 +1,238 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Asyncio facade for ``HamsterControl``.
+
+Store calls are blocking. ``AsyncHamsterControl`` runs them on worker threads so
+they do not block the event loop. Every public manager method is available as a
+coroutine function with the very same signature::
+
+    control = AsyncHamsterControl(config)
+    fact = await control.facts.save(fact)
+    async for fact in control.facts.iter_all(start, end):
+        ...
+    await control.close()
+
+Calls are split in two lanes, each with its own threads and a limit on the number
+of calls in flight. Calls beyond that limit wait in the event loop (backpressure)
+instead of piling up in an executor queue. Bulk calls (``BULK_METHODS``) use their
+own lane, so a burst of exports can not starve interactive calls like starting or
+stopping a fact.
+
+Note:
+    * This module requires python 3.6 or later and is not imported by
+      ``hamster_lib`` itself.
+    * Each worker thread uses its own session, see ``SQLAlchemyStore.session_scope``.
+      As in-memory SQLite databases are bound to a single connection, use a
+      database file.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .lib import HamsterControl
+from .storage import DEFAULT_BATCH_SIZE
+
+# Manager methods that may take long and are run in the bulk lane.
+BULK_METHODS = frozenset(('get_all', 'iter_all', 'get_records', 'get_columns', 'search',
+    'save_many', 'get_totals', 'aggregate'))
+
+# Default number of worker threads for interactive and bulk calls.
+DEFAULT_WORKERS = 4
+DEFAULT_BULK_WORKERS = 1
+
+# Default number of calls per lane that may be in flight at once.
+DEFAULT_MAX_PENDING = 64
+DEFAULT_MAX_PENDING_BULK = 2
+
+
+@contextmanager
+def _null_scope():
+    yield
+
+
+class Lane(object):
+    """Bounded group of worker threads."""
+
+    def __init__(self, workers, max_pending, name):
+        """
+        Initiate a new lane.
+
+        Args:
+            workers (int): Number of worker threads.
+            max_pending (int): Number of calls that may be running or queued for a
+                worker. Further calls wait until one of those is done.
+            name (text_type): Prefix for our worker threads names.
+        """
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix=name)
+        self.max_pending = max_pending
+        self._semaphore = None
+
+    async def run(self, function, *args, **kwargs):
+        """Run ``function`` on one of our workers and return its result."""
+        if self._semaphore is None:
+            # Created lazily, so it belongs to the loop we are used from.
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        async with self._semaphore:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(function, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+class AsyncIterator(object):
+    """Async iterator consuming a blocking iterator within a lane, one batch at a time."""
+
+    def __init__(self, control, function, args, kwargs, batch_size):
+        self.control = control
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.batch_size = batch_size
+        self._iterator = None
+        self._batch = []
+        self._exhausted = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._batch:
+            if self._exhausted:
+                raise StopAsyncIteration
+            self._batch = await self.control._bulk.run(self._next_batch)
+            if not self._batch:
+                raise StopAsyncIteration
+        return self._batch.pop(0)
+
+    def _next_batch(self):
+        if self._iterator is None:
+            self._iterator = iter(self.function(*self.args, **self.kwargs))
+        batch = []
+        with self.control._session_scope():
+            for item in self._iterator:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    return batch
+        self._exhausted = True
+        return batch
+
+
+class AsyncManager(object):
+    """
+    Awaitable view of a manager.
+
+    Each public method of the wrapped manager is available as coroutine function.
+    ``iter_all`` returns an async iterator instead.
+    """
+
+    def __init__(self, control, manager):
+        self._control = control
+        self._manager = manager
+
+    def __getattr__(self, name):
+        attribute = getattr(self._manager, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+        if name == 'iter_all':
+            return functools.partial(self._iter_all, attribute)
+
+        @functools.wraps(attribute)
+        async def method(*args, **kwargs):
+            return await self._control._run(name, attribute, *args, **kwargs)
+        return method
+
+    def _iter_all(self, function, *args, **kwargs):
+        # Bind against the blocking signature, ``batch_size`` may be passed positionally.
+        arguments = inspect.signature(function).bind(*args, **kwargs).arguments
+        batch_size = arguments.get('batch_size', DEFAULT_BATCH_SIZE)
+        return AsyncIterator(self._control, function, args, kwargs, batch_size)
+
+
+class AsyncHamsterControl(object):
+    """
+    Asyncio counterpart of ``HamsterControl``.
+
+    Attributes:
+        control (HamsterControl): The wrapped controller.
+        categories, activities, tags, facts (AsyncManager): Awaitable managers.
+    """
+
+    def __init__(self, config, workers=DEFAULT_WORKERS, bulk_workers=DEFAULT_BULK_WORKERS,
+            max_pending=DEFAULT_MAX_PENDING, max_pending_bulk=DEFAULT_MAX_PENDING_BULK):
+        """
+        Set up the controller and its worker threads.
+
+        Args:
+            config (dict): Backend config, just like ``HamsterControl`` takes.
+            workers (int, optional): Threads for interactive calls.
+            bulk_workers (int, optional): Threads for calls in ``BULK_METHODS``.
+            max_pending (int, optional): Interactive calls in flight before further
+                ones have to wait.
+            max_pending_bulk (int, optional): Bulk calls in flight before further
+                ones have to wait.
+        """
+        self.control = HamsterControl(config)
+        self._interactive = Lane(workers, max_pending, 'hamster-lib')
+        self._bulk = Lane(bulk_workers, max_pending_bulk, 'hamster-lib-bulk')
+        self.categories = AsyncManager(self, self.control.categories)
+        self.activities = AsyncManager(self, self.control.activities)
+        self.tags = AsyncManager(self, self.control.store.tags)
+        self.facts = AsyncManager(self, self.control.facts)
+
+    async def _run(self, name, function, *args, **kwargs):
+        """Run a manager method in the lane it belongs to."""
+        lane = self._bulk if name in BULK_METHODS else self._interactive
+        return await lane.run(self._in_scope(function), *args, **kwargs)
+
+    def _in_scope(self, function):
+        """Wrap ``function`` to run within ``_session_scope``."""
+        @functools.wraps(function)
+        def scoped(*args, **kwargs):
+            with self._session_scope():
+                return function(*args, **kwargs)
+        return scoped
+
+    def _session_scope(self):
+        """Return our stores ``session_scope``, if it provides one."""
+        session_scope = getattr(self.control.store, 'session_scope', None)
+        if session_scope is None:
+            return _null_scope()
+        return session_scope()
+
+    async def close(self):
+        """Wait for all pending calls, stop our worker threads and clean up the store."""
+        loop = asyncio.get_event_loop()
+        for lane in (self._interactive, self._bulk):
+            await loop.run_in_executor(None, lane.shutdown)
+        self.control.store.cleanup()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -0,0 +1,157 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+In-process cache for the small and rarely changing set of categories, activities and tags.
+
+Resolving the activity of each new fact by its composite key otherwise costs
+several queries every time.
+
+Note:
+    The cache is only kept accurate for changes made through our managers. Stores
+    within one process share a cache per database URL (see ``engines.registry``),
+    but changes made by other processes or by other means are not noticed. Call
+    ``IdentityCache.clear`` in that case.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+import copy
+import threading
+from collections import OrderedDict, namedtuple
+
+from future.utils import python_2_unicode_compatible
+
+# Maximum number of instances kept per namespace.
+DEFAULT_CACHE_SIZE = 1024
+
+CacheInfo = namedtuple('CacheInfo', ('hits', 'misses', 'maxsize', 'currsize'))
+
+
+@python_2_unicode_compatible
+class IdentityCache(object):
+    """
+    Thread safe LRU cache of ``hamster_lib`` instances, keyed by their natural keys.
+
+    Instances are kept in separate namespaces: ``categories`` and ``tags`` are
+    keyed by name, ``activities`` by their ``(name, category name)`` composite
+    key. ``category name`` is ``None`` for activities without category.
+
+    Instances are copied on the way in and out, so callers are free to modify
+    whatever they get.
+    """
+
+    NAMESPACES = ('categories', 'activities', 'tags')
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        """
+        Initiate a new, empty cache.
+
+        Args:
+            maxsize (int, optional): Maximum number of instances kept per namespace.
+                The least recently used ones are discarded first. Defaults to
+                ``DEFAULT_CACHE_SIZE``.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._entries = dict((namespace, OrderedDict()) for namespace in self.NAMESPACES)
+
+    def get(self, namespace, key):
+        """
+        Return the instance cached for ``key``.
+
+        Args:
+            namespace (text_type): One of ``NAMESPACES``.
+            key: Natural key of the requested instance.
+
+        Returns:
+            hamster_lib.Category, hamster_lib.Activity, hamster_lib.Tag or None: A copy
+                of the cached instance or ``None`` if there is none.
+        """
+        with self._lock:
+            entries = self._entries[namespace]
+            try:
+                instance = entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            # Re-insert to mark this entry as most recently used.
+            entries[key] = instance
+            self.hits += 1
+            return copy.deepcopy(instance)
+
+    def put(self, namespace, key, instance):
+        """
+        Cache an instance as it is stored in the database.
+
+        Args:
+            namespace (text_type): One of ``NAMESPACES``.
+            key: Natural key of ``instance``.
+            instance (hamster_lib.Category, hamster_lib.Activity or hamster_lib.Tag):
+                Instance to be cached. Needs to have a PK.
+        """
+        instance = copy.deepcopy(instance)
+        with self._lock:
+            entries = self._entries[namespace]
+            entries.pop(key, None)
+            entries[key] = instance
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    def invalidate(self, namespace, pk=None):
+        """
+        Discard cached instances.
+
+        Args:
+            namespace (text_type): One of ``NAMESPACES``.
+            pk (optional): Only discard the instance with this PK. If ``None``, the
+                whole namespace is discarded. Defaults to ``None``.
+        """
+        with self._lock:
+            entries = self._entries[namespace]
+            if pk is None:
+                entries.clear()
+            else:
+                for key in [key for key, instance in entries.items() if instance.pk == pk]:
+                    del entries[key]
+
+    def clear(self):
+        """Discard all cached instances and reset our counters."""
+        with self._lock:
+            for entries in self._entries.values():
+                entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self):
+        """
+        Return cache statistics, just like ``functools.lru_cache`` does.
+
+        Returns:
+            CacheInfo: ``(hits, misses, maxsize, currsize)`` namedtuple. ``currsize``
+                is the number of instances cached over all namespaces.
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                sum(len(entries) for entries in self._entries.values()))
+
+    def __str__(self):
+        return 'IdentityCache({})'.format(self.cache_info())
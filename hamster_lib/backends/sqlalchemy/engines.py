@@ -0,0 +1,268 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Process wide registry of SQLAlchemy engines.
+
+Creating an engine, its connection pool and making sure our schema is in place
+takes several round trips. Stores for the same database URL and engine options
+(pool settings and SQLite pragmas) therefore share one engine and the schema is
+only set up once per URL. A store asking for different options gets an engine of
+its own, so changed settings always take effect. Stores of the same URL also
+share one ``IdentityCache`` and one ``CompletionIndex``, so changes made through
+one of them are seen by all.
+
+Note:
+    In-memory SQLite databases only exist as long as their engine does, so each
+    store gets a private engine for them. They are never shared.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from collections import namedtuple
+
+from future.utils import python_2_unicode_compatible
+from hamster_lib.completion import CompletionIndex
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+from .cache import IdentityCache
+
+EngineInfo = namedtuple('EngineInfo', ('url', 'references', 'pool_status'))
+
+
+def is_shareable(url):
+    """Return ``True`` unless ``url`` refers to an in-memory SQLite database."""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return True
+    return url.database not in (None, '', ':memory:')
+
+
+def get_engine_kwargs(url, pool_size=None, max_overflow=None):
+    """
+    Return the ``create_engine`` keyword arguments for the given pool settings.
+
+    Args:
+        url (text_type): Database URL.
+        pool_size (int, optional): Number of connections kept open. Defaults to
+            SQLAlchemy's default for the dialect.
+        max_overflow (int, optional): Number of additional connections allowed
+            temporarily. Defaults to SQLAlchemy's default for the dialect.
+
+    Returns:
+        dict: Keyword arguments for ``sqlalchemy.create_engine``.
+    """
+    kwargs = {}
+    if pool_size is not None:
+        kwargs['pool_size'] = pool_size
+    if max_overflow is not None:
+        kwargs['max_overflow'] = max_overflow
+    if kwargs and make_url(url).get_backend_name() == 'sqlite':
+        # SQLite file databases do not pool connections by default. Pooled
+        # connections are handed to whichever thread needs one next.
+        kwargs['poolclass'] = QueuePool
+        kwargs['connect_args'] = {'check_same_thread': False}
+    return kwargs
+
+
+def set_sqlite_pragmas(engine, pragmas):
+    """
+    Make ``engine`` apply ``pragmas`` to each new SQLite connection.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): Engine using a SQLite database.
+        pragmas (list): List of ``(name, value)`` tuples. Values need to be
+            validated by the caller as they are not escaped.
+    """
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute('PRAGMA {}={}'.format(name, value))
+        cursor.close()
+
+    event.listen(engine, 'connect', on_connect)
+
+
+@python_2_unicode_compatible
+class EngineRegistry(object):
+    """
+    Thread safe registry handing out one shared engine per database URL and options.
+
+    Each ``acquire`` needs to be matched by a ``release``. Once an engine is no
+    longer referenced, its pooled connections are closed. The engine itself is kept,
+    so acquiring it again with the same options does neither create a new engine
+    nor set up the schema again. Unreferenced engines of a URL are discarded once
+    the URL is acquired with different options.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Keyed by ``(url, options)``, see ``get_key``.
+        self._engines = {}
+        self._references = {}
+        self._prepared = set()
+        self._caches = {}
+        self._completions = {}
+
+    @staticmethod
+    def get_key(url, pool_size=None, max_overflow=None, pragmas=None):
+        """Return the key identifying an engine for ``url`` with the given options."""
+        return (url, (pool_size, max_overflow, tuple(tuple(pragma) for pragma in pragmas or ())))
+
+    def acquire(self, url, setup=None, pool_size=None, max_overflow=None, pragmas=None):
+        """
+        Return the engine for ``url``, creating it if needed.
+
+        Args:
+            url (text_type): Database URL.
+            setup (callable, optional): Called with the engine the first time an
+                engine for ``url`` is handed out. Meant to create the schema.
+            pool_size (int, optional): Number of connections kept open.
+            max_overflow (int, optional): Number of additional connections allowed
+                temporarily.
+            pragmas (list, optional): ``(name, value)`` tuples applied to each new
+                connection of a SQLite database, see ``set_sqlite_pragmas``.
+
+        Returns:
+            sqlalchemy.engine.Engine: Engine connected to ``url``.
+        """
+        def get_engine():
+            engine = create_engine(url, **get_engine_kwargs(url, pool_size, max_overflow))
+            if pragmas:
+                set_sqlite_pragmas(engine, pragmas)
+            return engine
+
+        if not is_shareable(url):
+            engine = get_engine()
+            if setup:
+                setup(engine)
+            return engine
+
+        key = self.get_key(url, pool_size, max_overflow, pragmas)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                self._discard_unreferenced(url)
+                engine = get_engine()
+                self._engines[key] = engine
+            if setup and url not in self._prepared:
+                setup(engine)
+                self._prepared.add(url)
+            self._references[key] = self._references.get(key, 0) + 1
+            return engine
+
+    def get_cache(self, url):
+        """
+        Return the ``IdentityCache`` shared by all stores of ``url``.
+
+        Unlike engines, caches are shared regardless of engine options as they hold
+        the same data.
+
+        Args:
+            url (text_type): Database URL.
+
+        Returns:
+            hamster_lib.backends.sqlalchemy.cache.IdentityCache: A new cache for
+                databases that can not be shared, the shared one otherwise.
+        """
+        if not is_shareable(url):
+            return IdentityCache()
+        with self._lock:
+            return self._caches.setdefault(url, IdentityCache())
+
+    def get_completion(self, url, load):
+        """
+        Return the ``CompletionIndex`` shared by all stores of ``url``.
+
+        Args:
+            url (text_type): Database URL.
+            load (callable): Loads all entries, see ``CompletionIndex``. Only used
+                if the index is created.
+
+        Returns:
+            hamster_lib.completion.CompletionIndex: A new index for databases that
+                can not be shared, the shared one otherwise.
+        """
+        if not is_shareable(url):
+            return CompletionIndex(load)
+        with self._lock:
+            if url not in self._completions:
+                self._completions[url] = CompletionIndex(load)
+            return self._completions[url]
+
+    def _discard_unreferenced(self, url):
+        """Forget all engines of ``url`` no one uses anymore, their pools are closed."""
+        for key in [key for key in self._engines if key[0] == url]:
+            if not self._references.get(key):
+                del self._engines[key]
+                self._references.pop(key, None)
+
+    def release(self, engine):
+        """
+        Give back an engine handed out by ``acquire``.
+
+        If no one references the engine anymore, its pooled connections are closed.
+
+        Args:
+            engine (sqlalchemy.engine.Engine): Engine returned by ``acquire``.
+        """
+        with self._lock:
+            keys = [key for key, registered in self._engines.items() if registered is engine]
+            if not keys:
+                # Private engine.
+                engine.dispose()
+                return
+            key = keys[0]
+            self._references[key] = max(self._references.get(key, 0) - 1, 0)
+            if not self._references[key]:
+                engine.dispose()
+
+    def dispose_all(self):
+        """Close all pooled connections and forget about all engines."""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._references.clear()
+            self._prepared.clear()
+            self._caches.clear()
+            self._completions.clear()
+
+    def info(self):
+        """
+        Return a summary of all registered engines.
+
+        Returns:
+            list: List of ``EngineInfo`` namedtuples. ``pool_status`` is the engines
+                ``Pool.status()`` description.
+        """
+        with self._lock:
+            return [EngineInfo(key[0], self._references.get(key, 0), engine.pool.status())
+                for key, engine in sorted(self._engines.items(), key=lambda item: repr(item[0]))]
+
+    def __str__(self):
+        # ``URL.__repr__`` masks passwords.
+        return 'EngineRegistry({})'.format(', '.join(
+            repr(make_url(url)) for url in sorted(set(key[0] for key in self._engines))))
+
+
+registry = EngineRegistry()
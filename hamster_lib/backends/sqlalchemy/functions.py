@@ -0,0 +1,164 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+SQL functions for date arithmetic that needs to be spelled differently per database.
+
+Each function compiles to the dialects native construct. The default compilation
+uses standard SQL intervals as understood by PostgreSQL. SQLite and MySQL get
+their own variants.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+from sqlalchemy import BigInteger, Date, Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+def _get_offset(day_start):
+    """Return ``day_start`` (a ``datetime.time``) as seconds since midnight."""
+    return day_start.hour * 3600 + day_start.minute * 60 + day_start.second
+
+
+class seconds_between(FunctionElement):
+    """
+    Number of seconds between two datetime expressions.
+
+    Example:
+        ``seconds_between(facts.c.start, facts.c.end)``
+    """
+
+    type = Float()
+    name = 'seconds_between'
+
+
+class epoch_seconds(FunctionElement):
+    """
+    Whole seconds between 1970-01-01 and a naive datetime expression.
+
+    The datetime is taken as is, without any timezone conversion.
+
+    Example:
+        ``epoch_seconds(facts.c.start)``
+    """
+
+    type = BigInteger()
+    name = 'epoch_seconds'
+
+
+class workday(FunctionElement):
+    """
+    Workday a datetime expression belongs to, given the ``day_start`` time.
+
+    Example:
+        ``workday(facts.c.start, datetime.time(5, 30))``
+    """
+
+    type = Date()
+    name = 'workday'
+
+    def __init__(self, moment, day_start, **kwargs):
+        self.offset = _get_offset(day_start)
+        super(workday, self).__init__(moment, **kwargs)
+
+
+class week_start(workday):
+    """Monday of the week the workday of a datetime expression belongs to."""
+
+    name = 'week_start'
+
+
+@compiles(seconds_between)
+def _seconds_between(element, compiler, **kwargs):
+    start, end = list(element.clauses)
+    return 'EXTRACT(EPOCH FROM ({} - {}))'.format(
+        compiler.process(end, **kwargs), compiler.process(start, **kwargs))
+
+
+@compiles(seconds_between, 'sqlite')
+def _seconds_between_sqlite(element, compiler, **kwargs):
+    start, end = list(element.clauses)
+    return '((julianday({}) - julianday({})) * 86400.0)'.format(
+        compiler.process(end, **kwargs), compiler.process(start, **kwargs))
+
+
+@compiles(seconds_between, 'mysql')
+def _seconds_between_mysql(element, compiler, **kwargs):
+    start, end = list(element.clauses)
+    return 'TIMESTAMPDIFF(SECOND, {}, {})'.format(
+        compiler.process(start, **kwargs), compiler.process(end, **kwargs))
+
+
+@compiles(epoch_seconds)
+def _epoch_seconds(element, compiler, **kwargs):
+    return 'CAST(EXTRACT(EPOCH FROM {}) AS BIGINT)'.format(
+        compiler.process(element.clauses, **kwargs))
+
+
+@compiles(epoch_seconds, 'sqlite')
+def _epoch_seconds_sqlite(element, compiler, **kwargs):
+    # Cut off fractional seconds, ``strftime`` would round them to milliseconds.
+    return "CAST(strftime('%s', substr({}, 1, 19)) AS INTEGER)".format(
+        compiler.process(element.clauses, **kwargs))
+
+
+@compiles(epoch_seconds, 'mysql')
+def _epoch_seconds_mysql(element, compiler, **kwargs):
+    # ``UNIX_TIMESTAMP`` would convert from the session time zone.
+    return "TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', {})".format(
+        compiler.process(element.clauses, **kwargs))
+
+
+@compiles(workday)
+def _workday(element, compiler, **kwargs):
+    return "CAST(({} - INTERVAL '{} seconds') AS DATE)".format(
+        compiler.process(element.clauses, **kwargs), element.offset)
+
+
+@compiles(workday, 'sqlite')
+def _workday_sqlite(element, compiler, **kwargs):
+    return "date({}, '-{} seconds')".format(
+        compiler.process(element.clauses, **kwargs), element.offset)
+
+
+@compiles(workday, 'mysql')
+def _workday_mysql(element, compiler, **kwargs):
+    return 'DATE({} - INTERVAL {} SECOND)'.format(
+        compiler.process(element.clauses, **kwargs), element.offset)
+
+
+@compiles(week_start)
+def _week_start(element, compiler, **kwargs):
+    return "CAST(date_trunc('week', {} - INTERVAL '{} seconds') AS DATE)".format(
+        compiler.process(element.clauses, **kwargs), element.offset)
+
+
+@compiles(week_start, 'sqlite')
+def _week_start_sqlite(element, compiler, **kwargs):
+    # 'weekday 0' advances to the next sunday unless we are on one already.
+    return "date({}, '-{} seconds', 'weekday 0', '-6 days')".format(
+        compiler.process(element.clauses, **kwargs), element.offset)
+
+
+@compiles(week_start, 'mysql')
+def _week_start_mysql(element, compiler, **kwargs):
+    day = 'DATE({} - INTERVAL {} SECOND)'.format(
+        compiler.process(element.clauses, **kwargs), element.offset)
+    return 'DATE_SUB({day}, INTERVAL WEEKDAY({day}) DAY)'.format(day=day)
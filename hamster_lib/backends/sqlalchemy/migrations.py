@@ -0,0 +1,135 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Bring existing databases up to date with our current schema.
+
+``metadata.create_all`` only creates tables that do not exist yet. Any index
+that has been added to an already existing table after the database was
+created would be missing. This module takes care of those additions.
+
+Note:
+    This is deliberately kept simple. We do not try to be a general purpose
+    migration framework, we just make sure additive schema changes get applied.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+
+from . import objects
+
+# Queries listing the names of all indexes of a table, for dialects whose reflection
+# skips expression based indexes such as ``lower(name)``.
+INDEX_NAME_QUERIES = {
+    'sqlite': "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table",
+    'postgresql': 'SELECT indexname FROM pg_indexes WHERE tablename = :table',
+}
+
+# Columns of a throwaway virtual table per SQLite module, see ``has_sqlite_module``.
+MODULE_PROBES = {
+    'rtree': '(id, low, high)',
+    'fts5': '(content)',
+}
+
+
+def get_index_names(engine, table_name):
+    """
+    Return the names of all indexes of a table, including expression based ones.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): Engine connected to the database to inspect.
+        table_name (text_type): Name of the table.
+
+    Returns:
+        set: Index names.
+    """
+    query = INDEX_NAME_QUERIES.get(engine.dialect.name)
+    if query is None:
+        return set(index['name'] for index in inspect(engine).get_indexes(table_name))
+    return set(name for (name,) in engine.execute(text(query), table=table_name))
+
+
+def has_sqlite_module(connection, module):
+    """
+    Return whether the SQLite library of a connection provides a virtual table module.
+
+    Tables using a module, as well as triggers writing to them, fail with
+    ``no such module`` on connections lacking it. We try creating a temporary
+    table, which leaves the database itself untouched.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): Connection to a SQLite database.
+        module (text_type): Name of the module, one of ``MODULE_PROBES``.
+
+    Returns:
+        bool: ``True`` if the module is available.
+    """
+    name = 'hamster_probe_{}'.format(module)
+    try:
+        connection.execute('CREATE VIRTUAL TABLE temp.{} USING {}{}'.format(name, module,
+            MODULE_PROBES[module]))
+    except OperationalError:
+        return False
+    connection.execute('DROP TABLE temp.{}'.format(name))
+    return True
+
+
+def get_missing_indexes(engine, metadata=objects.metadata):
+    """
+    Return all indexes declared by ``metadata`` but missing from the database.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): Engine connected to the database to inspect.
+        metadata (sqlalchemy.MetaData, optional): Schema declaration to compare against.
+            Defaults to our regular ``objects.metadata``.
+
+    Returns:
+        list: List of ``sqlalchemy.Index`` instances that need to be created.
+    """
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+    result = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            # ``create_all`` will create the table including its indexes.
+            continue
+        existing = get_index_names(engine, table.name)
+        result.extend([index for index in table.indexes if index.name not in existing])
+    return result
+
+
+def upgrade(engine, metadata=objects.metadata):
+    """
+    Add any missing index to an existing database.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): Engine connected to the database to upgrade.
+        metadata (sqlalchemy.MetaData, optional): Schema declaration to compare against.
+            Defaults to our regular ``objects.metadata``.
+
+    Returns:
+        list: Names of all indexes that have been created.
+    """
+    created = []
+    for index in get_missing_indexes(engine, metadata):
+        index.create(bind=engine)
+        created.append(index.name)
+    return created
@@ -44,8 +44,9 @@ from __future__ import unicode_literals
 
 from future.utils import python_2_unicode_compatible
 from hamster_lib import Activity, Category, Fact, Tag
-from sqlalchemy import (Boolean, Column, DateTime, ForeignKey, Integer,
-                        MetaData, Table, Unicode, UniqueConstraint)
+from sqlalchemy import (Boolean, Column, Date, DateTime, ForeignKey, Index,
+                        Integer, MetaData, Table, Time, Unicode, UniqueConstraint,
+                        func)
 from sqlalchemy.orm import mapper, relationship
 
 DEFAULT_STRING_LENGTH = 254
@@ -181,6 +182,9 @@ activities = Table(
     UniqueConstraint('name', 'category_id')
 )
 
+# Case insensitive prefix lookups (``ActivityManager.complete``).
+Index('ix_activities_lower_name', func.lower(activities.c.name))
+
 mapper(AlchemyActivity, activities, properties={
     'pk': activities.c.id,
     'category': relationship(AlchemyCategory, backref='activities'),
@@ -203,6 +207,13 @@ facts = Table(
     Column('end', DateTime),
     Column('activity_id', Integer, ForeignKey(activities.c.id)),
     Column('description', Unicode(500)),
+    # Range lookups (``_get_all``) and overlap checks
+    # (``_timeframe_available_for_fact``) filter on ``start``/``end``.
+    Index('ix_facts_start_end', 'start', 'end'),
+    # Allows partial overlap lookups to use a ``MULTI-INDEX OR``.
+    Index('ix_facts_end', 'end'),
+    # Per activity lookups are usually restricted to a timeframe as well.
+    Index('ix_facts_activity_id_start', 'activity_id', 'start'),
 )
 
 mapper(AlchemyFact, facts, properties={
@@ -215,4 +226,49 @@ facttags = Table(
     'facttags', metadata,
     Column('fact_id', Integer, ForeignKey(facts.c.id)),
     Column('tag_id', Integer, ForeignKey(tags.c.id)),
+    # Tags are looked up per fact, e.g. by the ``fact_search`` triggers.
+    Index('ix_facttags_fact_id', 'fact_id'),
+)
+
+# Number of facts and start of the latest one per activity, maintained by
+# ``FactManager`` so recently and frequently used activities are a lookup away.
+activity_usage = Table(
+    'activity_usage', metadata,
+    Column('activity_id', Integer, ForeignKey(activities.c.id), primary_key=True),
+    Column('fact_count', Integer, nullable=False),
+    Column('last_used', DateTime, nullable=False),
+    Index('ix_activity_usage_last_used', 'last_used'),
+    Index('ix_activity_usage_fact_count', 'fact_count', 'last_used'),
+)
+
+# Optional pre-aggregated fact durations per workday, activity and tag. This table is
+# only created and maintained if the ``daily_totals`` config option is set.
+# Rows with ``tag_id == ALL_TAGS`` hold the total of an activity regardless of tags.
+ALL_TAGS = 0
+
+daily_totals = Table(
+    'daily_totals', metadata,
+    Column('day', Date, primary_key=True),
+    Column('activity_id', Integer, ForeignKey(activities.c.id), primary_key=True),
+    Column('tag_id', Integer, primary_key=True, autoincrement=False),
+    Column('seconds', Integer, nullable=False),
+)
+
+# Changes to ``facts`` and ``facttags`` not yet folded into ``daily_totals``. Rows are
+# added by triggers, ``sign`` is ``1`` for added and ``-1`` for removed contributions.
+daily_totals_log = Table(
+    'daily_totals_log', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('start', DateTime),
+    Column('end', DateTime),
+    Column('activity_id', Integer),
+    Column('tag_id', Integer, nullable=False),
+    Column('sign', Integer, nullable=False),
+)
+
+# The ``day_start`` setting ``daily_totals`` has been built with, a single row.
+daily_totals_meta = Table(
+    'daily_totals_meta', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('day_start', Time, nullable=False),
 )
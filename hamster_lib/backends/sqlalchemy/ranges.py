@@ -0,0 +1,144 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Maintain an R*Tree index of fact timeframes on SQLite.
+
+Looking for facts overlapping a timeframe (``start < :end AND end > :start``) can
+only use one side of a B-tree index, so its cost grows with the number of facts
+before or after the timeframe. The ``fact_ranges`` R*Tree virtual table holds the
+timeframe of each fact as epoch seconds and answers such questions in
+logarithmic time. It is kept up to date by triggers on ``facts``, so it also
+covers facts written by other clients or older versions of this library.
+
+Note:
+    R*Tree coordinates are 32 bit floats, rounded outwards. Candidates found by
+    the tree are always checked against the exact ``facts`` columns.
+
+    Once the index exists, every client writing facts to the database needs a
+    SQLite build providing the R*Tree module, otherwise its triggers fail with
+    ``no such module: rtree``. The index is only created if our own SQLite
+    provides it.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+from future.utils import python_2_unicode_compatible
+from hamster_lib.columns import epoch_seconds
+from sqlalchemy import column, inspect, table
+from sqlalchemy.exc import OperationalError
+
+from .migrations import has_sqlite_module
+
+TABLE_NAME = 'fact_ranges'
+
+
+def _get_epoch(expression):
+    # ``strftime`` would round fractional seconds, we always cut them off.
+    return "CAST(strftime('%s', substr({}, 1, 19)) AS INTEGER)".format(expression)
+
+
+def _get_insert(prefix):
+    """Return a statement adding the ranges of facts, ``prefix`` being ``'NEW.'`` or ``''``."""
+    # Facts without end are stored as points, ``min`` and ``max`` guard against facts
+    # ending before they start, which the R*Tree would reject.
+    return (
+        'INSERT INTO fact_ranges (id, start, "end")'
+        ' SELECT range_id, min(range_start, range_end), max(range_start, range_end) FROM ('
+        ' SELECT {prefix}id AS range_id, {start} AS range_start,'
+        ' coalesce({end}, {start}) AS range_end {source} WHERE {prefix}start IS NOT NULL)'
+    ).format(prefix=prefix, start=_get_epoch(prefix + 'start'),
+        end=_get_epoch(prefix + '"end"'), source='' if prefix else 'FROM facts')
+
+
+CREATE_STATEMENTS = (
+    'CREATE VIRTUAL TABLE fact_ranges USING rtree(id, start, "end")',
+    'CREATE TRIGGER fact_ranges_insert AFTER INSERT ON facts BEGIN {}; END'.format(
+        _get_insert('NEW.')),
+    'CREATE TRIGGER fact_ranges_update AFTER UPDATE OF id, start, "end" ON facts BEGIN'
+    ' DELETE FROM fact_ranges WHERE id = OLD.id; {}; END'.format(_get_insert('NEW.')),
+    'CREATE TRIGGER fact_ranges_delete AFTER DELETE ON facts BEGIN'
+    ' DELETE FROM fact_ranges WHERE id = OLD.id; END',
+    _get_insert(''),
+)
+
+
+@python_2_unicode_compatible
+class FactRanges(object):
+    """R*Tree index of fact timeframes of a ``SQLAlchemyStore`` using SQLite."""
+
+    def __init__(self, store):
+        self.store = store
+        self.enabled = False
+        self.table = table(TABLE_NAME, column('id'), column('start'), column('end'))
+
+    def setup(self, connection):
+        """
+        Make sure the index exists, if the database supports it.
+
+        If the table is created, it is populated from all existing facts. Databases
+        other than SQLite as well as SQLite builds lacking the R*Tree module are left
+        alone, ``enabled`` stays ``False`` then.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Connection used by our session.
+
+        Returns:
+            bool: ``True`` if the index has been built.
+        """
+        if connection.dialect.name != 'sqlite':
+            return False
+        available = has_sqlite_module(connection, 'rtree')
+        if TABLE_NAME in inspect(connection).get_table_names():
+            if not available:
+                self.store.logger.error(_(
+                    "The database has a fact ranges index, but our SQLite lacks the R*Tree"
+                    " module. Facts can not be saved."))
+            self.enabled = available
+            return False
+        if not available:
+            self.store.logger.debug(_("SQLite lacks the R*Tree module, no fact ranges index."))
+            return False
+        try:
+            for statement in CREATE_STATEMENTS:
+                connection.execute(statement)
+        except OperationalError as error:
+            self.store.session.rollback()
+            self.store.logger.debug(_(
+                "Unable to create fact ranges index: {}".format(error)))
+            return False
+        self.store.session.commit()
+        self.enabled = True
+        self.store.logger.debug(_("Created and populated fact ranges index."))
+        return True
+
+    def get_conditions(self, start, end):
+        """
+        Return conditions matching the ranges of all facts that may overlap a timeframe.
+
+        Args:
+            start (datetime.datetime): Start of the timeframe.
+            end (datetime.datetime): End of the timeframe.
+
+        Returns:
+            list: Conditions on ``self.table``. Callers join it with ``facts`` on ``id``
+                and check the exact ``start`` and ``end`` values as well.
+        """
+        return [self.table.c.start <= epoch_seconds(end),
+            self.table.c.end >= epoch_seconds(start)]
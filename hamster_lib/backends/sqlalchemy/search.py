@@ -0,0 +1,186 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Full-text search over facts.
+
+On SQLite the ``fact_search`` FTS5 table holds the activity name, category name,
+tag names and description of each fact, using the fact PK as ``rowid``. It is kept
+up to date by triggers on all tables involved, so renaming an activity, category
+or tag updates the index of all its facts. Terms match words starting with them,
+regardless of case.
+
+Other databases, and SQLite builds lacking FTS5, fall back to matching terms
+anywhere within those fields using ``LIKE``. Both rank facts matching terms in
+their activity name first, then in their category or tags, then in their
+description.
+
+Note:
+    Once the index exists, every client writing to the database needs a SQLite
+    build providing the FTS5 module, otherwise its triggers fail with
+    ``no such module: fts5``. The index is only created if our own SQLite
+    provides it.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+from future.utils import python_2_unicode_compatible
+from sqlalchemy import and_, case, column, exists, func, inspect, literal_column, or_, table
+from sqlalchemy.exc import OperationalError
+
+from . import objects
+from .migrations import has_sqlite_module
+
+TABLE_NAME = 'fact_search'
+
+# Relevance of a match within each column, in the order of the table columns.
+WEIGHTS = (4.0, 2.0, 2.0, 1.0)
+
+_REFRESH = (
+    'INSERT OR REPLACE INTO fact_search (rowid, activity, category, tags, description)'
+    ' SELECT facts.id, activities.name, categories.name,'
+    " (SELECT group_concat(tags.name, ' ') FROM facttags"
+    ' JOIN tags ON tags.id = facttags.tag_id WHERE facttags.fact_id = facts.id),'
+    ' facts.description FROM facts'
+    ' LEFT OUTER JOIN activities ON activities.id = facts.activity_id'
+    ' LEFT OUTER JOIN categories ON categories.id = activities.category_id'
+    ' WHERE {}'
+)
+
+# Each trigger refreshes the rows of all facts affected by a change.
+_TRIGGERS = (
+    ('facts_insert', 'AFTER INSERT ON facts', 'facts.id = NEW.id'),
+    ('facts_update', 'AFTER UPDATE OF activity_id, description ON facts', 'facts.id = NEW.id'),
+    ('facttags_insert', 'AFTER INSERT ON facttags', 'facts.id = NEW.fact_id'),
+    ('facttags_delete', 'AFTER DELETE ON facttags', 'facts.id = OLD.fact_id'),
+    ('activities_update', 'AFTER UPDATE OF name, category_id ON activities',
+        'facts.activity_id = NEW.id'),
+    ('categories_update', 'AFTER UPDATE OF name ON categories',
+        'activities.category_id = NEW.id'),
+    ('tags_update', 'AFTER UPDATE OF name ON tags',
+        'facts.id IN (SELECT fact_id FROM facttags WHERE tag_id = NEW.id)'),
+)
+
+CREATE_STATEMENTS = (
+    'CREATE VIRTUAL TABLE fact_search USING fts5(activity, category, tags, description)',
+    'CREATE TRIGGER fact_search_facts_delete AFTER DELETE ON facts BEGIN'
+    ' DELETE FROM fact_search WHERE rowid = OLD.id; END',
+) + tuple('CREATE TRIGGER fact_search_{} {} BEGIN {}; END'.format(name, event,
+    _REFRESH.format(condition)) for name, event, condition in _TRIGGERS) + (
+    _REFRESH.format('1'),
+)
+
+
+def _get_pattern(term):
+    """Return a ``LIKE`` pattern matching ``term`` anywhere, using ``\\`` as escape."""
+    for character in ('\\', '%', '_'):
+        term = term.replace(character, '\\' + character)
+    return '%{}%'.format(term)
+
+
+@python_2_unicode_compatible
+class FactSearch(object):
+    """Full-text search over the facts of a ``SQLAlchemyStore``."""
+
+    def __init__(self, store):
+        self.store = store
+        self.enabled = False
+        self.table = table(TABLE_NAME, column('rowid'))
+        # The hidden column named after the table stands for all its columns.
+        self.column = literal_column(TABLE_NAME)
+
+    def setup(self, connection):
+        """
+        Make sure the FTS5 index exists, if the database supports it.
+
+        If the table is created, it is populated from all existing facts. Databases
+        other than SQLite as well as SQLite builds lacking FTS5 are left alone,
+        ``enabled`` stays ``False`` then.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Connection used by our session.
+
+        Returns:
+            bool: ``True`` if the index has been built.
+        """
+        if connection.dialect.name != 'sqlite':
+            return False
+        available = has_sqlite_module(connection, 'fts5')
+        if TABLE_NAME in inspect(connection).get_table_names():
+            if not available:
+                self.store.logger.error(_(
+                    "The database has a fact search index, but our SQLite lacks the FTS5"
+                    " module. Facts can not be saved."))
+            self.enabled = available
+            return False
+        if not available:
+            self.store.logger.debug(_("SQLite lacks the FTS5 module, no fact search index."))
+            return False
+        try:
+            for statement in CREATE_STATEMENTS:
+                connection.execute(statement)
+        except OperationalError as error:
+            self.store.session.rollback()
+            self.store.logger.debug(_(
+                "Unable to create fact search index: {}".format(error)))
+            return False
+        self.store.session.commit()
+        self.enabled = True
+        self.store.logger.debug(_("Created and populated fact search index."))
+        return True
+
+    def filter(self, query, terms):
+        """
+        Limit a fact query to facts matching all terms and order it by relevance.
+
+        Args:
+            query (sqlalchemy.orm.query.Query): Query for ``AlchemyFact`` instances.
+            terms (list): Non-empty search terms.
+
+        Returns:
+            sqlalchemy.orm.query.Query: Query for matching ``AlchemyFact`` instances,
+                most relevant (then latest) first.
+        """
+        facts = objects.facts
+        if self.enabled:
+            # Quoting makes terms plain strings rather than FTS5 query syntax.
+            match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+            return query.join(self.table, self.table.c.rowid == facts.c.id).filter(
+                self.column.match(match)).order_by(
+                func.bm25(self.column, *WEIGHTS), facts.c.start.desc())
+
+        activities, categories = objects.activities, objects.categories
+        facttags, tags = objects.facttags, objects.tags
+        query = query.join(activities, activities.c.id == facts.c.activity_id).outerjoin(
+            categories, categories.c.id == activities.c.category_id)
+        rank = None
+        for term in terms:
+            pattern = _get_pattern(term)
+            matches = (
+                activities.c.name.ilike(pattern, escape='\\'),
+                categories.c.name.ilike(pattern, escape='\\'),
+                exists().where(and_(facttags.c.fact_id == facts.c.id,
+                    tags.c.id == facttags.c.tag_id, tags.c.name.ilike(pattern, escape='\\'))),
+                facts.c.description.ilike(pattern, escape='\\'),
+            )
+            query = query.filter(or_(*matches))
+            for match, weight in zip(matches, WEIGHTS):
+                value = case([(match, weight)], else_=0.0)
+                rank = value if rank is None else rank + value
+        return query.order_by(rank.desc(), facts.c.start.desc())
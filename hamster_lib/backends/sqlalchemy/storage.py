@@ -20,20 +20,71 @@
 
 from __future__ import unicode_literals
 
+import datetime
 import os.path
 from builtins import str
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from future.utils import python_2_unicode_compatible
-from hamster_lib import storage
+from hamster_lib import Activity, Category, Fact, FactRecord, completion, storage
+from hamster_lib.columns import FactColumns
+from hamster_lib.helpers import time as time_helpers
 from six import text_type
-from sqlalchemy import create_engine
+from sqlalchemy import case, func, literal, select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import (class_mapper, joinedload, make_transient_to_detached,
+                            scoped_session, sessionmaker, subqueryload)
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql.expression import and_, or_
 
-from . import objects
+from . import migrations, objects
+from .engines import registry
+from .functions import epoch_seconds, seconds_between, week_start, workday
 from .objects import AlchemyActivity, AlchemyCategory, AlchemyFact, AlchemyTag
+from .ranges import FactRanges
+from .search import FactSearch
+from .totals import DailyTotals
+from .usage import ActivityUsage
+
+# SQLite limits the number of bound parameters per statement (999 by default).
+# Bulk lookups using ``IN`` are split into chunks no larger than this.
+MAX_IN_CLAUSE_PARAMETERS = 500
+
+# Number of rows fetched at once by ``FactManager._get_columns``.
+COLUMNS_BATCH_SIZE = 10000
+
+
+# SQLite pragmas configurable by ``sqlite_<name>`` config options, along with
+# their valid values. ``int`` accepts any integer.
+SQLITE_PRAGMAS = (
+    ('journal_mode', ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')),
+    ('synchronous', ('OFF', 'NORMAL', 'FULL', 'EXTRA')),
+    ('mmap_size', int),
+    ('cache_size', int),
+    ('temp_store', ('DEFAULT', 'FILE', 'MEMORY')),
+    ('busy_timeout', int),
+)
+
+
+def _chunks(values, size=MAX_IN_CLAUSE_PARAMETERS):
+    """Split a list of values into lists of at most ``size`` items."""
+    return [values[index:index + size] for index in range(0, len(values), size)]
+
+
+def _get_detached(alchemy_class, **values):
+    """
+    Return a detached ``alchemy_class`` instance representing an existing database row.
+
+    All ``values`` are set as committed state without triggering any backrefs,
+    just as if the instance had been loaded by a previous session.
+    """
+    instance = class_mapper(alchemy_class).class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(instance, key, value)
+    make_transient_to_detached(instance)
+    return instance
 
 
 @python_2_unicode_compatible
@@ -74,31 +125,214 @@ class SQLAlchemyStore(storage.BaseStore):
 
         Note:
             The ``session`` argument is mainly useful for tests.
+            Unless a session is passed, ``session`` is a ``scoped_session``: each
+            thread transparently works with its own session. Use ``session_scope``
+            to delimit a threads unit of work. Note that in-memory SQLite databases
+            are bound to a single connection and therefore not visible to other
+            threads.
         """
         super(SQLAlchemyStore, self).__init__(config)
         # [TODO]
         # It takes more deliberation to decide how to handle engine creation if
         # we receive a session. Should be require the session to bring its own
         # engine?
-        engine = create_engine(self._get_db_url())
-        self.logger.debug(_('Engine created.'))
-        objects.metadata.bind = engine
-        objects.metadata.create_all(engine)
-        self.logger.debug(_("Database tables created."))
+        self.engine = registry.acquire(self._get_db_url(), setup=self._setup_schema,
+            pool_size=self.config.get('db_pool_size'),
+            max_overflow=self.config.get('db_max_overflow'),
+            pragmas=self._get_sqlite_pragmas())
+        self.logger.debug(_('Engine acquired.'))
+        objects.metadata.bind = self.engine
+        self._owns_session = not session
         if not session:
-            Session = sessionmaker(bind=engine)  # NOQA
+            Session = sessionmaker(bind=self.engine)  # NOQA
             self.logger.debug(_("Bound engine to session-object."))
-            self.session = Session()
-            self.logger.debug(_("Instantiated session."))
+            self.session = scoped_session(Session)
+            self.logger.debug(_("Instantiated thread local session registry."))
         else:
             self.session = session
+        self.cache = registry.get_cache(self._get_db_url())
+        self.totals = DailyTotals(self)
+        self.usage = ActivityUsage(self)
+        self.ranges = FactRanges(self)
+        self.search = FactSearch(self)
+        self.completion = registry.get_completion(self._get_db_url(), self._load_completion)
         self.categories = CategoryManager(self)
         self.activities = ActivityManager(self)
         self.tags = TagManager(self)
         self.facts = FactManager(self)
+        if self.totals.setup(self.session.connection()):
+            self.logger.debug(_("Daily totals built."))
+        if self.usage.setup(self.session.connection()):
+            self.logger.debug(_("Activity usage built."))
+        if self.ranges.setup(self.session.connection()):
+            self.logger.debug(_("Fact ranges index built."))
+        if self.search.setup(self.session.connection()):
+            self.logger.debug(_("Fact search index built."))
+
+    def _setup_schema(self, engine):
+        """
+        Create missing tables and indexes.
+
+        This is done only once per database URL and process, see ``engines.registry``.
+        """
+        # ``daily_totals`` is optional and taken care of by ``DailyTotals.setup``.
+        objects.metadata.create_all(engine, tables=[table for table in
+            objects.metadata.sorted_tables if table not in (objects.daily_totals,
+                objects.daily_totals_log, objects.daily_totals_meta)])
+        self.logger.debug(_("Database tables created."))
+        created_indexes = migrations.upgrade(engine)
+        if created_indexes:
+            self.logger.debug(_("Missing indexes created: {}.".format(created_indexes)))
 
     def cleanup(self):
-        pass
+        """
+        Close our session and give back our engine.
+
+        A session passed to ``__init__`` is left alone. Once no other store uses
+        our engine anymore, its pooled connections are closed.
+        """
+        if self._owns_session:
+            self.session.remove()
+        registry.release(self.engine)
+        self.logger.debug(_("Engine released."))
+
+    @contextmanager
+    def session_scope(self):
+        """
+        Provide a unit of work for the current thread.
+
+        Pending changes are committed when the block is left, or rolled back if it
+        raises. Afterwards the threads session is closed and discarded, returning its
+        connection to the pool. The next access creates a fresh one.
+
+        Example:
+            ``with store.session_scope(): store.facts.save(fact)``
+
+        Yields:
+            sqlalchemy.orm.session.Session: The current threads session.
+        """
+        session = self.session
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            if self._owns_session:
+                session.remove()
+            self.logger.debug(_("Session scope left."))
+
+    def _begin_write(self):
+        """
+        Make sure our transaction holds the SQLite write lock.
+
+        ``pysqlite`` only begins a transaction with its first write. Values read
+        before may be outdated by then, as other connections could have written in
+        between. ``BEGIN IMMEDIATE`` takes the lock right away instead.
+
+        Returns:
+            bool: ``True`` if no other connection can write until we commit, ``False``
+                for databases other than SQLite.
+        """
+        connection = self.session.connection()
+        if connection.dialect.name != 'sqlite':
+            return False
+        if not connection.connection.in_transaction:
+            connection.execute('BEGIN IMMEDIATE')
+        return True
+
+    def _commit(self, *invalidations):
+        """
+        Commit our session, then discard the cache entries it changed.
+
+        Entries are discarded only once the commit is done (or rolled back), so
+        other threads can not cache the previous state in between.
+
+        Args:
+            *invalidations: ``(namespace, pk)`` tuples passed on to
+                ``IdentityCache.invalidate``.
+
+        Raises:
+            Whatever ``commit`` raises, after rolling back.
+        """
+        try:
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            for namespace, pk in invalidations:
+                self.cache.invalidate(namespace, pk)
+
+    def _merge_cached(self, instance):
+        """
+        Return the session bound alchemy instance for a cached ``hamster_lib`` instance.
+
+        Merging a detached instance without loading re-associates it with our
+        session without emitting any SQL.
+
+        Args:
+            instance (hamster_lib.Category, hamster_lib.Activity or hamster_lib.Tag):
+                Instance as returned by ``self.cache``.
+
+        Returns:
+            AlchemyCategory, AlchemyActivity or AlchemyTag: Persistent instance.
+        """
+        if isinstance(instance, Activity):
+            category = None
+            if instance.category:
+                category = _get_detached(AlchemyCategory, pk=instance.category.pk,
+                    name=instance.category.name)
+            alchemy_instance = _get_detached(AlchemyActivity, pk=instance.pk,
+                name=instance.name, category=category, deleted=instance.deleted)
+        elif isinstance(instance, Category):
+            alchemy_instance = _get_detached(AlchemyCategory, pk=instance.pk,
+                name=instance.name)
+        else:
+            alchemy_instance = _get_detached(AlchemyTag, pk=instance.pk, name=instance.name)
+        return self.session.merge(alchemy_instance, load=False)
+
+    def _load_completion(self):
+        """
+        Return all entries for ``self.completion``.
+
+        Scores count the facts started within the last ``completion.RECENT_DAYS``.
+        A category scores the sum of its activities, including deleted ones.
+
+        Returns:
+            list: List of ``hamster_lib.completion.Entry`` tuples.
+        """
+        since = datetime.datetime.now() - datetime.timedelta(days=completion.RECENT_DAYS)
+        facts, facttags = objects.facts, objects.facttags
+        activities, categories = objects.activities, objects.categories
+        recent = facts.c.start >= since
+
+        usage = dict(self.session.execute(
+            select([facts.c.activity_id, func.count()]).where(recent)
+            .group_by(facts.c.activity_id)).fetchall())
+        entries, category_usage = [], {}
+        query = select([activities.c.id, activities.c.name, activities.c.deleted,
+            activities.c.category_id, categories.c.name]).select_from(
+            activities.outerjoin(categories))
+        for pk, name, deleted, category_pk, category_name in self.session.execute(query):
+            score = usage.get(pk, 0)
+            if category_pk is not None:
+                category_usage[category_pk] = category_usage.get(category_pk, 0) + score
+            if not deleted:
+                entries.append(completion.Entry('activities', pk,
+                    completion.get_activity_text(name, category_name), score))
+        for pk, name in self.session.execute(select([categories.c.id, categories.c.name])):
+            entries.append(completion.Entry('categories', pk, name,
+                category_usage.get(pk, 0)))
+
+        tag_usage = dict(self.session.execute(
+            select([facttags.c.tag_id, func.count()]).select_from(facttags.join(facts))
+            .where(recent).group_by(facttags.c.tag_id)).fetchall())
+        for pk, name in self.session.execute(select([objects.tags.c.id, objects.tags.c.name])):
+            entries.append(completion.Entry('tags', pk, name, tag_usage.get(pk, 0)))
+        self.logger.debug(_("Loaded {} completion entries.".format(len(entries))))
+        return entries
 
     def _get_db_url(self):
         """
@@ -180,6 +414,39 @@ class SQLAlchemyStore(storage.BaseStore):
                 engine=engine, user=user, password=password, host=host, port=port, name=name)
         return database_url
 
+    def _get_sqlite_pragmas(self):
+        """
+        Return the SQLite pragmas configured by the ``sqlite_*`` config options.
+
+        Options that are not set (or ``None``) leave SQLite's defaults alone.
+
+        Returns:
+            list: List of validated ``(name, value)`` tuples. Empty unless
+                ``db_engine='sqlite'``.
+
+        Raises:
+            ValueError: If an option has an invalid value.
+        """
+        if self.config.get('db_engine') != 'sqlite':
+            return []
+
+        pragmas = []
+        for name, choices in SQLITE_PRAGMAS:
+            value = self.config.get('sqlite_{}'.format(name))
+            if value is None or value == '':
+                continue
+            if choices is int:
+                valid = isinstance(value, int) and not isinstance(value, bool)
+            else:
+                value = text_type(value).upper()
+                valid = value in choices
+            if not valid:
+                message = _("Invalid value for 'sqlite_{}': {!r}.".format(name, value))
+                self.logger.error(message)
+                raise ValueError(message)
+            pragmas.append((name, value))
+        return pragmas
+
 
 @python_2_unicode_compatible
 class CategoryManager(storage.BaseCategoryManager):
@@ -247,6 +514,7 @@ class CategoryManager(storage.BaseCategoryManager):
             self.store.logger.error(message)
             raise ValueError(message)
         self.store.logger.debug(_("'{!r}' added.".format(alchemy_category)))
+        self.store.completion.put('categories', alchemy_category.pk, alchemy_category.name)
 
         if not raw:
             alchemy_category = alchemy_category.as_hamster()
@@ -286,7 +554,8 @@ class CategoryManager(storage.BaseCategoryManager):
         alchemy_category.name = category.name
 
         try:
-            self.store.session.commit()
+            # Activities are cached by their category name.
+            self.store._commit(('categories', category.pk), ('activities', None))
         except IntegrityError as e:
             message = _(
                 "An error occured! Are you sure the category.name is not already present in our"
@@ -295,7 +564,12 @@ class CategoryManager(storage.BaseCategoryManager):
             self.store.logger.error(message)
             raise ValueError(message)
 
-        return alchemy_category.as_hamster()
+        result = alchemy_category.as_hamster()
+        if self.store.completion.loaded:
+            self.store.completion.put('categories', result.pk, result.name)
+            for alchemy_activity in alchemy_category.activities:
+                self.store.completion.put_activity(alchemy_activity.as_hamster())
+        return result
 
     def remove(self, category):
         """
@@ -324,10 +598,15 @@ class CategoryManager(storage.BaseCategoryManager):
             message = _("``Category`` can not be found by the backend.")
             self.store.logger.error(message)
             raise KeyError(message)
+        alchemy_activities = list(alchemy_category.activities)
         self.store.session.delete(alchemy_category)
+        self.store._commit(('categories', category.pk), ('activities', None))
         message = _("{!r} successfully deleted.".format(category))
         self.store.logger.debug(message)
-        self.store.session.commit()
+        self.store.completion.remove('categories', category.pk)
+        if self.store.completion.loaded:
+            for alchemy_activity in alchemy_activities:
+                self.store.completion.put_activity(alchemy_activity.as_hamster())
 
     def get(self, pk):
         """
@@ -379,6 +658,11 @@ class CategoryManager(storage.BaseCategoryManager):
         self.store.logger.debug(message)
 
         name = text_type(name)
+        cached = self.store.cache.get('categories', name)
+        if cached is not None:
+            self.store.logger.debug(_("Returning cached: {!r}.").format(cached))
+            return self.store._merge_cached(cached) if raw else cached
+
         try:
             result = self.store.session.query(AlchemyCategory).filter_by(name=name).one()
         except NoResultFound:
@@ -386,6 +670,7 @@ class CategoryManager(storage.BaseCategoryManager):
             self.store.logger.error(message)
             raise KeyError(message)
 
+        self.store.cache.put('categories', name, result.as_hamster())
         if not raw:
             result = result.as_hamster()
             self.store.logger.debug(_("Returning: {!r}.").format(result))
@@ -403,9 +688,28 @@ class CategoryManager(storage.BaseCategoryManager):
         # or even spamming the logs with the enrire list. Instead we just state
         # that we return something.
         self.store.logger.debug(_("Returning list of all categories."))
-        return [alchemy_category for alchemy_category in (
+        return [alchemy_category.as_hamster() for alchemy_category in (
             self.store.session.query(AlchemyCategory).order_by(AlchemyCategory.name).all())]
 
+    def _get_page(self, after, limit):
+        """
+        Return categories following a keyset.
+
+        Args:
+            after (tuple): ``(name, pk)`` of the category to start after or ``None``.
+            limit (int): Maximum number of categories to return.
+
+        Returns:
+            list: List of ``hamster_lib.Category`` instances ordered by name and PK.
+        """
+        query = self.store.session.query(AlchemyCategory)
+        if after:
+            name, pk = after
+            query = query.filter(AlchemyCategory.name >= name,
+                or_(AlchemyCategory.name > name, AlchemyCategory.pk > pk))
+        query = query.order_by(AlchemyCategory.name, AlchemyCategory.pk).limit(limit)
+        return [alchemy_category.as_hamster() for alchemy_category in query]
+
 
 @python_2_unicode_compatible
 class ActivityManager(storage.BaseActivityManager):
@@ -481,6 +785,7 @@ class ActivityManager(storage.BaseActivityManager):
         alchemy_activity.category = category
         self.store.session.add(alchemy_activity)
         self.store.session.commit()
+        self.store.completion.put_activity(alchemy_activity.as_hamster())
         result = alchemy_activity
         if not raw:
             result = alchemy_activity.as_hamster()
@@ -532,13 +837,14 @@ class ActivityManager(storage.BaseActivityManager):
             raw=True)
         alchemy_activity.deleted = activity.deleted
         try:
-            self.store.session.commit()
+            self.store._commit(('activities', activity.pk))
         except IntegrityError as e:
             message = _("There seems to already be an activity like this for the given category."
                 "Can not change this activities values. Original exception: {}".format(e))
             self.store.logger.error(message)
             raise ValueError(message)
         result = alchemy_activity.as_hamster()
+        self.store.completion.put_activity(result)
         self.store.logger.debug(_("Returning: {!r}.".format(result)))
         return result
 
@@ -574,7 +880,8 @@ class ActivityManager(storage.BaseActivityManager):
             self.store.activities._update(alchemy_activity)
         else:
             self.store.session.delete(alchemy_activity)
-        self.store.session.commit()
+        self.store._commit(('activities', activity.pk))
+        self.store.completion.remove('activities', activity.pk)
         self.store.logger.debug(_("Deleted {!r}.".format(activity)))
         return True
 
@@ -632,6 +939,12 @@ class ActivityManager(storage.BaseActivityManager):
         self.store.logger.debug(message)
 
         name = str(name)
+        cache_key = (name, text_type(category.name) if category else None)
+        cached = self.store.cache.get('activities', cache_key)
+        if cached is not None:
+            self.store.logger.debug(_("Returning cached: {!r}.").format(cached))
+            return self.store._merge_cached(cached) if raw else cached
+
         if category:
             category = text_type(category.name)
             try:
@@ -656,6 +969,7 @@ class ActivityManager(storage.BaseActivityManager):
             )
             self.store.logger.error(message)
             raise KeyError(message)
+        self.store.cache.put('activities', cache_key, result.as_hamster())
         if not raw:
             result = result.as_hamster()
         self.store.logger.debug(_("Returning: {!r}.".format(result)))
@@ -680,22 +994,165 @@ class ActivityManager(storage.BaseActivityManager):
         message = _("Recieved '{!r}', 'search_term'={}.".format(category, search_term))
         self.store.logger.debug(message)
 
+        query = self._get_all_query(category, search_term)
+        query = query.order_by(AlchemyActivity.name, AlchemyActivity.pk)
+        self.store.logger.debug(_("Returning list of matches."))
+        return [alchemy_activity.as_hamster() for alchemy_activity in query]
+
+    def _get_page(self, category, search_term, after, limit):
+        """
+        Return matching activities following a keyset.
+
+        Args:
+            category (hamster_lib.Category): Category to limit activities to, ``None``
+                or ``False``, see ``get_all``.
+            search_term (text_type): Substring of the activity names to match.
+            after (tuple): ``(name, pk)`` of the activity to start after or ``None``.
+            limit (int): Maximum number of activities to return.
+
+        Returns:
+            list: List of ``hamster_lib.Activity`` instances ordered by name and PK.
+        """
+        query = self._get_all_query(category, search_term)
+        if after:
+            name, pk = after
+            query = query.filter(AlchemyActivity.name >= name,
+                or_(AlchemyActivity.name > name, AlchemyActivity.pk > pk))
+        query = query.order_by(AlchemyActivity.name, AlchemyActivity.pk).limit(limit)
+        return [alchemy_activity.as_hamster() for alchemy_activity in query]
+
+    def _get_all_query(self, category, search_term):
+        """
+        Return the query used by ``get_all`` to retrieve matching activities.
+
+        Args:
+            category (hamster_lib.Category): Category to limit activities to, ``None``
+                or ``False``, see ``get_all``.
+            search_term (text_type): Substring of the activity names to match.
+
+        Returns:
+            sqlalchemy.orm.query.Query: Query for ``AlchemyActivity`` instances, loading
+                their categories along.
+        """
         query = self.store.session.query(AlchemyActivity)
 
         if category is not False:
-            if category:
-                alchemy_category = self.store.session.query(AlchemyCategory).get(category.pk)
-            else:
-                alchemy_category = None
-            query = query.filter_by(category=alchemy_category)
-        else:
-            pass
+            query = query.filter(self._get_category_condition(category))
 
         if search_term:
             query = query.filter(AlchemyActivity.name.ilike('%{}%'.format(search_term)))
-        query.order_by(AlchemyActivity.name)
-        self.store.logger.debug(_("Returning list of matches."))
-        return query.all()
+        return query.options(joinedload(AlchemyActivity.category))
+
+    def _get_category_condition(self, category):
+        """
+        Return a condition limiting activities to a category.
+
+        We compare ``category_id`` directly instead of loading the category first.
+        ``None`` (or a category without PK) matches activities without category.
+        """
+        category_id = objects.activities.c.category_id
+        if category and category.pk is not None:
+            return category_id == category.pk
+        return category_id.is_(None)
+
+    def _complete(self, prefix, category, limit):
+        """
+        Return activities whose name starts with a prefix.
+
+        This is a single query. Names are matched using a range on ``lower(name)``
+        rather than ``LIKE``, so ``ix_activities_lower_name`` is used for both,
+        matching and ordering.
+
+        Args:
+            prefix (text_type): Start of the activity names to match.
+            category (hamster_lib.Category): Category to limit activities to, ``None``
+                or ``False``, see ``complete``.
+            limit (int): Maximum number of activities to return.
+
+        Returns:
+            list: List of ``hamster_lib.storage.Completion`` namedtuples.
+        """
+        activities, categories = objects.activities, objects.categories
+        lower_name = func.lower(activities.c.name)
+        query = select([activities.c.id, activities.c.name, categories.c.name]).select_from(
+            activities.outerjoin(categories)).where(activities.c.deleted.isnot(True))
+        if prefix:
+            # Both sides are lowered by the database, as python and e.g. SQLite disagree
+            # on non ASCII characters. All names starting with the prefix sort below the
+            # prefix followed by the largest character of the basic multilingual plane.
+            lower_prefix = func.lower(literal(prefix))
+            query = query.where(and_(lower_name >= lower_prefix,
+                lower_name < lower_prefix.concat('\uffff')))
+        if category is not False:
+            query = query.where(self._get_category_condition(category))
+        query = query.order_by(lower_name, activities.c.id).limit(limit)
+        return [storage.Completion(*row) for row in self.store.session.execute(query)]
+
+    def _get_recent(self, limit):
+        """
+        Return the most recently used activities.
+
+        Reads the first ``limit`` rows of ``ix_activity_usage_last_used``, no facts
+        are looked at.
+
+        Args:
+            limit (int): Maximum number of activities to return.
+
+        Returns:
+            list: List of ``hamster_lib.storage.Usage`` namedtuples.
+        """
+        usage = objects.activity_usage
+        return self._get_usages(usage, usage.c.fact_count, usage.c.last_used,
+            (usage.c.last_used.desc(), usage.c.activity_id.desc()), limit)
+
+    def _get_frequent(self, limit):
+        """
+        Return the activities with the most facts.
+
+        Reads the first ``limit`` rows of ``ix_activity_usage_fact_count``, no facts
+        are looked at.
+
+        Args:
+            limit (int): Maximum number of activities to return.
+
+        Returns:
+            list: List of ``hamster_lib.storage.Usage`` namedtuples.
+        """
+        usage = objects.activity_usage
+        return self._get_usages(usage, usage.c.fact_count, usage.c.last_used,
+            (usage.c.fact_count.desc(), usage.c.last_used.desc(),
+                usage.c.activity_id.desc()), limit)
+
+    def _get_usages(self, usage, count, last_used, order_by, limit):
+        """
+        Return ``Usage`` namedtuples for the top rows of a usage table or subquery.
+
+        Args:
+            usage (sqlalchemy.sql.FromClause): Providing an ``activity_id`` column.
+            count (sqlalchemy.Column): Number of facts.
+            last_used (sqlalchemy.Column): Start of the latest fact.
+            order_by (tuple): Criteria to order rows by, matching an index of ``usage``
+                if possible.
+            limit (int): Maximum number of rows.
+
+        Returns:
+            list: List of ``hamster_lib.storage.Usage`` namedtuples.
+        """
+        activities, categories = objects.activities, objects.categories
+        query = select([activities.c.id, activities.c.name, categories.c.id,
+            categories.c.name, count, last_used]).select_from(
+            usage.join(activities, activities.c.id == usage.c.activity_id).outerjoin(
+                categories)).where(
+            activities.c.deleted.isnot(True)).order_by(*order_by).limit(limit)
+        result = []
+        for pk, name, category_pk, category_name, fact_count, last_fact in (
+                self.store.session.execute(query)):
+            category = None
+            if category_pk is not None:
+                category = Category(category_name, pk=category_pk)
+            result.append(storage.Usage(Activity(name, pk=pk, category=category), fact_count,
+                last_fact))
+        return result
 
 
 @python_2_unicode_compatible
@@ -764,6 +1221,7 @@ class TagManager(storage.BaseTagManager):
             self.store.logger.error(message)
             raise ValueError(message)
         self.store.logger.debug(_("'{!r}' added.".format(alchemy_tag)))
+        self.store.completion.put('tags', alchemy_tag.pk, alchemy_tag.name)
 
         if not raw:
             alchemy_tag = alchemy_tag.as_hamster()
@@ -803,7 +1261,7 @@ class TagManager(storage.BaseTagManager):
         alchemy_tag.name = tag.name
 
         try:
-            self.store.session.commit()
+            self.store._commit(('tags', tag.pk))
         except IntegrityError as e:
             message = _(
                 "An error occured! Are you sure the tag.name is not already present in our"
@@ -812,6 +1270,7 @@ class TagManager(storage.BaseTagManager):
             self.store.logger.error(message)
             raise ValueError(message)
 
+        self.store.completion.put('tags', alchemy_tag.pk, alchemy_tag.name)
         return alchemy_tag.as_hamster()
 
     def remove(self, tag):
@@ -842,9 +1301,11 @@ class TagManager(storage.BaseTagManager):
             self.store.logger.error(message)
             raise KeyError(message)
         self.store.session.delete(alchemy_tag)
+        self.store.totals.sync()
+        self.store._commit(('tags', tag.pk))
         message = _("{!r} successfully deleted.".format(tag))
         self.store.logger.debug(message)
-        self.store.session.commit()
+        self.store.completion.remove('tags', tag.pk)
 
     def get(self, pk):
         """
@@ -896,6 +1357,11 @@ class TagManager(storage.BaseTagManager):
         self.store.logger.debug(message)
 
         name = text_type(name)
+        cached = self.store.cache.get('tags', name)
+        if cached is not None:
+            self.store.logger.debug(_("Returning cached: {!r}.").format(cached))
+            return self.store._merge_cached(cached) if raw else cached
+
         try:
             result = self.store.session.query(AlchemyTag).filter_by(name=name).one()
         except NoResultFound:
@@ -903,6 +1369,7 @@ class TagManager(storage.BaseTagManager):
             self.store.logger.error(message)
             raise KeyError(message)
 
+        self.store.cache.put('tags', name, result.as_hamster())
         if not raw:
             result = result.as_hamster()
             self.store.logger.debug(_("Returning: {!r}.").format(result))
@@ -913,16 +1380,35 @@ class TagManager(storage.BaseTagManager):
         Get all tags.
 
         Returns:
-            list: List of all Categories present in the database, ordered by lower(name).
+            list: List of all Tags present in the database, ordered by lower(name).
         """
 
         # We avoid the costs of always computing the length of the returned list
         # or even spamming the logs with the enrire list. Instead we just state
         # that we return something.
         self.store.logger.debug(_("Returning list of all tags."))
-        return [alchemy_tag for alchemy_tag in (
+        return [alchemy_tag.as_hamster() for alchemy_tag in (
             self.store.session.query(AlchemyTag).order_by(AlchemyTag.name).all())]
 
+    def _get_page(self, after, limit):
+        """
+        Return tags following a keyset.
+
+        Args:
+            after (tuple): ``(name, pk)`` of the tag to start after or ``None``.
+            limit (int): Maximum number of tags to return.
+
+        Returns:
+            list: List of ``hamster_lib.Tag`` instances ordered by name and PK.
+        """
+        query = self.store.session.query(AlchemyTag)
+        if after:
+            name, pk = after
+            query = query.filter(AlchemyTag.name >= name,
+                or_(AlchemyTag.name > name, AlchemyTag.pk > pk))
+        query = query.order_by(AlchemyTag.name, AlchemyTag.pk).limit(limit)
+        return [alchemy_tag.as_hamster() for alchemy_tag in query]
+
 
 @python_2_unicode_compatible
 class FactManager(storage.BaseFactManager):
@@ -947,16 +1433,23 @@ class FactManager(storage.BaseFactManager):
             the timeframe is considered available (for this fact)!
         """
         start, end = fact.start, fact.end
-        query = self.store.session.query(AlchemyFact)
+        facts = objects.facts
+        query = self.store.session.query(func.count(facts.c.id))
 
-        condition = and_(AlchemyFact.start < end, AlchemyFact.end > start)
+        conditions = [facts.c.start < end, facts.c.end > start]
 
         if fact.pk:
-            condition = and_(condition, AlchemyFact.pk != fact.pk)
+            conditions.append(facts.c.id != fact.pk)
 
-        query = query.filter(condition)
+        if self.store.ranges.enabled:
+            # Let the R*Tree find candidates, instead of scanning all facts before ``end``.
+            ranges = self.store.ranges.table
+            query = query.select_from(facts.join(ranges, ranges.c.id == facts.c.id))
+            conditions.extend(self.store.ranges.get_conditions(start, end))
+        else:
+            query = query.select_from(facts)
 
-        return not bool(query.count())
+        return not query.filter(and_(*conditions)).scalar()
 
     def _add(self, fact, raw=False):
         """
@@ -994,10 +1487,244 @@ class FactManager(storage.BaseFactManager):
         alchemy_fact.activity = self.store.activities.get_or_create(fact.activity, raw=True)
         alchemy_fact.tags = [self.store.tags.get_or_create(tag, raw=True) for tag in fact.tags]
         self.store.session.add(alchemy_fact)
+        self.store.usage.add(alchemy_fact.activity.pk, alchemy_fact.start)
+        self.store.totals.sync()
         self.store.session.commit()
+        if self.store.completion.loaded:
+            self.store.completion.add_fact_usage(alchemy_fact.as_hamster())
         self.store.logger.debug(_("Added {!r}.".format(alchemy_fact)))
+        if not raw:
+            alchemy_fact = alchemy_fact.as_hamster()
         return alchemy_fact
 
+    def _add_many(self, facts):
+        """
+        Add a list of new facts to the database within one transaction.
+
+        Instead of handling one fact at a time (as ``_add`` does) we work on the
+        whole batch:
+
+        * Timeframes are checked in one sweep over the batch sorted by ``start``,
+          comparing against all stored facts within the batches overall timeframe.
+        * Categories, activities and tags are looked up (and created if need be)
+          by name using set based queries.
+        * Facts and their tag relations are inserted using ``executemany``.
+
+        Args:
+            facts (list): List of validated ``hamster_lib.Fact`` instances to be added.
+
+        Returns:
+            tuple: ``(saved, failed)`` tuple. ``saved`` is a list of the added
+                ``hamster_lib.Fact`` instances. ``failed`` is a list of
+                ``(index, exception)`` tuples for facts that overlap others.
+
+        Raises:
+            ValueError: If the batch could not be stored. Nothing will have been
+                added in that case.
+
+        Note:
+            On SQLite we take the write lock and then assign new fact PKs ourselves,
+            following the highest present one, so we can insert related tags without
+            fetching each PK individually. Other databases assign PKs themselves, so
+            facts are inserted one at a time there.
+        """
+
+        self.store.logger.debug(_("Received {} facts.".format(len(facts))))
+
+        failed = self._get_bulk_overlaps(facts)
+        failed_indexes = set(index for index, error in failed)
+        facts = [fact for index, fact in enumerate(facts) if index not in failed_indexes]
+        if not facts:
+            return [], failed
+
+        session = self.store.session
+        try:
+            categories = self._get_or_create_by_names(AlchemyCategory, objects.categories,
+                set(fact.category.name for fact in facts if fact.category))
+            activities = self._get_or_create_activities(facts, categories)
+            tags = self._get_or_create_by_names(AlchemyTag, objects.tags,
+                set(tag.name for fact in facts for tag in fact.tags))
+
+            next_pk = None
+            if self.store._begin_write():
+                next_pk = (session.query(func.max(AlchemyFact.pk)).scalar() or 0) + 1
+            fact_rows, facttag_rows, saved, usage = [], [], [], {}
+            for fact in facts:
+                activity = activities[self._get_activity_key(fact.activity, categories)]
+                fact_tags = [tags[tag.name] for tag in fact.tags]
+                row = {
+                    'start': fact.start,
+                    'end': fact.end,
+                    'activity_id': activity.pk,
+                    'description': fact.description,
+                }
+                if next_pk is None:
+                    pk = session.execute(objects.facts.insert(), row).inserted_primary_key[0]
+                else:
+                    pk, next_pk = next_pk, next_pk + 1
+                    row['id'] = pk
+                    fact_rows.append(row)
+                facttag_rows.extend({'fact_id': pk, 'tag_id': tag.pk} for tag in fact_tags)
+                saved.append(Fact(activity, fact.start, fact.end, pk=pk,
+                    description=fact.description, tags=fact_tags))
+                count, last_used = usage.get(activity.pk, (0, fact.start))
+                usage[activity.pk] = (count + 1, max(last_used, fact.start))
+
+            if fact_rows:
+                session.execute(objects.facts.insert(), fact_rows)
+            if facttag_rows:
+                session.execute(objects.facttags.insert(), facttag_rows)
+            self.store.usage.apply(usage)
+            self.store.totals.sync()
+            session.commit()
+        except IntegrityError as e:
+            session.rollback()
+            message = _(
+                "An error occured! The batch of facts could not be saved."
+                " Here is the full original exception: '{}'.".format(e)
+            )
+            self.store.logger.error(message)
+            raise ValueError(message)
+
+        if self.store.completion.loaded:
+            for activity in set(fact.activity for fact in saved):
+                self.store.completion.put_activity(activity)
+            for tag in set(tag for fact in saved for tag in fact.tags):
+                self.store.completion.put('tags', tag.pk, tag.name)
+            for fact in saved:
+                self.store.completion.add_fact_usage(fact)
+        self.store.logger.debug(_("Added {} facts.".format(len(saved))))
+        return saved, failed
+
+    def _get_bulk_overlaps(self, facts):
+        """
+        Check the timeframes of a batch of facts in one sweep.
+
+        Facts are processed ordered by ``start``. A fact is rejected if it overlaps
+        with a fact stored in the database or with an accepted fact of the batch that
+        starts earlier. Just like ``_timeframe_available_for_fact``, facts that merely
+        touch each other do not overlap.
+
+        Args:
+            facts (list): List of ``hamster_lib.Fact`` instances.
+
+        Returns:
+            list: List of ``(index, ValueError)`` tuples for each overlapping fact,
+                ordered by ``index``.
+        """
+        if not facts:
+            return []
+
+        order = sorted(range(len(facts)), key=lambda index: facts[index].start)
+        lower = facts[order[0]].start
+        upper = max(fact.end for fact in facts)
+
+        # Merge stored facts into disjoint timeframes so we can sweep them along.
+        occupied = []
+        query = self.store.session.query(AlchemyFact.start, AlchemyFact.end).filter(
+            AlchemyFact.start < upper, AlchemyFact.end > lower).order_by(AlchemyFact.start)
+        for start, end in query:
+            if occupied and start < occupied[-1][1]:
+                occupied[-1][1] = max(occupied[-1][1], end)
+            else:
+                occupied.append([start, end])
+
+        failed = []
+        position = 0
+        batch_end = None
+        for index in order:
+            fact = facts[index]
+            while position < len(occupied) and occupied[position][1] <= fact.start:
+                position += 1
+            overlaps_stored = position < len(occupied) and occupied[position][0] < fact.end
+            overlaps_batch = batch_end is not None and fact.start < batch_end
+            if overlaps_stored or overlaps_batch:
+                message = _(
+                    "Our database already contains facts for the timewindow of '{!r}'."
+                    " There can ever only be one fact at any given point in time".format(fact)
+                )
+                self.store.logger.error(message)
+                failed.append((index, ValueError(message)))
+            else:
+                batch_end = fact.end if batch_end is None else max(batch_end, fact.end)
+        return sorted(failed, key=lambda error: error[0])
+
+    def _get_or_create_by_names(self, alchemy_class, table, names):
+        """
+        Return ``hamster_lib`` instances for all names, adding missing ones to the database.
+
+        Args:
+            alchemy_class (AlchemyCategory or AlchemyTag): Mapped class to look up.
+            table (sqlalchemy.Table): Table ``alchemy_class`` is mapped to.
+            names (set): Names of the instances requested.
+
+        Returns:
+            dict: Dictionary mapping each name to its ``hamster_lib`` instance.
+        """
+        def get_by_names(names):
+            result = {}
+            for chunk in _chunks(list(names)):
+                query = self.store.session.query(alchemy_class).filter(
+                    alchemy_class.name.in_(chunk))
+                result.update((instance.name, instance.as_hamster()) for instance in query)
+            return result
+
+        result = get_by_names(names)
+        missing = sorted(names - set(result))
+        if missing:
+            self.store.session.execute(table.insert(), [{'name': name} for name in missing])
+            result.update(get_by_names(missing))
+        return result
+
+    def _get_or_create_activities(self, facts, categories):
+        """
+        Return the activities of all facts, adding missing ones to the database.
+
+        Args:
+            facts (list): List of ``hamster_lib.Fact`` instances.
+            categories (dict): Dictionary mapping category names to stored
+                ``hamster_lib.Category`` instances.
+
+        Returns:
+            dict: Dictionary mapping ``_get_activity_key`` results to
+                ``hamster_lib.Activity`` instances.
+        """
+        requested = {}
+        for fact in facts:
+            requested.setdefault(self._get_activity_key(fact.activity, categories), fact.activity)
+
+        def get_by_names(names):
+            result = {}
+            for chunk in _chunks(list(names)):
+                query = self.store.session.query(
+                    AlchemyActivity.pk, AlchemyActivity.name, AlchemyActivity.deleted,
+                    AlchemyActivity.category_id).filter(AlchemyActivity.name.in_(chunk))
+                for pk, name, deleted, category_id in query:
+                    if (name, category_id) in requested:
+                        category = None
+                        if category_id is not None:
+                            category = categories[requested[(name, category_id)].category.name]
+                        result[(name, category_id)] = Activity(name, pk=pk, category=category,
+                            deleted=deleted)
+            return result
+
+        result = get_by_names(set(name for name, category_id in requested))
+        missing = [key for key in requested if key not in result]
+        if missing:
+            self.store.session.execute(objects.activities.insert(), [{
+                'name': name,
+                'category_id': category_id,
+                'deleted': requested[(name, category_id)].deleted,
+            } for name, category_id in missing])
+            result.update(get_by_names(set(name for name, category_id in missing)))
+        return result
+
+    def _get_activity_key(self, activity, categories):
+        """Return the ``(name, category_id)`` composite key identifying an activity."""
+        if activity.category:
+            return (activity.name, categories[activity.category.name].pk)
+        return (activity.name, None)
+
     def _update(self, fact, raw=False):
         """
         Update and existing fact with new values.
@@ -1037,13 +1764,24 @@ class FactManager(storage.BaseFactManager):
             self.store.logger.error(message)
             raise KeyError(message)
 
+        previous = None
+        if self.store.completion.loaded:
+            previous = alchemy_fact.as_hamster()
+        previous_activity_id = alchemy_fact.activity.pk
         alchemy_fact.start = fact.start
         alchemy_fact.end = fact.end
         alchemy_fact.description = fact.description
         alchemy_fact.activity = self.store.activities.get_or_create(fact.activity, raw=True)
         tags = [self.store.tags.get_or_create(tag, raw=True) for tag in fact.tags]
         alchemy_fact.tags = tags
+        self.store.session.flush()
+        self.store.usage.remove(previous_activity_id)
+        self.store.usage.add(alchemy_fact.activity.pk, alchemy_fact.start)
+        self.store.totals.sync()
         self.store.session.commit()
+        if previous:
+            self.store.completion.add_fact_usage(previous, -1)
+            self.store.completion.add_fact_usage(alchemy_fact.as_hamster())
         self.store.logger.debug(_("{!r} has been updated.".format(fact)))
         return fact
 
@@ -1077,8 +1815,17 @@ class FactManager(storage.BaseFactManager):
             message = _("No fact with given pk was found!")
             self.store.logger.error(message)
             raise KeyError(message)
+        previous = None
+        if self.store.completion.loaded:
+            previous = alchemy_fact.as_hamster()
+        activity_id = alchemy_fact.activity.pk
         self.store.session.delete(alchemy_fact)
+        self.store.session.flush()
+        self.store.usage.remove(activity_id)
+        self.store.totals.sync()
         self.store.session.commit()
+        if previous:
+            self.store.completion.add_fact_usage(previous, -1)
         self.store.logger.debug(_("{!r} has been removed.".format(fact)))
         return True
 
@@ -1098,7 +1845,8 @@ class FactManager(storage.BaseFactManager):
 
         self.store.logger.debug(_("Recieved PK: {}', 'raw'={}.".format(pk, raw)))
 
-        result = self.store.session.query(AlchemyFact).get(pk)
+        query = self._eager_load(self.store.session.query(AlchemyFact))
+        result = query.filter(AlchemyFact.pk == pk).one_or_none()
         if not result:
             message = _("No fact with given PK found.")
             self.store.logger.error(message)
@@ -1134,6 +1882,376 @@ class FactManager(storage.BaseFactManager):
             (e.g. that span more than) the specified timeframe.
         """
 
+        self.store.logger.debug(_(
+            "Received start: '{}', end: '{}' and search_term='{}'.".format(
+                start, end, search_term)
+        ))
+
+        query = self._eager_load(self._get_all_query(start, end, search_term, partial))
+
+        # Depending on scale, building this list could be a problem. Clients dealing
+        # with large timeframes should use ``iter_all`` instead.
+        self.store.logger.debug(_("Returning list of results."))
+        return [fact.as_hamster() for fact in query.all()]
+
+    def _iter_all(self, start=None, end=None, search_term='', partial=False,
+            batch_size=storage.DEFAULT_BATCH_SIZE):
+        """
+        Iterate over all facts within a given timeframe that match given search terms.
+
+        Facts are retrieved in batches using keyset pagination on ``(start, id)``.
+        Each batch is a fresh query that seeks right behind the last fact of the
+        previous batch, so we neither keep a server side cursor open nor pay
+        for an ever growing ``OFFSET``.
+
+        Args:
+            start (datetime.datetime, optional): Start of timeframe.
+            end (datetime.datetime, optional): End of timeframe.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+            partial (bool): If ``False`` only facts which start *and* end
+                within the timeframe will be considered.
+            batch_size (int): Number of facts to retrieve per query.
+
+        Returns:
+            generator: Generator of ``hamster_lib.Fact`` instances ordered by ``Fact.start``.
+        """
+
+        self.store.logger.debug(_(
+            "Received start: '{}', end: '{}', search_term='{}' and batch_size={}.".format(
+                start, end, search_term, batch_size)
+        ))
+
+        def get_batch(*criteria):
+            # The query is built anew for each batch, so it uses whatever session is
+            # current by then. Batches may be consumed from different threads or
+            # ``session_scope`` blocks.
+            query = self._eager_load(self._get_all_query(start, end, search_term, partial))
+            return query.filter(*criteria).order_by(AlchemyFact.start, AlchemyFact.pk).limit(
+                batch_size).all()
+
+        batch = get_batch()
+        while batch:
+            # Convert the whole batch upfront. Its instances may be expired or detached
+            # by the time we get resumed.
+            last_start, last_pk = batch[-1].start, batch[-1].pk
+            facts = [alchemy_fact.as_hamster() for alchemy_fact in batch]
+            full = len(batch) == batch_size
+            # Release our references before the next batch gets loaded.
+            batch = None
+            for fact in facts:
+                yield fact
+            if not full:
+                break
+            facts = None
+            batch = get_batch(
+                AlchemyFact.start >= last_start,
+                or_(AlchemyFact.start > last_start, AlchemyFact.pk > last_pk),
+            )
+
+    def _get_records(self, start, end, search_term):
+        """
+        Return ``FactRecords`` built straight from two ``SELECT`` queries.
+
+        No ORM instances are created. Equal activity, category and tag names as well
+        as equal tag tuples are shared between records.
+
+        Args:
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+
+        Returns:
+            list: List of ``hamster_lib.objects.FactRecord`` namedtuples ordered by
+                ``start``.
+        """
+        self.store.logger.debug(_("Received start: '{}', end: '{}' and search_term='{}'.".format(
+            start, end, search_term)))
+
+        facts, activities, categories = objects.facts, objects.activities, objects.categories
+        facttags, tags = objects.facttags, objects.tags
+
+        # Same conditions as ``_get_all_query`` uses for complete overlaps.
+        conditions = []
+        if start:
+            conditions.append(facts.c.start >= start)
+        if end:
+            conditions.extend((facts.c.start <= end, facts.c.end <= end))
+        joins = facts.join(activities)
+        if search_term:
+            joins = joins.join(categories)
+            conditions.append(or_(activities.c.name.ilike('%{}%'.format(search_term)),
+                categories.c.name.ilike('%{}%'.format(search_term))))
+        else:
+            joins = joins.outerjoin(categories)
+
+        def get_query(columns, joins):
+            query = select(columns).select_from(joins)
+            for condition in conditions:
+                query = query.where(condition)
+            return query
+
+        shared = {}
+
+        def share(value):
+            """Return the first equal value we have seen instead of ``value``."""
+            return shared.setdefault(value, value)
+
+        session = self.store.session
+        tag_names = {}
+        tags_query = get_query([facttags.c.fact_id, tags.c.name], joins.join(facttags).join(tags))
+        for fact_id, name in session.execute(tags_query.order_by(tags.c.name)):
+            tag_names.setdefault(fact_id, []).append(share(name))
+
+        records = []
+        query = get_query([facts.c.id, facts.c.start, facts.c.end, activities.c.name,
+            categories.c.name, facts.c.description], joins)
+        for pk, fact_start, fact_end, activity, category, description in session.execute(
+                query.order_by(facts.c.start, facts.c.id)):
+            records.append(FactRecord(pk, fact_start, fact_end, share(activity), share(category),
+                share(tuple(tag_names.get(pk, ()))), description))
+        return records
+
+    def _get_columns(self, start, end, search_term):
+        """
+        Return ``FactColumns`` built straight from a ``SELECT`` query.
+
+        No ORM instances are created. Start and end are converted to epoch seconds by
+        the database and activity and category names are looked up once.
+
+        Args:
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+
+        Returns:
+            hamster_lib.columns.FactColumns: Columns of all matching facts, ordered by
+                ``start``.
+        """
+        self.store.logger.debug(_("Received start: '{}', end: '{}' and search_term='{}'.".format(
+            start, end, search_term)))
+
+        facts, activities, categories = objects.facts, objects.activities, objects.categories
+        session = self.store.session
+        activity_names = dict((pk, name) for pk, name in session.execute(
+            select([activities.c.id, activities.c.name])))
+        category_names = dict((pk, name) for pk, name in session.execute(
+            select([categories.c.id, categories.c.name])))
+
+        joins = facts.join(activities)
+        if search_term:
+            joins = joins.join(categories)
+        query = select([facts.c.id, epoch_seconds(facts.c.start).label('start_seconds'),
+            epoch_seconds(facts.c.end).label('end_seconds'), activities.c.id,
+            activities.c.category_id]).select_from(joins)
+        # Same conditions as ``_get_all_query`` uses for complete overlaps.
+        if start:
+            query = query.where(facts.c.start >= start)
+        if end:
+            query = query.where(and_(facts.c.start <= end, facts.c.end <= end))
+        if search_term:
+            query = query.where(or_(activities.c.name.ilike('%{}%'.format(search_term)),
+                categories.c.name.ilike('%{}%'.format(search_term))))
+
+        columns = FactColumns()
+        result = session.execute(query.order_by(facts.c.start, facts.c.id))
+        while True:
+            rows = result.fetchmany(COLUMNS_BATCH_SIZE)
+            if not rows:
+                break
+            columns.extend(rows, activity_names, category_names)
+        return columns
+
+    def _get_page(self, start, end, search_term, after, limit):
+        """
+        Return facts matching given criteria following a keyset.
+
+        Just like the batches of ``_iter_all``, a page seeks right behind the
+        ``(start, id)`` keyset of the previous page.
+
+        Args:
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+            after (tuple): ``(start, pk)`` of the fact to start after or ``None``.
+            limit (int): Maximum number of facts to return.
+
+        Returns:
+            list: List of ``hamster_lib.Fact`` instances ordered by start and PK.
+        """
+        query = self._eager_load(self._get_all_query(start, end, search_term))
+        if after:
+            last_start, last_pk = after
+            query = query.filter(AlchemyFact.start >= last_start,
+                or_(AlchemyFact.start > last_start, AlchemyFact.pk > last_pk))
+        query = query.order_by(AlchemyFact.start, AlchemyFact.pk).limit(limit)
+        return [alchemy_fact.as_hamster() for alchemy_fact in query]
+
+    def _search(self, terms, start, end, limit):
+        """
+        Return the facts most relevant to a list of search terms.
+
+        On SQLite the ``fact_search`` FTS5 index is used, terms match words starting
+        with them and facts are ranked by BM25. Otherwise terms match anywhere within
+        a field. See ``hamster_lib.backends.sqlalchemy.search`` for details.
+
+        Args:
+            terms (list): Non-empty list of search terms.
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            limit (int): Maximum number of facts to return.
+
+        Returns:
+            list: List of ``hamster_lib.Fact`` instances, most relevant first.
+        """
+        self.store.logger.debug(_("Received terms: {}, start: '{}', end: '{}'.".format(
+            terms, start, end)))
+
+        query = self._eager_load(self._get_all_query(start, end))
+        query = self.store.search.filter(query, terms).limit(limit)
+        return [fact.as_hamster() for fact in query.all()]
+
+    def _get_totals(self, start, end, group_by):
+        """
+        Return summed up fact durations.
+
+        If the ``daily_totals`` config option is set, the pre-aggregated table is
+        used and no fact is loaded at all. Changes made by other clients are folded
+        into it first. Otherwise all facts overlapping the timeframe are summed up.
+
+        Args:
+            start (datetime.date or None): First workday to consider.
+            end (datetime.date or None): Last workday to consider.
+            group_by (tuple): Validated fields to group by.
+
+        Returns:
+            list: List of ``hamster_lib.storage.Total`` namedtuples.
+        """
+        self.store.logger.debug(_("Received start: '{}', end: '{}' and group_by={}.".format(
+            start, end, group_by)))
+
+        if not self.store.totals.enabled:
+            query = self._eager_load(self.store.session.query(AlchemyFact))
+            if start:
+                query = query.filter(AlchemyFact.end > datetime.datetime.combine(
+                    start, self.store.config['day_start']))
+            if end:
+                query = query.filter(AlchemyFact.start <= time_helpers.end_day_to_datetime(
+                    end, self.store.config))
+            facts = (alchemy_fact.as_hamster() for alchemy_fact in query)
+            return self._aggregate_totals(facts, start, end, group_by)
+
+        if self.store.totals.sync():
+            self.store.session.commit()
+        rows = self.store.totals.query(start, end, group_by)
+        activities = self._get_by_pks(AlchemyActivity, set(row[1] for row in rows))
+        categories = self._get_by_pks(AlchemyCategory, set(row[2] for row in rows))
+        tags = self._get_by_pks(AlchemyTag, set(row[3] for row in rows))
+        return self._sort_totals([storage.Total(day, activities.get(activity_id),
+            categories.get(category_id), tags.get(tag_id), duration)
+            for day, activity_id, category_id, tag_id, duration in rows])
+
+    def _aggregate(self, start, end, group_by):
+        """
+        Return summed up fact durations, computed by a single ``GROUP BY`` query.
+
+        Args:
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            group_by (tuple): Validated fields to group by.
+
+        Returns:
+            list: List of ``hamster_lib.storage.Aggregate`` namedtuples.
+        """
+        self.store.logger.debug(_("Received start: '{}', end: '{}' and group_by={}.".format(
+            start, end, group_by)))
+
+        facts, activities = objects.facts, objects.activities
+        categories, facttags, tags = objects.categories, objects.facttags, objects.tags
+
+        # Facts partially overlapping the timeframe only count with the overlapping part.
+        fact_start, fact_end = facts.c.start, facts.c.end
+        if start:
+            fact_start = case([(facts.c.start < start, literal(start, facts.c.start.type))],
+                else_=facts.c.start)
+        if end:
+            fact_end = case([(facts.c.end > end, literal(end, facts.c.end.type))],
+                else_=facts.c.end)
+
+        day_start = self.store.config['day_start']
+        # Reported column and any additional column to group by for each field.
+        fields = OrderedDict((
+            ('day', (workday(fact_start, day_start), [])),
+            ('week', (week_start(fact_start, day_start), [])),
+            ('activity', (activities.c.name, [activities.c.id])),
+            ('category', (categories.c.name, [categories.c.id])),
+            ('tag', (tags.c.name, [tags.c.id])),
+        ))
+        grouped = [field for field in fields if (
+            field in group_by or (field == 'category' and 'activity' in group_by))]
+        # Refer to reported columns by label, so expressions are not repeated.
+        group_columns = [column for field in grouped for column in fields[field][1] + [field]]
+
+        joins = facts
+        if 'activity' in grouped or 'category' in grouped:
+            joins = joins.join(activities).outerjoin(categories)
+        if 'tag' in grouped:
+            joins = joins.outerjoin(facttags).outerjoin(tags)
+
+        query = select([fields[field][0].label(field) for field in grouped] + [
+            func.sum(seconds_between(fact_start, fact_end)), func.count(facts.c.id)],
+        ).select_from(joins)
+        if start:
+            query = query.where(facts.c.end > start)
+        if end:
+            query = query.where(facts.c.start < end)
+        if group_columns:
+            query = query.group_by(*group_columns)
+            query = query.order_by(*grouped)
+
+        result = []
+        for row in self.store.session.execute(query):
+            seconds, count = row[-2:]
+            if not count:
+                # No facts at all.
+                continue
+            values = dict(zip(grouped, row))
+            values['duration'] = datetime.timedelta(seconds=int(round(seconds)))
+            values['count'] = count
+            result.append(storage.Aggregate(**dict(
+                (field, values.get(field)) for field in storage.Aggregate._fields)))
+        return result
+
+    def _get_by_pks(self, alchemy_class, pks):
+        """Return a dictionary mapping PKs to ``hamster_lib`` instances."""
+        pks = sorted(pk for pk in pks if pk is not None)
+        result = {}
+        for chunk in _chunks(pks):
+            query = self.store.session.query(alchemy_class).filter(alchemy_class.pk.in_(chunk))
+            if alchemy_class is AlchemyActivity:
+                query = query.options(joinedload(AlchemyActivity.category))
+            result.update((instance.pk, instance.as_hamster()) for instance in query)
+        return result
+
+    def _get_all_query(self, start=None, end=None, search_term='', partial=False):
+        """
+        Return the query used by ``_get_all`` to retrieve matching facts.
+
+        Args:
+            start (datetime.datetime, optional): Start of timeframe.
+            end (datetime.datetime, optional): End of timeframe.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+            partial (bool): If ``False`` only facts which start *and* end
+                within the timeframe will be considered.
+
+        Returns:
+            sqlalchemy.orm.query.Query: Query for ``AlchemyFact`` instances.
+        """
+
         def get_complete_overlaps(query, start, end):
             """Return all facts with start and end within the timeframe."""
 
@@ -1142,6 +2260,10 @@ class FactManager(storage.BaseFactManager):
             if start:
                 query = query.filter(AlchemyFact.start >= start)
             if end:
+                # As ``start <= end`` for any fact, this is implied by the
+                # condition on ``end``. Stating it explicitly however allows the
+                # db to use a bounded range scan on ``ix_facts_start_end``.
+                query = query.filter(AlchemyFact.start <= end)
                 query = query.filter(AlchemyFact.end <= end)
             return query
 
@@ -1171,17 +2293,12 @@ class FactManager(storage.BaseFactManager):
             The matching is not case sensitive.
             """
             query = query.join(AlchemyActivity).join(AlchemyCategory).filter(
-                or_(AlchemyActivity.name.ilike('%{}%'.format(search_term)),
-                    AlchemyCategory.name.ilike('%{}%'.format(search_term))
+                or_(AlchemyActivity.name.ilike('%{}%'.format(term)),
+                    AlchemyCategory.name.ilike('%{}%'.format(term))
                     )
             )
             return query
 
-        self.store.logger.debug(_(
-            "Received start: '{}', end: '{}' and search_term='{}'.".format(
-                start, end, search_term)
-        ))
-
         # [FIXME] Figure out against what to match search_terms
         query = self.store.session.query(AlchemyFact)
 
@@ -1192,8 +2309,26 @@ class FactManager(storage.BaseFactManager):
 
         if search_term:
             query = filter_search_term(query, search_term)
+        return query
 
-        # [FIXME]
-        # Depending on scale, this could be a problem.
-        self.store.logger.debug(_("Returning list of results."))
-        return [fact.as_hamster() for fact in query.all()]
+    def _eager_load(self, query):
+        """
+        Make a fact query load all related instances needed by ``as_hamster`` upfront.
+
+        Without this, each fact would lazily load its activity, category and tags
+        one SQL query at a time. This way we end up with exactly two queries no
+        matter how many facts are returned: one for facts, activities and categories
+        (joined) and one for all tags, joining ``facttags`` with the fact query as
+        a subquery. Unlike ``selectinload``, which passes fact PKs in chunks of 500,
+        this does not grow with the number of facts.
+
+        Args:
+            query (sqlalchemy.orm.query.Query): Query for ``AlchemyFact`` instances.
+
+        Returns:
+            sqlalchemy.orm.query.Query: Query including the eager loading options.
+        """
+        return query.options(
+            joinedload(AlchemyFact.activity).joinedload(AlchemyActivity.category),
+            subqueryload(AlchemyFact.tags),
+        )
@@ -0,0 +1,388 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Maintain the optional ``daily_totals`` table.
+
+For each workday, activity and tag the table holds the sum of all fact durations
+in seconds. Facts spanning several workdays contribute to each of them. Rows with
+``tag_id == objects.ALL_TAGS`` hold an activities total regardless of its tags.
+
+Triggers on ``facts`` and ``facttags`` record each change in ``daily_totals_log``,
+so writes by other clients or older versions of this library are never missed.
+``DailyTotals.sync`` folds logged changes into the table. Splitting timeframes by
+workday depends on the ``day_start`` setting, so this happens in python. The
+setting the table has been built with is kept in ``daily_totals_meta``, the table
+is rebuilt once it changes.
+
+Note:
+    Daily totals are only available on SQLite. All methods but ``setup`` and
+    ``drop`` operate within the stores current transaction and never commit.
+    ``FactManager`` syncs right before committing, so facts and their totals are
+    usually stored together.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+
+from future.utils import python_2_unicode_compatible
+from hamster_lib.helpers import time as time_helpers
+from sqlalchemy import (Integer, and_, bindparam, case, cast, func, inspect, literal_column,
+    or_, select, union_all)
+
+from . import objects
+from .functions import epoch_seconds, workday
+
+# Number of rows looked up at once by ``DailyTotals.apply``. Each takes three
+# parameters, older SQLite versions allow no more than 999 per statement.
+LOOKUP_BATCH_SIZE = 300
+
+_INSERT_LOG = 'INSERT INTO daily_totals_log (start, "end", activity_id, tag_id, sign)'
+
+
+def _log_fact(row, sign):
+    """Return statements logging the contributions of ``row`` (``NEW`` or ``OLD``) of facts."""
+    return (
+        '{insert} VALUES ({row}.start, {row}."end", {row}.activity_id, {all_tags}, {sign});'
+        ' {insert} SELECT {row}.start, {row}."end", {row}.activity_id, tag_id, {sign}'
+        ' FROM facttags WHERE fact_id = {row}.id;'
+    ).format(insert=_INSERT_LOG, row=row, all_tags=objects.ALL_TAGS, sign=sign)
+
+
+def _log_facttag(row, sign):
+    """Return a statement logging the contribution of ``row`` (``NEW`` or ``OLD``) of facttags."""
+    return (
+        '{insert} SELECT start, "end", activity_id, {row}.tag_id, {sign}'
+        ' FROM facts WHERE id = {row}.fact_id;'
+    ).format(insert=_INSERT_LOG, row=row, sign=sign)
+
+
+# Whichever order facts and their tag relations are written in, the logged
+# contributions add up to the change of the totals.
+TRIGGERS = (
+    ('daily_totals_fact_insert', 'AFTER INSERT ON facts', _log_fact('NEW', 1)),
+    ('daily_totals_fact_update', 'AFTER UPDATE OF start, "end", activity_id ON facts',
+        _log_fact('OLD', -1) + ' ' + _log_fact('NEW', 1)),
+    ('daily_totals_fact_delete', 'AFTER DELETE ON facts', _log_fact('OLD', -1)),
+    ('daily_totals_facttag_insert', 'AFTER INSERT ON facttags', _log_facttag('NEW', 1)),
+    ('daily_totals_facttag_update', 'AFTER UPDATE ON facttags',
+        _log_facttag('OLD', -1) + ' ' + _log_facttag('NEW', 1)),
+    ('daily_totals_facttag_delete', 'AFTER DELETE ON facttags', _log_facttag('OLD', -1)),
+)
+
+CREATE_STATEMENTS = tuple('CREATE TRIGGER IF NOT EXISTS {} {} BEGIN {} END'.format(
+    name, event, body) for name, event, body in TRIGGERS)
+
+
+def _get_microseconds(column):
+    return cast(func.substr(column, 21), Integer)
+
+
+@python_2_unicode_compatible
+class DailyTotals(object):
+    """Trigger maintained daily totals of a ``SQLAlchemyStore``."""
+
+    def __init__(self, store):
+        self.store = store
+        self.enabled = bool(store.config.get('daily_totals'))
+        self.table = objects.daily_totals
+        self.log = objects.daily_totals_log
+        self.meta = objects.daily_totals_meta
+
+    def setup(self, connection):
+        """
+        Make sure the table, its log and triggers exist if totals are enabled.
+
+        If they are created, or the table has been built with another ``day_start``,
+        the table is populated from all existing facts. If totals are disabled, an
+        existing table is left alone. Its triggers keep it up to date for stores
+        having totals enabled. Use ``drop`` to remove it.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Connection used by our session.
+
+        Returns:
+            bool: ``True`` if the table has been (re)built.
+        """
+        if not self.enabled:
+            return False
+        if connection.dialect.name != 'sqlite':
+            self.enabled = False
+            self.store.logger.debug(_("Daily totals are only available on SQLite."))
+            return False
+        table_names = inspect(connection).get_table_names()
+        trigger_names = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+        tables = (self.table, self.log, self.meta)
+        if all(table.name in table_names for table in tables) and all(
+                name in trigger_names for name, event, body in TRIGGERS):
+            if self._get_day_start() == self.store.config['day_start']:
+                return False
+            self.rebuild()
+            self.store.session.commit()
+            self.store.logger.debug(_("Rebuilt daily totals for a new day start."))
+            return True
+        # Tables created by earlier versions were maintained without triggers.
+        for table in tables:
+            table.create(connection, checkfirst=True)
+        for statement in CREATE_STATEMENTS:
+            connection.execute(statement)
+        self.rebuild()
+        self.store.session.commit()
+        self.store.logger.debug(_("Created and populated daily totals table."))
+        return True
+
+    def drop(self):
+        """
+        Remove the table, its log and triggers and disable totals for this store.
+
+        Stores having totals enabled set them up again when instantiated.
+        """
+        connection = self.store.session.connection()
+        for name, event, body in TRIGGERS:
+            connection.execute('DROP TRIGGER IF EXISTS {}'.format(name))
+        self.meta.drop(connection, checkfirst=True)
+        self.log.drop(connection, checkfirst=True)
+        self.table.drop(connection, checkfirst=True)
+        self.store.session.commit()
+        self.enabled = False
+        self.store.logger.debug(_("Dropped daily totals table."))
+
+    def _get_day_start(self):
+        """Return the ``day_start`` the table has been built with, ``None`` if unknown."""
+        return self.store.session.execute(select([self.meta.c.day_start])).scalar()
+
+    def _add_contribution(self, deltas, start, end, activity_id, tag_id, sign=1):
+        """Add the durations of a single fact and tag to ``deltas``."""
+        for day, duration in time_helpers.split_by_workday(start, end, self.store.config):
+            key = (day, activity_id, tag_id)
+            deltas[key] = deltas.get(key, 0) + sign * int(duration.total_seconds())
+
+    def sync(self):
+        """
+        Fold all logged changes into the table.
+
+        Pending changes of our session are flushed first. If another client
+        rebuilt the table with a different ``day_start`` meanwhile, it is rebuilt
+        with ours instead.
+
+        Returns:
+            bool: ``True`` if there were any changes.
+        """
+        if not self.enabled:
+            return False
+        log = self.log
+        session = self.store.session
+        session.flush()
+        day_start = self.store.config['day_start']
+        query = select([log.c.id, log.c.start, log.c.end, log.c.activity_id, log.c.tag_id,
+            log.c.sign]).order_by(log.c.id)
+        if self._get_day_start() == day_start and not session.execute(query.limit(1)).first():
+            return False
+        # Take the write lock before reading the log, so no one else can fold the
+        # same changes or rebuild the table at the same time.
+        self.store._begin_write()
+        if self._get_day_start() != day_start:
+            self.rebuild()
+            return True
+        rows = session.execute(query).fetchall()
+        deltas = {}
+        for pk, start, end, activity_id, tag_id, sign in rows:
+            if start and end and activity_id:
+                self._add_contribution(deltas, start, end, activity_id, tag_id, sign)
+        self.apply(deltas)
+        if rows:
+            session.execute(log.delete().where(log.c.id <= rows[-1][0]))
+        return bool(rows)
+
+    def apply(self, deltas):
+        """
+        Add a set of contributions to the table.
+
+        We look up exactly the affected rows, using the primary key, and then issue
+        at most one ``executemany`` statement for each of updating, inserting and
+        deleting rows.
+
+        Args:
+            deltas (dict): Dictionary mapping ``(day, activity_id, tag_id)`` keys to
+                seconds. Negative values subtract. Rows reaching zero are deleted.
+        """
+        deltas = dict((key, seconds) for key, seconds in deltas.items() if seconds)
+        if not self.enabled or not deltas:
+            return
+
+        table = self.table
+        session = self.store.session
+        keys = list(deltas)
+        existing = {}
+        for index in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            query = select([table.c.day, table.c.activity_id, table.c.tag_id, table.c.seconds])
+            query = query.where(or_(*[and_(table.c.day == day,
+                table.c.activity_id == activity_id, table.c.tag_id == tag_id)
+                for day, activity_id, tag_id in keys[index:index + LOOKUP_BATCH_SIZE]]))
+            existing.update(((day, activity_id, tag_id), seconds)
+                for day, activity_id, tag_id, seconds in session.execute(query))
+
+        inserts, updates, deletes = [], [], []
+        for (day, activity_id, tag_id), seconds in deltas.items():
+            row = {'b_day': day, 'b_activity_id': activity_id, 'b_tag_id': tag_id}
+            if (day, activity_id, tag_id) in existing:
+                row['b_seconds'] = existing[(day, activity_id, tag_id)] + seconds
+                if row['b_seconds'] > 0:
+                    updates.append(row)
+                else:
+                    deletes.append(row)
+            elif seconds > 0:
+                inserts.append({'day': day, 'activity_id': activity_id, 'tag_id': tag_id,
+                    'seconds': seconds})
+            else:
+                self.store.logger.error(_(
+                    "Daily totals are inconsistent: no row to subtract {} seconds from"
+                    " for {}.".format(seconds, (day, activity_id, tag_id))))
+
+        condition = and_(
+            table.c.day == bindparam('b_day'),
+            table.c.activity_id == bindparam('b_activity_id'),
+            table.c.tag_id == bindparam('b_tag_id'),
+        )
+        if updates:
+            session.execute(table.update().where(condition).values(
+                seconds=bindparam('b_seconds')), updates)
+        if deletes:
+            session.execute(table.delete().where(condition), deletes)
+        if inserts:
+            session.execute(table.insert(), inserts)
+
+    def _select_contributions(self, columns, condition):
+        """Return the ``columns`` of facts matching ``condition``, once per tag and overall."""
+        facts, facttags = objects.facts, objects.facttags
+        return union_all(
+            select(columns + [literal_column(str(objects.ALL_TAGS)).label('tag_id')]).where(
+                condition),
+            select(columns + [facttags.c.tag_id]).select_from(facts.join(facttags,
+                facttags.c.fact_id == facts.c.id)).where(condition),
+        )
+
+    def rebuild(self):
+        """
+        Recompute the whole table from all stored facts.
+
+        Facts spanning several workdays are split up in python and inserted first.
+        All others, which are almost all facts, are then summed up by a single
+        ``INSERT ... SELECT ... GROUP BY`` statement, adding to existing rows.
+        The current ``day_start`` is recorded in ``daily_totals_meta``.
+        """
+        table, facts = self.table, objects.facts
+        session = self.store.session
+        session.flush()
+        session.execute(self.log.delete())
+        session.execute(table.delete())
+        day_start = self.store.config['day_start']
+        session.execute(self.meta.delete())
+        session.execute(self.meta.insert().values(day_start=day_start))
+
+        valid = and_(facts.c.start < facts.c.end, facts.c.activity_id.isnot(None))
+        single_workday = workday(facts.c.start, day_start) == workday(facts.c.end, day_start)
+
+        deltas = {}
+        for start, end, activity_id, tag_id in session.execute(self._select_contributions(
+                [facts.c.start, facts.c.end, facts.c.activity_id],
+                and_(valid, ~single_workday))):
+            self._add_contribution(deltas, start, end, activity_id, tag_id)
+        rows = [{'day': day, 'activity_id': activity_id, 'tag_id': tag_id, 'seconds': seconds}
+            for (day, activity_id, tag_id), seconds in deltas.items() if seconds]
+        if rows:
+            session.execute(table.insert(), rows)
+
+        # Just like ``int(timedelta.total_seconds())``, fractions of a second are cut off.
+        seconds = epoch_seconds(facts.c.end) - epoch_seconds(facts.c.start) - case(
+            [(_get_microseconds(facts.c.end) < _get_microseconds(facts.c.start), 1)], else_=0)
+        contributions = self._select_contributions([
+            workday(facts.c.start, day_start).label('day'),
+            facts.c.activity_id,
+            seconds.label('seconds'),
+        ], and_(valid, single_workday)).alias('contributions')
+        group_columns = [contributions.c.day, contributions.c.activity_id,
+            contributions.c.tag_id]
+        total = func.sum(contributions.c.seconds)
+        existing = select([table.c.seconds]).where(and_(
+            table.c.day == contributions.c.day,
+            table.c.activity_id == contributions.c.activity_id,
+            table.c.tag_id == contributions.c.tag_id,
+        )).as_scalar()
+        session.execute(table.insert().prefix_with('OR REPLACE').from_select(
+            ['day', 'activity_id', 'tag_id', 'seconds'],
+            select(group_columns + [total + func.coalesce(existing, 0)]).group_by(
+                *group_columns).having(total > 0),
+        ))
+
+    def query(self, start, end, group_by):
+        """
+        Return summed up durations from the table.
+
+        Args:
+            start (datetime.date or None): First workday to consider.
+            end (datetime.date or None): Last workday to consider.
+            group_by (tuple): Any of ``'day'``, ``'activity'``, ``'category'`` and ``'tag'``.
+
+        Returns:
+            list: List of ``(day, activity_id, category_id, tag_id, duration)`` tuples.
+                Ids are ``None`` unless they are grouped by. Just like
+                ``BaseFactManager.get_totals``, grouping by activity implies its category.
+        """
+        table, activities = self.table, objects.activities
+        columns = {
+            'day': table.c.day,
+            'activity': table.c.activity_id,
+            'category': activities.c.category_id,
+            'tag': table.c.tag_id,
+        }
+        grouped = [field for field in ('day', 'activity', 'category', 'tag') if (
+            field in group_by or (field == 'category' and 'activity' in group_by))]
+        group_columns = [columns[field] for field in grouped]
+
+        query = select(group_columns + [func.sum(table.c.seconds)])
+        if 'category' in grouped:
+            query = query.select_from(table.join(activities))
+        if 'tag' in grouped:
+            query = query.where(table.c.tag_id != objects.ALL_TAGS)
+        else:
+            query = query.where(table.c.tag_id == objects.ALL_TAGS)
+        if start:
+            query = query.where(table.c.day >= start)
+        if end:
+            query = query.where(table.c.day <= end)
+        if group_columns:
+            query = query.group_by(*group_columns)
+
+        result = []
+        for row in self.store.session.execute(query):
+            values = dict(zip(grouped, row))
+            if row[-1] is None:
+                # No rows at all. ``sum`` yields ``NULL``.
+                continue
+            result.append((
+                values.get('day'),
+                values.get('activity'),
+                values.get('category'),
+                values.get('tag'),
+                datetime.timedelta(seconds=row[-1]),
+            ))
+        return result
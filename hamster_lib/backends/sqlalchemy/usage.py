@@ -0,0 +1,207 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Maintain the ``activity_usage`` table.
+
+For each activity with facts the table holds the number of its facts and the start
+of the latest one. Indexes on both columns let ``ActivityManager.get_recent`` and
+``get_frequent`` read the top activities right away instead of counting facts.
+
+On SQLite, triggers on ``facts`` maintain the table, so writes by other clients or
+older versions of this library are never missed. Other databases rely on the
+``FactManager`` calling ``add``, ``apply`` and ``remove``. Either way ``setup``
+rebuilds the table if it does not match the facts anymore.
+
+Note:
+    All methods but ``setup`` operate within the stores current transaction and
+    never commit. This is up to the calling ``FactManager`` method, so facts and
+    their usage are always stored together.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+from future.utils import python_2_unicode_compatible
+from sqlalchemy import and_, bindparam, case, func, select
+
+from . import objects
+
+
+def _count(row):
+    """Return statements counting ``row`` (``NEW``) of facts."""
+    return (
+        'INSERT OR IGNORE INTO activity_usage (activity_id, fact_count, last_used)'
+        ' SELECT {row}.activity_id, 0, {row}.start WHERE {row}.activity_id IS NOT NULL;'
+        ' UPDATE activity_usage SET fact_count = fact_count + 1,'
+        ' last_used = max(last_used, coalesce({row}.start, last_used))'
+        ' WHERE activity_id = {row}.activity_id;'
+    ).format(row=row)
+
+
+def _uncount(row):
+    """Return statements uncounting ``row`` (``OLD``) of facts."""
+    return (
+        'DELETE FROM activity_usage WHERE activity_id = {row}.activity_id AND fact_count <= 1;'
+        ' UPDATE activity_usage SET fact_count = fact_count - 1,'
+        ' last_used = (SELECT max(start) FROM facts WHERE activity_id = {row}.activity_id)'
+        ' WHERE activity_id = {row}.activity_id;'
+    ).format(row=row)
+
+
+TRIGGERS = (
+    ('activity_usage_fact_insert', 'AFTER INSERT ON facts', _count('NEW')),
+    ('activity_usage_fact_update', 'AFTER UPDATE OF start, activity_id ON facts',
+        _uncount('OLD') + ' ' + _count('NEW')),
+    ('activity_usage_fact_delete', 'AFTER DELETE ON facts', _uncount('OLD')),
+)
+
+CREATE_STATEMENTS = tuple('CREATE TRIGGER IF NOT EXISTS {} {} BEGIN {} END'.format(
+    name, event, body) for name, event, body in TRIGGERS)
+
+
+@python_2_unicode_compatible
+class ActivityUsage(object):
+    """Incrementally maintained activity usage of a ``SQLAlchemyStore``."""
+
+    def __init__(self, store):
+        self.store = store
+        self.table = objects.activity_usage
+        # ``True`` once triggers maintain the table, ``add``, ``apply`` and
+        # ``remove`` do nothing then.
+        self.triggered = False
+
+    def setup(self, connection):
+        """
+        Make sure the table matches all stored facts.
+
+        On SQLite, missing triggers are created and the table is rebuilt, as facts
+        may have been written without them. Otherwise the number of facts and their
+        latest start are compared with the table, which is rebuilt if they differ.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Connection used by our session.
+
+        Returns:
+            bool: ``True`` if the table has been (re)built.
+        """
+        missing = False
+        if connection.dialect.name == 'sqlite':
+            trigger_names = [row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+            missing = not all(name in trigger_names for name, event, body in TRIGGERS)
+            for statement in CREATE_STATEMENTS:
+                connection.execute(statement)
+            self.triggered = True
+        if not missing and self._is_current(connection):
+            return False
+        self.rebuild()
+        self.store.session.commit()
+        self.store.logger.debug(_("Rebuilt activity usage."))
+        return True
+
+    def _is_current(self, connection):
+        """Tell if the table accounts for the number and latest start of all facts."""
+        table, facts = self.table, objects.facts
+        usage = connection.execute(select([func.coalesce(func.sum(table.c.fact_count), 0),
+            func.max(table.c.last_used)])).first()
+        counted = connection.execute(select([func.count(facts.c.activity_id),
+            func.max(facts.c.start)]).where(facts.c.activity_id.isnot(None))).first()
+        return tuple(usage) == tuple(counted)
+
+    def add(self, activity_id, start):
+        """
+        Count a new fact.
+
+        Args:
+            activity_id (int): PK of the facts activity.
+            start (datetime.datetime): Start of the fact.
+        """
+        if self.triggered:
+            return
+        self.apply({activity_id: (1, start)})
+
+    def apply(self, additions):
+        """
+        Count new facts of several activities.
+
+        Just like ``DailyTotals.apply`` we look up all affected rows at once and then
+        issue at most one ``executemany`` statement for each of updating and inserting.
+
+        Args:
+            additions (dict): Dictionary mapping activity PKs to ``(count, start)``
+                tuples, ``start`` being the start of the latest of ``count`` new facts.
+        """
+        if self.triggered or not additions:
+            return
+        table = self.table
+        session = self.store.session
+        existing = set(row[0] for row in session.execute(select([table.c.activity_id]).where(
+            table.c.activity_id.in_(list(additions)))))
+
+        updates, inserts = [], []
+        for activity_id, (count, start) in additions.items():
+            if activity_id in existing:
+                updates.append({'b_activity_id': activity_id, 'b_count': count,
+                    'b_start': start})
+            else:
+                inserts.append({'activity_id': activity_id, 'fact_count': count,
+                    'last_used': start})
+        if updates:
+            start = bindparam('b_start', type_=table.c.last_used.type)
+            session.execute(table.update().where(
+                table.c.activity_id == bindparam('b_activity_id')).values(
+                fact_count=table.c.fact_count + bindparam('b_count'),
+                last_used=case([(table.c.last_used < start, start)], else_=table.c.last_used),
+            ), updates)
+        if inserts:
+            session.execute(table.insert(), inserts)
+
+    def remove(self, activity_id, count=1):
+        """
+        Uncount removed facts of an activity.
+
+        ``last_used`` is looked up again from the remaining facts, so they need to
+        be flushed already.
+
+        Args:
+            activity_id (int): PK of the facts activity.
+            count (int, optional): Number of removed facts. Defaults to ``1``.
+        """
+        if self.triggered:
+            return
+        table, facts = self.table, objects.facts
+        session = self.store.session
+        session.execute(table.delete().where(and_(table.c.activity_id == activity_id,
+            table.c.fact_count <= count)))
+        session.execute(table.update().where(table.c.activity_id == activity_id).values(
+            fact_count=table.c.fact_count - count,
+            last_used=select([func.max(facts.c.start)]).where(
+                facts.c.activity_id == activity_id).as_scalar(),
+        ))
+
+    def rebuild(self):
+        """Recompute the whole table from all stored facts."""
+        facts = objects.facts
+        session = self.store.session
+        session.execute(self.table.delete())
+        session.execute(self.table.insert().from_select(
+            ['activity_id', 'fact_count', 'last_used'],
+            select([facts.c.activity_id, func.count(), func.max(facts.c.start)]).where(
+                facts.c.activity_id.isnot(None)).group_by(facts.c.activity_id),
+        ))
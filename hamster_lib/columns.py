@@ -0,0 +1,235 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Columnar representation of facts for analytics.
+
+Instead of one object per fact, ``FactColumns`` holds one typed array per attribute.
+Activities and categories are dictionary encoded: their columns hold indexes into
+the ``activities`` and ``categories`` lists of names, ``-1`` meaning *no category*.
+
+Arrays are ``array.array`` instances, so no third party package is needed. If NumPy
+is installed, ``FactColumns.to_numpy`` turns them into NumPy arrays without copying.
+``FactColumns.write_npz`` writes a file ``numpy.load`` understands either way::
+
+    columns = controller.facts.get_columns(start, end)
+    columns.write_npz('facts.npz')
+
+    data = numpy.load('facts.npz')
+    durations = data['duration']
+    activities = data['activities'][data['activity']]
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import sys
+import zipfile
+from array import array
+
+from future.utils import python_2_unicode_compatible
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# ``array`` type code for 64 bit integers. Python 2 lacks ``'q'``.
+try:
+    INT64 = array(str('q')).typecode
+except ValueError:
+    INT64 = str('l')
+FLOAT64 = str('d')
+
+# Array columns in the order they are written, with their ``array`` type codes.
+COLUMNS = (
+    ('pk', INT64),
+    ('start', INT64),
+    ('end', INT64),
+    ('duration', FLOAT64),
+    ('activity', INT64),
+    ('category', INT64),
+)
+
+# NumPy type descriptions of our type codes, in native byte order.
+_BYTE_ORDER = '<' if sys.byteorder == 'little' else '>'
+_DESCRIPTIONS = {INT64: _BYTE_ORDER + 'i8', FLOAT64: _BYTE_ORDER + 'f8'}
+
+
+def epoch_seconds(moment):
+    """
+    Return ``moment`` as whole seconds since 1970-01-01.
+
+    Args:
+        moment (datetime.datetime): Naive datetime. It is not converted to UTC, just
+            like facts are stored.
+
+    Returns:
+        int: Seconds since the epoch.
+    """
+    delta = moment - EPOCH
+    return delta.days * 86400 + delta.seconds
+
+
+def _get_npy(description, shape, data):
+    """Return the contents of an ``.npy`` file (format version 1.0)."""
+    header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({},), }}".format(
+        description, shape)
+    # The header is padded with spaces and a final newline, so the data is aligned.
+    header += ' ' * (63 - (len(header) + 10) % 64) + '\n'
+    length = bytearray((len(header) & 0xff, len(header) >> 8))
+    return b''.join((b'\x93NUMPY\x01\x00', bytes(length), header.encode('latin-1'), data))
+
+
+@python_2_unicode_compatible
+class FactColumns(object):
+    """
+    Facts as columns of typed arrays.
+
+    Attributes:
+        pk (array.array): Fact PKs.
+        start (array.array): Fact starts as seconds since 1970-01-01, see
+            ``epoch_seconds``.
+        end (array.array): Fact ends as seconds since 1970-01-01.
+        duration (array.array): ``end - start`` in seconds, as floats.
+        activity (array.array): Index of each facts activity within ``activities``.
+        category (array.array): Index of each facts category within ``categories``
+            or ``-1`` if its activity has no category.
+        activities (list): Activity names. Names are not unique, as different
+            activities may have the same name in different categories.
+        categories (list): Category names.
+    """
+
+    def __init__(self):
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+        self.activities = []
+        self.categories = []
+        self._activity_codes = {}
+        self._category_codes = {None: -1}
+
+    def extend(self, rows, activity_names, category_names):
+        """
+        Add facts.
+
+        Args:
+            rows (list): ``(pk, start, end, activity_key, category_key)`` tuples, with
+                ``start`` and ``end`` as seconds since 1970-01-01. Keys identify an
+                activity or category, e.g. by their PK. ``category_key`` is ``None``
+                for activities without category.
+            activity_names (dict): Maps each ``activity_key`` to the activity name.
+            category_names (dict): Maps each ``category_key`` but ``None`` to the
+                category name.
+        """
+        if not rows:
+            return
+        pks, starts, ends, activity_keys, category_keys = zip(*rows)
+        self.pk.extend(pks)
+        self.start.extend(starts)
+        self.end.extend(ends)
+        self.duration.extend([float(end - start) for start, end in zip(starts, ends)])
+        self.activity.extend(self._encode(activity_keys, self._activity_codes, self.activities,
+            activity_names))
+        self.category.extend(self._encode(category_keys, self._category_codes, self.categories,
+            category_names))
+
+    @staticmethod
+    def _encode(keys, codes, names, new_names):
+        """Return the codes of ``keys``, adding unknown keys to ``codes`` and ``names``."""
+        for key in keys:
+            if key not in codes:
+                codes[key] = len(names)
+                names.append(new_names[key])
+        return [codes[key] for key in keys]
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build columns from ``FactRecords``.
+
+        Activities are told apart by their name and category name.
+
+        Args:
+            records (Iterable): ``hamster_lib.objects.FactRecord`` instances.
+
+        Returns:
+            FactColumns: Columns holding all records.
+        """
+        rows, activity_names, category_names = [], {}, {}
+        for record in records:
+            activity_key = (record.activity, record.category)
+            activity_names[activity_key] = record.activity
+            category_names[record.category] = record.category
+            rows.append((record.pk, epoch_seconds(record.start), epoch_seconds(record.end),
+                activity_key, record.category))
+        columns = cls()
+        columns.extend(rows, activity_names, category_names)
+        return columns
+
+    def to_numpy(self):
+        """
+        Return our columns as NumPy arrays.
+
+        Numeric arrays share their memory with our ``array.array`` columns.
+
+        Returns:
+            dict: Dictionary mapping the names of ``COLUMNS`` as well as ``'activities'``
+                and ``'categories'`` to NumPy arrays.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+        """
+        if numpy is None:
+            raise ImportError(_("NumPy needs to be installed to convert columns."))
+        result = dict((name, numpy.frombuffer(getattr(self, name),
+            dtype=_DESCRIPTIONS[typecode])) for name, typecode in COLUMNS)
+        result['activities'] = numpy.array(self.activities, dtype=numpy.str_)
+        result['categories'] = numpy.array(self.categories, dtype=numpy.str_)
+        return result
+
+    def write_npz(self, file):
+        """
+        Write all columns to an uncompressed NumPy ``.npz`` archive.
+
+        ``numpy.load`` returns the same arrays ``to_numpy`` does. NumPy is not needed
+        to write the file.
+
+        Args:
+            file: Path or binary file object.
+        """
+        with zipfile.ZipFile(file, 'w', zipfile.ZIP_STORED) as archive:
+            for name, typecode in COLUMNS:
+                column = getattr(self, name)
+                archive.writestr(str('{}.npy'.format(name)),
+                    _get_npy(_DESCRIPTIONS[typecode], len(column), column.tobytes()))
+            for name in ('activities', 'categories'):
+                names = getattr(self, name)
+                width = max([len(value) for value in names] + [1])
+                data = b''.join(value.ljust(width, '\0').encode('utf-32-le') for value in names)
+                archive.writestr(str('{}.npy'.format(name)),
+                    _get_npy('<U{}'.format(width), len(names), data))
+
+    def __len__(self):
+        return len(self.pk)
+
+    def __str__(self):
+        return 'FactColumns({} facts, {} activities, {} categories)'.format(
+            len(self), len(self.activities), len(self.categories))
@@ -0,0 +1,243 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+In-memory index for autocompleting activities, categories and tags.
+
+Each namespace keeps its entries in a list sorted by their lowercased text. The
+entries starting with a prefix are found using ``bisect`` and ranked by a score,
+the number of recent facts using them. Short prefixes match a large part of all
+entries, those are served by walking a second list sorted by score instead. No
+database query is involved, so a completion takes microseconds::
+
+    store.completion.complete('activities', 'cod')
+    [Suggestion(text='coding@work', pk=3, score=42), ...]
+
+Activities are indexed as ``'<activity>@<category>'`` (just like raw facts
+write them), so typing the activity name matches regardless of its category.
+
+Backends fill the index lazily on first use through a ``load`` callable and keep
+it up to date while their managers write.
+
+Note:
+    The index is only kept accurate for changes made through our managers. If the
+    database is modified by other means, call ``CompletionIndex.clear``.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import heapq
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import islice
+
+from future.utils import python_2_unicode_compatible
+from six import unichr
+
+# Facts started within this many days count towards scores when the index is loaded.
+RECENT_DAYS = 90
+
+# Number of suggestions ``CompletionIndex.complete`` returns unless told otherwise.
+DEFAULT_LIMIT = 10
+
+Suggestion = namedtuple('Suggestion', ('text', 'pk', 'score'))
+
+# An entry handed to the index by a ``load`` callable.
+Entry = namedtuple('Entry', ('namespace', 'pk', 'text', 'score'))
+
+
+def get_activity_text(name, category_name):
+    """Return the text an activity is indexed by, ``'<name>@<category name>'``."""
+    if category_name is None:
+        return name
+    return '{}@{}'.format(name, category_name)
+
+
+@python_2_unicode_compatible
+class CompletionIndex(object):
+    """
+    Thread safe index of activity, category and tag texts, ranked by usage.
+
+    Entries are identified by their namespace and PK.
+    """
+
+    NAMESPACES = ('activities', 'categories', 'tags')
+
+    def __init__(self, load):
+        """
+        Initiate a new, not yet loaded index.
+
+        Args:
+            load (callable): Returns an iterable of ``Entry`` tuples holding all
+                entries. Called on first use and after ``clear``.
+        """
+        self._load = load
+        self._lock = threading.RLock()
+        self.loaded = False
+        self._reset()
+
+    def _reset(self):
+        # Sorted ``(folded text, pk)`` keys, sorted ``(-score, folded text, pk)`` ranks
+        # and ``pk: [text, folded text, score]``.
+        self._keys = dict((namespace, []) for namespace in self.NAMESPACES)
+        self._ranks = dict((namespace, []) for namespace in self.NAMESPACES)
+        self._entries = dict((namespace, {}) for namespace in self.NAMESPACES)
+
+    def _ensure_loaded(self):
+        if self.loaded:
+            return
+        self._reset()
+        for entry in self._load():
+            folded = entry.text.lower()
+            self._keys[entry.namespace].append((folded, entry.pk))
+            self._ranks[entry.namespace].append((-entry.score, folded, entry.pk))
+            self._entries[entry.namespace][entry.pk] = [entry.text, folded, entry.score]
+        for namespace in self.NAMESPACES:
+            self._keys[namespace].sort()
+            self._ranks[namespace].sort()
+        self.loaded = True
+
+    def _insert(self, namespace, pk, text, score):
+        folded = text.lower()
+        for items, item in ((self._keys[namespace], (folded, pk)),
+                            (self._ranks[namespace], (-score, folded, pk))):
+            items.insert(bisect_left(items, item), item)
+        self._entries[namespace][pk] = [text, folded, score]
+
+    def _delete(self, namespace, pk):
+        entry = self._entries[namespace].pop(pk, None)
+        if entry is None:
+            return None
+        text, folded, score = entry
+        for items, item in ((self._keys[namespace], (folded, pk)),
+                            (self._ranks[namespace], (-score, folded, pk))):
+            del items[bisect_left(items, item)]
+        return entry
+
+    def complete(self, namespace, prefix, limit=DEFAULT_LIMIT):
+        """
+        Return the entries starting with a prefix, most used first.
+
+        Args:
+            namespace (text_type): One of ``NAMESPACES``.
+            prefix (text_type): Start of the texts to match, not case sensitive.
+            limit (int, optional): Maximum number of suggestions. Defaults to
+                ``DEFAULT_LIMIT``.
+
+        Returns:
+            list: List of ``Suggestion`` namedtuples, ordered by descending score and
+                text.
+        """
+        prefix = prefix.lower()
+        with self._lock:
+            self._ensure_loaded()
+            keys, entries = self._keys[namespace], self._entries[namespace]
+            start = bisect_left(keys, (prefix,))
+            end = len(keys)
+            if prefix:
+                # The first text past all starting with ``prefix``.
+                end = bisect_left(keys, (prefix[:-1] + unichr(ord(prefix[-1]) + 1),), start)
+            if (end - start) ** 2 > limit * len(keys):
+                # Matches are plenty, so the best ones show up early in ``_ranks``.
+                ranked = islice((pk for score, folded, pk in self._ranks[namespace]
+                    if folded.startswith(prefix)), limit)
+            else:
+                ranked = heapq.nsmallest(limit, (pk for folded, pk in keys[start:end]),
+                    key=lambda pk: (-entries[pk][2], entries[pk][1], pk))
+            return [Suggestion(entries[pk][0], pk, entries[pk][2]) for pk in ranked]
+
+    def put(self, namespace, pk, text):
+        """
+        Add an entry or change its text, keeping its score.
+
+        Does nothing unless the index has been loaded already.
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            entry = self._delete(namespace, pk)
+            self._insert(namespace, pk, text, entry[2] if entry else 0)
+
+    def remove(self, namespace, pk):
+        """Discard an entry, if present."""
+        with self._lock:
+            if self.loaded:
+                self._delete(namespace, pk)
+
+    def add_usage(self, namespace, pk, count=1):
+        """
+        Change the score of an entry, e.g. as a fact using it is saved or removed.
+
+        Args:
+            namespace (text_type): One of ``NAMESPACES``.
+            pk: PK of the entry. Unknown entries are ignored.
+            count (int, optional): Number of uses to add, may be negative. Defaults
+                to ``1``.
+        """
+        with self._lock:
+            if self.loaded and pk in self._entries[namespace]:
+                text, folded, score = self._delete(namespace, pk)
+                self._insert(namespace, pk, text, max(score + count, 0))
+
+    def put_activity(self, activity):
+        """
+        Add or update a ``hamster_lib.Activity`` along with its category.
+
+        Deleted activities are removed instead.
+        """
+        category_name = None
+        with self._lock:
+            if activity.category:
+                category_name = activity.category.name
+                self.put('categories', activity.category.pk, category_name)
+            if activity.deleted:
+                self.remove('activities', activity.pk)
+            else:
+                self.put('activities', activity.pk,
+                    get_activity_text(activity.name, category_name))
+
+    def add_fact_usage(self, fact, count=1):
+        """
+        Change the scores of the activity, category and tags of a ``hamster_lib.Fact``.
+
+        Facts started more than ``RECENT_DAYS`` ago do not count.
+        """
+        if fact.start < datetime.datetime.now() - datetime.timedelta(days=RECENT_DAYS):
+            return
+        with self._lock:
+            self.add_usage('activities', fact.activity.pk, count)
+            if fact.category:
+                self.add_usage('categories', fact.category.pk, count)
+            for tag in fact.tags:
+                self.add_usage('tags', tag.pk, count)
+
+    def clear(self):
+        """Discard all entries, they are loaded again on next use."""
+        with self._lock:
+            self.loaded = False
+            self._reset()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def __str__(self):
+        return 'CompletionIndex({} entries, loaded={})'.format(len(self), self.loaded)
@@ -47,6 +47,18 @@ Note:
         store/engine choice.
         db_password: ``string`` indicating the password to access the db server. Depends on
         store/engine choice.
+        daily_totals: ``bool`` indicating whether the store maintains pre-aggregated daily
+        totals for fast reporting. Only available with SQLite. Defaults to ``False``.
+        db_pool_size: ``int`` specifying how many db connections are kept open. Depends on
+        store/engine choice. Defaults to ``None``, meaning the engines default.
+        db_max_overflow: ``int`` specifying how many db connections may be opened on top of
+        ``db_pool_size``. Depends on store/engine choice. Defaults to ``None``, meaning the
+        engines default.
+        sqlite_journal_mode, sqlite_synchronous, sqlite_temp_store: ``string`` values of the
+        SQLite pragmas of the same name, applied to each new connection. Only relevant for
+        ``db_engine='sqlite'``. ``None`` keeps SQLite's default.
+        sqlite_mmap_size, sqlite_cache_size, sqlite_busy_timeout: ``int`` values of the SQLite
+        pragmas of the same name, see above.
 
     Please also note that a backend *config dict* does except ``None`` / ``empty`` values, its
     ``ConfigParser`` representation does not include those however!
@@ -137,6 +149,10 @@ DEFAULT_APP_NAME = 'projecthamster'
 DEFAULT_APPDIRS = HamsterAppDirs(DEFAULT_APP_NAME)
 DEFAULT_CONFIG_FILENAME = '{}.conf'.format(DEFAULT_APPDIRS.appname)
 
+# Optional backend config keys tuning SQLite, by value type.
+SQLITE_TEXT_OPTIONS = ('sqlite_journal_mode', 'sqlite_synchronous', 'sqlite_temp_store')
+SQLITE_INT_OPTIONS = ('sqlite_mmap_size', 'sqlite_cache_size', 'sqlite_busy_timeout')
+
 
 def get_config_path(appdirs=DEFAULT_APPDIRS, file_name=DEFAULT_CONFIG_FILENAME):
     """
@@ -231,6 +247,16 @@ def get_default_backend_config(appdirs):
         'tmpfile_path': os.path.join(appdirs.user_data_dir, '{}.tmp'.format(appdirs.appname)),
         'db_engine': 'sqlite',
         'db_path': os.path.join(appdirs.user_data_dir, '{}.sqlite'.format(appdirs.appname)),
+        'daily_totals': False,
+        # Write ahead logging lets readers and a writer work concurrently and only
+        # syncs at checkpoints, so commits get considerably cheaper.
+        'sqlite_journal_mode': 'WAL',
+        'sqlite_synchronous': 'NORMAL',
+        'sqlite_mmap_size': 256 * 1024 * 1024,
+        # Negative values are KiB instead of pages.
+        'sqlite_cache_size': -16000,
+        'sqlite_temp_store': 'MEMORY',
+        'sqlite_busy_timeout': 5000,
     }
 
 
@@ -285,6 +311,21 @@ def backend_config_to_configparser(config):
     def get_db_password():
         return text_type(config.get('db_password'))
 
+    def get_daily_totals():
+        return text_type(bool(config.get('daily_totals')))
+
+    def get_db_pool_size():
+        return get_optional('db_pool_size')
+
+    def get_db_max_overflow():
+        return get_optional('db_max_overflow')
+
+    def get_optional(key):
+        value = config.get(key)
+        if value is None:
+            return ''
+        return text_type(value)
+
     cp_instance = ConfigParser()
     cp_instance.add_section('Backend')
     cp_instance.set('Backend', 'store', get_store())
@@ -298,6 +339,13 @@ def backend_config_to_configparser(config):
     cp_instance.set('Backend', 'db_name', get_db_name())
     cp_instance.set('Backend', 'db_user', get_db_user())
     cp_instance.set('Backend', 'db_password', get_db_password())
+    cp_instance.set('Backend', 'daily_totals', get_daily_totals())
+    cp_instance.set('Backend', 'db_pool_size', get_db_pool_size())
+    cp_instance.set('Backend', 'db_max_overflow', get_db_max_overflow())
+    for key in SQLITE_TEXT_OPTIONS:
+        cp_instance.set('Backend', key, get_optional(key))
+    for key in SQLITE_INT_OPTIONS:
+        cp_instance.set('Backend', key, get_optional(key))
 
     return cp_instance
 
@@ -365,6 +413,29 @@ def configparser_to_backend_config(cp_instance):
     def get_db_password():
         return text_type(cp_instance.get('Backend', 'db_password'))
 
+    def get_daily_totals():
+        # Config files written by earlier versions do not have this option.
+        return cp_instance.getboolean('Backend', 'daily_totals', fallback=False)
+
+    def get_db_pool_size():
+        return get_optional_int('db_pool_size')
+
+    def get_db_max_overflow():
+        return get_optional_int('db_max_overflow')
+
+    def get_optional(key):
+        # Empty or missing values select the engines default.
+        value = cp_instance.get('Backend', key, fallback='')
+        if not value:
+            return None
+        return text_type(value)
+
+    def get_optional_int(key):
+        value = get_optional(key)
+        if value is None:
+            return None
+        return int(value)
+
     result = {
         'store': get_store(),
         'day_start': get_day_start(),
@@ -377,5 +448,10 @@ def configparser_to_backend_config(cp_instance):
         'db_name': get_db_name(),
         'db_user': get_db_user(),
         'db_password': get_db_password(),
+        'daily_totals': get_daily_totals(),
+        'db_pool_size': get_db_pool_size(),
+        'db_max_overflow': get_db_max_overflow(),
     }
+    result.update((key, get_optional(key)) for key in SQLITE_TEXT_OPTIONS)
+    result.update((key, get_optional_int(key)) for key in SQLITE_INT_OPTIONS)
     return result
@@ -23,17 +23,105 @@ This module provides several convenience and intermediate functions to perform c
 """
 
 
+import datetime
+import json
+import os
 import pickle
+import re
+import tempfile
+from contextlib import contextmanager
 
 from hamster_lib.helpers import time as time_helpers
 
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows. Writes are still atomic, just not serialized.
+    fcntl = None
+
+try:
+    from functools import lru_cache
+except ImportError:
+    # Python 2. Raw facts are parsed each time.
+    lru_cache = None
+
+# Version of the 'ongoing fact' file format written by ``_dump_tmp_fact``.
+TMP_FACT_VERSION = 1
+
+TMP_FACT_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# Number of distinct raw facts whose parsing results ``parse_raw_fact`` keeps.
+RAW_FACT_CACHE_SIZE = 4096
+
+# Grammar of a raw fact, see ``parse_raw_fact``. Each component is matched by its
+# own group in a single pass, there is no splitting and stripping of substrings.
+# Surrounding whitespace is left out by having each group start and end with a
+# non whitespace character.
+RAW_FACT_REGEX = re.compile(''.join((
+    # Any time information starts with a digit or ``-``.
+    r'(?:(?=[-\d]){} (?=.))?'.format(time_helpers.TIMEFRAME_PATTERN),
+    r'\s*(?P<activity>(?:[^@]*[^@\s])?)\s*',
+    # Categories are matched word by word, as few as possible, so trailing words
+    # starting with ``#`` end up as tags.
+    r'(?:@\s*(?P<category>(?:[^\s,]+(?:\s+[^\s,]+)*?)??)',
+    r'(?P<tags>(?:\s*(?<![^\s@])#[^\s,]+)*)\s*',
+    r'(?:,\s*(?P<description>(?:.*\S)?))?)?',
+    r'\s*\Z',
+)), re.DOTALL)
+
 
 # Non public helpers
 # These should be of very little use for any client module.
+def _tmp_fact_to_dict(fact):
+    """Return a JSON serializable representation of an 'ongoing fact'."""
+    def category_to_dict(category):
+        if not category:
+            return None
+        return {'pk': category.pk, 'name': category.name}
+
+    activity = fact.activity
+    return {
+        'version': TMP_FACT_VERSION,
+        'pk': fact.pk,
+        'activity': {
+            'pk': activity.pk,
+            'name': activity.name,
+            'category': category_to_dict(activity.category),
+            'deleted': activity.deleted,
+        },
+        'start': fact.start.strftime(TMP_FACT_DATETIME_FORMAT) if fact.start else None,
+        'description': fact.description,
+        'tags': [{'pk': tag.pk, 'name': tag.name} for tag in fact.tags],
+    }
+
+
+def _tmp_fact_from_dict(data):
+    """Return the ``Fact`` represented by a dictionary created by ``_tmp_fact_to_dict``."""
+    from hamster_lib import Activity, Category, Fact, Tag
+
+    if data.get('version') != TMP_FACT_VERSION:
+        raise TypeError(_(
+            "Unsupported 'ongoing fact' file version: {}.".format(data.get('version'))
+        ))
+    category = data['activity']['category']
+    if category:
+        category = Category(category['name'], pk=category['pk'])
+    activity = Activity(data['activity']['name'], pk=data['activity']['pk'],
+        category=category, deleted=data['activity']['deleted'])
+    start = data['start']
+    if start:
+        start = datetime.datetime.strptime(start, TMP_FACT_DATETIME_FORMAT)
+    tags = [Tag(tag['name'], pk=tag['pk']) for tag in data['tags']]
+    return Fact(activity, start, pk=data['pk'], description=data['description'], tags=tags)
+
+
 def _load_tmp_fact(filepath):
     """
     Load an 'ongoing fact' from a given location.
 
+    Files written by ``_dump_tmp_fact`` are plain JSON. Pickled files written by
+    previous versions are still understood.
+
     Args:
         filepath: Full path to the tmpfile location.
 
@@ -43,105 +131,159 @@ def _load_tmp_fact(filepath):
 
     Raises:
         TypeError: If for some reason our stored instance is no instance of
-            ``hamster_lib.Fact``.
+            ``hamster_lib.Fact`` or the file format version is unknown.
     """
     from hamster_lib import Fact
 
     try:
         with open(filepath, 'rb') as fobj:
-            fact = pickle.load(fobj)
+            content = fobj.read()
     except IOError:
-        fact = False
-    else:
-        if not isinstance(fact, Fact):
-            raise TypeError(_(
-                "Something went wrong. It seems our pickled file does not contain"
-                " valid Fact instance. [Content: '{content}'; Type: {type}".format(
-                    content=fact, type=type(fact))
-            ))
+        return False
+
+    if content.startswith(b'{'):
+        return _tmp_fact_from_dict(json.loads(content.decode('utf-8')))
+
+    fact = pickle.loads(content)
+    if not isinstance(fact, Fact):
+        raise TypeError(_(
+            "Something went wrong. It seems our pickled file does not contain"
+            " valid Fact instance. [Content: '{content}'; Type: {type}".format(
+                content=fact, type=type(fact))
+        ))
     return fact
 
 
+def _dump_tmp_fact(filepath, fact):
+    """
+    Atomically store an 'ongoing fact' at a given location.
+
+    The fact is written to a temporary file next to ``filepath`` which then replaces
+    ``filepath``. Readers will therefore either see the old or the new fact, but never
+    a partially written file.
+
+    Args:
+        filepath: Full path to the tmpfile location.
+        fact (hamster_lib.Fact): Fact to be stored.
+    """
+    content = json.dumps(_tmp_fact_to_dict(fact), sort_keys=True).encode('utf-8')
+    directory, filename = os.path.split(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix='.{}.'.format(filename), dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fobj:
+            fobj.write(content)
+            fobj.flush()
+            os.fsync(fobj.fileno())
+        # ``os.replace`` is not available on python 2, ``os.rename`` is atomic on
+        # POSIX systems as well.
+        getattr(os, 'replace', os.rename)(tmp_path, filepath)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def _lock_tmp_fact(filepath):
+    """
+    Context manager holding an exclusive lock on the 'ongoing fact' at ``filepath``.
+
+    The lock is taken on a separate ``<filepath>.lock`` file, as ``filepath`` itself
+    gets replaced on each write. ``_remove_tmp_fact`` removes that file again, so
+    once locked we make sure the file we hold is still the one at that path.
+    Locks are not reentrant. Without ``fcntl`` (Windows) no lock is taken at all.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    lock_path = '{}.lock'.format(filepath)
+    while True:
+        fobj = open(lock_path, 'a')
+        fcntl.flock(fobj.fileno(), fcntl.LOCK_EX)
+        try:
+            current = os.stat(lock_path)
+        except OSError:
+            current = None
+        if current and current.st_ino == os.fstat(fobj.fileno()).st_ino:
+            break
+        # Removed by whoever held the lock before us, lock the new file instead.
+        fobj.close()
+
+    with fobj:
+        try:
+            yield
+        finally:
+            fcntl.flock(fobj.fileno(), fcntl.LOCK_UN)
+
+
+def _remove_tmp_fact(filepath):
+    """
+    Remove the 'ongoing fact' at ``filepath`` along with its lock file.
+
+    Must be called while holding ``_lock_tmp_fact(filepath)``.
+
+    Args:
+        filepath: Full path to the tmpfile location.
+    """
+    os.remove(filepath)
+    try:
+        os.remove('{}.lock'.format(filepath))
+    except OSError:
+        pass
+
+
 def parse_raw_fact(raw_fact):
     """
     Extract semantically meaningful sub-components from a ``raw fact`` text.
 
+    A raw fact reads ``[timeinfo ]activity[@category[ #tag ...][, description]]``.
+
+    * ``timeinfo`` is anything ``TIMEFRAME_PATTERN`` accepts. It needs to be
+      followed by a single space.
+    * ``activity`` is everything in front of the leftmost ``@``.
+    * ``category`` ends at the leftmost ``,``, so it can not contain any. It may be
+      followed by whitespace delimited ``#tags``.
+    * ``description`` is everything after that ``,``. It may contain ``@`` and
+      ``,`` as wished.
+
+    Without ``@`` everything but the time information is considered the activity.
+    All components are trimmed of leading and trailing whitespace.
+
+    Parsing only depends on the text itself, so results for the most recently
+    parsed ``RAW_FACT_CACHE_SIZE`` distinct texts are cached (python 3 only).
+
     Args:
         raw_fact (text_type): ``raw fact`` text to be parsed.
 
     Returns:
-        dict: dict with sub-components as values.
+        dict: dict with sub-components as values. ``category`` is ``None`` if empty,
+            ``description`` is ``None`` without ``,``. ``tags`` is a list of tag names.
+
+    Raises:
+        ValueError: If the time information is out of range.
     """
-    def at_split(string):
-        """
-        Return everything in front of the (leftmost) '@'-symbol, if it was used.
-
-        Args:
-            string (str):  The string to be parsed.
-
-        Returns:
-            tuple: (front, back) representing the substrings before and after the
-                most left ``@`` symbol. If no such symbol was present at all,
-                ``back=None``. Both substrings have been trimmed of any leading
-                and trailing whitespace.
-
-        Note:
-            If our string contains multiple ``@`` symbols, all but the most left
-            one will be treated as part of the regular ``back`` string.
-            This allows for usage of the symbol in descriptions, categories and tags.
-
-            Also note that *no tags are extracted* any tags included will be considered
-            part of the ``category`` string. We are likely to remove this parsing function
-            in ``0.14.0`` in favour of a regex based solution so we will not spend
-            time on tags for now
-        """
-        result = string.split('@', 1)
-        length = len(result)
-        if length == 1:
-            front, back = result[0].strip(), None
-        else:
-            front, back = result
-            front, back = front.strip(), back.strip()
-        return (front, back)
-
-    def comma_split(string):
-        """
-        Split string at the most left comma.
-
-        Args:
-            string (str): String to be processed. At this stage this should
-                look something like ``<Category> and <tags>, <Description>
-
-
-        Returns
-            tuple: (category_and_tags, description). Both substrings have their
-                leading/trailing whitespace removed.
-                ``category_and_tags`` may include >=0 tags indicated by a leading ``#``.
-                As we have used the most left ``,`` to separate both substrings that
-                means that categories and tags can not contain any ``,`` but the
-                description text may contain as many as wished.
-        """
-
-        result = string.split(',', 1)
-        length = len(result)
-        if length == 1:
-            category, description = result[0].strip(), None
-        else:
-            category, description = tuple(result)
-            category, description = category.strip(), description.strip()
-        return (category.strip(), description)
-
-    time_info, rest = time_helpers.extract_time_info(raw_fact)
-    activity_name, back = at_split(rest)
-
-    if back:
-        category_name, description = comma_split(back)
-    else:
-        category_name, description = None, None
+    # All values are immutable or copied, so our cached dict stays intact.
+    result = dict(_cached_parse_raw_fact(raw_fact))
+    result['tags'] = list(result['tags'])
+    return result
 
+
+def _parse_raw_fact(raw_fact):
+    """Uncached implementation of ``parse_raw_fact``."""
+    match = RAW_FACT_REGEX.match(raw_fact)
+    activity, category, tags, description = match.group(
+        'activity', 'category', 'tags', 'description')
     return {
-        'timeinfo': time_info,
-        'category': category_name,
-        'activity': activity_name,
+        'timeinfo': time_helpers.get_timeframe(match),
+        'activity': activity,
+        'category': category or None,
+        # Tags are whitespace delimited and each one starts with ``#``.
+        'tags': tuple(tag[1:] for tag in tags.split()) if tags else (),
         'description': description,
     }
+
+
+if lru_cache:
+    _cached_parse_raw_fact = lru_cache(maxsize=RAW_FACT_CACHE_SIZE)(_parse_raw_fact)
+else:
+    _cached_parse_raw_fact = _parse_raw_fact
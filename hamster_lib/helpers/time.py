@@ -29,6 +29,34 @@ from collections import namedtuple
 TimeFrame = namedtuple('Timeframe', ('start_date', 'start_time',
     'end_date', 'end_time', 'offset'))
 
+# Individual patterns for time/date substrings.
+RELATIVE_PATTERN = r'(?P<relative>-\d+)'
+TIME_PATTERN = r'\d{2}:\d{2}(?::\d{2})?'
+DATE_PATTERN = r'\d{4}-\d{2}-\d{2}'
+
+
+def _get_point_pattern(prefix):
+    """
+    Return a pattern matching a date, a time or a date followed by a time.
+
+    Groups are named ``<prefix>date`` and ``<prefix>time`` for dates with an optional
+    time and ``<prefix>clock`` for a time on its own. Having dates and times share
+    their prefix keeps backtracking to a minimum.
+    """
+    return (r'(?:(?P<{prefix}date>{date})(?: (?P<{prefix}time>{time}))?'
+        r'|(?P<{prefix}clock>{time}))').format(prefix=prefix, date=DATE_PATTERN, time=TIME_PATTERN)
+
+
+# Either a relative time or a start, optionally followed by `` - `` and an end.
+# Meant to be embedded in larger patterns, see ``get_timeframe``.
+TIMEFRAME_PATTERN = r'(?:{}|{}(?: - {})?)'.format(RELATIVE_PATTERN, _get_point_pattern(''),
+    _get_point_pattern('end_'))
+
+# Groups ``get_timeframe`` extracts its values from.
+TIMEFRAME_GROUPS = ('relative', 'date', 'time', 'clock', 'end_date', 'end_time', 'end_clock')
+
+TIMEFRAME_REGEX = re.compile(r'^{} (?P<rest>.+)'.format(TIMEFRAME_PATTERN))
+
 
 def get_day_end(config):
     """
@@ -82,6 +110,50 @@ def end_day_to_datetime(end_day, config):
     return end
 
 
+def get_workday(moment, config):
+    """
+    Return the workday a given point in time belongs to.
+
+    Args:
+        moment (datetime.datetime): Point in time.
+        config: Controller config containing information on when a workday starts.
+
+    Returns:
+        datetime.date: The workday ``moment`` belongs to.
+
+    Example:
+        Given a ``day_start`` of ``5:30``, ``2015-04-02 03:00`` belongs to the
+        ``2015-04-01`` workday.
+    """
+    if moment.time() < config['day_start']:
+        return moment.date() - datetime.timedelta(days=1)
+    return moment.date()
+
+
+def split_by_workday(start, end, config):
+    """
+    Split a timeframe into the parts falling onto each workday.
+
+    Args:
+        start (datetime.datetime): Start of the timeframe.
+        end (datetime.datetime): End of the timeframe.
+        config: Controller config containing information on when a workday starts.
+
+    Returns:
+        list: List of ``(workday, duration)`` tuples, ``workday`` being a ``datetime.date``
+            and ``duration`` a ``datetime.timedelta``. Ordered by workday.
+    """
+    result = []
+    workday = get_workday(start, config)
+    while start < end:
+        next_workday_start = end_day_to_datetime(workday, config) + datetime.timedelta(seconds=1)
+        part_end = min(end, next_workday_start)
+        result.append((workday, part_end - start))
+        start = part_end
+        workday += datetime.timedelta(days=1)
+    return result
+
+
 def extract_time_info(text):
     """
     Extract valid time(-range) information from a string according to our specs.
@@ -107,83 +179,55 @@ def extract_time_info(text):
 
     # [TODO] Add a list of supported formats.
 
-    def get_time(time, seconds=None):
-        """Convert a times string representation to datetime.time instance."""
-        if time is None:
-            return time
+    match = TIMEFRAME_REGEX.match(text)
+    if not match:
+        # Consider the whole string as 'rest' if no time/date info was extracted
+        return (TimeFrame(None, None, None, None, None), text.strip())
+    return (get_timeframe(match), match.group('rest').strip())
 
-        if seconds:
-            time_format = '%H:%M:%S'
-        else:
-            time_format = '%H:%M'
 
-        return datetime.datetime.strptime(time.strip(), time_format).time()
+# Our patterns only match fixed width, zero padded values. Slicing them is
+# considerably faster than ``strptime``. Out of range values still raise
+# ``ValueError``.
+def _get_time(time):
+    """Convert a times string representation to datetime.time instance."""
+    if time is None:
+        return time
 
-    def get_date(date):
-        """Convert a dates string representation to datetime.date instance."""
-        if date:
-            date = datetime.datetime.strptime(date.strip(), "%Y-%m-%d").date()
-        return date
+    seconds = int(time[6:8]) if len(time) > 5 else 0
+    return datetime.time(int(time[0:2]), int(time[3:5]), seconds)
 
-    def date_time_from_groupdict(groupdict):
-        """Return a date/time tuple by introspecting a passed dict."""
-        if groupdict['datetime']:
-            dt = parse_time(groupdict['datetime'])
-            time = dt.time()
-            date = dt.date()
-        else:
-            date = get_date(groupdict.get('date'))
-            time = get_time(groupdict.get('time'), groupdict.get('seconds'))
-        return (date, time)
-
-    # Baseline/default values.
-    result = {
-        'start_date': None,
-        'start_time': None,
-        'end_date': None,
-        'end_time': None,
-        'offset': None
-    }
-    rest = None
-
-    # Individual patterns for time/date  substrings.
-    relative_pattern = '(?P<relative>-\d+)'
-    time_pattern = '(?P<time>\d{2}:\d{2}(?P<seconds>:\d{2})?)'
-    date_pattern = '(?P<date>\d{4}-\d{2}-\d{2})'
-    datetime_pattern = '(?P<datetime>\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?)'
-
-    start = re.match('^({}|{}|{}|{}) (?P<rest>.+)'.format(relative_pattern, datetime_pattern,
-        date_pattern, time_pattern), text)
-    if start:
-        start_groups = start.groupdict()
-        if start_groups['relative']:
-            result['offset'] = datetime.timedelta(minutes=abs(int(start_groups['relative'])))
-        else:
-            date, time = date_time_from_groupdict(start_groups)
-            result['start_date'] = date
-            result['start_time'] = time
-        rest = start_groups['rest']
-
-        if rest:
-            end = re.match('^- ({}|{}|{}) (?P<rest>.+)'.format(datetime_pattern, date_pattern,
-                time_pattern), rest)
-        else:
-            end = None
-
-        if end and not start_groups['relative']:
-            end_groups = end.groupdict()
-            date, time = date_time_from_groupdict(end_groups)
-            result['end_date'] = date
-            result['end_time'] = time
-            rest = end_groups['rest']
-
-    result = TimeFrame(result['start_date'], result['start_time'], result['end_date'],
-        result['end_time'], result['offset'])
-
-    # Consider the whole string as 'rest' if no time/date info was extracted
-    if not rest:
-        rest = text
-    return (result, rest.strip())
+
+def _get_date(date):
+    """Convert a dates string representation to datetime.date instance."""
+    if date:
+        date = datetime.date(int(date[0:4]), int(date[5:7]), int(date[8:10]))
+    return date
+
+
+def get_timeframe(match):
+    """
+    Return the ``TimeFrame`` described by a match of ``TIMEFRAME_PATTERN``.
+
+    Args:
+        match: Match object of a pattern embedding ``TIMEFRAME_PATTERN``. All its
+            groups are ``None`` if the time information is optional and missing.
+
+    Returns:
+        TimeFrame: Extracted time information. Relative times always return just
+            ``(None, None, None, None, timedelta)``.
+
+    Raises:
+        ValueError: If the matched values are out of range, e.g. ``25:00``.
+    """
+    (relative, start_date, start_time, start_clock, end_date, end_time,
+        end_clock) = match.group(*TIMEFRAME_GROUPS)
+    if relative:
+        offset = datetime.timedelta(minutes=abs(int(relative)))
+        return TimeFrame(None, None, None, None, offset)
+
+    return TimeFrame(_get_date(start_date), _get_time(start_time or start_clock),
+        _get_date(end_date), _get_time(end_time or end_clock), None)
 
 
 def complete_timeframe(timeframe, config, partial=False):
@@ -0,0 +1,221 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-lib'.
+#
+# 'hamster-lib' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-lib' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-lib'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Bulk computations over many fact timeframes at once.
+
+All functions take sequences of ``start`` and ``end`` values as seconds since
+1970-01-01, such as the columns of ``hamster_lib.columns.FactColumns`` or the
+result of ``get_ranges``. Facts are expected to end after they start. Just like
+``FactManager._timeframe_available_for_fact``, facts that merely touch each other
+do not overlap.
+
+If NumPy is installed, computations are vectorized and NumPy arrays are returned.
+Otherwise equivalent pure python implementations return ``array.array`` instances
+and lists.
+"""
+
+
+from __future__ import absolute_import, unicode_literals
+
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from hamster_lib.columns import FLOAT64, INT64, epoch_seconds
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SECONDS_PER_DAY = 86400
+
+# Parts of facts split by ``split_by_workday``. ``index`` refers to the fact a part
+# belongs to, ``day`` is its workday as days since 1970-01-01.
+WorkdayParts = namedtuple('WorkdayParts', ('index', 'day', 'start', 'end'))
+
+
+def get_ranges(facts):
+    """
+    Return the timeframes of facts as epoch seconds.
+
+    Args:
+        facts (Iterable): ``hamster_lib.Fact`` instances with ``start`` and ``end``.
+
+    Returns:
+        tuple: ``(starts, ends)`` tuple of ``array.array`` instances.
+    """
+    starts, ends = array(INT64), array(INT64)
+    for fact in facts:
+        starts.append(epoch_seconds(fact.start))
+        ends.append(epoch_seconds(fact.end))
+    return starts, ends
+
+
+def _as_arrays(*sequences):
+    return [numpy.asarray(sequence, dtype=numpy.int64) for sequence in sequences]
+
+
+def durations(starts, ends):
+    """
+    Return the duration of each fact.
+
+    Returns:
+        numpy.ndarray or array.array: Durations in seconds, as floats.
+    """
+    if numpy is not None:
+        starts, ends = _as_arrays(starts, ends)
+        return (ends - starts).astype(numpy.float64)
+    return array(FLOAT64, [float(end - start) for start, end in zip(starts, ends)])
+
+
+def overlapping(starts, ends):
+    """
+    Tell which facts overlap with any other fact of the same sequence.
+
+    Facts are sorted by ``start`` and swept once. A fact overlaps an earlier one if
+    it starts before the latest end seen so far, and a later one if the next fact
+    starts before it ends.
+
+    Returns:
+        numpy.ndarray or list: Boolean for each fact, ``True`` if it overlaps.
+    """
+    if numpy is not None:
+        starts, ends = _as_arrays(starts, ends)
+        order = numpy.argsort(starts, kind='mergesort')
+        starts, ends = starts[order], ends[order]
+        result = numpy.zeros(len(starts), dtype=bool)
+        if len(starts) > 1:
+            result[1:] = starts[1:] < numpy.maximum.accumulate(ends)[:-1]
+            result[:-1] |= starts[1:] < ends[:-1]
+        unsorted = numpy.empty_like(result)
+        unsorted[order] = result
+        return unsorted
+
+    order = sorted(range(len(starts)), key=lambda index: starts[index])
+    result = [False] * len(order)
+    latest_end = None
+    for position, index in enumerate(order):
+        if latest_end is not None and starts[index] < latest_end:
+            result[index] = True
+        if position + 1 < len(order) and starts[order[position + 1]] < ends[index]:
+            result[index] = True
+        latest_end = ends[index] if latest_end is None else max(latest_end, ends[index])
+    return result
+
+
+def overlapping_with(starts, ends, other_starts, other_ends):
+    """
+    Tell which facts overlap with any fact of another sequence, e.g. stored facts.
+
+    Args:
+        starts, ends: Timeframes of the facts to check.
+        other_starts, other_ends: Timeframes of the facts to check against.
+
+    Returns:
+        numpy.ndarray or list: Boolean for each fact, ``True`` if it overlaps.
+    """
+    if numpy is not None:
+        starts, ends, other_starts, other_ends = _as_arrays(starts, ends, other_starts,
+            other_ends)
+        order = numpy.argsort(other_starts, kind='mergesort')
+        other_starts = other_starts[order]
+        latest_ends = numpy.maximum.accumulate(other_ends[order])
+        # Number of other facts starting before each fact ends.
+        counts = numpy.searchsorted(other_starts, ends, side='left')
+        result = counts > 0
+        result[result] = latest_ends[counts[result] - 1] > starts[result]
+        return result
+
+    order = sorted(range(len(other_starts)), key=lambda index: other_starts[index])
+    sorted_starts = [other_starts[index] for index in order]
+    latest_ends = []
+    for index in order:
+        latest_ends.append(max(latest_ends[-1], other_ends[index]) if latest_ends else
+            other_ends[index])
+    result = []
+    for start, end in zip(starts, ends):
+        count = bisect_left(sorted_starts, end)
+        result.append(count > 0 and latest_ends[count - 1] > start)
+    return result
+
+
+def find_overlaps(starts, ends):
+    """
+    Return all pairs of overlapping facts.
+
+    Facts are swept ordered by ``start``, keeping a heap of facts that have not
+    ended yet. This takes ``O(n log n + k)`` for ``k`` pairs.
+
+    Returns:
+        list: Sorted list of ``(index, other_index)`` tuples with ``index < other_index``.
+    """
+    order = sorted(range(len(starts)), key=lambda index: starts[index])
+    result = []
+    active = []
+    for index in order:
+        start = starts[index]
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        result.extend((min(index, other), max(index, other)) for end, other in active)
+        heapq.heappush(active, (ends[index], index))
+    return sorted(result)
+
+
+def split_by_workday(starts, ends, day_start):
+    """
+    Split facts into the parts falling onto each workday.
+
+    This is the bulk version of ``hamster_lib.helpers.time.split_by_workday``.
+
+    Args:
+        starts, ends: Timeframes of the facts.
+        day_start (datetime.time): Time a workday starts.
+
+    Returns:
+        WorkdayParts: ``(index, day, start, end)`` tuple of arrays with one entry
+            per part, ordered by ``index`` and ``day``. Parts start and end within
+            their workday. Facts not ending after they start have no parts.
+    """
+    offset = day_start.hour * 3600 + day_start.minute * 60 + day_start.second
+    if numpy is not None:
+        starts, ends = _as_arrays(starts, ends)
+        first_days = (starts - offset) // SECONDS_PER_DAY
+        last_days = (ends - offset - 1) // SECONDS_PER_DAY
+        counts = numpy.where(ends > starts, last_days - first_days + 1, 0)
+        index = numpy.repeat(numpy.arange(len(starts)), counts)
+        # Position of each part within its fact.
+        positions = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts,
+            counts)
+        days = first_days[index] + positions
+        day_starts = days * SECONDS_PER_DAY + offset
+        return WorkdayParts(index, days, numpy.maximum(starts[index], day_starts),
+            numpy.minimum(ends[index], day_starts + SECONDS_PER_DAY))
+
+    result = WorkdayParts(array(INT64), array(INT64), array(INT64), array(INT64))
+    for index, (start, end) in enumerate(zip(starts, ends)):
+        day = (start - offset) // SECONDS_PER_DAY
+        while start < end:
+            part_end = min(end, (day + 1) * SECONDS_PER_DAY + offset)
+            for column, value in zip(result, (index, day, start, part_end)):
+                column.append(value)
+            start = part_end
+            day += 1
+    return result
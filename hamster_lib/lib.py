@@ -74,9 +74,20 @@ class HamsterControl(object):
         self.facts = self.store.facts
 
     def update_config(self, config):
-        """Use a new config dictionary and apply its settings."""
+        """
+        Use a new config dictionary and apply its settings.
+
+        A new store is set up for it. Changed engine options, such as ``db_pool_size``
+        or the ``sqlite_*`` pragmas, give it a new engine even if the database stays
+        the same, see ``backends.sqlalchemy.engines``.
+        """
         self.config = config
-        self.store = self._get_store()
+        # Set up the new store first, so an engine both use is not disposed in between.
+        previous_store, self.store = self.store, self._get_store()
+        previous_store.cleanup()
+        self.categories = self.store.categories
+        self.activities = self.store.activities
+        self.facts = self.store.facts
 
     def _get_store(self):
         """
@@ -35,6 +35,98 @@ TagTuple = namedtuple('TagTuple', ('pk', 'name'))
 ActivityTuple = namedtuple('ActivityTuple', ('pk', 'name', 'category', 'deleted'))
 FactTuple = namedtuple('FactTuple', ('pk', 'activity', 'start', 'end', 'description', 'tags'))
 
+# Compact, read-only representation of a fact. ``activity`` and ``category`` are
+# names (``category`` may be ``None``), ``tags`` is a sorted tuple of tag names.
+# See ``Fact.as_record`` and ``BaseFactManager.get_records``.
+FactRecord = namedtuple('FactRecord', ('pk', 'start', 'end', 'activity', 'category', 'tags',
+    'description'))
+
+# Outcome of parsing a single line by ``Fact.create_many_from_raw_facts``.
+# Either ``fact`` or ``error`` is ``None``.
+RawFactResult = namedtuple('RawFactResult', ('line_number', 'fact', 'error'))
+
+
+class _Frozen(object):
+    """
+    Make a domain object immutable, with its tuple representation and hash computed once.
+
+    Concrete classes need to provide the ``_tuple`` and ``_hash`` slots, call
+    ``_freeze`` at the end of ``__init__`` and implement ``thaw``.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def _create(cls, **values):
+        """
+        Create a new instance from already validated attribute values.
+
+        This bypasses ``__init__`` and its validation, which makes freezing existing
+        instances considerably faster.
+        """
+        instance = cls.__new__(cls)
+        for name, value in values.items():
+            object.__setattr__(instance, name, value)
+        instance._freeze()
+        return instance
+
+    def _freeze(self):
+        value = super(_Frozen, self).as_tuple()
+        object.__setattr__(self, '_tuple', value)
+        object.__setattr__(self, '_hash', hash(value))
+
+    def frozen(self):
+        """Return this instance, it is frozen already."""
+        return self
+
+    def replace(self, **changes):
+        """
+        Return a new frozen instance with the given attributes changed.
+
+        Args:
+            **changes: Attribute names and their new values.
+
+        Returns:
+            A new instance of our class.
+        """
+        instance = self.thaw()
+        for name, value in changes.items():
+            setattr(instance, name, value)
+        return instance.frozen()
+
+    def as_tuple(self, include_pk=True):
+        if include_pk:
+            return self._tuple
+        return super(_Frozen, self).as_tuple(include_pk=include_pk)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, '_hash'):
+            raise AttributeError(_(
+                "{} instances are immutable, use 'replace' or 'thaw'.".format(
+                    type(self).__name__)))
+        super(_Frozen, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(_(
+            "{} instances are immutable, use 'replace' or 'thaw'.".format(
+                type(self).__name__)))
+
+    def __setstate__(self, state):
+        # ``_tuple`` and ``_hash`` are slots, which are pickled separately from our
+        # dictionary. Hashes of strings differ between processes though, so never
+        # trust a pickled one.
+        dict_state = state[0] if isinstance(state, tuple) else state
+        self.__dict__.update(dict_state or {})
+        self._freeze()
+
+    def __eq__(self, other):
+        if isinstance(other, _Frozen):
+            return self._hash == other._hash and self._tuple == other._tuple
+        return super(_Frozen, self).__eq__(other)
+
+    def __hash__(self):
+        return self._hash
+
 
 @python_2_unicode_compatible
 class Category(object):
@@ -79,6 +171,15 @@ class Category(object):
             pk = False
         return CategoryTuple(pk=pk, name=self.name)
 
+    def frozen(self):
+        """
+        Provide an immutable copy of this category, see ``FrozenCategory``.
+
+        Returns:
+            hamster_lib.objects.FrozenCategory: Copy with its hash computed once.
+        """
+        return FrozenCategory._create(pk=self.pk, _name=self._name)
+
     def equal_fields(self, other):
         """
         Compare this instances fields with another category. This excludes comparing the PK.
@@ -203,6 +304,16 @@ class Activity(object):
             category = None
         return ActivityTuple(pk=pk, name=self.name, category=category, deleted=self.deleted)
 
+    def frozen(self):
+        """
+        Provide an immutable copy of this activity, see ``FrozenActivity``.
+
+        Returns:
+            hamster_lib.objects.FrozenActivity: Copy with its hash computed once.
+        """
+        return FrozenActivity._create(pk=self.pk, _name=self._name,
+            category=_get_frozen(self.category), deleted=self.deleted)
+
     def equal_fields(self, other):
         """
         Compare this instances fields with another activity. This excludes comparing the PK.
@@ -290,6 +401,15 @@ class Tag(object):
             pk = False
         return TagTuple(pk=pk, name=self.name)
 
+    def frozen(self):
+        """
+        Provide an immutable copy of this tag, see ``FrozenTag``.
+
+        Returns:
+            hamster_lib.objects.FrozenTag: Copy with its hash computed once.
+        """
+        return FrozenTag._create(pk=self.pk, _name=self._name)
+
     def equal_fields(self, other):
         """
         Compare this instances fields with another tag. This excludes comparing the PK.
@@ -337,6 +457,7 @@ class Tag(object):
 @python_2_unicode_compatible
 class Fact(object):
     """Storage agnostic class for facts."""
+
     # [TODO]
     # There is some weird black magic still to be integrated from
     # ``store.db.Storage``. Among it ``__get_facts()``.
@@ -423,8 +544,44 @@ class Fact(object):
             activity.category = Category(category_name)
 
         description = extracted_components['description']
+        tags = [Tag(name) for name in extracted_components['tags']]
 
-        return cls(activity, start, end=end, description=description)
+        return cls(activity, start, end=end, description=description, tags=tags)
+
+    @classmethod
+    def create_many_from_raw_facts(cls, lines, config=None):
+        """
+        Parse an iterable of ``raw fact`` strings, such as the lines of a text log.
+
+        Each line is parsed just like ``create_from_raw_fact`` would. A line that can
+        not be parsed does not stop the others from being processed, its error is
+        reported instead. Blank lines are skipped.
+
+        Args:
+            lines (Iterable): ``raw fact`` strings. Surrounding whitespace, including
+                line breaks, is ignored.
+            config (dict, optional): Controller config provided additional settings
+                relevant for timeframe completion.
+
+        Yields:
+            hamster_lib.objects.RawFactResult: ``(line_number, fact, error)`` tuple for
+                each non blank line. ``line_number`` starts at ``1``. ``error`` is
+                the ``ValueError`` raised if the line could not be parsed, ``fact``
+                is ``None`` then.
+        """
+        if not config:
+            config = {'day_start': datetime.time(0, 0, 0)}
+
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                fact = cls.create_from_raw_fact(line, config)
+            except ValueError as error:
+                yield RawFactResult(line_number, None, error)
+            else:
+                yield RawFactResult(line_number, fact, None)
 
     @property
     def start(self):
@@ -643,6 +800,28 @@ class Fact(object):
             self.end, self.description,
             frozenset([tag.as_tuple(include_pk=include_pk) for tag in self.tags]))
 
+    def frozen(self):
+        """
+        Provide an immutable copy of this fact, see ``FrozenFact``.
+
+        Returns:
+            hamster_lib.objects.FrozenFact: Copy with its hash computed once.
+        """
+        return FrozenFact._create(pk=self.pk, activity=self.activity.frozen(),
+            _start=self._start, _end=self._end, _description=self._description,
+            tags=frozenset(tag.frozen() for tag in self.tags))
+
+    def as_record(self):
+        """
+        Provide a compact, read-only representation of this fact.
+
+        Returns:
+            hamster_lib.objects.FactRecord: Record holding this facts values.
+        """
+        category = self.category.name if self.category else None
+        return FactRecord(self.pk, self.start, self.end, self.activity.name, category,
+            tuple(sorted(tag.name for tag in self.tags)), self.description)
+
     def equal_fields(self, other):
         """
         Compare this instances fields with another fact. This excludes comparing the PK.
@@ -721,3 +900,81 @@ class Fact(object):
             result = '{} {}'.format(start, result)
 
         return str(result)
+
+
+def _get_frozen(instance):
+    """Return a frozen version of ``instance``, which may be ``None``."""
+    if instance is None:
+        return None
+    return instance.frozen()
+
+
+class FrozenCategory(_Frozen, Category):
+    """
+    Immutable ``Category``.
+
+    Its tuple representation and hash are computed once, which makes frozen
+    instances cheap to use in sets and as dictionary keys. Use ``replace`` to get
+    a modified copy or ``thaw`` to get a mutable one.
+    """
+
+    __slots__ = ('_tuple', '_hash')
+
+    def __init__(self, name, pk=None):
+        super(FrozenCategory, self).__init__(name, pk=pk)
+        self._freeze()
+
+    def thaw(self):
+        """Return a mutable ``Category`` copy of this instance."""
+        return Category(self.name, pk=self.pk)
+
+
+class FrozenActivity(_Frozen, Activity):
+    """Immutable ``Activity``, see ``FrozenCategory``. Its category is frozen as well."""
+
+    __slots__ = ('_tuple', '_hash')
+
+    def __init__(self, name, pk=None, category=None, deleted=False):
+        super(FrozenActivity, self).__init__(name, pk=pk, category=_get_frozen(category),
+            deleted=deleted)
+        self._freeze()
+
+    def thaw(self):
+        """Return a mutable ``Activity`` copy of this instance."""
+        category = self.category.thaw() if self.category else None
+        return Activity(self.name, pk=self.pk, category=category, deleted=self.deleted)
+
+
+class FrozenTag(_Frozen, Tag):
+    """Immutable ``Tag``, see ``FrozenCategory``."""
+
+    __slots__ = ('_tuple', '_hash')
+
+    def __init__(self, name, pk=None):
+        super(FrozenTag, self).__init__(name, pk=pk)
+        self._freeze()
+
+    def thaw(self):
+        """Return a mutable ``Tag`` copy of this instance."""
+        return Tag(self.name, pk=self.pk)
+
+
+class FrozenFact(_Frozen, Fact):
+    """
+    Immutable ``Fact``, see ``FrozenCategory``.
+
+    Its activity and tags are frozen as well. ``tags`` is a ``frozenset``.
+    """
+
+    __slots__ = ('_tuple', '_hash')
+
+    def __init__(self, activity, start, end=None, pk=None, description=None, tags=None):
+        super(FrozenFact, self).__init__(_get_frozen(activity), start, end=end, pk=pk,
+            description=description)
+        self.tags = frozenset(tag.frozen() for tag in tags or ())
+        self._freeze()
+
+    def thaw(self):
+        """Return a mutable ``Fact`` copy of this instance."""
+        return Fact(self.activity.thaw(), self.start, self.end, pk=self.pk,
+            description=self.description, tags=[tag.thaw() for tag in self.tags])
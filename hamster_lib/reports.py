@@ -31,6 +31,7 @@ from __future__ import unicode_literals
 
 import csv
 import datetime
+import io
 import sys
 from collections import namedtuple
 from xml.dom.minidom import Document
@@ -204,7 +205,12 @@ class TSVWriter(ReportWriter):
 @python_2_unicode_compatible
 class ICALWriter(ReportWriter):
     """A simple ical writer for fact export."""
-    def __init__(self, path, datetime_format="%Y-%m-%d %H:%M:%S"):
+
+    # Framing of a calendar without any properties, as ``Calendar.to_ical`` renders it.
+    CALENDAR_HEADER = b'BEGIN:VCALENDAR\r\n'
+    CALENDAR_FOOTER = b'END:VCALENDAR\r\n'
+
+    def __init__(self, path, datetime_format="%Y-%m-%d %H:%M:%S", stream=False):
         """
         Initiate new instance and open an output file like object.
 
@@ -212,10 +218,19 @@ class ICALWriter(ReportWriter):
             path: File like object to be opend. This is where all output will be directed to.
             datetime_format (str): String specifying how datetime information is to be
                 rendered in the output.
+            stream (bool, optional): If ``True`` each event is written to ``path`` right away
+                instead of being collected in ``calendar`` first. This keeps memory usage
+                constant no matter how many facts are exported. The output is identical.
+                Defaults to ``False``.
         """
         self.datetime_format = datetime_format
+        self.stream = stream
         self.file = open(path, 'wb')
-        self.calendar = Calendar()
+        if self.stream:
+            self.calendar = None
+            self.file.write(self.CALENDAR_HEADER)
+        else:
+            self.calendar = Calendar()
 
     def _fact_to_tuple(self, fact):
         """
@@ -270,11 +285,17 @@ class ICALWriter(ReportWriter):
         event.add('categories', fact_tuple.category)
         event.add('summary', fact_tuple.activity)
         event.add('description', fact_tuple.description)
-        self.calendar.add_component(event)
+        if self.stream:
+            self.file.write(event.to_ical())
+        else:
+            self.calendar.add_component(event)
 
     def _close(self):
         """Custom close method to make sure the calendar is actually writen do disk."""
-        self.file.write(self.calendar.to_ical())
+        if self.stream:
+            self.file.write(self.CALENDAR_FOOTER)
+        else:
+            self.file.write(self.calendar.to_ical())
         return super(ICALWriter, self)._close()
 
 
@@ -284,12 +305,32 @@ class XMLWriter(ReportWriter):
     # This is a straight forward copy of the 'legacy hamster' XMLWriter class
     # contributed by 'tbaugis' in 11e3f66
 
-    def __init__(self, path, datetime_format="%Y-%m-%d %H:%M:%S"):
-        """Setup the writer including a main xml document."""
+    def __init__(self, path, datetime_format="%Y-%m-%d %H:%M:%S", stream=False):
+        """
+        Setup the writer including a main xml document.
+
+        Args:
+            path: File like object to be opened. This is where all output will be directed to.
+            datetime_format (str): String specifying how datetime information is to be
+                rendered in the output.
+            stream (bool, optional): If ``True`` each fact element is serialized to ``path``
+                right away instead of being appended to ``fact_list`` first. This keeps
+                memory usage constant no matter how many facts are exported. The output is
+                identical. Defaults to ``False``.
+        """
         self.datetime_format = datetime_format
-        self.file = open(path, 'wb')
+        self.stream = stream
         self.document = Document()
-        self.fact_list = self.document.createElement("facts")
+        if self.stream:
+            # Mirror what ``Document.toxml(encoding='utf-8')`` does internally.
+            self.file = io.TextIOWrapper(io.open(path, 'wb'), encoding='utf-8',
+                errors='xmlcharrefreplace', newline='\n')
+            self.file.write('<?xml version="1.0" encoding="utf-8"?>')
+            self.fact_list = None
+            self._facts_written = 0
+        else:
+            self.file = open(path, 'wb')
+            self.fact_list = self.document.createElement("facts")
 
     def _fact_to_tuple(self, fact):
         """
@@ -338,7 +379,15 @@ class XMLWriter(ReportWriter):
         fact.setAttribute('duration', fact_tuple.duration)
         fact.setAttribute('category', fact_tuple.category)
         fact.setAttribute('description', fact_tuple.description)
-        self.fact_list.appendChild(fact)
+        if self.stream:
+            # An empty list is rendered as ``<facts/>`` so we can only open it
+            # once we know there is at least one fact.
+            if not self._facts_written:
+                self.file.write('<facts>')
+            fact.writexml(self.file)
+            self._facts_written += 1
+        else:
+            self.fact_list.appendChild(fact)
 
     def _close(self):
         """
@@ -346,7 +395,12 @@ class XMLWriter(ReportWriter):
 
         ``toxml`` should take care of encoding everything with UTF-8.
         """
-
-        self.document.appendChild(self.fact_list)
-        self.file.write(self.document.toxml(encoding='utf-8'))
+        if self.stream:
+            if self._facts_written:
+                self.file.write('</facts>')
+            else:
+                self.file.write('<facts/>')
+        else:
+            self.document.appendChild(self.fact_list)
+            self.file.write(self.document.toxml(encoding='utf-8'))
         return super(XMLWriter, self)._close()
@@ -30,16 +30,61 @@ Note:
 
 from __future__ import absolute_import, unicode_literals
 
+import base64
+import binascii
 import datetime
+import json
 import logging
-import os
-import pickle
+from collections import namedtuple
 
 import hamster_lib
 from future.utils import python_2_unicode_compatible
 from hamster_lib import objects
+from hamster_lib.columns import FactColumns
 from hamster_lib.helpers import helpers
 from hamster_lib.helpers import time as time_helpers
+from six import text_type
+
+# Number of facts ``BaseFactManager.iter_all`` retrieves from the backend at once.
+DEFAULT_BATCH_SIZE = 500
+
+# Number of facts ``BaseFactManager.search`` returns unless told otherwise.
+DEFAULT_SEARCH_LIMIT = 20
+
+# Number of items ``get_page`` methods return unless told otherwise.
+DEFAULT_PAGE_SIZE = 50
+
+# Format of fact starts within page tokens.
+TOKEN_TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# A page of items returned by the ``get_page`` methods of our managers. Pass ``token``
+# to get the next page, it is ``None`` on the last page.
+Page = namedtuple('Page', ('items', 'token'))
+
+# Number of activities ``BaseActivityManager.complete`` returns unless told otherwise.
+DEFAULT_COMPLETION_LIMIT = 10
+
+# Lightweight activity returned by ``BaseActivityManager.complete``. ``category_name``
+# is ``None`` for activities without category.
+Completion = namedtuple('Completion', ('pk', 'name', 'category_name'))
+
+# Number of activities ``BaseActivityManager.get_recent`` and ``get_frequent`` return
+# unless told otherwise.
+DEFAULT_USAGE_LIMIT = 10
+
+# Activity returned by ``BaseActivityManager.get_recent`` and ``get_frequent``, along
+# with the number of its facts and the start of its latest one.
+Usage = namedtuple('Usage', ('activity', 'count', 'last_used'))
+
+# Fields ``BaseFactManager.get_totals`` can group by.
+TOTALS_GROUP_BY = ('day', 'activity', 'category', 'tag')
+
+Total = namedtuple('Total', TOTALS_GROUP_BY + ('duration',))
+
+# Fields ``BaseFactManager.aggregate`` can group by.
+AGGREGATE_GROUP_BY = ('day', 'week', 'activity', 'category', 'tag')
+
+Aggregate = namedtuple('Aggregate', AGGREGATE_GROUP_BY + ('duration', 'count'))
 
 
 @python_2_unicode_compatible
@@ -77,6 +122,72 @@ class BaseManager(object):
     def __init__(self, store):
         self.store = store
 
+    def _paginate(self, fetch, limit, token, get_keyset, types):
+        """
+        Return a ``Page`` of items using keyset pagination.
+
+        Instead of an offset, a page token holds the keyset (e.g. ``(name, pk)``) of
+        the last item of the previous page. The backend seeks right behind it, so
+        each page costs the same however deep it is.
+
+        Args:
+            fetch (callable): Called with the keyset to start after (``None`` for the
+                first page) and a number of items. Returns up to that many items,
+                ordered by their keyset.
+            limit (int): Maximum number of items on the page.
+            token (text_type): Token returned along with the previous page or ``None``
+                for the first page.
+            get_keyset (callable): Returns the keyset of an item as a tuple of JSON
+                serializable values.
+            types (tuple): Callables converting each keyset value back from a token.
+
+        Returns:
+            Page: ``(items, token)`` tuple.
+
+        Raises:
+            ValueError: If ``limit`` is not a positive integer or ``token`` is invalid.
+        """
+        if limit < 1:
+            message = _("Limit needs to be a positive integer.")
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+        after = self._decode_token(token, types) if token else None
+        # One more item than needed tells us whether there is a next page.
+        items = fetch(after, limit + 1)
+        if len(items) <= limit:
+            return Page(items, None)
+        items = items[:limit]
+        return Page(items, self._encode_token(get_keyset(items[-1])))
+
+    def _encode_token(self, keyset):
+        """Return an opaque, URL safe page token for a keyset."""
+        data = json.dumps(list(keyset), separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def _decode_token(self, token, types):
+        """
+        Return the keyset held by a page token.
+
+        Raises:
+            ValueError: If ``token`` was not created by ``_encode_token`` for a keyset
+                matching ``types``.
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            if not isinstance(values, list) or len(values) != len(types):
+                raise ValueError(values)
+            return tuple(convert(value) for convert, value in zip(types, values))
+        except (binascii.Error, TypeError, UnicodeError, ValueError):
+            message = _("Invalid page token: {!r}.".format(token))
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+    def _get_name_page(self, fetch, limit, token):
+        """Return a ``Page`` of items keyed by ``(name, pk)``, see ``_paginate``."""
+        return self._paginate(fetch, limit, token, lambda item: (item.name, item.pk),
+            (text_type, int))
+
 
 @python_2_unicode_compatible
 class BaseCategoryManager(BaseManager):
@@ -246,6 +357,39 @@ class BaseCategoryManager(BaseManager):
         """
         raise NotImplementedError
 
+    def get_page(self, limit=DEFAULT_PAGE_SIZE, token=None):
+        """
+        Return a page of categories.
+
+        Args:
+            limit (int, optional): Maximum number of categories on the page. Defaults to
+                ``DEFAULT_PAGE_SIZE``.
+            token (text_type, optional): Token of the previous page. Defaults to ``None``,
+                returning the first page.
+
+        Returns:
+            Page: ``(items, token)`` tuple of ``Categories`` ordered by name and PK.
+
+        Raises:
+            ValueError: If ``limit`` is not a positive integer or ``token`` is invalid.
+        """
+        self.store.logger.debug(_("Limit: {}, token: {!r} has been received.".format(
+            limit, token)))
+        return self._get_name_page(self._get_page, limit, token)
+
+    def _get_page(self, after, limit):
+        """
+        Return categories following a keyset.
+
+        Args:
+            after (tuple): ``(name, pk)`` of the category to start after or ``None``.
+            limit (int): Maximum number of categories to return.
+
+        Returns:
+            list: List of ``Categories`` ordered by name and PK.
+        """
+        raise NotImplementedError
+
 
 @python_2_unicode_compatible
 class BaseActivityManager(BaseManager):
@@ -426,6 +570,170 @@ class BaseActivityManager(BaseManager):
         # lower(activity.name).
         raise NotImplementedError
 
+    def complete(self, prefix, category=False, limit=DEFAULT_COMPLETION_LIMIT):
+        """
+        Return activities whose name starts with a prefix, e.g. for autocompletion.
+
+        Unlike ``get_all`` no ``Activity`` instances are created. Activities marked
+        as deleted are left out.
+
+        Args:
+            prefix (text_type): Start of the activity names to match, not case sensitive.
+                An empty prefix matches all activities.
+            category (hamster_lib.Category, optional): Limit activities to this category.
+                Defaults to ``False``. If ``category=None`` only activities without a
+                category will be considered.
+            limit (int, optional): Maximum number of activities to return. Defaults to
+                ``DEFAULT_COMPLETION_LIMIT``.
+
+        Returns:
+            list: List of ``Completion`` namedtuples, ordered by name (not case
+                sensitive) and PK.
+
+        Raises:
+            ValueError: If ``limit`` is not a positive integer.
+        """
+        self.store.logger.debug(_("Prefix: '{}', category: {!r}, limit: {} has been received."
+            .format(prefix, category, limit)))
+
+        if limit < 1:
+            message = _("Limit needs to be a positive integer.")
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+        return self._complete(prefix, category, limit)
+
+    def _complete(self, prefix, category, limit):
+        """
+        Return activities whose name starts with a prefix.
+
+        Args:
+            prefix (text_type): Start of the activity names to match.
+            category (hamster_lib.Category): Category to limit activities to, ``None``
+                or ``False``, see ``complete``.
+            limit (int): Maximum number of activities to return.
+
+        Returns:
+            list: List of ``Completion`` namedtuples.
+        """
+        raise NotImplementedError
+
+    def get_recent(self, limit=DEFAULT_USAGE_LIMIT):
+        """
+        Return the most recently used activities.
+
+        Activities marked as deleted are left out.
+
+        Args:
+            limit (int, optional): Maximum number of activities to return. Defaults to
+                ``DEFAULT_USAGE_LIMIT``.
+
+        Returns:
+            list: List of ``Usage`` namedtuples, ordered by descending ``last_used``.
+
+        Raises:
+            ValueError: If ``limit`` is not a positive integer.
+        """
+        self.store.logger.debug(_("Limit: {} has been received.".format(limit)))
+        self._validate_usage_limit(limit)
+        return self._get_recent(limit)
+
+    def _get_recent(self, limit):
+        """
+        Return the most recently used activities.
+
+        Args:
+            limit (int): Maximum number of activities to return.
+
+        Returns:
+            list: List of ``Usage`` namedtuples.
+        """
+        raise NotImplementedError
+
+    def get_frequent(self, limit=DEFAULT_USAGE_LIMIT):
+        """
+        Return the activities with the most facts of all time.
+
+        Activities marked as deleted are left out.
+
+        Args:
+            limit (int, optional): Maximum number of activities to return. Defaults to
+                ``DEFAULT_USAGE_LIMIT``.
+
+        Returns:
+            list: List of ``Usage`` namedtuples, ordered by descending ``count``, then
+                by descending ``last_used``.
+
+        Raises:
+            ValueError: If ``limit`` is not a positive integer.
+        """
+        self.store.logger.debug(_("Limit: {} has been received.".format(limit)))
+        self._validate_usage_limit(limit)
+        return self._get_frequent(limit)
+
+    def _get_frequent(self, limit):
+        """
+        Return the activities with the most facts.
+
+        Args:
+            limit (int): Maximum number of activities to return.
+
+        Returns:
+            list: List of ``Usage`` namedtuples.
+        """
+        raise NotImplementedError
+
+    def _validate_usage_limit(self, limit):
+        if limit < 1:
+            message = _("Limit needs to be a positive integer.")
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+    def get_page(self, category=False, search_term='', limit=DEFAULT_PAGE_SIZE, token=None):
+        """
+        Return a page of matching activities.
+
+        Args:
+            category (hamster_lib.Category, optional): Limit activities to this category,
+                see ``get_all``. Defaults to ``False``.
+            search_term (str, optional): Limit activities to those matching this string
+                a substring in their name. Defaults to ``empty string``.
+            limit (int, optional): Maximum number of activities on the page. Defaults to
+                ``DEFAULT_PAGE_SIZE``.
+            token (text_type, optional): Token of the previous page. Defaults to ``None``,
+                returning the first page.
+
+        Returns:
+            Page: ``(items, token)`` tuple of ``Activities`` ordered by name and PK.
+
+        Raises:
+            ValueError: If ``limit`` is not a positive integer or ``token`` is invalid.
+        """
+        self.store.logger.debug(_(
+            "Category: {!r}, search_term: '{}', limit: {}, token: {!r} has been received."
+            .format(category, search_term, limit, token)))
+
+        def fetch(after, limit):
+            return self._get_page(category, search_term, after, limit)
+
+        return self._get_name_page(fetch, limit, token)
+
+    def _get_page(self, category, search_term, after, limit):
+        """
+        Return matching activities following a keyset.
+
+        Args:
+            category (hamster_lib.Category): Category to limit activities to, ``None``
+                or ``False``, see ``get_all``.
+            search_term (text_type): Substring of the activity names to match.
+            after (tuple): ``(name, pk)`` of the activity to start after or ``None``.
+            limit (int): Maximum number of activities to return.
+
+        Returns:
+            list: List of ``Activities`` ordered by name and PK.
+        """
+        raise NotImplementedError
+
 
 @python_2_unicode_compatible
 class BaseTagManager(BaseManager):
@@ -590,6 +898,39 @@ class BaseTagManager(BaseManager):
         """
         raise NotImplementedError
 
+    def get_page(self, limit=DEFAULT_PAGE_SIZE, token=None):
+        """
+        Return a page of tags.
+
+        Args:
+            limit (int, optional): Maximum number of tags on the page. Defaults to
+                ``DEFAULT_PAGE_SIZE``.
+            token (text_type, optional): Token of the previous page. Defaults to ``None``,
+                returning the first page.
+
+        Returns:
+            Page: ``(items, token)`` tuple of ``Tags`` ordered by name and PK.
+
+        Raises:
+            ValueError: If ``limit`` is not a positive integer or ``token`` is invalid.
+        """
+        self.store.logger.debug(_("Limit: {}, token: {!r} has been received.".format(
+            limit, token)))
+        return self._get_name_page(self._get_page, limit, token)
+
+    def _get_page(self, after, limit):
+        """
+        Return tags following a keyset.
+
+        Args:
+            after (tuple): ``(name, pk)`` of the tag to start after or ``None``.
+            limit (int): Maximum number of tags to return.
+
+        Returns:
+            list: List of ``Tags`` ordered by name and PK.
+        """
+        raise NotImplementedError
+
 
 @python_2_unicode_compatible
 class BaseFactManager(BaseManager):
@@ -613,6 +954,61 @@ class BaseFactManager(BaseManager):
         """
         self.store.logger.debug(_("Fact: '{}' has been received.".format(fact)))
 
+        self._validate_min_delta(fact)
+
+        if fact.pk or fact.pk == 0:
+            result = self._update(fact)
+        elif fact.end is None:
+            result = self._start_tmp_fact(fact)
+        else:
+            result = self._add(fact)
+        return result
+
+    def save_many(self, facts):
+        """
+        Add a batch of new facts to our selected backend in one go.
+
+        This is meant for imports. Unlike calling ``save`` for each fact, the
+        backend may resolve related instances and check timeframes for the whole
+        batch at once and will store all valid facts in a single transaction.
+        A fact that can not be saved does not prevent the others from being saved.
+
+        Args:
+            facts (Iterable): Iterable of complete, new ``hamster_lib.Fact`` instances.
+
+        Returns:
+            tuple: ``(saved, errors)`` tuple. ``saved`` is a list of all saved ``Facts`` as
+                stored in the backend. ``errors`` is a list of ``(fact, exception)`` tuples
+                for each fact that could not be saved. Both lists follow the order
+                ``facts`` were passed in.
+        """
+        facts = list(facts)
+        self.store.logger.debug(_("{} facts have been received.".format(len(facts))))
+
+        valid, errors = [], []
+        for position, fact in enumerate(facts):
+            try:
+                self._validate_new_fact(fact)
+            except ValueError as error:
+                errors.append((position, error))
+            else:
+                valid.append(position)
+
+        saved, failed = self._add_many([facts[position] for position in valid])
+        errors.extend((valid[index], error) for index, error in failed)
+        errors.sort(key=lambda error: error[0])
+        return saved, [(facts[position], error) for position, error in errors]
+
+    def _validate_min_delta(self, fact):
+        """
+        Make sure a fact is not shorter than the config given ``fact_min_delta``.
+
+        Args:
+            fact (hamster_lib.Fact): Fact to be validated.
+
+        Raises:
+            ValueError: If ``fact.delta`` is smaller than ``self.store.config['fact_min_delta']``.
+        """
         fact_min_delta = datetime.timedelta(seconds=int(self.store.config['fact_min_delta']))
         if fact.delta and (fact.delta < fact_min_delta):
             message = _(
@@ -622,13 +1018,34 @@ class BaseFactManager(BaseManager):
             self.store.logger.error(message)
             raise ValueError(message)
 
+    def _validate_new_fact(self, fact):
+        """
+        Make sure a fact can be added as part of a batch.
+
+        Args:
+            fact (hamster_lib.Fact): Fact to be validated.
+
+        Raises:
+            ValueError: If the passed fact has a PK assigned. New facts should not have one.
+            ValueError: If the passed fact has no ``end``. Ongoing facts can not be
+                added as part of a batch.
+            ValueError: If ``fact.delta`` is smaller than ``self.store.config['fact_min_delta']``.
+        """
         if fact.pk or fact.pk == 0:
-            result = self._update(fact)
-        elif fact.end is None:
-            result = self._start_tmp_fact(fact)
-        else:
-            result = self._add(fact)
-        return result
+            message = _(
+                "The fact ('{!r}') you are trying to add already has an PK."
+                " Are you sure you do not want to ``save`` it instead?".format(fact)
+            )
+            self.store.logger.error(message)
+            raise ValueError(message)
+
+        if fact.end is None:
+            message = _("Ongoing facts ('{!r}') can not be added as part of a batch.".format(
+                fact))
+            self.store.logger.error(message)
+            raise ValueError(message)
+
+        self._validate_min_delta(fact)
 
     def _add(self, fact):
         """
@@ -646,6 +1063,25 @@ class BaseFactManager(BaseManager):
         """
         raise NotImplementedError
 
+    def _add_many(self, facts):
+        """
+        Add a list of validated new ``Facts`` to the backend within one transaction.
+
+        Args:
+            facts (list): List of ``hamster_lib.Fact`` instances. Each one has been
+                validated by ``_validate_new_fact`` already.
+
+        Returns:
+            tuple: ``(saved, failed)`` tuple. ``saved`` is a list of the added ``Facts``.
+                ``failed`` is a list of ``(index, exception)`` tuples, ``index`` being the
+                position of the fact within ``facts``. Both lists are ordered like ``facts``.
+
+        Note:
+            Facts overlapping with already stored facts or with a fact earlier in the
+            batch are expected to be reported as failed with a ``ValueError``.
+        """
+        raise NotImplementedError
+
     def _update(self, fact):
         """
         Update and existing fact with new values.
@@ -734,6 +1170,225 @@ class BaseFactManager(BaseManager):
                 start=start, end=end, filter=filter_term)
         ))
 
+        start, end = self._normalize_timeframe(start, end)
+        return self._get_all(start, end, filter_term)
+
+    def iter_all(self, start=None, end=None, filter_term='', batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Iterate over all facts within a given timeframe that match given search terms.
+
+        Unlike ``get_all`` this does not build a list of all matching facts but
+        retrieves them from the backend in chunks of ``batch_size`` facts. Memory
+        consumption will therefore stay flat no matter how large the timeframe is.
+
+        Args:
+            start (datetime.datetime, optional): Consider only Facts starting at or after
+                this date. Accepts the same types as ``get_all``.
+            end (datetime.datetime, optional): Consider only Facts ending before or at
+                this date. Accepts the same types as ``get_all``.
+            filter_term (str, optional): Only consider ``Facts`` with this string as part of their
+                associated ``Activity.name``
+            batch_size (int, optional): Number of facts retrieved from the backend at once.
+                Defaults to ``DEFAULT_BATCH_SIZE``.
+
+        Returns:
+            generator: Generator of ``Facts`` matching given specifications, ordered by
+                ``Fact.start``.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are not ``datetime.date``, ``datetime.time`` or
+                ``datetime.datetime`` objects.
+            ValueError: If ``end`` is before ``start``.
+            ValueError: If ``batch_size`` is not a positive integer.
+        """
+        self.store.logger.debug(_(
+            "Start: '{start}', end: {end} with filter: {filter} and batch_size: {size}"
+            " has been received.".format(start=start, end=end, filter=filter_term,
+                size=batch_size)
+        ))
+
+        if batch_size < 1:
+            message = _("Batch size needs to be a positive integer.")
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+        start, end = self._normalize_timeframe(start, end)
+        return self._iter_all(start, end, filter_term, batch_size=batch_size)
+
+    def get_records(self, start=None, end=None, filter_term=''):
+        """
+        Return all facts within a given timeframe as compact, read-only records.
+
+        Meant for clients holding many facts in memory at once, e.g. for charts. A
+        ``FactRecord`` only holds names instead of ``Activity``, ``Category`` and
+        ``Tag`` instances and backends may share equal names between records.
+
+        Args:
+            start (datetime.datetime, optional): Consider only Facts starting at or after
+                this date. Accepts the same types as ``get_all``.
+            end (datetime.datetime, optional): Consider only Facts ending before or at
+                this date. Accepts the same types as ``get_all``.
+            filter_term (str, optional): Only consider ``Facts`` with this string as part of their
+                associated ``Activity.name``
+
+        Returns:
+            list: List of ``hamster_lib.objects.FactRecord`` namedtuples matching given
+                specifications, ordered by ``start``.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are not ``datetime.date``, ``datetime.time`` or
+                ``datetime.datetime`` objects.
+            ValueError: If ``end`` is before ``start``.
+        """
+        self.store.logger.debug(_(
+            "Start: '{start}', end: {end} with filter: {filter} has been received.".format(
+                start=start, end=end, filter=filter_term)
+        ))
+
+        start, end = self._normalize_timeframe(start, end)
+        return self._get_records(start, end, filter_term)
+
+    def get_columns(self, start=None, end=None, filter_term=''):
+        """
+        Return all facts within a given timeframe as columns of typed arrays.
+
+        Meant for analytics. No ``Fact`` instances are created, backends may build the
+        columns from their query results directly. Tags and descriptions are not
+        included.
+
+        Args:
+            start (datetime.datetime, optional): Consider only Facts starting at or after
+                this date. Accepts the same types as ``get_all``.
+            end (datetime.datetime, optional): Consider only Facts ending before or at
+                this date. Accepts the same types as ``get_all``.
+            filter_term (str, optional): Only consider ``Facts`` with this string as part of their
+                associated ``Activity.name``
+
+        Returns:
+            hamster_lib.columns.FactColumns: Columns of all matching facts, ordered by
+                ``start``.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are not ``datetime.date``, ``datetime.time`` or
+                ``datetime.datetime`` objects.
+            ValueError: If ``end`` is before ``start``.
+        """
+        self.store.logger.debug(_(
+            "Start: '{start}', end: {end} with filter: {filter} has been received.".format(
+                start=start, end=end, filter=filter_term)
+        ))
+
+        start, end = self._normalize_timeframe(start, end)
+        return self._get_columns(start, end, filter_term)
+
+    def get_page(self, start=None, end=None, filter_term='', limit=DEFAULT_PAGE_SIZE,
+            token=None):
+        """
+        Return a page of facts within a given timeframe that match given search terms.
+
+        Unlike ``iter_all`` nothing is kept between pages, clients store ``Page.token``
+        to continue later on.
+
+        Args:
+            start (datetime.datetime, optional): Consider only Facts starting at or after
+                this date. Accepts the same types as ``get_all``.
+            end (datetime.datetime, optional): Consider only Facts ending before or at
+                this date. Accepts the same types as ``get_all``.
+            filter_term (str, optional): Only consider ``Facts`` with this string as part of their
+                associated ``Activity.name``
+            limit (int, optional): Maximum number of facts on the page. Defaults to
+                ``DEFAULT_PAGE_SIZE``.
+            token (text_type, optional): Token of the previous page. Defaults to ``None``,
+                returning the first page.
+
+        Returns:
+            Page: ``(items, token)`` tuple of ``Facts`` ordered by start and PK.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are not ``datetime.date``, ``datetime.time`` or
+                ``datetime.datetime`` objects.
+            ValueError: If ``end`` is before ``start``.
+            ValueError: If ``limit`` is not a positive integer or ``token`` is invalid.
+        """
+        self.store.logger.debug(_(
+            "Start: '{start}', end: {end} with filter: {filter}, limit: {limit} and token:"
+            " {token!r} has been received.".format(start=start, end=end, filter=filter_term,
+                limit=limit, token=token)
+        ))
+
+        start, end = self._normalize_timeframe(start, end)
+
+        def fetch(after, limit):
+            return self._get_page(start, end, filter_term, after, limit)
+
+        def parse_start(value):
+            return datetime.datetime.strptime(value, TOKEN_TIME_FORMAT)
+
+        return self._paginate(fetch, limit, token,
+            lambda fact: (fact.start.strftime(TOKEN_TIME_FORMAT), fact.pk), (parse_start, int))
+
+    def search(self, query, start=None, end=None, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Return the facts most relevant to a search query.
+
+        Each whitespace separated term of ``query`` has to match the activity name,
+        category name, a tag name or the description of a fact. Matching is not case
+        sensitive. How exactly terms match and how facts are ranked is up to the
+        backend, see its ``_search``.
+
+        Args:
+            query (text_type): Search terms.
+            start (datetime.datetime, optional): Consider only Facts starting at or after
+                this date. Accepts the same types as ``get_all``.
+            end (datetime.datetime, optional): Consider only Facts ending before or at
+                this date. Accepts the same types as ``get_all``.
+            limit (int, optional): Maximum number of facts to return. Defaults to
+                ``DEFAULT_SEARCH_LIMIT``.
+
+        Returns:
+            list: List of ``Facts``, most relevant first. Empty if ``query`` holds no
+                terms.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are not ``datetime.date``, ``datetime.time`` or
+                ``datetime.datetime`` objects.
+            ValueError: If ``end`` is before ``start``.
+            ValueError: If ``limit`` is not a positive integer.
+        """
+        self.store.logger.debug(_(
+            "Query: '{query}', start: '{start}', end: {end} and limit: {limit}"
+            " has been received.".format(query=query, start=start, end=end, limit=limit)
+        ))
+
+        if limit < 1:
+            message = _("Limit needs to be a positive integer.")
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+        start, end = self._normalize_timeframe(start, end)
+        terms = query.split()
+        if not terms:
+            return []
+        return self._search(terms, start, end, limit)
+
+    def _normalize_timeframe(self, start, end):
+        """
+        Turn the various accepted ``start``/``end`` values into ``datetime.datetime`` instances.
+
+        Args:
+            start (datetime.date, datetime.time or datetime.datetime): Start info.
+                May be ``None``.
+            end (datetime.date, datetime.time or datetime.datetime): End info.
+                May be ``None``.
+
+        Returns:
+            tuple: ``(start, end)`` tuple of ``datetime.datetime`` instances or ``None``.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are not ``datetime.date``, ``datetime.time`` or
+                ``datetime.datetime`` objects.
+            ValueError: If ``end`` is before ``start``.
+        """
         if start is not None:
             if isinstance(start, datetime.datetime):
                 # isinstance(datetime.datetime, datetime.date) returns True,
@@ -772,7 +1427,7 @@ class BaseFactManager(BaseManager):
             self.store.logger.debug(message)
             raise ValueError(message)
 
-        return self._get_all(start, end, filter_term)
+        return (start, end)
 
     def _get_all(self, start=None, end=None, search_terms='', partial=False):
         """
@@ -797,6 +1452,285 @@ class BaseFactManager(BaseManager):
         """
         raise NotImplementedError
 
+    def _iter_all(self, start=None, end=None, search_terms='', partial=False,
+            batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Return a generator of ``Facts`` matching given criteria.
+
+        Args:
+            start_date (datetime.datetime, optional): Consider only Facts starting at or after
+                this datetime. Defaults to ``None``.
+            end_date (datetime.datetime): Consider only Facts ending before or at
+                this datetime. Defaults to ``None``.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+            partial (bool): If ``False`` only facts which start *and* end
+                within the timeframe will be considered.
+            batch_size (int): Number of facts to retrieve from the backend at once.
+
+        Returns:
+            generator: Generator of ``Facts`` matching given specifications, ordered by
+                ``Fact.start``.
+
+        Note:
+            In contrast to the public ``iter_all``, this method actually handles the
+            backend query.
+        """
+        raise NotImplementedError
+
+    def _get_records(self, start, end, search_term):
+        """
+        Return ``FactRecords`` matching given criteria.
+
+        This default implementation converts the facts returned by ``_iter_all``.
+        Backends are encouraged to build records from their query results directly.
+
+        Args:
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+
+        Returns:
+            list: List of ``hamster_lib.objects.FactRecord`` namedtuples ordered by
+                ``start``.
+        """
+        return [fact.as_record() for fact in self._iter_all(start, end, search_term)]
+
+    def _get_columns(self, start, end, search_term):
+        """
+        Return ``FactColumns`` of facts matching given criteria.
+
+        This default implementation converts the records returned by ``_get_records``.
+        Activities are told apart by their name and category name.
+
+        Args:
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+
+        Returns:
+            hamster_lib.columns.FactColumns: Columns of all matching facts, ordered by
+                ``start``.
+        """
+        return FactColumns.from_records(self._get_records(start, end, search_term))
+
+    def _get_page(self, start, end, search_term, after, limit):
+        """
+        Return facts matching given criteria following a keyset.
+
+        Args:
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            search_term (text_type): Cases insensitive strings to match
+                ``Activity.name`` or ``Category.name``.
+            after (tuple): ``(start, pk)`` of the fact to start after or ``None``.
+            limit (int): Maximum number of facts to return.
+
+        Returns:
+            list: List of ``Facts`` ordered by start and PK.
+        """
+        raise NotImplementedError
+
+    def _search(self, terms, start, end, limit):
+        """
+        Return the facts most relevant to a list of search terms.
+
+        Args:
+            terms (list): Non-empty list of search terms.
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            limit (int): Maximum number of facts to return.
+
+        Returns:
+            list: List of ``Facts``, most relevant first.
+
+        Note:
+            In contrast to the public ``search``, this method actually handles the
+            backend query.
+        """
+        raise NotImplementedError
+
+    def get_totals(self, start=None, end=None, group_by=('day',)):
+        """
+        Return summed up fact durations per workday, activity, category and/or tag.
+
+        Args:
+            start (datetime.date, optional): First workday to consider. A
+                ``datetime.datetime`` is converted to the workday it belongs to.
+            end (datetime.date, optional): Last workday to consider. A
+                ``datetime.datetime`` is converted to the workday it belongs to.
+            group_by (Iterable, optional): Any combination of ``TOTALS_GROUP_BY``.
+                Defaults to ``('day',)``. An empty iterable returns the grand total.
+
+        Returns:
+            list: List of ``Total`` namedtuples ordered by day and names. Fields not
+                grouped by are ``None``. Grouping by activity implies its category.
+                ``duration`` is a ``datetime.timedelta``.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are not ``datetime.date`` instances.
+            ValueError: If ``end`` is before ``start``.
+            ValueError: If ``group_by`` contains an unknown field.
+
+        Note:
+            * Facts spanning several workdays contribute to each of them.
+            * When grouping by tag, untagged facts are not included and facts with
+              several tags count towards each of them.
+        """
+        self.store.logger.debug(_(
+            "Start: '{start}', end: {end} with group_by: {group_by} has been received.".format(
+                start=start, end=end, group_by=group_by)
+        ))
+
+        def get_workday(day):
+            if day is None:
+                return None
+            if isinstance(day, datetime.datetime):
+                return time_helpers.get_workday(day, self.store.config)
+            if isinstance(day, datetime.date):
+                return day
+            message = _("You need to pass either a datetime.date or datetime.datetime object.")
+            self.store.logger.debug(message)
+            raise TypeError(message)
+
+        start, end = get_workday(start), get_workday(end)
+        if start and end and end < start:
+            message = _("End value can not be earlier than start!")
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+        group_by = tuple(group_by)
+        unknown = [field for field in group_by if field not in TOTALS_GROUP_BY]
+        if unknown:
+            message = _("Can not group totals by {}. Valid options are: {}.".format(
+                unknown, TOTALS_GROUP_BY))
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+        return self._get_totals(start, end, group_by)
+
+    def _get_totals(self, start, end, group_by):
+        """
+        Return summed up fact durations.
+
+        Args:
+            start (datetime.date or None): First workday to consider.
+            end (datetime.date or None): Last workday to consider.
+            group_by (tuple): Validated fields to group by.
+
+        Returns:
+            list: List of ``Total`` namedtuples, see ``get_totals``.
+
+        Note:
+            Backends without dedicated support may collect all facts overlapping the
+            timeframe and pass them to ``_aggregate_totals``.
+        """
+        raise NotImplementedError
+
+    def _aggregate_totals(self, facts, start, end, group_by):
+        """
+        Sum up the durations of the given facts.
+
+        Args:
+            facts (Iterable): ``hamster_lib.Fact`` instances overlapping the timeframe.
+            start (datetime.date or None): First workday to consider.
+            end (datetime.date or None): Last workday to consider.
+            group_by (tuple): Validated fields to group by.
+
+        Returns:
+            list: List of ``Total`` namedtuples, see ``get_totals``.
+        """
+        totals = {}
+        for fact in facts:
+            for day, duration in time_helpers.split_by_workday(fact.start, fact.end,
+                    self.store.config):
+                if (start and day < start) or (end and day > end):
+                    continue
+                tags = fact.tags if 'tag' in group_by else [None]
+                for tag in tags:
+                    key = (
+                        day if 'day' in group_by else None,
+                        fact.activity if 'activity' in group_by else None,
+                        fact.category if set(('activity', 'category')) & set(group_by) else None,
+                        tag,
+                    )
+                    totals[key] = totals.get(key, 0) + int(duration.total_seconds())
+        return self._sort_totals([Total(*(key + (datetime.timedelta(seconds=seconds),)))
+            for key, seconds in totals.items()])
+
+    def _sort_totals(self, totals):
+        """Return ``Total`` namedtuples ordered by day and the names of their instances."""
+        def get_name(instance):
+            return instance.name if instance else ''
+
+        return sorted(totals, key=lambda total: (
+            total.day or datetime.date.min, get_name(total.activity),
+            get_name(total.category), get_name(total.tag)))
+
+    def aggregate(self, start=None, end=None, group_by=('activity',)):
+        """
+        Return summed up fact durations, computed by the backend without loading any fact.
+
+        Args:
+            start (datetime.date, datetime.time or datetime.datetime, optional): Start of
+                the timeframe. Handled just like ``get_all`` does.
+            end (datetime.date, datetime.time or datetime.datetime, optional): End of
+                the timeframe. Handled just like ``get_all`` does.
+            group_by (Iterable, optional): Any combination of ``AGGREGATE_GROUP_BY``.
+                Defaults to ``('activity',)``. An empty iterable returns the grand total.
+
+        Returns:
+            list: List of ``Aggregate`` namedtuples ordered by day, week and names.
+                ``day`` is the workday a fact starts at, ``week`` the monday of that
+                workdays week. ``activity``, ``category`` and ``tag`` are names,
+                ``duration`` is a ``datetime.timedelta`` and ``count`` the number of
+                facts. Fields not grouped by are ``None``. Grouping by activity implies
+                its category.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are of an unsupported type.
+            ValueError: If ``end`` is before ``start``.
+            ValueError: If ``group_by`` contains an unknown field.
+
+        Note:
+            * Facts partially overlapping the timeframe only contribute the overlapping
+              part of their duration.
+            * Unlike ``get_totals`` facts are not split by workday.
+            * When grouping by tag, untagged facts are reported with ``tag=None`` and
+              facts with several tags count towards each of them.
+        """
+        self.store.logger.debug(_(
+            "Start: '{start}', end: {end} with group_by: {group_by} has been received.".format(
+                start=start, end=end, group_by=group_by)
+        ))
+
+        start, end = self._normalize_timeframe(start, end)
+        group_by = tuple(group_by)
+        unknown = [field for field in group_by if field not in AGGREGATE_GROUP_BY]
+        if unknown:
+            message = _("Can not aggregate by {}. Valid options are: {}.".format(
+                unknown, AGGREGATE_GROUP_BY))
+            self.store.logger.debug(message)
+            raise ValueError(message)
+
+        return self._aggregate(start, end, group_by)
+
+    def _aggregate(self, start, end, group_by):
+        """
+        Return summed up fact durations.
+
+        Args:
+            start (datetime.datetime or None): Start of the timeframe.
+            end (datetime.datetime or None): End of the timeframe.
+            group_by (tuple): Validated fields to group by.
+
+        Returns:
+            list: List of ``Aggregate`` namedtuples, see ``aggregate``.
+        """
+        raise NotImplementedError
+
     def get_today(self):
         """
         Return all facts for today, while respecting ``day_start``.
@@ -836,15 +1770,15 @@ class BaseFactManager(BaseManager):
             self.store.logger.debug(message)
             raise ValueError(message)
 
-        tmp_fact = helpers._load_tmp_fact(self._get_tmp_fact_path())
-        if tmp_fact:
-            message = _("Trying to start with ongoing fact already present.")
-            self.store.logger.debug(message)
-            raise ValueError(message)
-        else:
-            with open(self._get_tmp_fact_path(), 'wb') as fobj:
-                pickle.dump(fact, fobj)
-            self.store.logger.debug(_("New temporary fact started."))
+        with helpers._lock_tmp_fact(self._get_tmp_fact_path()):
+            tmp_fact = helpers._load_tmp_fact(self._get_tmp_fact_path())
+            if tmp_fact:
+                message = _("Trying to start with ongoing fact already present.")
+                self.store.logger.debug(message)
+                raise ValueError(message)
+            else:
+                helpers._dump_tmp_fact(self._get_tmp_fact_path(), fact)
+                self.store.logger.debug(_("New temporary fact started."))
         return fact
 
     def update_tmp_fact(self, fact):
@@ -872,14 +1806,14 @@ class BaseFactManager(BaseManager):
                 "The passed fact seems to have an end and hence is an invalid"
                 " 'ongoing fact'."
             ))
-        old_fact = self.get_tmp_fact()
+        with helpers._lock_tmp_fact(self._get_tmp_fact_path()):
+            old_fact = self.get_tmp_fact()
 
-        for attribute in ('activity', 'start', 'description', 'tags'):
-            value = getattr(fact, attribute)
-            setattr(old_fact, attribute, value)
+            for attribute in ('activity', 'start', 'description', 'tags'):
+                value = getattr(fact, attribute)
+                setattr(old_fact, attribute, value)
 
-        with open(self._get_tmp_fact_path(), 'wb') as fobj:
-            pickle.dump(old_fact, fobj)
+            helpers._dump_tmp_fact(self._get_tmp_fact_path(), old_fact)
         self.store.logger.debug(_("Temporary fact updated."))
 
         return old_fact
@@ -924,19 +1858,23 @@ class BaseFactManager(BaseManager):
         else:
             end = datetime.datetime.now()
 
-        fact = helpers._load_tmp_fact(self._get_tmp_fact_path())
-        if fact:
-            if fact.start > end:
-                raise ValueError(_("The indicated 'end' value seem to be before its 'start'."))
+        # We hold the lock until the fact is removed, so concurrent calls can not
+        # save it twice.
+        with helpers._lock_tmp_fact(self._get_tmp_fact_path()):
+            fact = helpers._load_tmp_fact(self._get_tmp_fact_path())
+            if fact:
+                if fact.start > end:
+                    raise ValueError(_(
+                        "The indicated 'end' value seem to be before its 'start'."))
+                else:
+                    fact.end = end
+                result = self.save(fact)
+                helpers._remove_tmp_fact(self._get_tmp_fact_path())
+                self.store.logger.debug(_("Temporary fact stopped."))
             else:
-                fact.end = end
-            result = self.save(fact)
-            os.remove(self._get_tmp_fact_path())
-            self.store.logger.debug(_("Temporary fact stopped."))
-        else:
-            message = _("Trying to stop a non existing ongoing fact.")
-            self.store.logger.debug(message)
-            raise ValueError(message)
+                message = _("Trying to stop a non existing ongoing fact.")
+                self.store.logger.debug(message)
+                raise ValueError(message)
         return result
 
     def get_tmp_fact(self):
@@ -974,12 +1912,13 @@ class BaseFactManager(BaseManager):
         # it up before canceling. which would result in two retrievals.
         self.store.logger.debug(_("Trying to cancel 'ongoing fact'."))
 
-        fact = helpers._load_tmp_fact(self._get_tmp_fact_path())
-        if not fact:
-            message = _("Trying to stop a non existing ongoing fact.")
-            self.store.logger.debug(message)
-            raise KeyError(message)
-        os.remove(self._get_tmp_fact_path())
+        with helpers._lock_tmp_fact(self._get_tmp_fact_path()):
+            fact = helpers._load_tmp_fact(self._get_tmp_fact_path())
+            if not fact:
+                message = _("Trying to stop a non existing ongoing fact.")
+                self.store.logger.debug(message)
+                raise KeyError(message)
+            helpers._remove_tmp_fact(self._get_tmp_fact_path())
         self.store.logger.debug(_("Temporary fact stoped."))
 
     def _get_tmp_fact_path(self):
@@ -13,7 +13,7 @@ from hamster_lib import Activity, Category, Fact, Tag
 from hamster_lib.backends.sqlalchemy import objects
 from hamster_lib.backends.sqlalchemy.storage import SQLAlchemyStore
 from pytest_factoryboy import register
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 
 from . import common, factories
 
@@ -167,6 +167,31 @@ def alchemy_store(request, alchemy_runner, alchemy_config):
     return SQLAlchemyStore(alchemy_config, common.Session)
 
 
+@pytest.fixture
+def query_counter(request, alchemy_store):
+    """
+    Provide a list that records every SQL statement issued by ``alchemy_store``.
+
+    Any instance state held by the session is expired first, so lazy loads show up
+    just as they would for a fresh session.
+    """
+    engine = alchemy_store.session.get_bind()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    alchemy_store.session.commit()
+    alchemy_store.session.expire_all()
+    event.listen(engine, 'before_cursor_execute', record)
+
+    def fin():
+        event.remove(engine, 'before_cursor_execute', record)
+
+    request.addfinalizer(fin)
+    return statements
+
+
 # We are sometimes tempted not using hamster-lib.objects at all. but as our tests
 # expect them as input we need them!
 
@@ -0,0 +1,67 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+from hamster_lib import Activity, Category, Tag
+from hamster_lib.backends.sqlalchemy.cache import CacheInfo, IdentityCache
+
+
+@pytest.fixture
+def cache():
+    return IdentityCache(maxsize=2)
+
+
+class TestIdentityCache(object):
+    def test_get_miss(self, cache):
+        assert cache.get('tags', 'foo') is None
+        assert cache.cache_info() == CacheInfo(0, 1, 2, 0)
+
+    def test_get_hit(self, cache):
+        cache.put('categories', 'foo', Category('foo', pk=1))
+        assert cache.get('categories', 'foo') == Category('foo', pk=1)
+        assert cache.cache_info() == CacheInfo(1, 0, 2, 1)
+
+    def test_namespaces_are_separate(self, cache):
+        cache.put('categories', 'foo', Category('foo', pk=1))
+        assert cache.get('tags', 'foo') is None
+
+    def test_instances_are_copied(self, cache):
+        """Make sure modifying a returned instance does not affect the cache."""
+        activity = Activity('foo', pk=1, category=Category('bar', pk=2))
+        cache.put('activities', ('foo', 'bar'), activity)
+        activity.name = 'changed'
+        result = cache.get('activities', ('foo', 'bar'))
+        result.category.name = 'changed'
+        result = cache.get('activities', ('foo', 'bar'))
+        assert result.name == 'foo'
+        assert result.category.name == 'bar'
+
+    def test_least_recently_used_discarded(self, cache):
+        cache.put('tags', 'foo', Tag('foo', pk=1))
+        cache.put('tags', 'bar', Tag('bar', pk=2))
+        cache.get('tags', 'foo')
+        cache.put('tags', 'baz', Tag('baz', pk=3))
+        assert cache.get('tags', 'bar') is None
+        assert cache.get('tags', 'foo')
+        assert cache.get('tags', 'baz')
+
+    def test_invalidate_pk(self, cache):
+        cache.put('tags', 'foo', Tag('foo', pk=1))
+        cache.put('tags', 'bar', Tag('bar', pk=2))
+        cache.invalidate('tags', 1)
+        assert cache.get('tags', 'foo') is None
+        assert cache.get('tags', 'bar')
+
+    def test_invalidate_namespace(self, cache):
+        cache.put('tags', 'foo', Tag('foo', pk=1))
+        cache.put('categories', 'foo', Category('foo', pk=1))
+        cache.invalidate('tags')
+        assert cache.get('tags', 'foo') is None
+        assert cache.get('categories', 'foo')
+
+    def test_clear(self, cache):
+        cache.put('tags', 'foo', Tag('foo', pk=1))
+        cache.get('tags', 'foo')
+        cache.clear()
+        assert cache.cache_info() == CacheInfo(0, 0, 2, 0)
@@ -0,0 +1,131 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+from hamster_lib import Activity, Category, Fact, Tag
+from hamster_lib.completion import Suggestion
+
+
+@pytest.fixture
+def facts(alchemy_store):
+    """Add recent facts using distinct activities, categories and tags."""
+    start = datetime.datetime.now().replace(microsecond=0) - datetime.timedelta(days=1)
+    hour = datetime.timedelta(hours=1)
+    work = Category('work')
+    facts = (
+        Fact(Activity('coding', category=work), start, start + hour, tags=[Tag('hamster')]),
+        Fact(Activity('coding', category=work), start + hour, start + 2 * hour),
+        Fact(Activity('cooking'), start + 2 * hour, start + 3 * hour, tags=[Tag('home')]),
+        # Too old to count.
+        Fact(Activity('cooking'), start - datetime.timedelta(days=365),
+            start - datetime.timedelta(days=365) + hour),
+    )
+    return [alchemy_store.facts._add(fact) for fact in facts]
+
+
+def get_state(index):
+    """Return all entries of an index."""
+    return dict((namespace, index.complete(namespace, '', limit=1000))
+        for namespace in index.NAMESPACES)
+
+
+def assert_in_sync(store):
+    """Make sure the incrementally updated index matches a freshly loaded one."""
+    state = get_state(store.completion)
+    store.completion.clear()
+    assert get_state(store.completion) == state
+
+
+class TestCompletionIndex(object):
+    def test_load(self, alchemy_store, facts):
+        assert alchemy_store.completion.complete('activities', 'co') == [
+            Suggestion('coding@work', facts[0].activity.pk, 2),
+            Suggestion('cooking', facts[2].activity.pk, 1),
+        ]
+        assert alchemy_store.completion.complete('categories', 'w') == [
+            Suggestion('work', facts[0].category.pk, 2)]
+        assert [s.text for s in alchemy_store.completion.complete('tags', 'h')] == [
+            'hamster', 'home']
+
+    def test_load_skips_deleted_activities(self, alchemy_store, facts):
+        alchemy_store.activities._add(Activity('cycling', deleted=True))
+        assert [s.text for s in alchemy_store.completion.complete('activities', '')] == [
+            'coding@work', 'cooking']
+
+    def test_complete_does_not_query(self, request, alchemy_store, facts):
+        alchemy_store.completion.complete('activities', '')
+        query_counter = request.getfixturevalue('query_counter')
+        alchemy_store.completion.complete('activities', 'co')
+        assert query_counter == []
+
+    def test_category_writes(self, alchemy_store, facts):
+        alchemy_store.completion.complete('categories', '')
+        alchemy_store.categories._add(Category('leisure'))
+        work = alchemy_store.categories.get(facts[0].category.pk)
+        work.name = 'job'
+        alchemy_store.categories._update(work)
+        assert alchemy_store.completion.complete('activities', 'cod')[0].text == 'coding@job'
+        assert_in_sync(alchemy_store)
+        alchemy_store.categories.remove(work)
+        assert alchemy_store.completion.complete('activities', 'cod')[0].text == 'coding'
+        assert_in_sync(alchemy_store)
+
+    def test_activity_writes(self, alchemy_store, facts):
+        alchemy_store.completion.complete('activities', '')
+        alchemy_store.activities._add(Activity('reading', category=Category('books')))
+        alchemy_store.activities._add(Activity('cycling', deleted=True))
+        coding = alchemy_store.activities.get(facts[0].activity.pk)
+        coding.name = 'hacking'
+        alchemy_store.activities._update(coding)
+        assert_in_sync(alchemy_store)
+        coding.name = 'retired'
+        coding.deleted = True
+        alchemy_store.activities._update(coding)
+        alchemy_store.activities.remove(alchemy_store.activities.get_by_composite(
+            'reading', Category('books')))
+        assert [s.text for s in alchemy_store.completion.complete('activities', '')] == [
+            'cooking']
+        assert_in_sync(alchemy_store)
+
+    def test_tag_writes(self, alchemy_store, facts):
+        alchemy_store.completion.complete('tags', '')
+        alchemy_store.tags._add(Tag('hobby'))
+        tag = alchemy_store.tags.get_by_name('home')
+        tag.name = 'house'
+        alchemy_store.tags._update(tag)
+        assert_in_sync(alchemy_store)
+        alchemy_store.tags.remove(alchemy_store.tags.get_by_name('hamster'))
+        assert [s.text for s in alchemy_store.completion.complete('tags', '')] == [
+            'house', 'hobby']
+        assert_in_sync(alchemy_store)
+
+    def test_fact_writes(self, alchemy_store, facts):
+        alchemy_store.completion.complete('activities', '')
+        start = facts[2].end
+        hour = datetime.timedelta(hours=1)
+        alchemy_store.facts._add(Fact(Activity('cooking'), start, start + hour,
+            tags=[Tag('hamster')]))
+        assert alchemy_store.completion.complete('activities', 'coo')[0].score == 2
+        fact = facts[0]
+        fact.activity = Activity('gardening', category=Category('home'))
+        fact.tags = [Tag('outdoor')]
+        alchemy_store.facts._update(fact)
+        assert_in_sync(alchemy_store)
+        alchemy_store.facts.remove(facts[1])
+        assert_in_sync(alchemy_store)
+
+    def test_add_many(self, alchemy_store, facts):
+        alchemy_store.completion.complete('activities', '')
+        start = facts[2].end
+        hour = datetime.timedelta(hours=1)
+        saved, failed = alchemy_store.facts._add_many([
+            Fact(Activity('coding', category=Category('work')), start, start + hour),
+            Fact(Activity('painting', category=Category('art')), start + hour,
+                start + 2 * hour, tags=[Tag('hamster'), Tag('canvas')]),
+        ])
+        assert len(saved) == 2
+        assert alchemy_store.completion.complete('activities', 'cod')[0].score == 3
+        assert_in_sync(alchemy_store)
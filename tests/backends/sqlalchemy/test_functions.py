@@ -0,0 +1,101 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+from hamster_lib.backends.sqlalchemy import functions, objects
+from sqlalchemy import DateTime, create_engine, literal, select
+from sqlalchemy.dialects import mysql, postgresql
+
+
+@pytest.fixture
+def engine():
+    return create_engine('sqlite:///:memory:')
+
+
+def as_literal(moment):
+    return literal(moment, DateTime)
+
+
+class TestSQLite(object):
+    """Make sure our functions evaluate correctly on sqlite."""
+
+    @pytest.mark.parametrize(('start', 'end', 'expectation'), (
+        (datetime.datetime(2015, 4, 1, 9), datetime.datetime(2015, 4, 1, 9, 30), 1800),
+        (datetime.datetime(2015, 4, 1, 23), datetime.datetime(2015, 4, 3, 1, 0, 1), 93601),
+    ))
+    def test_seconds_between(self, engine, start, end, expectation):
+        query = select([functions.seconds_between(as_literal(start), as_literal(end))])
+        assert round(engine.execute(query).scalar()) == expectation
+
+    @pytest.mark.parametrize(('moment', 'expectation'), (
+        (datetime.datetime(1970, 1, 1), 0),
+        (datetime.datetime(2015, 4, 1, 9, 30, 15), 1427880615),
+        (datetime.datetime(2015, 4, 1, 9, 30, 15, 999999), 1427880615),
+    ))
+    def test_epoch_seconds(self, engine, moment, expectation):
+        query = select([functions.epoch_seconds(as_literal(moment))])
+        assert engine.execute(query).scalar() == expectation
+
+    @pytest.mark.parametrize(('moment', 'expectation'), (
+        (datetime.datetime(2015, 4, 1, 5, 30), datetime.date(2015, 4, 1)),
+        (datetime.datetime(2015, 4, 1, 5, 29, 59), datetime.date(2015, 3, 31)),
+        (datetime.datetime(2015, 4, 1, 0, 0), datetime.date(2015, 3, 31)),
+    ))
+    def test_workday(self, engine, moment, expectation):
+        query = select([functions.workday(as_literal(moment), datetime.time(5, 30)).label('day')])
+        assert engine.execute(query).scalar() == expectation
+
+    @pytest.mark.parametrize(('moment', 'expectation'), (
+        # Monday
+        (datetime.datetime(2015, 3, 30, 8), datetime.date(2015, 3, 30)),
+        # Sunday
+        (datetime.datetime(2015, 4, 5, 23), datetime.date(2015, 3, 30)),
+        # Monday, but still sundays workday
+        (datetime.datetime(2015, 4, 6, 4), datetime.date(2015, 3, 30)),
+        (datetime.datetime(2015, 4, 6, 6), datetime.date(2015, 4, 6)),
+    ))
+    def test_week_start(self, engine, moment, expectation):
+        query = select([functions.week_start(as_literal(moment), datetime.time(5, 30)).label(
+            'week')])
+        assert engine.execute(query).scalar() == expectation
+
+
+class TestCompilation(object):
+    """Make sure other dialects get their native constructs."""
+
+    @pytest.mark.parametrize(('dialect', 'expectation'), (
+        (postgresql.dialect(), 'EXTRACT(EPOCH FROM (facts."end" - facts.start))'),
+        (mysql.dialect(), 'TIMESTAMPDIFF(SECOND, facts.start, facts.end)'),
+    ))
+    def test_seconds_between(self, dialect, expectation):
+        expression = functions.seconds_between(objects.facts.c.start, objects.facts.c.end)
+        assert str(expression.compile(dialect=dialect)) == expectation
+
+    @pytest.mark.parametrize(('dialect', 'expectation'), (
+        (postgresql.dialect(), 'CAST(EXTRACT(EPOCH FROM facts.start) AS BIGINT)'),
+        (mysql.dialect(), "TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', facts.start)"),
+    ))
+    def test_epoch_seconds(self, dialect, expectation):
+        expression = functions.epoch_seconds(objects.facts.c.start)
+        assert str(expression.compile(dialect=dialect)) == expectation
+
+    @pytest.mark.parametrize(('dialect', 'expectation'), (
+        (postgresql.dialect(), "CAST((facts.start - INTERVAL '19800 seconds') AS DATE)"),
+        (mysql.dialect(), 'DATE(facts.start - INTERVAL 19800 SECOND)'),
+    ))
+    def test_workday(self, dialect, expectation):
+        expression = functions.workday(objects.facts.c.start, datetime.time(5, 30))
+        assert str(expression.compile(dialect=dialect)) == expectation
+
+    @pytest.mark.parametrize(('dialect', 'expectation'), (
+        (postgresql.dialect(),
+            "CAST(date_trunc('week', facts.start - INTERVAL '0 seconds') AS DATE)"),
+        (mysql.dialect(), 'DATE_SUB(DATE(facts.start - INTERVAL 0 SECOND),'
+            ' INTERVAL WEEKDAY(DATE(facts.start - INTERVAL 0 SECOND)) DAY)'),
+    ))
+    def test_week_start(self, dialect, expectation):
+        expression = functions.week_start(objects.facts.c.start, datetime.time(0, 0))
+        assert str(expression.compile(dialect=dialect)) == expectation
@@ -0,0 +1,79 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+
+from hamster_lib.backends.sqlalchemy import migrations, objects
+from sqlalchemy import create_engine, inspect
+
+
+def get_index_names(engine, table_name):
+    """Return the names of all indexes present for a given table."""
+    return set(index['name'] for index in inspect(engine).get_indexes(table_name))
+
+
+class TestUpgrade(object):
+    """Make sure existing databases get our schema additions."""
+
+    def test_fresh_database(self, alchemy_store):
+        """Make sure a brand new database already has all indexes."""
+        engine = alchemy_store.session.get_bind()
+        assert migrations.get_missing_indexes(engine) == []
+        assert {'ix_facts_start_end', 'ix_facts_activity_id_start'} <= get_index_names(
+            engine, 'facts')
+
+    def test_existing_database_without_indexes(self):
+        """Make sure indexes are added to tables that have been created without them."""
+        engine = create_engine('sqlite:///:memory:')
+        objects.metadata.create_all(engine)
+        for index in objects.facts.indexes:
+            index.drop(bind=engine)
+        assert not get_index_names(engine, 'facts')
+
+        created = migrations.upgrade(engine)
+        assert set(created) == set(index.name for index in objects.facts.indexes)
+        assert get_index_names(engine, 'facts') == set(created)
+
+    def test_get_index_names_expression_index(self):
+        """Make sure expression based indexes are not recreated over and over."""
+        engine = create_engine('sqlite:///:memory:')
+        objects.metadata.create_all(engine)
+        assert 'ix_activities_lower_name' in migrations.get_index_names(engine, 'activities')
+
+    def test_upgrade_is_idempotent(self):
+        """Make sure running an upgrade on an up to date database does nothing."""
+        engine = create_engine('sqlite:///:memory:')
+        objects.metadata.create_all(engine)
+        assert migrations.upgrade(engine) == []
+
+    def test_overlap_query_uses_index(self, alchemy_store):
+        """Make sure the timeframe check is no longer a full table scan."""
+        engine = alchemy_store.session.get_bind()
+        query = alchemy_store.session.query(objects.AlchemyFact).filter(
+            objects.AlchemyFact.start < datetime.datetime.now(),
+            objects.AlchemyFact.end > datetime.datetime.now(),
+        )
+        statement = str(query.statement.compile(engine, compile_kwargs={'literal_binds': True}))
+        plan = [row[-1] for row in engine.execute('EXPLAIN QUERY PLAN ' + statement)]
+        assert len(plan) == 1
+        assert plan[0].startswith('SEARCH')
+        assert 'ix_facts_' in plan[0]
+
+
+class TestHasSQLiteModule(object):
+    """Make sure virtual table modules are detected without touching the database."""
+
+    @pytest.mark.parametrize('module', migrations.MODULE_PROBES)
+    def test_available(self, alchemy_store, module):
+        connection = alchemy_store.session.connection()
+        tables = inspect(connection).get_table_names()
+        assert migrations.has_sqlite_module(connection, module)
+        assert inspect(connection).get_table_names() == tables
+
+    def test_missing(self, alchemy_store, monkeypatch):
+        monkeypatch.setitem(migrations.MODULE_PROBES, 'unknown_module', '(a)')
+        connection = alchemy_store.session.connection()
+        assert migrations.has_sqlite_module(connection, 'unknown_module') is False
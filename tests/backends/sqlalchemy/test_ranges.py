@@ -0,0 +1,138 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+from hamster_lib import Fact
+from hamster_lib.backends.sqlalchemy import objects, ranges
+from hamster_lib.backends.sqlalchemy.storage import SQLAlchemyStore
+from hamster_lib.columns import epoch_seconds
+from sqlalchemy import inspect, select
+
+from . import common
+
+HOUR = datetime.timedelta(hours=1)
+SECOND = datetime.timedelta(seconds=1)
+
+
+def get_ranges(store):
+    """Return all rows of the ``fact_ranges`` table as ``{id: (start, end)}``."""
+    table = store.ranges.table
+    rows = store.session.execute(select([table.c.id, table.c.start, table.c.end]))
+    return dict((pk, (start, end)) for pk, start, end in rows)
+
+
+def covers(bounds, start, end):
+    """
+    Tell if R*Tree ``bounds`` cover a timeframe as closely as 32 bit floats allow.
+
+    Around 2017 these are precise to 128 seconds, SQLite rounds outwards by up to two steps.
+    """
+    start, end = epoch_seconds(start), epoch_seconds(end)
+    return bounds[0] <= start <= bounds[0] + 256 and end <= bounds[1] <= end + 256
+
+
+class TestFactRanges(object):
+    def test_setup(self, alchemy_store):
+        assert alchemy_store.ranges.enabled
+        assert get_ranges(alchemy_store) == {}
+
+    def test_setup_existing_table(self, alchemy_store, alchemy_config):
+        """Make sure an existing table is used as it is."""
+        store = SQLAlchemyStore(alchemy_config, common.Session)
+        assert store.ranges.enabled
+        assert store.ranges.setup(store.session.connection()) is False
+
+    def test_setup_populates_table(self, alchemy_store, alchemy_config, alchemy_fact):
+        """Make sure enabling the index on an existing database adds all facts."""
+        connection = alchemy_store.session.connection()
+        for name in ('insert', 'update', 'delete'):
+            connection.execute('DROP TRIGGER fact_ranges_{}'.format(name))
+        connection.execute('DROP TABLE fact_ranges')
+        store = SQLAlchemyStore(alchemy_config, common.Session)
+        result = get_ranges(store)
+        assert list(result) == [alchemy_fact.pk]
+        assert covers(result[alchemy_fact.pk], alchemy_fact.start, alchemy_fact.end)
+
+    def test_setup_missing_module(self, alchemy_store, mocker):
+        """Make sure no index is created unless our SQLite provides the R*Tree module."""
+        mocker.patch.object(ranges, 'has_sqlite_module', return_value=False)
+        connection = alchemy_store.session.connection()
+        for name in ('insert', 'update', 'delete'):
+            connection.execute('DROP TRIGGER fact_ranges_{}'.format(name))
+        connection.execute('DROP TABLE {}'.format(ranges.TABLE_NAME))
+        fact_ranges = ranges.FactRanges(alchemy_store)
+        assert fact_ranges.setup(connection) is False
+        assert fact_ranges.enabled is False
+        assert ranges.TABLE_NAME not in inspect(connection).get_table_names()
+
+    def test_setup_existing_table_missing_module(self, alchemy_store, mocker):
+        """Make sure an index we can not write to is reported and left disabled."""
+        mocker.patch.object(ranges, 'has_sqlite_module', return_value=False)
+        alchemy_store.logger = mocker.MagicMock()
+        fact_ranges = ranges.FactRanges(alchemy_store)
+        assert fact_ranges.setup(alchemy_store.session.connection()) is False
+        assert fact_ranges.enabled is False
+        assert alchemy_store.logger.error.called
+
+    def test_setup_unsupported(self, alchemy_store, monkeypatch):
+        """Make sure a missing R*Tree module leaves the index disabled."""
+        monkeypatch.setattr(ranges, 'CREATE_STATEMENTS', ('CREATE VIRTUAL TABLE fact_ranges'
+            ' USING unknown_module(id, start, "end")',))
+        fact_ranges = ranges.FactRanges(alchemy_store)
+        connection = alchemy_store.session.connection()
+        connection.execute('DROP TABLE fact_ranges')
+        assert fact_ranges.setup(connection) is False
+        assert fact_ranges.enabled is False
+
+    def test_add(self, alchemy_store, fact):
+        fact.start = datetime.datetime(2017, 3, 1, 9, 15, 30, 900000)
+        fact = alchemy_store.facts._add(fact)
+        result = get_ranges(alchemy_store)
+        assert list(result) == [fact.pk]
+        assert covers(result[fact.pk], fact.start, fact.end)
+
+    def test_add_without_end(self, alchemy_store, alchemy_activity):
+        """Make sure a fact without end is stored as a point."""
+        start = datetime.datetime(2017, 3, 1, 9)
+        alchemy_store.session.execute(objects.facts.insert(), {'id': 1, 'start': start,
+            'activity_id': alchemy_activity.pk})
+        assert covers(get_ranges(alchemy_store)[1], start, start)
+
+    def test_update(self, alchemy_store, alchemy_fact):
+        fact = alchemy_fact.as_hamster()
+        fact.end += datetime.timedelta(hours=2)
+        alchemy_store.facts._update(fact)
+        assert covers(get_ranges(alchemy_store)[fact.pk], fact.start, fact.end)
+
+    def test_remove(self, alchemy_store, alchemy_fact):
+        alchemy_store.facts.remove(alchemy_fact.as_hamster())
+        assert get_ranges(alchemy_store) == {}
+
+
+class TestTimeframeAvailable(object):
+    @pytest.fixture(params=(True, False))
+    def store(self, request, alchemy_store, alchemy_fact):
+        """Provide a store with a stored fact, with and without using the index."""
+        alchemy_store.ranges.enabled = request.param
+        return alchemy_store
+
+    @pytest.mark.parametrize(('get_timeframe', 'expectation'), (
+        # Facts merely touching the stored one do not overlap.
+        (lambda fact: (fact.start - HOUR, fact.start), True),
+        (lambda fact: (fact.end, fact.end + HOUR), True),
+        (lambda fact: (fact.start - HOUR, fact.start + SECOND), False),
+        (lambda fact: (fact.end - SECOND, fact.end + HOUR), False),
+    ))
+    def test_neighbours(self, store, alchemy_fact, get_timeframe, expectation):
+        """Make sure the check is exact to the second."""
+        start, end = get_timeframe(alchemy_fact)
+        fact = Fact(None, start, end)
+        assert store.facts._timeframe_available_for_fact(fact) is expectation
+
+    def test_same_fact(self, store, alchemy_fact):
+        """Make sure a fact does not overlap itself."""
+        fact = alchemy_fact.as_hamster()
+        assert store.facts._timeframe_available_for_fact(fact)
@@ -0,0 +1,157 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+from hamster_lib import Activity, Category, Fact, Tag
+from hamster_lib.backends.sqlalchemy import search
+from hamster_lib.backends.sqlalchemy.storage import SQLAlchemyStore
+from sqlalchemy import inspect
+
+from . import common
+
+
+@pytest.fixture(params=('fts5', 'like'))
+def store(request, alchemy_store):
+    """Provide a store searching with its FTS5 index as well as with ``LIKE``."""
+    alchemy_store.search.enabled = request.param == 'fts5'
+    return alchemy_store
+
+
+@pytest.fixture
+def facts(alchemy_store):
+    """Add facts with distinct activities, categories, tags and descriptions."""
+    start = datetime.datetime(2017, 3, 1, 8)
+    hour = datetime.timedelta(hours=1)
+    facts = (
+        Fact(Activity('coding', category=Category('work')), start, start + hour,
+            description='Fix the parser', tags=[Tag('hamster')]),
+        Fact(Activity('reading'), start + 2 * hour, start + 3 * hour,
+            description='Book about coding'),
+        Fact(Activity('gardening', category=Category('home')), start + 4 * hour,
+            start + 5 * hour, description='50% done'),
+    )
+    return [alchemy_store.facts._add(fact) for fact in facts]
+
+
+def get_pks(facts):
+    return [fact.pk for fact in facts]
+
+
+class TestFactSearch(object):
+    def test_setup(self, alchemy_store):
+        assert alchemy_store.search.enabled
+        assert search.TABLE_NAME in inspect(alchemy_store.session.connection()).get_table_names()
+
+    def test_setup_populates_table(self, alchemy_store, alchemy_config, facts):
+        """Make sure enabling the index on an existing database adds all facts."""
+        connection = alchemy_store.session.connection()
+        for statement in search.CREATE_STATEMENTS[1:-1]:
+            connection.execute('DROP TRIGGER {}'.format(statement.split()[2]))
+        connection.execute('DROP TABLE fact_search')
+        store = SQLAlchemyStore(alchemy_config, common.Session)
+        assert get_pks(store.facts.search('hamster')) == [facts[0].pk]
+
+    def test_setup_missing_module(self, alchemy_store, mocker):
+        """Make sure no index is created unless our SQLite provides the FTS5 module."""
+        mocker.patch.object(search, 'has_sqlite_module', return_value=False)
+        connection = alchemy_store.session.connection()
+        for statement in search.CREATE_STATEMENTS[1:-1]:
+            connection.execute('DROP TRIGGER {}'.format(statement.split()[2]))
+        connection.execute('DROP TABLE {}'.format(search.TABLE_NAME))
+        fact_search = search.FactSearch(alchemy_store)
+        assert fact_search.setup(connection) is False
+        assert fact_search.enabled is False
+        assert search.TABLE_NAME not in inspect(connection).get_table_names()
+
+    def test_setup_existing_table_missing_module(self, alchemy_store, mocker):
+        """Make sure an index we can not write to is reported and left disabled."""
+        mocker.patch.object(search, 'has_sqlite_module', return_value=False)
+        alchemy_store.logger = mocker.MagicMock()
+        fact_search = search.FactSearch(alchemy_store)
+        assert fact_search.setup(alchemy_store.session.connection()) is False
+        assert fact_search.enabled is False
+        assert alchemy_store.logger.error.called
+
+    def test_setup_unsupported(self, alchemy_store, monkeypatch):
+        """Make sure a missing FTS5 module leaves the index disabled."""
+        monkeypatch.setattr(search, 'CREATE_STATEMENTS', ('CREATE VIRTUAL TABLE fact_search'
+            ' USING unknown_module(activity)',))
+        fact_search = search.FactSearch(alchemy_store)
+        connection = alchemy_store.session.connection()
+        connection.execute('DROP TABLE fact_search')
+        assert fact_search.setup(connection) is False
+        assert fact_search.enabled is False
+
+    @pytest.mark.parametrize(('query', 'expectation'), (
+        ('hamster', [0]),
+        ('WORK', [0]),
+        ('garden', [2]),
+        ('parser fix', [0]),
+        ('50%', [2]),
+        ('coding book', [1]),
+        ('"quoted', []),
+        ('work home', []),
+    ))
+    def test_search(self, store, facts, query, expectation):
+        assert get_pks(store.facts.search(query)) == [facts[index].pk for index in expectation]
+
+    def test_search_ranking(self, store, facts):
+        """Make sure activity names rank before descriptions."""
+        assert get_pks(store.facts.search('coding')) == [facts[0].pk, facts[1].pk]
+
+    def test_search_timeframe_and_limit(self, store, facts):
+        assert get_pks(store.facts.search('coding', start=facts[1].start)) == [facts[1].pk]
+        assert len(store.facts.search('coding', limit=1)) == 1
+
+    def test_search_returns_facts(self, store, facts):
+        assert store.facts.search('hamster') == [facts[0]]
+
+
+class TestFactSearchSync(object):
+    """Make sure the index follows all changes affecting facts."""
+
+    def test_update_fact(self, alchemy_store, facts):
+        fact = facts[0]
+        fact.description = 'Write docs'
+        fact.tags = set()
+        alchemy_store.facts._update(fact)
+        assert alchemy_store.facts.search('parser') == []
+        assert alchemy_store.facts.search('hamster') == []
+        assert get_pks(alchemy_store.facts.search('docs')) == [fact.pk]
+
+    def test_remove_fact(self, alchemy_store, facts):
+        alchemy_store.facts.remove(facts[0])
+        assert alchemy_store.facts.search('hamster') == []
+
+    def test_rename_category(self, alchemy_store, facts):
+        category = alchemy_store.categories.get_by_name('work')
+        category.name = 'office'
+        alchemy_store.categories._update(category)
+        assert get_pks(alchemy_store.facts.search('office')) == [facts[0].pk]
+        assert alchemy_store.facts.search('work') == []
+
+    def test_rename_activity(self, alchemy_store, facts):
+        activity = facts[0].activity
+        activity.name = 'hacking'
+        alchemy_store.activities._update(activity)
+        assert get_pks(alchemy_store.facts.search('hacking')) == [facts[0].pk]
+
+    def test_rename_tag(self, alchemy_store, facts):
+        tag = alchemy_store.tags.get_by_name('hamster')
+        tag.name = 'rodent'
+        alchemy_store.tags._update(tag)
+        assert get_pks(alchemy_store.facts.search('rodent')) == [facts[0].pk]
+        assert alchemy_store.facts.search('hamster') == []
+
+    def test_remove_tag(self, alchemy_store, facts):
+        alchemy_store.tags.remove(alchemy_store.tags.get_by_name('hamster'))
+        assert alchemy_store.facts.search('hamster') == []
+
+    def test_add_many(self, alchemy_store):
+        start = datetime.datetime(2017, 3, 1, 8)
+        facts, errors = alchemy_store.facts.save_many([Fact(Activity('coding'), start,
+            start + datetime.timedelta(hours=1), tags=[Tag('bulk')])])
+        assert get_pks(alchemy_store.facts.search('bulk')) == get_pks(facts)
@@ -3,11 +3,27 @@
 from __future__ import unicode_literals
 
 import datetime
+import os.path
+import threading
 
 import pytest
+from hamster_lib import Activity, Category, Fact, Tag, storage
 from hamster_lib.backends.sqlalchemy import (AlchemyActivity, AlchemyCategory,
                                              AlchemyFact, AlchemyTag,
                                              SQLAlchemyStore)
+from hamster_lib.columns import epoch_seconds
+
+
+def get_all_pages(get_page, limit, **kwargs):
+    """Return the items of all pages, making sure only the last page lacks a token."""
+    items, token = [], None
+    while True:
+        page = get_page(limit=limit, token=token, **kwargs)
+        items.extend(page.items)
+        if page.token is None:
+            return items
+        assert len(page.items) == limit
+        token = page.token
 
 
 # The reason we see a great deal of count == 0 statements is to make sure that
@@ -66,6 +82,48 @@ class TestStore(object):
         alchemy_config['db_path'] = db_path_parametrized
         assert SQLAlchemyStore(alchemy_config)
 
+    def test_sqlite_pragmas(self, alchemy_config, tmpdir):
+        """Make sure configured pragmas are applied to each connection."""
+        config = alchemy_config.copy()
+        config.update({
+            'db_path': os.path.join(tmpdir.strpath, 'hamster.sqlite'),
+            'sqlite_journal_mode': 'wal',
+            'sqlite_synchronous': 'NORMAL',
+            'sqlite_cache_size': -4000,
+            'sqlite_temp_store': 'MEMORY',
+            'sqlite_busy_timeout': 1234,
+        })
+        store = SQLAlchemyStore(config)
+        try:
+            def get(name):
+                return store.session.execute('PRAGMA {}'.format(name)).scalar()
+            assert get('journal_mode') == 'wal'
+            assert get('synchronous') == 1
+            assert get('cache_size') == -4000
+            assert get('temp_store') == 2
+            assert get('busy_timeout') == 1234
+        finally:
+            store.cleanup()
+
+    def test_sqlite_pragmas_unset(self, alchemy_store):
+        """Make sure we do not touch any pragma unless configured to."""
+        assert alchemy_store._get_sqlite_pragmas() == []
+
+    @pytest.mark.parametrize(('key', 'value'), (
+        ('sqlite_journal_mode', 'fast'),
+        ('sqlite_synchronous', 1),
+        ('sqlite_mmap_size', '1; DROP TABLE facts'),
+        ('sqlite_busy_timeout', True),
+    ))
+    def test_sqlite_pragmas_invalid(self, alchemy_store, key, value):
+        alchemy_store.config[key] = value
+        with pytest.raises(ValueError):
+            alchemy_store._get_sqlite_pragmas()
+
+    def test_sqlite_pragmas_other_engines(self, alchemy_store):
+        alchemy_store.config.update({'db_engine': 'postgresql', 'sqlite_journal_mode': 'WAL'})
+        assert alchemy_store._get_sqlite_pragmas() == []
+
 
 class TestCategoryManager():
     def test_add_new(self, alchemy_store, alchemy_category_factory):
@@ -182,6 +240,13 @@ class TestCategoryManager():
         for category in set_of_categories:
             assert category.as_hamster() in result
 
+    @pytest.mark.parametrize('limit', (1, 2, 5, 10))
+    def test_get_page(self, alchemy_store, set_of_categories, limit):
+        """Make sure walking all pages returns each category once, ordered by name."""
+        result = get_all_pages(alchemy_store.categories.get_page, limit)
+        assert result == sorted([category.as_hamster() for category in set_of_categories],
+            key=lambda category: category.name)
+
     # Test convinience methods.
     def test_get_or_create_get(self, alchemy_store, alchemy_category_factory):
         """Test that if we pass a alchemy_category of existing name, we just return it."""
@@ -439,6 +504,78 @@ class TestActivityManager():
             search_term=activity.name)
         assert len(result) == 1
 
+    def test_get_all_ordered_by_name(self, alchemy_store, alchemy_activity_factory):
+        for name in ('foo', 'bar', 'baz'):
+            alchemy_activity_factory(name=name)
+        result = alchemy_store.activities.get_all()
+        assert [activity.name for activity in result] == ['bar', 'baz', 'foo']
+
+    def test_get_all_with_category_single_query(self, alchemy_store, alchemy_activity,
+            request):
+        """Make sure the category is filtered by its PK instead of being loaded first."""
+        category = alchemy_activity.category.as_hamster()
+        query_counter = request.getfixturevalue('query_counter')
+        result = alchemy_store.activities.get_all(category=category)
+        assert result == [alchemy_activity.as_hamster()]
+        assert len(query_counter) == 1
+
+    @pytest.fixture
+    def completion_activities(self, alchemy_activity_factory, alchemy_category_factory):
+        """Provide activities with various names, some of them sharing a category."""
+        category = alchemy_category_factory(name='work')
+        return [alchemy_activity_factory(name=name, category=category) for name in (
+            'Coding', 'cooking', 'reading')] + [alchemy_activity_factory(name=name,
+                category=None) for name in ('coffee', 'co_op')] + [
+            alchemy_activity_factory(name='contact', category=None, deleted=True)]
+
+    @pytest.mark.parametrize(('prefix', 'expectation'), (
+        ('co', ['co_op', 'Coding', 'coffee', 'cooking']),
+        ('CO', ['co_op', 'Coding', 'coffee', 'cooking']),
+        ('cod', ['Coding']),
+        ('co_', ['co_op']),
+        ('x', []),
+        ('', ['co_op', 'Coding', 'coffee', 'cooking', 'reading']),
+    ))
+    def test_complete(self, alchemy_store, completion_activities, prefix, expectation):
+        """Make sure prefixes match regardless of case and deleted activities are left out."""
+        result = alchemy_store.activities.complete(prefix)
+        assert [completion.name for completion in result] == expectation
+
+    def test_complete_with_category(self, alchemy_store, completion_activities):
+        category = completion_activities[0].category.as_hamster()
+        result = alchemy_store.activities.complete('co', category=category)
+        assert result == [(activity.pk, activity.name, 'work')
+            for activity in completion_activities[:2]]
+
+    def test_complete_without_category(self, alchemy_store, completion_activities):
+        result = alchemy_store.activities.complete('co', category=None, limit=1)
+        assert result == [storage.Completion(completion_activities[4].pk, 'co_op', None)]
+
+    def test_complete_uses_index(self, alchemy_store, completion_activities, request):
+        """Make sure matching and ordering use ``ix_activities_lower_name``."""
+        query_counter = request.getfixturevalue('query_counter')
+        alchemy_store.activities.complete('co')
+        statement = query_counter[-1]
+        engine = alchemy_store.session.get_bind()
+        plan = [row[-1] for row in engine.execute('EXPLAIN QUERY PLAN ' + statement,
+            ('co', 'co', '\uffff', 10, 0))]
+        assert 'ix_activities_lower_name' in plan[0]
+        assert not any('TEMP B-TREE' in step for step in plan)
+
+    @pytest.mark.parametrize('limit', (1, 2, 3, 10))
+    def test_get_page(self, alchemy_store, alchemy_activity_factory, limit):
+        """Make sure activities sharing a name are told apart by their PK."""
+        activities = [alchemy_activity_factory(name=name).as_hamster()
+            for name in ('foo', 'bar', 'foo', 'foo', 'baz')]
+        result = get_all_pages(alchemy_store.activities.get_page, limit)
+        assert result == sorted(activities, key=lambda activity: (activity.name, activity.pk))
+
+    def test_get_page_with_search_term(self, alchemy_store, alchemy_activity_factory):
+        activities = [alchemy_activity_factory(name=name).as_hamster()
+            for name in ('foo', 'bar', 'food')]
+        result = get_all_pages(alchemy_store.activities.get_page, 1, search_term='foo')
+        assert result == [activities[0], activities[2]]
+
 
 class TestTagManager():
     def test_add_new(self, alchemy_store, alchemy_tag_factory):
@@ -555,6 +692,13 @@ class TestTagManager():
         for tag in set_of_tags:
             assert tag.as_hamster() in result
 
+    @pytest.mark.parametrize('limit', (1, 2, 5, 10))
+    def test_get_page(self, alchemy_store, set_of_tags, limit):
+        """Make sure walking all pages returns each tag once, ordered by name."""
+        result = get_all_pages(alchemy_store.tags.get_page, limit)
+        assert result == sorted([tag.as_hamster() for tag in set_of_tags],
+            key=lambda tag: tag.name)
+
     # Test convinience methods.
     def test_get_or_create_get(self, alchemy_store, alchemy_tag_factory):
         """Test that if we pass a alchemy_tag of existing name, we just return it."""
@@ -616,6 +760,112 @@ class TestFactManager():
         with pytest.raises(ValueError):
             alchemy_store.facts._add(fact)
 
+    def get_batch(self, amount, start=datetime.datetime(2017, 1, 1, 8)):
+        """Return a list of consecutive, non overlapping new facts sharing related instances."""
+        category = Category('work')
+        activities = [Activity('coding', category=category), Activity('coding'),
+            Activity('meeting', category=category)]
+        facts = []
+        for index in range(amount):
+            fact_start = start + datetime.timedelta(hours=index)
+            facts.append(Fact(activities[index % 3], fact_start,
+                fact_start + datetime.timedelta(minutes=30), description='#{}'.format(index),
+                tags=[Tag('tag {}'.format(index % 2))]))
+        return facts
+
+    def test_add_many(self, alchemy_store):
+        """Make sure all facts are stored and related instances are created only once."""
+        facts = self.get_batch(6)
+        saved, failed = alchemy_store.facts._add_many(facts)
+        assert failed == []
+        assert len(saved) == 6
+        for fact, result in zip(facts, saved):
+            assert result.pk
+            assert result.equal_fields(fact)
+            assert alchemy_store.facts.get(result.pk) == result
+        assert alchemy_store.session.query(AlchemyCategory).count() == 1
+        assert alchemy_store.session.query(AlchemyActivity).count() == 3
+        assert alchemy_store.session.query(AlchemyTag).count() == 2
+
+    def test_add_many_existing_related_instances(self, alchemy_store, alchemy_activity,
+            alchemy_tag):
+        """Make sure existing activities, categories and tags are reused."""
+        fact = Fact(alchemy_activity.as_hamster(), datetime.datetime(2017, 1, 1, 8),
+            datetime.datetime(2017, 1, 1, 9), tags=[Tag(alchemy_tag.name)])
+        fact.activity.pk = None
+        fact.activity.category.pk = None
+        saved, failed = alchemy_store.facts._add_many([fact])
+        assert saved[0].activity == alchemy_activity.as_hamster()
+        assert saved[0].tags == set([alchemy_tag.as_hamster()])
+        assert alchemy_store.session.query(AlchemyActivity).count() == 1
+        assert alchemy_store.session.query(AlchemyCategory).count() == 1
+        assert alchemy_store.session.query(AlchemyTag).count() == 1
+
+    def test_add_many_locks_before_assigning_pks(self, alchemy_store, alchemy_activity,
+            request):
+        """Make sure no other connection can add facts between reading and using the max PK."""
+        fact = Fact(alchemy_activity.as_hamster(), datetime.datetime(2017, 1, 1, 8),
+            datetime.datetime(2017, 1, 1, 9))
+        statements = request.getfixturevalue('query_counter')
+        alchemy_store.facts._add_many([fact])
+        max_pk = [index for index, statement in enumerate(statements) if 'max(' in statement]
+        assert statements.index('BEGIN IMMEDIATE') < max_pk[0]
+
+    def test_add_many_database_assigned_pks(self, alchemy_store, mocker):
+        """Make sure databases other than SQLite assign PKs themselves."""
+        mocker.patch.object(alchemy_store, '_begin_write', return_value=False)
+        facts = self.get_batch(4)
+        saved, failed = alchemy_store.facts._add_many(facts)
+        assert len(set(fact.pk for fact in saved)) == 4
+        for fact, result in zip(facts, saved):
+            assert alchemy_store.facts.get(result.pk).equal_fields(fact)
+
+    def test_add_many_overlapping_existing_facts(self, alchemy_store, alchemy_fact):
+        """Make sure facts overlapping stored facts are reported while the others get saved."""
+        facts = self.get_batch(3, start=alchemy_fact.start - datetime.timedelta(hours=1))
+        facts[0].end = alchemy_fact.start
+        facts[1].start = alchemy_fact.end - datetime.timedelta(minutes=1)
+        facts[1].end = alchemy_fact.end + datetime.timedelta(minutes=1)
+        facts[2].start = alchemy_fact.end + datetime.timedelta(hours=1)
+        facts[2].end = facts[2].start + datetime.timedelta(minutes=30)
+        saved, failed = alchemy_store.facts._add_many(facts)
+        assert [fact.equal_fields(result) for fact, result in zip(
+            (facts[0], facts[2]), saved)] == [True, True]
+        assert [index for index, error in failed] == [1]
+        assert isinstance(failed[0][1], ValueError)
+        assert alchemy_store.session.query(AlchemyFact).count() == 3
+
+    def test_add_many_overlapping_within_batch(self, alchemy_store):
+        """Make sure only the later of two overlapping facts within a batch is rejected."""
+        facts = self.get_batch(3)
+        facts[0].start = facts[2].start + datetime.timedelta(minutes=10)
+        facts[0].end = facts[0].start + datetime.timedelta(hours=1)
+        saved, failed = alchemy_store.facts._add_many(facts)
+        assert [index for index, error in failed] == [0]
+        assert len(saved) == 2
+
+    def test_add_many_empty(self, alchemy_store):
+        assert alchemy_store.facts._add_many([]) == ([], [])
+
+    @pytest.mark.parametrize('amount', (1, 10, 100))
+    def test_add_many_constant_number_of_queries(self, alchemy_store, amount, request):
+        """Make sure the number of statements does not depend on the amount of facts."""
+        statements = request.getfixturevalue('query_counter')
+        alchemy_store.facts._add_many(self.get_batch(amount))
+        # Overlaps, select/insert/select for categories, activities and tags,
+        # the highest fact PK, inserting facts and inserting their tags. Triggers
+        # maintain activity usage.
+        assert len(statements) == 13
+        assert alchemy_store.session.query(AlchemyFact).count() == amount
+
+    def test_save_many(self, alchemy_store, alchemy_fact):
+        """Make sure invalid and overlapping facts are reported in the order passed."""
+        facts = self.get_batch(4, start=alchemy_fact.start - datetime.timedelta(hours=2))
+        facts[2].end = None
+        saved, errors = alchemy_store.facts.save_many(facts)
+        assert [fact for fact, error in errors] == [facts[2], facts[3]]
+        assert [result.description for result in saved] == ['#0', '#1']
+
     def test_add_tags(self, alchemy_store, fact):
         """Make sure that adding a new valid fact will also save its tags."""
         result = alchemy_store.facts._add(fact)
@@ -710,6 +960,245 @@ class TestFactManager():
         assert len(result) == len(set_of_alchemy_facts)
         assert len(result) == alchemy_store.session.query(AlchemyFact).count()
 
+    @pytest.mark.parametrize('limit', (1, 2, 4, 10))
+    def test_get_page(self, set_of_alchemy_facts, alchemy_fact_factory, alchemy_store, limit):
+        """Make sure facts sharing a start are told apart by their PK."""
+        fact = set_of_alchemy_facts[2]
+        alchemy_fact_factory(start=fact.start, end=fact.end)
+        expectation = sorted(alchemy_store.facts._get_all(),
+            key=lambda fact: (fact.start, fact.pk))
+        assert get_all_pages(alchemy_store.facts.get_page, limit) == expectation
+
+    def test_get_page_timeframe(self, set_of_alchemy_facts, alchemy_store):
+        start = set_of_alchemy_facts[1].start
+        result = get_all_pages(alchemy_store.facts.get_page, 2, start=start)
+        assert [fact.pk for fact in result] == [fact.pk for fact in set_of_alchemy_facts[1:]]
+
+    @pytest.mark.parametrize('amount', (1, 5, 20))
+    def test_get_all_constant_number_of_queries(self, alchemy_store, alchemy_fact_factory,
+            amount, request):
+        """Make sure facts, activities, categories and tags are not loaded one by one."""
+        start = datetime.datetime(2017, 1, 1, 9)
+        expectation = []
+        for i in range(amount):
+            fact = alchemy_fact_factory(start=start + datetime.timedelta(days=i))
+            expectation.append(fact.as_hamster())
+        statements = request.getfixturevalue('query_counter')
+        result = alchemy_store.facts._get_all()
+        assert len(statements) == 2
+        assert sorted(result, key=lambda fact: fact.pk) == expectation
+        assert all(fact.tags for fact in result)
+
+    def test_get_all_many_facts_two_queries(self, alchemy_store, request):
+        """Make sure tags of more than 500 facts are not loaded in chunks."""
+        saved, failed = alchemy_store.facts._add_many(self.get_batch(1200))
+        statements = request.getfixturevalue('query_counter')
+        result = alchemy_store.facts._get_all()
+        assert len(statements) == 2
+        assert len(result) == 1200
+        assert all(len(fact.tags) == 1 for fact in result)
+
+    @pytest.mark.parametrize('batch_size', (1, 2, 3, 100))
+    def test_iter_all(self, alchemy_store, set_of_alchemy_facts, batch_size):
+        """Make sure iterating yields the same facts as ``get_all``, ordered by start."""
+        result = list(alchemy_store.facts._iter_all(batch_size=batch_size))
+        assert result == sorted(alchemy_store.facts._get_all(), key=lambda fact: fact.start)
+
+    def test_iter_all_identical_starts(self, alchemy_store, alchemy_fact_factory):
+        """Make sure facts sharing a start across batches are neither lost nor repeated."""
+        start = datetime.datetime(2017, 1, 1, 9)
+        facts = [alchemy_fact_factory(start=start) for i in range(5)]
+        result = list(alchemy_store.facts._iter_all(batch_size=2))
+        assert [fact.pk for fact in result] == sorted(fact.pk for fact in facts)
+
+    def test_iter_all_timeframe(self, alchemy_store, set_of_alchemy_facts):
+        """Make sure our timeframe is respected."""
+        start = set_of_alchemy_facts[1].start
+        end = set_of_alchemy_facts[3].end
+        result = list(alchemy_store.facts._iter_all(start, end, batch_size=2))
+        assert result == [fact.as_hamster() for fact in set_of_alchemy_facts[1:4]]
+
+    def test_iter_all_batches(self, alchemy_store, set_of_alchemy_facts, request):
+        """Make sure facts are retrieved in batches, each taking a constant number of queries."""
+        statements = request.getfixturevalue('query_counter')
+        iterator = alchemy_store.facts._iter_all(batch_size=2)
+        next(iterator)
+        assert len(statements) == 2
+        assert len(list(iterator)) == 4
+        # Three batches (2 + 2 + 1 facts) with two queries each.
+        assert len(statements) == 6
+
+    def test_get_records(self, alchemy_store, set_of_alchemy_facts, request):
+        """Make sure records match the facts ``get_all`` returns, using two queries."""
+        statements = request.getfixturevalue('query_counter')
+        result = alchemy_store.facts._get_records(None, None, '')
+        assert len(statements) == 2
+        facts = sorted(alchemy_store.facts._get_all(), key=lambda fact: fact.start)
+        assert result == [fact.as_record() for fact in facts]
+
+    def test_get_records_timeframe_and_search_term(self, alchemy_store, set_of_alchemy_facts):
+        """Make sure we apply the same criteria as ``_get_all``."""
+        start = set_of_alchemy_facts[1].start
+        end = set_of_alchemy_facts[3].end
+        term = set_of_alchemy_facts[2].activity.name
+        for arguments in ((start, end, ''), (None, None, term)):
+            expectation = sorted(alchemy_store.facts._get_all(*arguments),
+                key=lambda fact: fact.start)
+            result = alchemy_store.facts._get_records(*arguments)
+            assert result == [fact.as_record() for fact in expectation]
+
+    def test_get_records_shares_values(self, alchemy_store, alchemy_fact_factory,
+            alchemy_activity, alchemy_tag_factory):
+        """Make sure equal names and tag tuples are shared between records."""
+        tag = alchemy_tag_factory()
+        for index in range(2):
+            fact = alchemy_fact_factory(activity=alchemy_activity,
+                start=datetime.datetime(2017, 1, index + 1, 9))
+            fact.tags = [tag]
+        alchemy_store.session.flush()
+        first, second = alchemy_store.facts._get_records(None, None, '')
+        assert first.activity is second.activity
+        assert first.category is second.category
+        assert first.tags is second.tags
+        assert first.tags == (tag.name,)
+
+    def test_get_columns(self, alchemy_store, set_of_alchemy_facts, request):
+        """Make sure columns match the records of the same facts, using three queries."""
+        statements = request.getfixturevalue('query_counter')
+        result = alchemy_store.facts._get_columns(None, None, '')
+        assert len(statements) == 3
+        records = alchemy_store.facts._get_records(None, None, '')
+        assert list(result.pk) == [record.pk for record in records]
+        assert list(result.start) == [epoch_seconds(record.start) for record in records]
+        assert list(result.duration) == [
+            (record.end - record.start).total_seconds() for record in records]
+        assert [result.activities[index] for index in result.activity] == [
+            record.activity for record in records]
+        assert [result.categories[index] for index in result.category] == [
+            record.category for record in records]
+
+    def test_get_columns_timeframe_and_search_term(self, alchemy_store, set_of_alchemy_facts):
+        """Make sure we apply the same criteria as ``_get_all``."""
+        start = set_of_alchemy_facts[1].start
+        end = set_of_alchemy_facts[3].end
+        term = set_of_alchemy_facts[2].activity.name
+        for arguments in ((start, end, ''), (None, None, term)):
+            expectation = sorted(alchemy_store.facts._get_all(*arguments),
+                key=lambda fact: fact.start)
+            result = alchemy_store.facts._get_columns(*arguments)
+            assert list(result.pk) == [fact.pk for fact in expectation]
+
+    def test_get_columns_dictionary_encoding(self, alchemy_store, alchemy_fact_factory,
+            alchemy_activity, alchemy_activity_factory):
+        """Make sure each activity and category is listed once and missing categories are -1."""
+        without_category = alchemy_activity_factory()
+        without_category.category = None
+        for index, activity in enumerate((alchemy_activity, without_category, alchemy_activity)):
+            alchemy_fact_factory(activity=activity, start=datetime.datetime(2017, 1, index + 1, 9))
+        alchemy_store.session.flush()
+        result = alchemy_store.facts._get_columns(None, None, '')
+        assert result.activities == [alchemy_activity.name, without_category.name]
+        assert list(result.activity) == [0, 1, 0]
+        assert result.categories == [alchemy_activity.category.name]
+        assert list(result.category) == [0, -1, 0]
+
+    def test_aggregate_grand_total(self, alchemy_store, set_of_alchemy_facts, request):
+        """Make sure durations are summed up by a single query without loading any fact."""
+        statements = request.getfixturevalue('query_counter')
+        result = alchemy_store.facts._aggregate(None, None, ())
+        assert len(statements) == 1
+        assert result == [storage.Aggregate(None, None, None, None, None,
+            datetime.timedelta(minutes=100), 5)]
+
+    def test_aggregate_no_facts(self, alchemy_store):
+        assert alchemy_store.facts._aggregate(None, None, ()) == []
+
+    def test_aggregate_by_activity(self, alchemy_store, set_of_alchemy_facts):
+        """Make sure grouping by activity reports activity and category names."""
+        expectation = sorted((fact.activity.name, fact.activity.category.name)
+            for fact in set_of_alchemy_facts)
+        result = alchemy_store.facts._aggregate(None, None, ('activity',))
+        assert [(row.activity, row.category) for row in result] == expectation
+        assert all(row.duration == datetime.timedelta(minutes=20) for row in result)
+        assert all(row.count == 1 for row in result)
+        assert all(row.day is None and row.tag is None for row in result)
+
+    def test_aggregate_by_category(self, alchemy_store, alchemy_fact_factory, alchemy_activity):
+        """Make sure facts of different activities are summed up by their category."""
+        start = datetime.datetime(2015, 4, 1, 9)
+        for hours in range(3):
+            alchemy_fact_factory(activity=alchemy_activity,
+                start=start + datetime.timedelta(hours=hours),
+                end=start + datetime.timedelta(hours=hours, minutes=30))
+        alchemy_fact_factory(start=start + datetime.timedelta(days=1),
+            end=start + datetime.timedelta(days=1, minutes=10))
+        result = alchemy_store.facts._aggregate(None, None, ('category',))
+        assert len(result) == 2
+        row = [row for row in result if row.category == alchemy_activity.category.name][0]
+        assert row.activity is None
+        assert row.duration == datetime.timedelta(minutes=90)
+        assert row.count == 3
+
+    def test_aggregate_by_tag(self, alchemy_store, alchemy_fact_factory, alchemy_tag_factory):
+        """Make sure facts count towards each tag and untagged facts are reported as well."""
+        tags = [alchemy_tag_factory(name='bar'), alchemy_tag_factory(name='foo')]
+        start = datetime.datetime(2015, 4, 1, 9)
+        tagged = alchemy_fact_factory(start=start, end=start + datetime.timedelta(hours=1))
+        tagged.tags = tags
+        untagged = alchemy_fact_factory(start=start + datetime.timedelta(hours=2),
+            end=start + datetime.timedelta(hours=2, minutes=30))
+        untagged.tags = []
+        alchemy_store.session.flush()
+        result = alchemy_store.facts._aggregate(None, None, ('tag',))
+        assert [(row.tag, row.duration, row.count) for row in result] == [
+            (None, datetime.timedelta(minutes=30), 1),
+            ('bar', datetime.timedelta(hours=1), 1),
+            ('foo', datetime.timedelta(hours=1), 1),
+        ]
+
+    def test_aggregate_by_day_and_week(self, alchemy_store, alchemy_fact_factory):
+        """Make sure facts are reported for the workday and week they start at."""
+        # 2015-04-01 is a wednesday, before ``day_start`` we are still on tuesday.
+        for start in (datetime.datetime(2015, 4, 1, 4), datetime.datetime(2015, 4, 1, 6),
+                datetime.datetime(2015, 4, 6, 6)):
+            alchemy_fact_factory(start=start, end=start + datetime.timedelta(minutes=15))
+        result = alchemy_store.facts._aggregate(None, None, ('day', 'week'))
+        assert [(row.day, row.week, row.count) for row in result] == [
+            (datetime.date(2015, 3, 31), datetime.date(2015, 3, 30), 1),
+            (datetime.date(2015, 4, 1), datetime.date(2015, 3, 30), 1),
+            (datetime.date(2015, 4, 6), datetime.date(2015, 4, 6), 1),
+        ]
+        result = alchemy_store.facts._aggregate(None, None, ('week',))
+        assert [(row.week, row.duration) for row in result] == [
+            (datetime.date(2015, 3, 30), datetime.timedelta(minutes=30)),
+            (datetime.date(2015, 4, 6), datetime.timedelta(minutes=15)),
+        ]
+
+    @pytest.mark.parametrize(('start', 'end', 'expectation'), (
+        (datetime.datetime(2015, 4, 1, 9, 30), None, 30),
+        (None, datetime.datetime(2015, 4, 1, 9, 15), 15),
+        (datetime.datetime(2015, 4, 1, 9, 15), datetime.datetime(2015, 4, 1, 9, 45), 30),
+        (datetime.datetime(2015, 4, 1, 8), datetime.datetime(2015, 4, 1, 11), 60),
+        (datetime.datetime(2015, 4, 1, 10), None, None),
+    ))
+    def test_aggregate_timeframe(self, alchemy_store, alchemy_fact_factory, start, end,
+            expectation):
+        """Make sure only the part of a fact overlapping the timeframe counts."""
+        alchemy_fact_factory(start=datetime.datetime(2015, 4, 1, 9),
+            end=datetime.datetime(2015, 4, 1, 10))
+        result = alchemy_store.facts._aggregate(start, end, ())
+        if expectation is None:
+            assert result == []
+        else:
+            assert [row.duration for row in result] == [datetime.timedelta(minutes=expectation)]
+
+    def test_get_constant_number_of_queries(self, alchemy_store, alchemy_fact, request):
+        """Make sure retrieving a single fact loads its related instances upfront."""
+        expectation = alchemy_fact.as_hamster()
+        statements = request.getfixturevalue('query_counter')
+        assert alchemy_store.facts.get(expectation.pk) == expectation
+        assert len(statements) == 2
+
     @pytest.mark.parametrize(('start_filter', 'end_filter'), (
         (10, 12),
         (10, None),
@@ -779,3 +1268,175 @@ class TestFactManager():
         search_term = set_of_alchemy_facts[1].category.name
         result = alchemy_store.facts._get_all(search_term=search_term)
         assert result == [set_of_alchemy_facts[1]]
+
+
+class TestIdentityCache(object):
+    """Make sure lookups by natural key are cached and kept up to date."""
+
+    def test_get_by_name_cached(self, alchemy_store, alchemy_category, request):
+        """Make sure a repeated lookup does not hit the database."""
+        expectation = alchemy_store.categories.get_by_name(alchemy_category.name)
+        statements = request.getfixturevalue('query_counter')
+        result = alchemy_store.categories.get_by_name(expectation.name)
+        assert result == expectation
+        assert statements == []
+        assert alchemy_store.cache.cache_info().hits == 1
+
+    def test_get_by_name_cached_raw(self, alchemy_store, alchemy_tag, request):
+        """Make sure cached instances are returned as part of our session."""
+        expectation = alchemy_store.tags.get_by_name(alchemy_tag.name)
+        statements = request.getfixturevalue('query_counter')
+        result = alchemy_store.tags.get_by_name(expectation.name, raw=True)
+        assert result in alchemy_store.session
+        assert result.as_hamster() == expectation
+        assert statements == []
+
+    def test_get_by_composite_cached(self, alchemy_store, alchemy_activity, request):
+        activity = alchemy_activity.as_hamster()
+        alchemy_store.activities.get_by_composite(activity.name, activity.category)
+        statements = request.getfixturevalue('query_counter')
+        result = alchemy_store.activities.get_by_composite(activity.name, activity.category,
+            raw=True)
+        assert result.as_hamster() == activity
+        assert statements == []
+
+    def test_fact_add_with_cached_related_instances(self, alchemy_store, fact, request):
+        """Make sure adding a fact does not look up known related instances again."""
+        # The first fact creates related instances, the second one caches them.
+        alchemy_store.facts._add(fact)
+        alchemy_store.facts._add(fact_with_new_timeframe(fact, days=1))
+        fact = fact_with_new_timeframe(fact, days=2)
+        statements = request.getfixturevalue('query_counter')
+        alchemy_store.facts._add(fact)
+        assert [statement for statement in statements if 'name = ?' in statement] == []
+        assert alchemy_store.facts.get_all()[2].equal_fields(fact)
+
+    def test_category_update_invalidates(self, alchemy_store, alchemy_activity):
+        """Make sure renaming a category invalidates it and its activities."""
+        activity = alchemy_store.activities.get_by_composite(alchemy_activity.name,
+            alchemy_activity.category)
+        old_name = activity.category.name
+        category = activity.category
+        category.name += 'foo'
+        alchemy_store.categories._update(category)
+        with pytest.raises(KeyError):
+            alchemy_store.categories.get_by_name(old_name)
+        result = alchemy_store.activities.get_by_composite(activity.name, category)
+        assert result.category == category
+
+    def test_activity_update_invalidates(self, alchemy_store, alchemy_activity):
+        activity = alchemy_store.activities.get_by_composite(alchemy_activity.name,
+            alchemy_activity.category)
+        old_name = activity.name
+        activity.name += 'foo'
+        alchemy_store.activities._update(activity)
+        with pytest.raises(KeyError):
+            alchemy_store.activities.get_by_composite(old_name, activity.category)
+
+    def test_tag_remove_invalidates(self, alchemy_store, alchemy_tag):
+        tag = alchemy_store.tags.get_by_name(alchemy_tag.name)
+        alchemy_store.tags.remove(tag)
+        with pytest.raises(KeyError):
+            alchemy_store.tags.get_by_name(tag.name)
+
+    def test_invalidated_after_commit(self, alchemy_store, alchemy_tag, mocker):
+        """Make sure no other thread can cache the previous state before we commit."""
+        tag = alchemy_store.tags.get_by_name(alchemy_tag.name)
+        calls = []
+        mocker.patch.object(alchemy_store.session, 'commit',
+            side_effect=lambda: calls.append('commit'))
+        mocker.patch.object(alchemy_store.cache, 'invalidate',
+            side_effect=lambda *args: calls.append('invalidate'))
+        tag.name += 'foo'
+        alchemy_store.tags._update(tag)
+        assert calls == ['commit', 'invalidate']
+
+    def test_invalidated_after_rollback(self, alchemy_store):
+        """Make sure a failed commit is rolled back and still invalidates."""
+        tag = alchemy_store.tags.save(Tag('foo'))
+        other = alchemy_store.tags.save(Tag('bar'))
+        old_name = tag.name
+        alchemy_store.tags.get_by_name(old_name)
+        tag.name = other.name
+        with pytest.raises(ValueError):
+            alchemy_store.tags._update(tag)
+        assert alchemy_store.cache.get('tags', old_name) is None
+        assert not alchemy_store.session.dirty
+        assert alchemy_store.tags.get_by_name(old_name).pk == tag.pk
+
+
+def fact_with_new_timeframe(fact, days):
+    """Return a copy of ``fact`` moved by ``days``."""
+    offset = datetime.timedelta(days=days)
+    return Fact(fact.activity, fact.start + offset, fact.end + offset,
+        description=fact.description, tags=fact.tags)
+
+
+class TestSessionScope(object):
+    """Make sure a store can be shared by several threads."""
+
+    @pytest.fixture
+    def file_store(self, alchemy_config, tmpdir):
+        config = alchemy_config.copy()
+        config['db_path'] = os.path.join(tmpdir.strpath, 'hamster.sqlite')
+        store = SQLAlchemyStore(config)
+        yield store
+        store.cleanup()
+
+    def run_threaded(self, function, count=4):
+        """Call ``function(index)`` in ``count`` threads and return their results."""
+        results = [None] * count
+
+        def run(index):
+            results[index] = function(index)
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_session_per_thread(self, file_store):
+        sessions = self.run_threaded(lambda index: file_store.session())
+        assert len(set(id(session) for session in sessions)) == 4
+        assert file_store.session() not in sessions
+
+    def test_session_scope_commits(self, file_store, category):
+        with file_store.session_scope() as session:
+            session.add(AlchemyCategory(None, category.name))
+        assert not file_store.session().new
+        assert file_store.categories.get_by_name(category.name)
+
+    def test_session_scope_rolls_back(self, file_store, category):
+        with pytest.raises(RuntimeError):
+            with file_store.session_scope() as session:
+                session.add(AlchemyCategory(None, category.name))
+                session.flush()
+                raise RuntimeError()
+        assert file_store.session.query(AlchemyCategory).count() == 0
+
+    def test_session_scope_removes_session(self, file_store):
+        with file_store.session_scope() as session:
+            pass
+        assert file_store.session() is not session
+
+    def test_concurrent_saves(self, file_store):
+        """Make sure threads saving facts at the same time do not interfere."""
+        start = datetime.datetime(2017, 1, 1, 9)
+        # Concurrently creating the same tag is a race we can not prevent, see
+        # ``SQLAlchemyStore``.
+        file_store.tags.save(Tag('shared'))
+
+        def save_facts(index):
+            with file_store.session_scope():
+                for day in range(5):
+                    fact_start = start + datetime.timedelta(days=day, hours=index)
+                    fact = Fact(Activity('activity {}'.format(index)), fact_start,
+                        fact_start + datetime.timedelta(minutes=30), tags=[Tag('shared')])
+                    file_store.facts.save(fact)
+            return True
+
+        assert self.run_threaded(save_facts) == [True] * 4
+        assert len(file_store.facts.get_all()) == 20
+        assert len(file_store.tags.get_all()) == 1
@@ -0,0 +1,250 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+from hamster_lib import Activity, Category, Fact, Tag
+from hamster_lib.backends.sqlalchemy import objects, totals
+from hamster_lib.backends.sqlalchemy.storage import SQLAlchemyStore
+from sqlalchemy import func, inspect, select
+
+from . import common
+
+
+@pytest.fixture
+def alchemy_config(alchemy_config):
+    """Enable daily totals for all stores in this module."""
+    config = alchemy_config.copy()
+    config['daily_totals'] = True
+    return config
+
+
+@pytest.fixture(params=(
+    (),
+    ('day',),
+    ('activity',),
+    ('category',),
+    ('tag',),
+    ('day', 'activity', 'tag'),
+    ('day', 'category'),
+))
+def group_by_parametrized(request):
+    return request.param
+
+
+@pytest.fixture
+def facts(alchemy_store):
+    """Add a set of facts spanning several workdays through our manager."""
+    work, home = Category('work'), Category('home')
+    activities = (Activity('coding', category=work), Activity('coding', category=home),
+        Activity('reading'))
+    tags = (Tag('foo'), Tag('bar'))
+    start = datetime.datetime(2017, 3, 1, 22, 0)
+    result = []
+    for index in range(9):
+        fact = Fact(activities[index % 3], start, start + datetime.timedelta(hours=index + 1),
+            tags=tags[:index % 3])
+        result.append(alchemy_store.facts._add(fact))
+        start += datetime.timedelta(hours=index + 2)
+    return result
+
+
+def get_rows(store):
+    """Return all rows of ``daily_totals``."""
+    return set(tuple(row) for row in store.session.execute(objects.daily_totals.select()))
+
+
+def get_trigger_names(store):
+    return set(row[0] for row in store.session.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'daily_totals%'"))
+
+
+def get_expectation(store, group_by, start=None, end=None):
+    """Compute totals from all facts."""
+    facts = store.facts._get_all()
+    return store.facts._aggregate_totals(facts, start, end, group_by)
+
+
+class TestDailyTotals(object):
+    def test_setup_disabled_keeps_table(self, alchemy_store, alchemy_config, facts):
+        """Make sure disabling totals neither drops the table nor lets it go stale."""
+        config = alchemy_config.copy()
+        config['daily_totals'] = False
+        store = SQLAlchemyStore(config, common.Session)
+        assert 'daily_totals' in inspect(store.session.connection()).get_table_names()
+        assert store.totals.enabled is False
+        store.facts.remove(facts[0])
+        result = alchemy_store.facts.get_totals(group_by=('day', 'activity', 'tag'))
+        assert result == get_expectation(alchemy_store, ('day', 'activity', 'tag'))
+
+    def test_setup_builds_missing_table(self, alchemy_store, alchemy_config, facts):
+        """Make sure enabling totals on an existing database populates the table."""
+        expectation = alchemy_store.facts.get_totals(group_by=('day', 'activity', 'tag'))
+        objects.daily_totals.drop(alchemy_store.session.connection())
+        store = SQLAlchemyStore(alchemy_config, common.Session)
+        assert store.facts.get_totals(group_by=('day', 'activity', 'tag')) == expectation
+
+    def test_setup_adds_missing_triggers(self, alchemy_store, alchemy_config, facts):
+        """Make sure tables of earlier versions get their triggers and are rebuilt."""
+        expectation = alchemy_store.facts.get_totals(group_by=('day', 'activity', 'tag'))
+        connection = alchemy_store.session.connection()
+        for name, event, body in totals.TRIGGERS:
+            connection.execute('DROP TRIGGER {}'.format(name))
+        objects.daily_totals_log.drop(connection)
+        connection.execute(objects.daily_totals.delete())
+        store = SQLAlchemyStore(alchemy_config, common.Session)
+        assert store.facts.get_totals(group_by=('day', 'activity', 'tag')) == expectation
+        assert get_trigger_names(store) == set(name for name, event, body in totals.TRIGGERS)
+
+    def test_setup_rebuilds_for_new_day_start(self, alchemy_store, alchemy_config,
+            alchemy_activity, mocker):
+        """Make sure reopening with another ``day_start`` moves facts to their new workday."""
+        config = alchemy_config.copy()
+        config['day_start'] = datetime.time(0, 0)
+        store = SQLAlchemyStore(config, common.Session)
+        fact = store.facts._add(Fact(alchemy_activity, datetime.datetime(2020, 1, 1, 3, 0),
+            datetime.datetime(2020, 1, 1, 4, 0)))
+        assert [row[0] for row in store.facts.get_totals(group_by=('day',))] == [
+            datetime.date(2020, 1, 1)]
+
+        config['day_start'] = datetime.time(5, 0)
+        store = SQLAlchemyStore(config, common.Session)
+        store.logger = mocker.MagicMock()
+        assert [row[0] for row in store.facts.get_totals(group_by=('day',))] == [
+            datetime.date(2019, 12, 31)]
+        store.facts.remove(fact)
+        assert get_rows(store) == set()
+        assert not store.logger.error.called
+
+    def test_sync_rebuilds_for_new_day_start(self, alchemy_store, alchemy_config, facts):
+        """Make sure changes are not folded into a table built with another ``day_start``."""
+        config = alchemy_config.copy()
+        config['day_start'] = datetime.time((alchemy_config['day_start'].hour + 5) % 24)
+        store = SQLAlchemyStore(config, common.Session)
+        alchemy_store.facts.remove(facts[0])
+        result = store.facts.get_totals(group_by=('day', 'activity', 'tag'))
+        assert result == get_expectation(store, ('day', 'activity', 'tag'))
+
+    def test_drop(self, alchemy_store, facts):
+        alchemy_store.totals.drop()
+        assert alchemy_store.totals.enabled is False
+        assert not get_trigger_names(alchemy_store)
+        table_names = inspect(alchemy_store.session.connection()).get_table_names()
+        assert not set(table_names) & set(['daily_totals', 'daily_totals_log',
+            'daily_totals_meta'])
+        alchemy_store.facts.remove(facts[0])
+
+    def test_add(self, alchemy_store, facts, group_by_parametrized):
+        """Make sure totals of added facts match those computed from raw facts."""
+        result = alchemy_store.facts.get_totals(group_by=group_by_parametrized)
+        assert result
+        assert result == get_expectation(alchemy_store, group_by_parametrized)
+
+    def test_update(self, alchemy_store, facts, group_by_parametrized):
+        fact = facts[4]
+        fact.start -= datetime.timedelta(minutes=30)
+        fact.activity = facts[0].activity
+        fact.tags = set([Tag('baz')])
+        alchemy_store.facts._update(fact)
+        result = alchemy_store.facts.get_totals(group_by=group_by_parametrized)
+        assert result == get_expectation(alchemy_store, group_by_parametrized)
+
+    def test_remove(self, alchemy_store, facts, group_by_parametrized):
+        for fact in facts[:5]:
+            alchemy_store.facts.remove(fact)
+        result = alchemy_store.facts.get_totals(group_by=group_by_parametrized)
+        assert result == get_expectation(alchemy_store, group_by_parametrized)
+
+    def test_remove_all(self, alchemy_store, facts):
+        """Make sure no empty rows are left behind."""
+        for fact in facts:
+            alchemy_store.facts.remove(fact)
+        assert alchemy_store.session.execute(objects.daily_totals.count()).scalar() == 0
+
+    def test_save_many(self, alchemy_store, facts, group_by_parametrized):
+        new_facts = []
+        for fact in facts:
+            fact.pk = None
+            fact.start += datetime.timedelta(days=30)
+            fact.end += datetime.timedelta(days=30)
+            new_facts.append(fact)
+        saved, errors = alchemy_store.facts.save_many(new_facts)
+        assert not errors
+        result = alchemy_store.facts.get_totals(group_by=group_by_parametrized)
+        assert result == get_expectation(alchemy_store, group_by_parametrized)
+
+    def test_remove_tag(self, alchemy_store, facts):
+        alchemy_store.tags.remove(alchemy_store.tags.get_by_name('foo'))
+        result = alchemy_store.facts.get_totals(group_by=('tag',))
+        assert [total.tag.name for total in result] == ['bar']
+
+    def test_changes_by_other_clients(self, alchemy_store, facts, group_by_parametrized):
+        """Make sure facts written without our managers are accounted for as well."""
+        connection = alchemy_store.session.connection()
+        tag_id = alchemy_store.tags.get_by_name('foo').pk
+        connection.execute('UPDATE facts SET start = datetime(start, "-15 minutes") WHERE id = ?',
+            facts[1].pk)
+        connection.execute('DELETE FROM facttags WHERE fact_id = ?', facts[2].pk)
+        connection.execute('INSERT INTO facttags (fact_id, tag_id) VALUES (?, ?)', facts[3].pk,
+            tag_id)
+        connection.execute('DELETE FROM facts WHERE id = ?', facts[4].pk)
+        connection.execute('INSERT INTO facts (start, "end", activity_id) VALUES (?, ?, ?)',
+            '2017-04-01 23:00:00.250000', '2017-04-02 06:00:00', facts[0].activity.pk)
+        alchemy_store.session.commit()
+        result = alchemy_store.facts.get_totals(group_by=group_by_parametrized)
+        assert result == get_expectation(alchemy_store, group_by_parametrized)
+        assert not alchemy_store.session.execute(select([func.count()]).select_from(
+            objects.daily_totals_log)).scalar()
+
+    def test_rebuild(self, alchemy_store, facts):
+        """Make sure a rebuilt table matches the incrementally maintained one."""
+        alchemy_store.facts._add(Fact(Activity('reading'), datetime.datetime(2017, 4, 1, 9,
+            0, 0, 750000), datetime.datetime(2017, 4, 1, 9, 30, 0, 250000)))
+        expectation = get_rows(alchemy_store)
+        alchemy_store.totals.rebuild()
+        assert get_rows(alchemy_store) == expectation
+
+    def test_apply_looks_up_affected_rows(self, alchemy_store, facts, request):
+        """Make sure only the affected rows are read, using the primary key."""
+        statements = request.getfixturevalue('query_counter')
+        activity_id = facts[0].activity.pk
+        alchemy_store.totals.apply({
+            (datetime.date(2017, 3, 1), activity_id, objects.ALL_TAGS): 60,
+            (datetime.date(2017, 3, 9), activity_id, objects.ALL_TAGS): 60,
+        })
+        engine = alchemy_store.session.get_bind()
+        plan = [row[-1] for row in engine.execute('EXPLAIN QUERY PLAN ' + statements[0],
+            ('2017-03-01', activity_id, 0, '2017-03-09', activity_id, 0))]
+        searches = [step for step in plan if step.startswith('SEARCH')]
+        assert len(searches) == 2
+        assert all('(day=? AND activity_id=? AND tag_id=?)' in step for step in searches)
+        assert not any(step.startswith('SCAN') for step in plan)
+
+    @pytest.mark.parametrize(('start', 'end'), (
+        (datetime.date(2017, 3, 2), None),
+        (None, datetime.date(2017, 3, 2)),
+        (datetime.date(2017, 3, 2), datetime.date(2017, 3, 3)),
+    ))
+    def test_timeframe(self, alchemy_store, facts, start, end):
+        """Make sure only the requested workdays are considered, including partial facts."""
+        result = alchemy_store.facts.get_totals(start, end, group_by=('day', 'activity'))
+        assert result == get_expectation(alchemy_store, ('day', 'activity'), start, end)
+        assert all((not start or total.day >= start) and (not end or total.day <= end)
+            for total in result)
+
+    def test_no_facts_loaded(self, alchemy_store, facts, request):
+        """Make sure totals are answered without touching the facts table."""
+        statements = request.getfixturevalue('query_counter')
+        alchemy_store.facts.get_totals(group_by=('day', 'activity', 'tag'))
+        assert statements
+        assert not [statement for statement in statements if 'facts' in statement]
+
+    def test_disabled(self, alchemy_store, alchemy_config, facts, group_by_parametrized):
+        """Make sure totals computed from raw facts match those of our table."""
+        expectation = alchemy_store.facts.get_totals(group_by=group_by_parametrized)
+        config = alchemy_config.copy()
+        config['daily_totals'] = False
+        store = SQLAlchemyStore(config, common.Session)
+        assert store.facts.get_totals(group_by=group_by_parametrized) == expectation
@@ -0,0 +1,182 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+from hamster_lib import Activity, Category, Fact
+from hamster_lib.backends.sqlalchemy import objects, usage
+from hamster_lib.backends.sqlalchemy.storage import SQLAlchemyStore
+from sqlalchemy import select
+
+from . import common
+
+START = datetime.datetime(2017, 3, 1, 8)
+HOUR = datetime.timedelta(hours=1)
+
+
+@pytest.fixture(params=(True, False))
+def triggered(request, alchemy_store):
+    """Maintain activity usage by triggers as on SQLite, or by ``FactManager`` as elsewhere."""
+    if not request.param:
+        drop_triggers(alchemy_store)
+        alchemy_store.usage.triggered = False
+    return request.param
+
+
+@pytest.fixture
+def facts(alchemy_store, triggered):
+    """Add facts of three activities, one hour apart."""
+    activities = (Activity('coding', category=Category('work')), Activity('reading'),
+        Activity('cooking'))
+    return [alchemy_store.facts._add(Fact(activities[index], START + position * HOUR,
+        START + position * HOUR + HOUR / 2)) for position, index in enumerate((0, 1, 0, 2, 0, 1))]
+
+
+def get_usage(store):
+    """Return all rows of ``activity_usage``."""
+    table = objects.activity_usage
+    return set(tuple(row) for row in store.session.execute(select([table.c.activity_id,
+        table.c.fact_count, table.c.last_used])))
+
+
+def drop_triggers(store):
+    connection = store.session.connection()
+    for name, event, body in usage.TRIGGERS:
+        connection.execute('DROP TRIGGER {}'.format(name))
+
+
+def assert_consistent(store):
+    """Make sure the incrementally maintained table matches a rebuilt one."""
+    usage = get_usage(store)
+    store.usage.rebuild()
+    assert get_usage(store) == usage
+
+
+class TestActivityUsage(object):
+    def test_add(self, alchemy_store, facts):
+        assert get_usage(alchemy_store) == {
+            (facts[0].activity.pk, 3, facts[4].start),
+            (facts[1].activity.pk, 2, facts[5].start),
+            (facts[3].activity.pk, 1, facts[3].start),
+        }
+        assert_consistent(alchemy_store)
+
+    def test_add_many(self, alchemy_store, facts):
+        start = facts[-1].end
+        saved, failed = alchemy_store.facts._add_many([
+            Fact(Activity('reading'), start + HOUR, start + 2 * HOUR),
+            Fact(Activity('painting'), start + 3 * HOUR, start + 4 * HOUR),
+            Fact(Activity('reading'), start + 2 * HOUR, start + 3 * HOUR),
+        ])
+        assert len(saved) == 3
+        assert (facts[1].activity.pk, 4, start + 2 * HOUR) in get_usage(alchemy_store)
+        assert_consistent(alchemy_store)
+
+    def test_update(self, alchemy_store, facts):
+        """Make sure both, the previous and the new activity are accounted for."""
+        fact = facts[5]
+        fact.activity = facts[3].activity
+        fact.start, fact.end = START - 2 * HOUR, START - HOUR
+        alchemy_store.facts._update(fact)
+        assert (facts[1].activity.pk, 1, facts[1].start) in get_usage(alchemy_store)
+        assert (facts[3].activity.pk, 2, facts[3].start) in get_usage(alchemy_store)
+        assert_consistent(alchemy_store)
+
+    def test_remove(self, alchemy_store, facts):
+        alchemy_store.facts.remove(facts[4])
+        alchemy_store.facts.remove(facts[3])
+        assert get_usage(alchemy_store) == {
+            (facts[0].activity.pk, 2, facts[2].start),
+            (facts[1].activity.pk, 2, facts[5].start),
+        }
+        assert_consistent(alchemy_store)
+
+    def test_setup_populates_table(self, alchemy_store, alchemy_config, facts):
+        """Make sure databases predating the table get it populated."""
+        usage = get_usage(alchemy_store)
+        alchemy_store.session.execute(objects.activity_usage.delete())
+        alchemy_store.session.commit()
+        store = SQLAlchemyStore(alchemy_config, common.Session)
+        assert get_usage(store) == usage
+
+    def test_setup_empty_database(self, alchemy_store):
+        assert not alchemy_store.usage.setup(alchemy_store.session.connection())
+
+    @pytest.mark.parametrize('triggered', (True,), indirect=True)
+    def test_setup_adds_missing_triggers(self, alchemy_store, alchemy_config, facts):
+        """Make sure facts written before the triggers existed are counted."""
+        drop_triggers(alchemy_store)
+        alchemy_store.session.execute(objects.facts.delete().where(
+            objects.facts.c.id == facts[3].pk))
+        alchemy_store.session.commit()
+        store = SQLAlchemyStore(alchemy_config, common.Session)
+        assert store.usage.triggered
+        assert facts[3].activity.pk not in [row[0] for row in get_usage(store)]
+        assert_consistent(store)
+
+    def test_setup_rebuilds_stale_table(self, alchemy_store, facts):
+        """Make sure a table not matching the facts is rebuilt."""
+        expectation = get_usage(alchemy_store)
+        alchemy_store.session.execute(objects.activity_usage.update().where(
+            objects.activity_usage.c.activity_id == facts[0].activity.pk).values(fact_count=1))
+        assert alchemy_store.usage.setup(alchemy_store.session.connection())
+        assert get_usage(alchemy_store) == expectation
+
+    @pytest.mark.parametrize('triggered', (True,), indirect=True)
+    def test_written_by_other_clients(self, alchemy_store, facts):
+        """Make sure facts written without our managers are counted on SQLite."""
+        facts_table = objects.facts
+        alchemy_store.session.execute(facts_table.insert().values(activity_id=facts[3].activity.pk,
+            start=START - HOUR, end=START - HOUR / 2))
+        alchemy_store.session.execute(facts_table.update().where(
+            facts_table.c.id == facts[4].pk).values(activity_id=facts[3].activity.pk))
+        alchemy_store.session.execute(facts_table.delete().where(facts_table.c.id == facts[1].pk))
+        assert get_usage(alchemy_store) == {
+            (facts[0].activity.pk, 2, facts[2].start),
+            (facts[1].activity.pk, 1, facts[5].start),
+            (facts[3].activity.pk, 3, facts[4].start),
+        }
+        assert_consistent(alchemy_store)
+
+
+class TestGetUsage(object):
+    def test_get_recent(self, alchemy_store, facts):
+        result = alchemy_store.activities.get_recent()
+        assert [(usage.activity, usage.count, usage.last_used) for usage in result] == [
+            (facts[5].activity, 2, facts[5].start),
+            (facts[4].activity, 3, facts[4].start),
+            (facts[3].activity, 1, facts[3].start),
+        ]
+
+    def test_get_recent_limit(self, alchemy_store, facts):
+        assert [usage.activity for usage in alchemy_store.activities.get_recent(1)] == [
+            facts[5].activity]
+
+    def test_get_frequent(self, alchemy_store, facts):
+        result = alchemy_store.activities.get_frequent()
+        assert [(usage.activity, usage.count) for usage in result] == [
+            (facts[0].activity, 3), (facts[1].activity, 2), (facts[3].activity, 1)]
+
+    def test_deleted_activities_left_out(self, alchemy_store, facts):
+        activity = alchemy_store.activities.get(facts[0].activity.pk)
+        activity.name = 'hacking'
+        activity.deleted = True
+        alchemy_store.activities._update(activity)
+        assert facts[0].activity.pk not in [usage.activity.pk
+            for usage in alchemy_store.activities.get_frequent()]
+
+    @pytest.mark.parametrize(('method', 'index'), (
+        ('get_recent', 'ix_activity_usage_last_used'),
+        ('get_frequent', 'ix_activity_usage_fact_count'),
+    ))
+    def test_uses_index(self, alchemy_store, facts, request, method, index):
+        """Make sure the top activities are read from an index rather than sorted."""
+        query_counter = request.getfixturevalue('query_counter')
+        getattr(alchemy_store.activities, method)(limit=2)
+        engine = alchemy_store.session.get_bind()
+        plan = [row[-1] for row in engine.execute('EXPLAIN QUERY PLAN ' + query_counter[-1],
+            (2, 0))]
+        assert index in plan[0]
+        assert not any('TEMP B-TREE' in step for step in plan)
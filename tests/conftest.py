@@ -4,10 +4,10 @@
 
 import datetime
 import os.path
-import pickle
 
 import fauxfactory
 import pytest
+from hamster_lib.helpers import helpers
 from pytest_factoryboy import register
 
 from .hamster_lib import factories as lib_factories
@@ -26,8 +26,7 @@ def tmp_fact(base_config, fact_factory):
     # fixture.
     fact = fact_factory()
     fact.end = None
-    with open(base_config['tmpfile_path'], 'wb') as fobj:
-        pickle.dump(fact, fobj)
+    helpers._dump_tmp_fact(base_config['tmpfile_path'], fact)
     return fact
 
 
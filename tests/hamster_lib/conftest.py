@@ -5,6 +5,7 @@
 from __future__ import unicode_literals
 
 import datetime
+import sys
 
 import faker as faker_
 import pytest
@@ -21,6 +22,9 @@ register(factories.FactFactory)
 
 faker = faker_.Faker()
 
+# ``hamster_lib.aio`` uses python 3.6 syntax and APIs.
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 6) else []
+
 
 def convert_time_to_datetime(time_string):
     """
@@ -0,0 +1,138 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import asyncio
+import datetime
+import os.path
+import threading
+
+import pytest
+from hamster_lib import Activity, Fact
+from hamster_lib.aio import AsyncHamsterControl
+
+
+@pytest.fixture
+def async_config(base_config, tmpdir):
+    """Provide a config using a database file, so all worker threads see the same data."""
+    config = base_config.copy()
+    config['db_path'] = os.path.join(tmpdir.strpath, 'hamster.sqlite')
+    return config
+
+
+@pytest.fixture
+def run():
+    """Provide a function running a coroutine to completion on a fresh event loop."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def async_control(async_config, run):
+    control = AsyncHamsterControl(async_config, max_pending_bulk=1)
+    yield control
+    run(control.close())
+
+
+def get_facts(count):
+    start = datetime.datetime(2017, 1, 1, 9)
+    return [Fact(Activity('foo'), start + datetime.timedelta(hours=index),
+        start + datetime.timedelta(hours=index, minutes=30)) for index in range(count)]
+
+
+class TestAsyncHamsterControl(object):
+    def test_save_and_get(self, async_control, run):
+        """Make sure manager methods can be awaited and return the usual results."""
+        fact = run(async_control.facts.save(get_facts(1)[0]))
+        assert fact.pk
+        assert run(async_control.facts.get(fact.pk)) == fact
+        assert [activity.name for activity in run(async_control.activities.get_all())] == [
+            'foo']
+
+    def test_iter_all(self, async_control, run):
+        """Make sure facts can be iterated asynchronously in batches."""
+        saved, errors = async_control.control.facts.save_many(get_facts(5))
+
+        async def collect():
+            return [fact async for fact in async_control.facts.iter_all(batch_size=2)]
+        assert run(collect()) == saved
+
+    def test_iter_all_positional_batch_size(self, async_control, run):
+        """Make sure ``batch_size`` is honoured when passed positionally, just like in sync."""
+        async_control.control.facts.save_many(get_facts(5))
+        iterator = async_control.facts.iter_all(None, None, '', 2)
+        assert iterator.batch_size == 2
+
+        async def collect():
+            return [fact async for fact in iterator]
+        assert len(run(collect())) == 5
+
+    def test_iter_all_invalid_arguments(self, async_control):
+        with pytest.raises(TypeError):
+            async_control.facts.iter_all(None, None, '', 2, 'foo')
+
+    def test_private_attributes_not_wrapped(self, async_control):
+        assert async_control.facts._get_all == async_control.control.facts._get_all
+
+    def test_errors_are_raised(self, async_control, run):
+        with pytest.raises(KeyError):
+            run(async_control.facts.get(42))
+
+    def test_bulk_calls_do_not_block_interactive_ones(self, async_control, run, mocker):
+        """Make sure a stalled export leaves interactive calls unaffected."""
+        release = threading.Event()
+        mocker.patch.object(async_control.control.facts, 'get_all',
+            side_effect=lambda *args, **kwargs: release.wait(5) and [])
+
+        async def scenario():
+            exports = [asyncio.ensure_future(async_control.facts.get_all()) for i in range(3)]
+            fact = await asyncio.wait_for(async_control.facts.save(get_facts(1)[0]), 5)
+            assert not any(export.done() for export in exports)
+            release.set()
+            await asyncio.gather(*exports)
+            return fact
+        assert run(scenario()).pk
+
+    @pytest.mark.parametrize(('method', 'bulk'), (
+        ('get_all', True),
+        ('get_records', True),
+        ('get_columns', True),
+        ('search', True),
+        ('get_totals', True),
+        ('save_many', True),
+        ('get', False),
+        ('save', False),
+        ('get_page', False),
+    ))
+    def test_lanes(self, async_control, run, mocker, method, bulk):
+        """Make sure methods reading or writing many facts run in the bulk lane."""
+        mocker.patch.object(async_control.control.facts, method,
+            side_effect=lambda *args, **kwargs: threading.current_thread().name)
+        thread_name = run(getattr(async_control.facts, method)())
+        assert thread_name.startswith('hamster-lib-bulk') is bulk
+
+    def test_backpressure(self, async_control, run, mocker):
+        """Make sure no more than ``max_pending_bulk`` bulk calls are handed to workers."""
+        running = []
+        concurrency = []
+
+        def get_all(*args, **kwargs):
+            running.append(True)
+            concurrency.append(len(running))
+            threading.Event().wait(0.01)
+            running.pop()
+            return []
+        mocker.patch.object(async_control.control.facts, 'get_all', side_effect=get_all)
+
+        async def scenario():
+            await asyncio.gather(*[async_control.facts.get_all() for i in range(5)])
+            return async_control._bulk._semaphore._value
+        assert run(scenario()) == 1
+        assert concurrency == [1] * 5
+
+    def test_close(self, async_config, run, mocker):
+        control = AsyncHamsterControl(async_config)
+        cleanup = mocker.patch.object(control.control.store, 'cleanup')
+        run(control.close())
+        assert cleanup.called
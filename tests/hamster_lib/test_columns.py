@@ -0,0 +1,115 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import ast
+import datetime
+import io
+import zipfile
+
+import pytest
+from hamster_lib import columns
+from hamster_lib.columns import FactColumns
+
+
+@pytest.fixture
+def fact_columns():
+    result = FactColumns()
+    result.extend([(1, 3600, 5400, 10, None), (2, 7200, 9000, 11, 5)],
+        {10: 'foo', 11: 'bä'}, {5: 'spam'})
+    result.extend([(3, 9000, 9060, 10, 5)], {10: 'foo'}, {5: 'spam'})
+    return result
+
+
+def read_npy(content):
+    """Return header and data of an ``.npy`` file."""
+    assert content[:8] == b'\x93NUMPY\x01\x00'
+    length = content[8] + content[9] * 256
+    assert (10 + length) % 64 == 0
+    return ast.literal_eval(content[10:10 + length].decode('latin-1')), content[10 + length:]
+
+
+@pytest.mark.parametrize(('moment', 'expectation'), (
+    (datetime.datetime(1970, 1, 1), 0),
+    (datetime.datetime(2015, 4, 1, 9, 30, 15, 999999), 1427880615),
+    (datetime.datetime(1969, 12, 31, 23, 59), -60),
+))
+def test_epoch_seconds(moment, expectation):
+    assert columns.epoch_seconds(moment) == expectation
+
+
+class TestFactColumns(object):
+    def test_append(self, fact_columns):
+        assert len(fact_columns) == 3
+        assert list(fact_columns.pk) == [1, 2, 3]
+        assert list(fact_columns.start) == [3600, 7200, 9000]
+        assert list(fact_columns.end) == [5400, 9000, 9060]
+        assert list(fact_columns.duration) == [1800.0, 1800.0, 60.0]
+
+    def test_extend_nothing(self, fact_columns):
+        fact_columns.extend([], {}, {})
+        assert len(fact_columns) == 3
+
+    def test_dictionary_encoding(self, fact_columns):
+        """Make sure names are listed once and facts without category get ``-1``."""
+        assert fact_columns.activities == ['foo', 'bä']
+        assert list(fact_columns.activity) == [0, 1, 0]
+        assert fact_columns.categories == ['spam']
+        assert list(fact_columns.category) == [-1, 0, 0]
+
+    def test_from_records(self, fact):
+        """Make sure activities are told apart by name and category."""
+        fact.pk = 1
+        other = fact.as_record()._replace(pk=2, category=None)
+        result = FactColumns.from_records([fact.as_record(), other, fact.as_record()])
+        assert result.activities == [fact.activity.name, fact.activity.name]
+        assert list(result.activity) == [0, 1, 0]
+        assert list(result.category) == [0, -1, 0]
+        assert list(result.start) == [columns.epoch_seconds(fact.start)] * 3
+
+    def test_write_npz(self, fact_columns):
+        """Make sure we write a valid archive without NumPy."""
+        output = io.BytesIO()
+        fact_columns.write_npz(output)
+        archive = zipfile.ZipFile(output)
+        assert sorted(archive.namelist()) == sorted('{}.npy'.format(name) for name in (
+            'pk', 'start', 'end', 'duration', 'activity', 'category', 'activities',
+            'categories'))
+        header, data = read_npy(archive.read('start.npy'))
+        assert header['descr'][1:] == 'i8'
+        assert header['shape'] == (3,)
+        assert data == fact_columns.start.tobytes()
+        header, data = read_npy(archive.read('activities.npy'))
+        assert header == {'descr': '<U3', 'fortran_order': False, 'shape': (2,)}
+        assert data.decode('utf-32-le') == 'foobä\0'
+
+    def test_write_npz_empty(self):
+        output = io.BytesIO()
+        FactColumns().write_npz(output)
+        header, data = read_npy(zipfile.ZipFile(output).read('categories.npy'))
+        assert header['shape'] == (0,)
+        assert data == b''
+
+    def test_to_numpy_without_numpy(self, fact_columns, monkeypatch):
+        monkeypatch.setattr(columns, 'numpy', None)
+        with pytest.raises(ImportError):
+            fact_columns.to_numpy()
+
+    def test_to_numpy(self, fact_columns):
+        numpy = pytest.importorskip('numpy')
+        result = fact_columns.to_numpy()
+        assert result['start'].dtype == numpy.int64
+        assert result['duration'].dtype == numpy.float64
+        assert list(result['activities'][result['activity']]) == ['foo', 'bä', 'foo']
+
+    def test_load_npz(self, fact_columns):
+        """Make sure NumPy reads what we write."""
+        numpy = pytest.importorskip('numpy')
+        output = io.BytesIO()
+        fact_columns.write_npz(output)
+        output.seek(0)
+        result = numpy.load(output)
+        expectation = fact_columns.to_numpy()
+        for name in expectation:
+            assert (result[name] == expectation[name]).all()
+            assert result[name].dtype == expectation[name].dtype
@@ -0,0 +1,151 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+from hamster_lib import Activity, Category, Fact, Tag
+from hamster_lib.completion import CompletionIndex, Entry, Suggestion, get_activity_text
+
+
+@pytest.fixture
+def entries():
+    return [
+        Entry('activities', 1, 'coding@work', 3),
+        Entry('activities', 2, 'Cooking', 5),
+        Entry('activities', 3, 'cleaning@home', 0),
+        Entry('activities', 4, 'reading', 9),
+        Entry('categories', 1, 'work', 3),
+        Entry('categories', 2, 'home', 0),
+        Entry('tags', 1, 'hamster', 1),
+    ]
+
+
+@pytest.fixture
+def index(entries):
+    return CompletionIndex(lambda: entries)
+
+
+class TestGetActivityText(object):
+    @pytest.mark.parametrize(('name', 'category_name', 'expectation'), (
+        ('coding', 'work', 'coding@work'),
+        ('coding', None, 'coding'),
+    ))
+    def test_get_activity_text(self, name, category_name, expectation):
+        assert get_activity_text(name, category_name) == expectation
+
+
+class TestCompletionIndex(object):
+    def test_loaded_lazily(self, entries):
+        calls = []
+
+        def load():
+            calls.append(True)
+            return entries
+
+        index = CompletionIndex(load)
+        assert not index.loaded
+        index.complete('tags', 'h')
+        index.complete('tags', 'h')
+        assert index.loaded
+        assert len(calls) == 1
+        assert len(index) == len(entries)
+
+    def test_complete_ranked_by_score(self, index):
+        """Make sure matches are ordered by descending score, then by text."""
+        assert index.complete('activities', 'c') == [
+            Suggestion('Cooking', 2, 5),
+            Suggestion('coding@work', 1, 3),
+            Suggestion('cleaning@home', 3, 0),
+        ]
+
+    def test_complete_many_matches(self, index):
+        """Make sure prefixes matching most entries rank just the same."""
+        assert index.complete('activities', 'c', limit=1) == [Suggestion('Cooking', 2, 5)]
+        assert [s.pk for s in index.complete('activities', '', limit=2)] == [4, 2]
+
+    def test_complete_case_insensitive(self, index):
+        assert [s.pk for s in index.complete('activities', 'COO')] == [2]
+
+    def test_complete_matches_prefix_only(self, index):
+        assert index.complete('activities', 'work') == []
+
+    def test_complete_empty_prefix(self, index):
+        assert [s.pk for s in index.complete('categories', '')] == [1, 2]
+
+    def test_complete_limit(self, index):
+        assert [s.pk for s in index.complete('activities', 'c', limit=2)] == [2, 1]
+
+    def test_complete_namespaces_are_separate(self, index):
+        assert [s.text for s in index.complete('tags', '')] == ['hamster']
+
+    def test_put_new(self, index):
+        index.complete('tags', '')
+        index.put('tags', 2, 'Hobby')
+        assert index.complete('tags', 'h') == [Suggestion('hamster', 1, 1),
+            Suggestion('Hobby', 2, 0)]
+
+    def test_put_renames_keeping_score(self, index):
+        index.complete('tags', '')
+        index.put('tags', 1, 'rodent')
+        assert index.complete('tags', 'h') == []
+        assert index.complete('tags', 'r') == [Suggestion('rodent', 1, 1)]
+
+    def test_put_not_loaded(self, index):
+        """Make sure writes before the first completion do not load the index."""
+        index.put('tags', 2, 'hobby')
+        assert not index.loaded
+        assert len(index) == 0
+
+    def test_remove(self, index):
+        index.complete('tags', '')
+        index.remove('activities', 2)
+        index.remove('activities', 42)
+        assert [s.pk for s in index.complete('activities', 'c')] == [1, 3]
+
+    def test_add_usage(self, index):
+        index.complete('tags', '')
+        index.add_usage('activities', 3, 10)
+        index.add_usage('activities', 2, -10)
+        index.add_usage('activities', 42)
+        assert index.complete('activities', 'c') == [
+            Suggestion('cleaning@home', 3, 10),
+            Suggestion('coding@work', 1, 3),
+            Suggestion('Cooking', 2, 0),
+        ]
+
+    def test_put_activity(self, index):
+        index.complete('tags', '')
+        index.put_activity(Activity('cleaning', pk=3, category=Category('house', pk=2)))
+        index.put_activity(Activity('cooking', pk=2, deleted=True))
+        assert index.complete('activities', 'c') == [Suggestion('coding@work', 1, 3),
+            Suggestion('cleaning@house', 3, 0)]
+        assert index.complete('categories', 'h') == [Suggestion('house', 2, 0)]
+
+    def test_add_fact_usage(self, index):
+        index.complete('tags', '')
+        start = datetime.datetime.now() - datetime.timedelta(hours=1)
+        fact = Fact(Activity('coding', pk=1, category=Category('work', pk=1)), start,
+            tags=[Tag('hamster', pk=1)])
+        index.add_fact_usage(fact)
+        index.add_fact_usage(fact)
+        assert index.complete('activities', 'cod')[0].score == 5
+        assert index.complete('categories', 'w')[0].score == 5
+        assert index.complete('tags', 'h')[0].score == 3
+        index.add_fact_usage(fact, -1)
+        assert index.complete('activities', 'cod')[0].score == 4
+
+    def test_add_fact_usage_old_fact(self, index):
+        """Make sure facts outside the recent window do not change scores."""
+        index.complete('tags', '')
+        start = datetime.datetime(2000, 1, 1, 8)
+        index.add_fact_usage(Fact(Activity('coding', pk=1), start))
+        assert index.complete('activities', 'cod')[0].score == 3
+
+    def test_clear(self, index, entries):
+        index.complete('tags', '')
+        index.put('tags', 2, 'hobby')
+        index.clear()
+        assert not index.loaded
+        assert len(index.complete('tags', 'h')) == 1
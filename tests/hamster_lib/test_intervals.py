@@ -0,0 +1,100 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+from hamster_lib import intervals
+from hamster_lib.columns import epoch_seconds
+from hamster_lib.helpers import time as time_helpers
+
+HOUR = 3600
+DAY = 86400
+
+
+@pytest.fixture(params=('numpy', 'python'))
+def implementation(request, monkeypatch):
+    """Run a test against the NumPy as well as the pure python implementation."""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(intervals, 'numpy', None)
+    return request.param
+
+
+def test_get_ranges(fact):
+    starts, ends = intervals.get_ranges([fact])
+    assert list(starts) == [epoch_seconds(fact.start)]
+    assert list(ends) == [epoch_seconds(fact.end)]
+
+
+def test_durations(implementation):
+    assert list(intervals.durations([0, HOUR], [60, 3 * HOUR])) == [60.0, 2 * HOUR]
+
+
+@pytest.mark.parametrize(('starts', 'ends', 'expectation'), (
+    ([], [], []),
+    ([0], [10], [False]),
+    # Touching facts do not overlap.
+    ([0, 10, 20], [10, 20, 30], [False, False, False]),
+    ([20, 0, 5], [30, 10, 8], [False, True, True]),
+    # A long fact overlapping one that does not follow it directly.
+    ([0, 10, 20, 100], [50, 20, 30, 110], [True, True, True, False]),
+    ([0, 0], [10, 10], [True, True]),
+))
+def test_overlapping(implementation, starts, ends, expectation):
+    assert [bool(value) for value in intervals.overlapping(starts, ends)] == expectation
+
+
+@pytest.mark.parametrize(('starts', 'ends', 'expectation'), (
+    ([], [], []),
+    ([0, 10, 35, 60], [10, 20, 45, 70], [False, True, True, False]),
+))
+def test_overlapping_with(implementation, starts, ends, expectation):
+    result = intervals.overlapping_with(starts, ends, [50, 15], [60, 40])
+    assert [bool(value) for value in result] == expectation
+
+
+def test_overlapping_with_nothing(implementation):
+    assert [bool(value) for value in intervals.overlapping_with([0], [10], [], [])] == [False]
+
+
+def test_find_overlaps():
+    starts = [0, 10, 20, 100, 15]
+    ends = [50, 20, 30, 110, 16]
+    assert intervals.find_overlaps(starts, ends) == [(0, 1), (0, 2), (0, 4), (1, 4)]
+
+
+class TestSplitByWorkday(object):
+    def test_single_day(self, implementation):
+        result = intervals.split_by_workday([DAY + 8 * HOUR], [DAY + 9 * HOUR],
+            datetime.time(5, 30))
+        assert [list(column) for column in result] == [[0], [1], [DAY + 8 * HOUR],
+            [DAY + 9 * HOUR]]
+
+    def test_before_day_start(self, implementation):
+        """Make sure a fact before ``day_start`` belongs to the previous workday."""
+        result = intervals.split_by_workday([HOUR], [2 * HOUR], datetime.time(5, 30))
+        assert list(result.day) == [-1]
+
+    def test_several_days(self, implementation):
+        day_start = 5 * HOUR + 30 * 60
+        result = intervals.split_by_workday([0, 20 * HOUR, 30], [10, 2 * DAY + 6 * HOUR, 30],
+            datetime.time(5, 30))
+        assert list(result.index) == [0, 1, 1, 1]
+        assert list(result.day) == [-1, 0, 1, 2]
+        assert list(result.start) == [0, 20 * HOUR, DAY + day_start, 2 * DAY + day_start]
+        assert list(result.end) == [10, DAY + day_start, 2 * DAY + day_start, 2 * DAY + 6 * HOUR]
+
+    def test_matches_time_helpers(self, implementation, fact):
+        """Make sure we split just like ``time.split_by_workday`` does."""
+        config = {'day_start': datetime.time(5, 30)}
+        fact.start = datetime.datetime(2017, 3, 1, 22, 15)
+        fact.end = datetime.datetime(2017, 3, 4, 5, 30)
+        starts, ends = intervals.get_ranges([fact])
+        result = intervals.split_by_workday(starts, ends, config['day_start'])
+        expectation = time_helpers.split_by_workday(fact.start, fact.end, config)
+        assert [(datetime.date(1970, 1, 1) + datetime.timedelta(days=int(day)),
+            datetime.timedelta(seconds=int(end - start))) for day, start, end in zip(
+                result.day, result.start, result.end)] == expectation
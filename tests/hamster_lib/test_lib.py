@@ -31,6 +31,15 @@ class TestController:
         assert controller.config == {}
         assert controller._get_store.called
 
+    def test_update_config_cleans_up_previous_store(self, controller, base_config, mocker):
+        """Make sure the replaced store is cleaned up and shortcuts point to the new one."""
+        previous_store = controller.store
+        mocker.patch.object(previous_store, 'cleanup')
+        controller.update_config(base_config)
+        assert previous_store.cleanup.called
+        assert controller.store is not previous_store
+        assert controller.facts is controller.store.facts
+
     def test_get_logger(self, controller):
         """Make sure we recieve a logger that maches our expectations."""
         logger = controller._get_logger()
@@ -4,13 +4,16 @@ from __future__ import unicode_literals
 
 import copy
 import datetime
+import pickle
+import weakref
 from builtins import str as text
 from operator import attrgetter
 
 import faker as faker_
 import pytest
 from freezegun import freeze_time
-from hamster_lib import Activity, Category, Fact, Tag
+from hamster_lib import (Activity, Category, Fact, FactRecord, FrozenActivity, FrozenCategory,
+    FrozenFact, FrozenTag, Tag)
 from six import text_type
 
 faker = faker_.Faker()
@@ -287,6 +290,39 @@ class TestFact(object):
         assert fact.end == start_end_datetimes[1]
         assert fact.tags == tag_list_valid_parametrized
 
+    @pytest.mark.parametrize('protocol', range(pickle.HIGHEST_PROTOCOL + 1))
+    def test_pickle(self, fact, protocol):
+        """Make sure facts can be pickled with any protocol."""
+        assert pickle.loads(pickle.dumps(fact, protocol)) == fact
+
+    def test_ad_hoc_attributes(self, fact):
+        """Make sure clients can attach their own attributes and weak references."""
+        fact.color = 'red'
+        assert fact.color == 'red'
+        assert weakref.ref(fact)() is fact
+
+    def test_copy(self, fact):
+        """Make sure copies are equal, but independent."""
+        result = copy.deepcopy(fact)
+        assert result == fact
+        result.activity.name = 'foo'
+        assert fact.activity.name != 'foo'
+
+    def test_as_record(self, fact):
+        """Make sure records hold names, with tags sorted."""
+        result = fact.as_record()
+        assert isinstance(result, FactRecord)
+        assert result.pk == fact.pk
+        assert (result.start, result.end) == (fact.start, fact.end)
+        assert result.activity == fact.activity.name
+        assert result.category == fact.category.name
+        assert result.tags == tuple(sorted(tag.name for tag in fact.tags))
+        assert result.description == fact.description
+
+    def test_as_record_without_category(self, fact):
+        fact.activity.category = None
+        assert fact.as_record().category is None
+
     def test_create_from_raw_fact_valid(self, valid_raw_fact_parametrized):
         """Make sure that a valid raw fact creates a proper Fact."""
         assert Fact.create_from_raw_fact(valid_raw_fact_parametrized)
@@ -296,6 +332,33 @@ class TestFact(object):
         with pytest.raises(ValueError):
             Fact.create_from_raw_fact(invalid_raw_fact_parametrized)
 
+    def test_create_from_raw_fact_with_tags(self):
+        """Make sure tags are extracted as new ``Tag`` instances."""
+        fact = Fact.create_from_raw_fact('12:00 - 13:00 foo@bar #t1 #t2, baz')
+        assert fact.category.name == 'bar'
+        assert sorted(tag.name for tag in fact.tags) == ['t1', 't2']
+        assert fact.description == 'baz'
+
+    @pytest.mark.parametrize('invalid', ('14:00 - 12:00 foo@bar', '12:00 - 14:00 @bar'))
+    def test_create_many_from_raw_facts(self, invalid):
+        """Make sure each line is reported on its own and blank lines are skipped."""
+        lines = [
+            '2015-05-02 10:00 - 2015-05-02 11:00 foo@bar, baz\n',
+            '\n',
+            invalid,
+            '2015-05-02 12:00 - 2015-05-02 13:00 foo@bar',
+        ]
+        results = list(Fact.create_many_from_raw_facts(lines))
+        assert [result.line_number for result in results] == [1, 3, 4]
+        first, invalid, last = results
+        assert first.error is None
+        assert first.fact.description == 'baz'
+        assert first.fact.end == datetime.datetime(2015, 5, 2, 11)
+        assert invalid.fact is None
+        assert isinstance(invalid.error, ValueError)
+        assert last.error is None
+        assert last.fact.start == datetime.datetime(2015, 5, 2, 12)
+
     @pytest.mark.parametrize(('raw_fact', 'expectations'), [
         ('-7 foo@bar, palimpalum',
          {'start': datetime.datetime(2015, 5, 2, 18, 0, 0),
@@ -582,3 +645,103 @@ class TestFact(object):
         result = repr(fact)
         assert isinstance(result, str)
         assert result == expectation
+
+
+class TestFrozen(object):
+    def test_frozen_category(self, category):
+        result = category.frozen()
+        assert isinstance(result, FrozenCategory)
+        assert result == category
+        assert hash(result) == hash(category)
+        assert result.thaw() == category
+
+    def test_frozen_tag(self, tag):
+        result = tag.frozen()
+        assert isinstance(result, FrozenTag)
+        assert result == tag
+        assert hash(result) == hash(tag)
+        assert result.thaw() == tag
+
+    def test_frozen_activity(self, activity):
+        """Make sure the category gets frozen as well."""
+        result = activity.frozen()
+        assert isinstance(result, FrozenActivity)
+        assert isinstance(result.category, FrozenCategory)
+        assert result == activity
+        assert hash(result) == hash(activity)
+        assert type(result.thaw().category) is Category
+
+    def test_frozen_fact(self, fact):
+        """Make sure related instances get frozen as well."""
+        result = fact.frozen()
+        assert isinstance(result, FrozenFact)
+        assert isinstance(result.activity, FrozenActivity)
+        assert isinstance(result.tags, frozenset)
+        assert all(isinstance(tag, FrozenTag) for tag in result.tags)
+        assert result == fact
+        assert fact == result
+        assert hash(result) == hash(fact)
+        assert result.frozen() is result
+
+    def test_thaw(self, fact):
+        result = fact.frozen().thaw()
+        assert type(result) is Fact
+        assert type(result.activity) is Activity
+        assert result == fact
+        result.description = 'foo'
+        assert fact.description != 'foo'
+
+    def test_hash_computed_once(self, fact, mocker):
+        result, other = fact.frozen(), copy.deepcopy(fact).frozen()
+        mocker.patch.object(Fact, 'as_tuple', side_effect=AssertionError)
+        hash(result)
+        assert result == other
+
+    @pytest.mark.parametrize('attribute', ('pk', 'start', 'description', 'tags', 'activity'))
+    def test_immutable(self, fact, attribute):
+        result = fact.frozen()
+        with pytest.raises(AttributeError):
+            setattr(result, attribute, None)
+        with pytest.raises(AttributeError):
+            delattr(result, attribute)
+
+    def test_related_immutable(self, fact):
+        result = fact.frozen()
+        with pytest.raises(AttributeError):
+            result.activity.name = 'foo'
+        with pytest.raises(AttributeError):
+            result.category.name = 'foo'
+        with pytest.raises(AttributeError):
+            result.tags.add(Tag('foo'))
+
+    def test_replace(self, fact):
+        """Make sure ``replace`` returns a new instance with a new hash."""
+        frozen = fact.frozen()
+        result = frozen.replace(description='foo', activity=Activity('bar'))
+        assert isinstance(result, FrozenFact)
+        assert isinstance(result.activity, FrozenActivity)
+        assert result.description == 'foo'
+        assert result.activity.name == 'bar'
+        assert result != frozen
+        assert frozen == fact
+        fact.description = 'foo'
+        fact.activity = Activity('bar')
+        assert hash(result) == hash(fact)
+
+    def test_replace_invalid(self, fact):
+        with pytest.raises(TypeError):
+            fact.frozen().replace(start='foo')
+
+    def test_set_deduplication(self, fact):
+        result = set([fact.frozen(), copy.deepcopy(fact).frozen(), fact.frozen().replace(pk=-1)])
+        assert len(result) == 2
+
+    def test_pickle(self, fact):
+        """Make sure unpickled instances are frozen and their hash is recomputed."""
+        frozen = fact.frozen()
+        result = pickle.loads(pickle.dumps(frozen))
+        assert isinstance(result, FrozenFact)
+        assert result == frozen
+        assert hash(result) == hash(frozen)
+        with pytest.raises(AttributeError):
+            result.description = 'foo'
@@ -40,6 +40,12 @@ def xml_writer(path):
     return reports.XMLWriter(path)
 
 
+@pytest.fixture(params=(reports.ICALWriter, reports.XMLWriter))
+def streamable_writer_class(request):
+    """Provide all writer classes that support a streaming mode."""
+    return request.param
+
+
 # Tests
 class TestReportWriter(object):
     @pytest.mark.parametrize('datetime_format', [None, '%Y-%m-%d'])
@@ -226,3 +232,38 @@ class TestXMLWriter(object):
         with open(path, 'rb') as fobj:
             result = xml.dom.minidom.parse(fobj)
             assert result.toxml()
+
+
+class TestStreamingWriters(object):
+    """Make sure streaming writers produce exactly what their buffering counterparts do."""
+
+    def get_output(self, writer_class, path, facts, stream):
+        writer_class(path, stream=stream).write_report(facts)
+        with open(path, 'rb') as fobj:
+            return fobj.read()
+
+    @pytest.mark.parametrize('amount', (0, 1, 5))
+    def test_output_identical(self, streamable_writer_class, path, list_of_facts, amount):
+        """Make sure streaming does not change the output."""
+        facts = list_of_facts(amount)
+        expectation = self.get_output(streamable_writer_class, path, facts, False)
+        assert self.get_output(streamable_writer_class, path, facts, True) == expectation
+
+    def test_output_identical_special_characters(self, streamable_writer_class, path, fact):
+        """Make sure escaping and encoding of markup and non ascii characters is identical."""
+        fact.description = '<b>"Fish" & \'chips\'</b> \u00e4\u00f6\u00fc\n\u20ac'
+        expectation = self.get_output(streamable_writer_class, path, [fact], False)
+        assert self.get_output(streamable_writer_class, path, [fact], True) == expectation
+
+    def test_no_document_kept(self, streamable_writer_class, path, list_of_facts):
+        """Make sure facts are written right away instead of accumulating in memory."""
+        writer = streamable_writer_class(path, stream=True)
+        writer.file.flush()
+        header_size = os.path.getsize(path)
+        for fact in list_of_facts(3):
+            writer._write_fact(writer._fact_to_tuple(fact))
+        writer.file.flush()
+        assert os.path.getsize(path) > header_size
+        assert getattr(writer, 'calendar', None) is None
+        assert getattr(writer, 'fact_list', None) is None
+        writer._close()
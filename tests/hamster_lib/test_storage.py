@@ -3,11 +3,13 @@ from __future__ import unicode_literals
 
 import datetime
 import os.path
-import pickle
+import threading
 
 import pytest
 from freezegun import freeze_time
-from hamster_lib import Fact
+from hamster_lib import Fact, Tag, storage
+from hamster_lib.columns import FactColumns
+from hamster_lib.helpers import helpers
 
 
 class TestBaseStore():
@@ -85,6 +87,22 @@ class TestCategoryManager():
         with pytest.raises(NotImplementedError):
             basestore.categories.get_all()
 
+    def test_get_page(self, basestore, category, mocker):
+        """Make sure we ask for one more item to tell if there is a next page."""
+        category.pk = 1
+        basestore.categories._get_page = mocker.MagicMock(return_value=[category, category])
+        page = basestore.categories.get_page(limit=1)
+        assert page.items == [category]
+        assert basestore.categories._get_page.call_args == mocker.call(None, 2)
+        basestore.categories._get_page.return_value = []
+        assert basestore.categories.get_page(limit=1, token=page.token) == storage.Page([], None)
+        assert basestore.categories._get_page.call_args == mocker.call(
+            (category.name, category.pk), 2)
+
+    def test__get_page(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.categories._get_page(None, 10)
+
 
 class TestActivityManager:
     def test_save_new(self, basestore, activity, mocker):
@@ -144,6 +162,54 @@ class TestActivityManager:
         with pytest.raises(NotImplementedError):
             basestore.activities.get_all()
 
+    def test_complete(self, basestore, mocker):
+        basestore.activities._complete = mocker.MagicMock(return_value=[])
+        assert basestore.activities.complete('fo', None, limit=3) == []
+        assert basestore.activities._complete.call_args == mocker.call('fo', None, 3)
+
+    @pytest.mark.parametrize('limit', (0, -1))
+    def test_complete_invalid_limit(self, basestore, limit):
+        with pytest.raises(ValueError):
+            basestore.activities.complete('fo', limit=limit)
+
+    def test__complete(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.activities._complete('fo', False, 10)
+
+    def test_get_recent(self, basestore, mocker):
+        basestore.activities._get_recent = mocker.MagicMock(return_value=[])
+        assert basestore.activities.get_recent(limit=3) == []
+        assert basestore.activities._get_recent.call_args == mocker.call(3)
+
+    def test_get_frequent(self, basestore, mocker):
+        basestore.activities._get_frequent = mocker.MagicMock(return_value=[])
+        assert basestore.activities.get_frequent(limit=3) == []
+        assert basestore.activities._get_frequent.call_args == mocker.call(3)
+
+    @pytest.mark.parametrize('limit', (0, -1))
+    def test_get_recent_invalid_limit(self, basestore, limit):
+        with pytest.raises(ValueError):
+            basestore.activities.get_recent(limit=limit)
+
+    @pytest.mark.parametrize('limit', (0, -1))
+    def test_get_frequent_invalid_limit(self, basestore, limit):
+        with pytest.raises(ValueError):
+            basestore.activities.get_frequent(limit=limit)
+
+    def test__get_recent(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.activities._get_recent(10)
+
+    def test__get_frequent(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.activities._get_frequent(10)
+
+    def test_get_page(self, basestore, activity, mocker):
+        """Make sure filters are passed on."""
+        basestore.activities._get_page = mocker.MagicMock(return_value=[activity])
+        assert basestore.activities.get_page(None, 'foo', limit=5).items == [activity]
+        assert basestore.activities._get_page.call_args == mocker.call(None, 'foo', None, 6)
+
 
 class TestTagManager():
     def test_add(self, basestore, tag):
@@ -214,6 +280,12 @@ class TestTagManager():
         with pytest.raises(NotImplementedError):
             basestore.tags.get_all()
 
+    def test_get_page(self, basestore, tag, mocker):
+        basestore.tags._get_page = mocker.MagicMock(return_value=[tag])
+        assert basestore.tags.get_page() == storage.Page([tag], None)
+        assert basestore.tags._get_page.call_args == mocker.call(None,
+            storage.DEFAULT_PAGE_SIZE + 1)
+
 
 class TestFactManager:
     def test_save_tmp_fact(self, basestore, fact, mocker):
@@ -240,6 +312,114 @@ class TestFactManager:
         with pytest.raises(NotImplementedError):
             basestore.facts._update(fact)
 
+    def test_save_many(self, basestore, list_of_facts, mocker):
+        """Make sure only valid facts are passed on and all errors are reported in order."""
+        facts = list_of_facts(5)
+        facts[1].pk = 1
+        facts[3].end = None
+        error = ValueError()
+        basestore.facts._add_many = mocker.MagicMock(
+            return_value=([facts[0], facts[4]], [(1, error)]))
+        saved, errors = basestore.facts.save_many(iter(facts))
+        assert basestore.facts._add_many.call_args == mocker.call([facts[0], facts[2], facts[4]])
+        assert saved == [facts[0], facts[4]]
+        assert [fact for fact, error in errors] == [facts[1], facts[2], facts[3]]
+        assert errors[1][1] is error
+        assert all(isinstance(error, ValueError) for fact, error in errors)
+
+    def test_save_many_to_brief_fact(self, basestore, fact, mocker):
+        """Ensure that a fact with to small delta is reported."""
+        basestore.facts._add_many = mocker.MagicMock(return_value=([], []))
+        fact.end = fact.start + datetime.timedelta(seconds=(
+            basestore.config['fact_min_delta'] - 1))
+        saved, errors = basestore.facts.save_many([fact])
+        assert errors[0][0] is fact
+        assert isinstance(errors[0][1], ValueError)
+
+    def test__add_many(self, basestore, fact):
+        with pytest.raises(NotImplementedError):
+            basestore.facts._add_many([fact])
+
+    @pytest.mark.parametrize(('start', 'end', 'expectation'), [
+        (None, None, (None, None)),
+        (datetime.date(2015, 4, 1), datetime.date(2015, 4, 3),
+            (datetime.date(2015, 4, 1), datetime.date(2015, 4, 3))),
+        (datetime.datetime(2015, 4, 1, 3, 0), datetime.datetime(2015, 4, 3, 12, 0),
+            (datetime.date(2015, 3, 31), datetime.date(2015, 4, 3))),
+    ])
+    def test_get_totals(self, basestore, mocker, start, end, expectation):
+        """Make sure datetimes are converted to the workday they belong to."""
+        basestore.facts._get_totals = mocker.MagicMock(return_value=[])
+        basestore.facts.get_totals(start, end, group_by=['activity'])
+        assert basestore.facts._get_totals.call_args == mocker.call(
+            expectation[0], expectation[1], ('activity',))
+
+    @pytest.mark.parametrize(('start', 'end', 'group_by'), [
+        (datetime.date(2015, 4, 3), datetime.date(2015, 4, 1), ('day',)),
+        (None, None, ('day', 'foo')),
+    ])
+    def test_get_totals_invalid(self, basestore, start, end, group_by):
+        with pytest.raises(ValueError):
+            basestore.facts.get_totals(start, end, group_by)
+
+    def test_get_totals_invalid_type(self, basestore):
+        with pytest.raises(TypeError):
+            basestore.facts.get_totals('2015-04-01')
+
+    def test__get_totals(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts._get_totals(None, None, ('day',))
+
+    def test__aggregate_totals(self, basestore, activity):
+        """Make sure facts are split by workday and summed up by activity and tag."""
+        tags = [Tag('foo'), Tag('bar')]
+        facts = [
+            Fact(activity, datetime.datetime(2015, 4, 1, 4, 0),
+                datetime.datetime(2015, 4, 1, 6, 0), tags=tags),
+            Fact(activity, datetime.datetime(2015, 4, 1, 8, 0),
+                datetime.datetime(2015, 4, 1, 8, 30), tags=tags[:1]),
+        ]
+        result = basestore.facts._aggregate_totals(facts, None, None, ('day', 'tag'))
+        assert result == [
+            storage.Total(datetime.date(2015, 3, 31), None, None, tags[1],
+                datetime.timedelta(minutes=90)),
+            storage.Total(datetime.date(2015, 3, 31), None, None, tags[0],
+                datetime.timedelta(minutes=90)),
+            storage.Total(datetime.date(2015, 4, 1), None, None, tags[1],
+                datetime.timedelta(minutes=30)),
+            storage.Total(datetime.date(2015, 4, 1), None, None, tags[0],
+                datetime.timedelta(minutes=60)),
+        ]
+        result = basestore.facts._aggregate_totals(facts, datetime.date(2015, 4, 1), None,
+            ('activity',))
+        assert result == [storage.Total(None, activity, activity.category, None,
+            datetime.timedelta(minutes=60))]
+
+    def test_aggregate(self, basestore, mocker):
+        """Make sure the timeframe is normalized just like ``get_all`` does."""
+        basestore.facts._aggregate = mocker.MagicMock(return_value=[])
+        basestore.facts.aggregate(datetime.date(2015, 4, 1), datetime.date(2015, 4, 2),
+            group_by=['week', 'tag'])
+        assert basestore.facts._aggregate.call_args == mocker.call(
+            datetime.datetime(2015, 4, 1, 5, 30), datetime.datetime(2015, 4, 3, 5, 29, 59),
+            ('week', 'tag'))
+
+    @pytest.mark.parametrize(('start', 'end', 'group_by'), [
+        (datetime.date(2015, 4, 3), datetime.date(2015, 4, 1), ('activity',)),
+        (None, None, ('activity', 'foo')),
+    ])
+    def test_aggregate_invalid(self, basestore, start, end, group_by):
+        with pytest.raises(ValueError):
+            basestore.facts.aggregate(start, end, group_by)
+
+    def test_aggregate_invalid_type(self, basestore):
+        with pytest.raises(TypeError):
+            basestore.facts.aggregate('2015-04-01')
+
+    def test__aggregate(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts._aggregate(None, None, ('activity',))
+
     def test_remove(self, basestore, fact):
         with pytest.raises(NotImplementedError):
             basestore.facts.remove(fact)
@@ -314,14 +494,140 @@ class TestFactManager:
         with pytest.raises(NotImplementedError):
             basestore.facts._get_all()
 
+    @freeze_time('2015-04-01 18:00')
+    def test_iter_all(self, basestore, mocker):
+        """Make sure timeframe normalization and batch size are passed on."""
+        basestore.facts._iter_all = mocker.MagicMock(return_value=iter([]))
+        result = basestore.facts.iter_all(datetime.date(2014, 4, 1), datetime.time(13, 40, 25),
+            'foo', batch_size=10)
+        assert list(result) == []
+        assert basestore.facts._iter_all.call_args == mocker.call(
+            datetime.datetime(2014, 4, 1, 5, 30, 0), datetime.datetime(2015, 4, 1, 13, 40, 25),
+            'foo', batch_size=10)
+
+    @pytest.mark.parametrize('batch_size', (0, -1))
+    def test_iter_all_invalid_batch_size(self, basestore, batch_size):
+        """Make sure we refuse non positive batch sizes right away."""
+        with pytest.raises(ValueError):
+            basestore.facts.iter_all(batch_size=batch_size)
+
+    def test_iter_all_end_before_start(self, basestore):
+        """Make sure validation happens before iteration starts."""
+        with pytest.raises(ValueError):
+            basestore.facts.iter_all(datetime.date(2015, 4, 5), datetime.date(2012, 3, 4))
+
+    def test__iter_all(self, basestore):
+        with pytest.raises(NotImplementedError):
+            next(basestore.facts._iter_all())
+
+    @freeze_time('2015-04-01 18:00')
+    def test_get_records(self, basestore, mocker):
+        """Make sure timeframe normalization and filter are passed on."""
+        basestore.facts._get_records = mocker.MagicMock(return_value=[])
+        assert basestore.facts.get_records(datetime.date(2014, 4, 1), None, 'foo') == []
+        assert basestore.facts._get_records.call_args == mocker.call(
+            datetime.datetime(2014, 4, 1, 5, 30, 0), None, 'foo')
+
+    def test__get_records(self, basestore, fact, mocker):
+        """Make sure the default implementation converts facts from ``_iter_all``."""
+        basestore.facts._iter_all = mocker.MagicMock(return_value=iter([fact]))
+        assert basestore.facts._get_records(None, None, '') == [fact.as_record()]
+
+    def test_get_columns(self, basestore, mocker):
+        """Make sure timeframe normalization and filter are passed on."""
+        basestore.facts._get_columns = mocker.MagicMock(return_value=FactColumns())
+        assert len(basestore.facts.get_columns(datetime.date(2014, 4, 1), None, 'foo')) == 0
+        assert basestore.facts._get_columns.call_args == mocker.call(
+            datetime.datetime(2014, 4, 1, 5, 30, 0), None, 'foo')
+
+    def test__get_columns(self, basestore, fact, mocker):
+        """Make sure the default implementation converts records from ``_get_records``."""
+        fact.pk = 1
+        basestore.facts._get_records = mocker.MagicMock(return_value=[fact.as_record()])
+        result = basestore.facts._get_columns(None, None, '')
+        assert list(result.pk) == [fact.pk]
+        assert result.activities == [fact.activity.name]
+        assert result.categories == [fact.category.name]
+
+    def test_get_page(self, basestore, fact, mocker):
+        """Make sure the timeframe is normalized and the token holds the last start."""
+        fact.pk = 3
+        basestore.facts._get_page = mocker.MagicMock(return_value=[fact, fact])
+        page = basestore.facts.get_page(datetime.date(2014, 4, 1), None, 'foo', limit=1)
+        assert page.items == [fact]
+        assert basestore.facts._get_page.call_args == mocker.call(
+            datetime.datetime(2014, 4, 1, 5, 30, 0), None, 'foo', None, 2)
+        basestore.facts.get_page(datetime.date(2014, 4, 1), None, 'foo', limit=1,
+            token=page.token)
+        assert basestore.facts._get_page.call_args == mocker.call(
+            datetime.datetime(2014, 4, 1, 5, 30, 0), None, 'foo', (fact.start, 3), 2)
+
+    @pytest.mark.parametrize('token', ('', 'foo', '\u00e4', 'W10=', 'WzEsMl0=', 'eyJhIjoxfQ=='))
+    def test_get_page_invalid_token(self, basestore, mocker, token):
+        """Make sure tokens not created by us are refused (``''`` means first page)."""
+        basestore.facts._get_page = mocker.MagicMock(return_value=[])
+        if not token:
+            assert basestore.facts.get_page(token=token).items == []
+            return
+        with pytest.raises(ValueError):
+            basestore.facts.get_page(token=token)
+
+    @pytest.mark.parametrize('limit', (0, -1))
+    def test_get_page_invalid_limit(self, basestore, limit):
+        with pytest.raises(ValueError):
+            basestore.facts.get_page(limit=limit)
+
+    def test__get_page(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts._get_page(None, None, '', None, 10)
+
+    def test_search(self, basestore, mocker):
+        """Make sure the query is split into terms and the timeframe normalized."""
+        basestore.facts._search = mocker.MagicMock(return_value=[])
+        assert basestore.facts.search(' foo  bar ', datetime.date(2014, 4, 1), limit=5) == []
+        assert basestore.facts._search.call_args == mocker.call(['foo', 'bar'],
+            datetime.datetime(2014, 4, 1, 5, 30, 0), None, 5)
+
+    def test_search_without_terms(self, basestore, mocker):
+        basestore.facts._search = mocker.MagicMock()
+        assert basestore.facts.search('  ') == []
+        assert not basestore.facts._search.called
+
+    @pytest.mark.parametrize('limit', (0, -1))
+    def test_search_invalid_limit(self, basestore, limit):
+        with pytest.raises(ValueError):
+            basestore.facts.search('foo', limit=limit)
+
+    def test__search(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts._search(['foo'], None, None, 10)
+
     def test_start_tmp_fact_new(self, basestore, fact):
         """Make sure that a valid new fact creates persistent file with proper content."""
         fact.end = None
         basestore.facts._start_tmp_fact(fact)
-        with open(basestore.facts._get_tmp_fact_path(), 'rb') as fobj:
-            new_fact = pickle.load(fobj)
-            assert isinstance(new_fact, Fact)
-            assert new_fact == fact
+        new_fact = helpers._load_tmp_fact(basestore.facts._get_tmp_fact_path())
+        assert isinstance(new_fact, Fact)
+        assert new_fact == fact
+
+    def test_start_tmp_fact_concurrent(self, basestore, fact):
+        """Make sure only one of several concurrent starts succeeds."""
+        fact.end = None
+        errors = []
+
+        def start():
+            try:
+                basestore.facts._start_tmp_fact(fact)
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=start) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 7
+        assert basestore.facts.get_tmp_fact() == fact
 
     def test_start_tmp_fact_existsing(self, basestore, fact, tmp_fact):
         """Make sure that starting an new 'ongoing fact' if we already got one throws error."""
@@ -423,6 +729,7 @@ class TestFactManager:
         result = basestore.facts.cancel_tmp_fact()
         assert result is None
         assert os.path.exists(basestore.facts._get_tmp_fact_path()) is False
+        assert os.path.exists('{}.lock'.format(basestore.facts._get_tmp_fact_path())) is False
 
     def test_cancel_tmp_fact_without_ongoing_fact(self, basestore):
         """Make sure that we raise a KeyError if ther is no 'ongoing fact'."""
@@ -70,6 +70,15 @@ def configparser_instance(request):
     config.set('Backend', 'db_name', 'hamster')
     config.set('Backend', 'db_user', 'hamster')
     config.set('Backend', 'db_password', 'hamster')
+    config.set('Backend', 'daily_totals', 'True')
+    config.set('Backend', 'db_pool_size', '5')
+    config.set('Backend', 'db_max_overflow', '10')
+    config.set('Backend', 'sqlite_journal_mode', 'WAL')
+    config.set('Backend', 'sqlite_synchronous', 'NORMAL')
+    config.set('Backend', 'sqlite_mmap_size', '268435456')
+    config.set('Backend', 'sqlite_cache_size', '-16000')
+    config.set('Backend', 'sqlite_temp_store', 'MEMORY')
+    config.set('Backend', 'sqlite_busy_timeout', '5000')
 
     expectation = {
         'store': text_type('sqlalchemy'),
@@ -83,6 +92,15 @@ def configparser_instance(request):
         'db_name': text_type('hamster'),
         'db_user': text_type('hamster'),
         'db_password': text_type('hamster'),
+        'daily_totals': True,
+        'db_pool_size': 5,
+        'db_max_overflow': 10,
+        'sqlite_journal_mode': text_type('WAL'),
+        'sqlite_synchronous': text_type('NORMAL'),
+        'sqlite_mmap_size': 268435456,
+        'sqlite_cache_size': -16000,
+        'sqlite_temp_store': text_type('MEMORY'),
+        'sqlite_busy_timeout': 5000,
     }
 
     return config, expectation
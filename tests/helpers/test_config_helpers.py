@@ -173,3 +173,37 @@ class TestConfigParserToBackendConfig(object):
         cp_instance, expectation = configparser_instance
         result = config_helpers.configparser_to_backend_config(cp_instance)
         assert result == expectation
+
+    def test_daily_totals_missing(self, configparser_instance):
+        """Make sure config files lacking the ``daily_totals`` option still work."""
+        cp_instance, expectation = configparser_instance
+        cp_instance.remove_option('Backend', 'daily_totals')
+        result = config_helpers.configparser_to_backend_config(cp_instance)
+        assert result['daily_totals'] is False
+
+    def test_roundtrip_default_pool_settings(self, configparser_instance):
+        """Make sure unset pool settings survive being written to a config file."""
+        cp_instance, expectation = configparser_instance
+        expectation.update({'db_pool_size': None, 'db_max_overflow': None})
+        cp_instance = config_helpers.backend_config_to_configparser(expectation)
+        assert config_helpers.configparser_to_backend_config(cp_instance) == expectation
+
+    def test_roundtrip_default_sqlite_options(self, configparser_instance):
+        """Make sure the default sqlite tuning survives being written to a config file."""
+        cp_instance, expectation = configparser_instance
+        default_config = config_helpers.get_default_backend_config(
+            config_helpers.DEFAULT_APPDIRS)
+        for key in config_helpers.SQLITE_TEXT_OPTIONS + config_helpers.SQLITE_INT_OPTIONS:
+            expectation[key] = default_config[key]
+        cp_instance = config_helpers.backend_config_to_configparser(expectation)
+        assert config_helpers.configparser_to_backend_config(cp_instance) == expectation
+
+    @pytest.mark.parametrize('key', ('db_pool_size', 'db_max_overflow', 'sqlite_journal_mode',
+        'sqlite_mmap_size'))
+    def test_optional_settings_missing(self, configparser_instance, key):
+        """Make sure missing or empty optional settings select the engines default."""
+        cp_instance, expectation = configparser_instance
+        cp_instance.remove_option('Backend', key)
+        assert config_helpers.configparser_to_backend_config(cp_instance)[key] is None
+        cp_instance.set('Backend', key, '')
+        assert config_helpers.configparser_to_backend_config(cp_instance)[key] is None
@@ -2,6 +2,8 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import json
+import os.path
 import pickle
 
 import pytest
@@ -26,6 +28,78 @@ class TestLoadTmpFact(object):
         result = helpers._load_tmp_fact(base_config['tmpfile_path'])
         assert result == tmp_fact
 
+    def test_legacy_pickle(self, base_config, fact):
+        """Make sure files pickled by previous versions can still be loaded."""
+        fact.end = None
+        with open(base_config['tmpfile_path'], 'wb') as fobj:
+            pickle.dump(fact, fobj)
+        assert helpers._load_tmp_fact(base_config['tmpfile_path']) == fact
+
+    def test_unsupported_version(self, base_config):
+        """Make sure we refuse files written in a format we do not know."""
+        with open(base_config['tmpfile_path'], 'wb') as fobj:
+            fobj.write(json.dumps({'version': 0}).encode('utf-8'))
+        with pytest.raises(TypeError):
+            helpers._load_tmp_fact(base_config['tmpfile_path'])
+
+
+class TestDumpTmpFact(object):
+    """Tests related to storing the 'ongoing fact'."""
+    @pytest.mark.parametrize('with_category', (True, False))
+    def test_roundtrip(self, base_config, fact, with_category):
+        """Make sure the fact we load equals the one we stored."""
+        fact.end = None
+        if not with_category:
+            fact.activity.category = None
+        helpers._dump_tmp_fact(base_config['tmpfile_path'], fact)
+        assert helpers._load_tmp_fact(base_config['tmpfile_path']) == fact
+
+    def test_replaces_existing(self, base_config, tmp_fact, fact):
+        """Make sure an existing file is replaced and no temporary files are left."""
+        fact.end = None
+        helpers._dump_tmp_fact(base_config['tmpfile_path'], fact)
+        assert helpers._load_tmp_fact(base_config['tmpfile_path']) == fact
+        directory = os.path.dirname(base_config['tmpfile_path'])
+        assert os.listdir(directory) == [os.path.basename(base_config['tmpfile_path'])]
+
+    def test_failed_write(self, base_config, tmp_fact, fact, mocker):
+        """Make sure a failing write leaves the existing file untouched."""
+        mocker.patch.object(helpers.os, 'fsync', side_effect=OSError)
+        with pytest.raises(OSError):
+            helpers._dump_tmp_fact(base_config['tmpfile_path'], fact)
+        assert helpers._load_tmp_fact(base_config['tmpfile_path']) == tmp_fact
+        directory = os.path.dirname(base_config['tmpfile_path'])
+        assert os.listdir(directory) == [os.path.basename(base_config['tmpfile_path'])]
+
+
+class TestLockTmpFact(object):
+    """Tests related to locking and removing the 'ongoing fact'."""
+    def test_remove_tmp_fact(self, base_config, tmp_fact):
+        """Make sure removing the 'ongoing fact' does not leave its lock file behind."""
+        path = base_config['tmpfile_path']
+        with helpers._lock_tmp_fact(path):
+            helpers._remove_tmp_fact(path)
+        assert os.listdir(os.path.dirname(path)) == []
+
+    @pytest.mark.skipif(helpers.fcntl is None, reason="Requires fcntl.")
+    def test_lock_file_removed_while_waiting(self, base_config, tmp_fact, mocker):
+        """Make sure a lock file removed before we got hold of it is not used."""
+        path = base_config['tmpfile_path']
+        flock = helpers.fcntl.flock
+
+        def remove_before_locking(fd, operation):
+            if operation == helpers.fcntl.LOCK_EX:
+                locked.append(fd)
+                if len(locked) == 1:
+                    os.remove('{}.lock'.format(path))
+            flock(fd, operation)
+
+        locked = []
+        mocker.patch.object(helpers.fcntl, 'flock', side_effect=remove_before_locking)
+        with helpers._lock_tmp_fact(path):
+            assert len(locked) == 2
+            assert os.path.exists('{}.lock'.format(path))
+
 
 class TestParseRawFact(object):
     def test_parsing(self, raw_fact_parametrized):
@@ -36,3 +110,31 @@ class TestParseRawFact(object):
         assert result['activity'] == expectation['activity']
         assert result['category'] == expectation['category']
         assert result['description'] == expectation['description']
+
+    def test_cached_result_is_a_copy(self):
+        """Make sure modifying a result does not affect later results."""
+        result = helpers.parse_raw_fact('foo@bar, baz')
+        result['activity'] = 'changed'
+        assert helpers.parse_raw_fact('foo@bar, baz')['activity'] == 'foo'
+
+    @pytest.mark.skipif(helpers.lru_cache is None, reason="Requires 'functools.lru_cache'.")
+    def test_cached(self, mocker):
+        """Make sure identical raw facts are only parsed once."""
+        helpers._cached_parse_raw_fact.cache_clear()
+        get_timeframe = mocker.spy(helpers.time_helpers, 'get_timeframe')
+        first = helpers.parse_raw_fact('12:00 foo@bar')
+        assert helpers.parse_raw_fact('12:00 foo@bar') == first
+        assert get_timeframe.call_count == 1
+
+    @pytest.mark.parametrize(('raw_fact', 'expectation'), (
+        ('foo@bar #t1 #t2, baz', ('bar', ['t1', 't2'], 'baz')),
+        ('foo@bar #t1, baz #no-tag, @x', ('bar', ['t1'], 'baz #no-tag, @x')),
+        ('foo@ #t1', (None, ['t1'], None)),
+        ('foo@bar #t1 qux', ('bar #t1 qux', [], None)),
+        ('foo@C# lang', ('C# lang', [], None)),
+        ('foo #t1', (None, [], None)),
+    ))
+    def test_tags(self, raw_fact, expectation):
+        """Make sure tags are extracted from the end of the category part only."""
+        result = helpers.parse_raw_fact(raw_fact)
+        assert (result['category'], result['tags'], result['description']) == expectation
@@ -274,6 +274,46 @@ class TestEndDayToDaytime(object):
         assert time_helpers.end_day_to_datetime(end_day, config) == expectation
 
 
+class TestGetWorkday(object):
+    @pytest.mark.parametrize(('moment', 'day_start', 'expectation'), [
+        (datetime.datetime(2015, 4, 5, 12, 0, 0), datetime.time(5, 30, 0),
+         datetime.date(2015, 4, 5)),
+        (datetime.datetime(2015, 4, 5, 5, 30, 0), datetime.time(5, 30, 0),
+         datetime.date(2015, 4, 5)),
+        (datetime.datetime(2015, 4, 5, 5, 29, 59), datetime.time(5, 30, 0),
+         datetime.date(2015, 4, 4)),
+        (datetime.datetime(2015, 4, 5, 0, 0, 0), datetime.time(0, 0, 0),
+         datetime.date(2015, 4, 5)),
+    ])
+    def test_various_moments(self, base_config, moment, day_start, expectation):
+        """Make sure points in time before ``day_start`` belong to the previous workday."""
+        base_config['day_start'] = day_start
+        assert time_helpers.get_workday(moment, base_config) == expectation
+
+
+class TestSplitByWorkday(object):
+    @pytest.mark.parametrize(('start', 'end', 'expectation'), [
+        (datetime.datetime(2015, 4, 5, 12, 0, 0), datetime.datetime(2015, 4, 5, 13, 0, 0),
+         [(datetime.date(2015, 4, 5), datetime.timedelta(hours=1))]),
+        # Crossing midnight does not start a new workday.
+        (datetime.datetime(2015, 4, 5, 23, 0, 0), datetime.datetime(2015, 4, 6, 2, 0, 0),
+         [(datetime.date(2015, 4, 5), datetime.timedelta(hours=3))]),
+        (datetime.datetime(2015, 4, 6, 4, 30, 0), datetime.datetime(2015, 4, 6, 6, 0, 0),
+         [(datetime.date(2015, 4, 5), datetime.timedelta(hours=1)),
+          (datetime.date(2015, 4, 6), datetime.timedelta(minutes=30))]),
+        (datetime.datetime(2015, 4, 5, 12, 0, 0), datetime.datetime(2015, 4, 7, 12, 0, 0),
+         [(datetime.date(2015, 4, 5), datetime.timedelta(hours=17, minutes=30)),
+          (datetime.date(2015, 4, 6), datetime.timedelta(hours=24)),
+          (datetime.date(2015, 4, 7), datetime.timedelta(hours=6, minutes=30))]),
+        (datetime.datetime(2015, 4, 5, 12, 0, 0), datetime.datetime(2015, 4, 5, 12, 0, 0),
+         []),
+    ])
+    def test_various_timeframes(self, base_config, start, end, expectation):
+        """Make sure timeframes are split at ``day_start``."""
+        base_config['day_start'] = datetime.time(5, 30, 0)
+        assert time_helpers.split_by_workday(start, end, base_config) == expectation
+
+
 class TestParseTime(object):
     @pytest.mark.parametrize(('time', 'expectation'), [
         ('18:55', datetime.time(18, 55)),